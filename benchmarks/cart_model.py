@@ -0,0 +1,56 @@
+# benchmarks/cart_model.py
+
+"""
+Cart update costs at the billing counter: adding new and existing lines,
+changing the discount/tax rates and removing lines, with a QTableView
+attached as on the billing screen.
+
+    python -m benchmarks.cart_model [lines]
+"""
+
+import sys
+import time
+from decimal import Decimal
+
+from PyQt6.QtWidgets import QApplication, QTableView
+
+from models.money import Money
+from ui.cart_model import CartModel
+
+
+def main():
+    app = QApplication(sys.argv)
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    cart = CartModel()
+    view = QTableView()
+    view.setModel(cart)
+    totals = []
+    cart.totals_changed.connect(lambda: totals.append(cart.totals()))  # As the screen does for its labels
+
+    started = time.perf_counter()
+    for med_id in range(line_count):
+        cart.add(med_id, f"Medicine {med_id}", 12.35, 1)
+    add_new = time.perf_counter() - started
+    started = time.perf_counter()
+    for med_id in range(line_count):
+        cart.add(med_id, f"Medicine {med_id}", 12.35, 2)
+    add_existing = time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(1000):
+        cart.set_rates(Decimal("5"), Decimal(_ % 17))
+    rate_changes = time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(1000):
+        cart.remove_row(cart.rowCount() // 2)
+    removes = time.perf_counter() - started
+
+    expected = sum((line.price * line.qty for line in cart.lines()), Money(0))
+    assert cart.subtotal == expected, (cart.subtotal, expected)
+    print(f"{line_count} lines: new line {add_new / line_count * 1e6:.1f}us, "
+          f"existing line {add_existing / line_count * 1e6:.1f}us, "
+          f"rate change {rate_changes / 1000 * 1e6:.1f}us, "
+          f"remove from middle {removes / 1000 * 1e6:.1f}us; subtotal {cart.totals()['subtotal']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+# benchmarks/email_suggestions.py
+
+"""
+Login email completion per keystroke, with count remembered emails across
+three domains.
+
+    python -m benchmarks.email_suggestions [emails]
+"""
+
+import sys
+import time
+
+from ui.email_suggestions import EmailSuggestions
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    suggestions = EmailSuggestions(capacity=count)
+    suggestions.load([f"user{i}@{('gmail.com', 'pharmacare.pk', 'outlook.com')[i % 3]}" for i in range(count * 2)])
+    typed = ["u", "us", "user1", "user12", "g", "gm", "pharma", "x"]
+    started = time.perf_counter()
+    for _ in range(10000):
+        for prefix in typed:
+            suggestions.complete(prefix)
+    elapsed = time.perf_counter() - started
+    print(f"{len(suggestions)} emails kept: {elapsed / (10000 * len(typed)) * 1e6:.1f}us per keystroke")
+    print(suggestions.complete("user1", 5), suggestions.complete("pharma", 3))
+
+
+if __name__ == "__main__":
+    main()
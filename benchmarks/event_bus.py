@@ -0,0 +1,38 @@
+# benchmarks/event_bus.py
+
+"""
+Event coalescing under a burst of writes: 1000 stock updates published in
+ten passes of the event loop, delivered to one visible and one hidden screen.
+Prints how many refreshes each screen did and the bus counters.
+
+    python -m benchmarks.event_bus
+"""
+
+import sys
+
+from PyQt6.QtWidgets import QApplication, QWidget
+
+from database.change_feed import ChangeEvent, ChangeFeed
+from ui.event_bus import EventBus
+
+
+def main():
+    app = QApplication(sys.argv)
+    feed = ChangeFeed()
+    bus = EventBus(feed)
+    shown, hidden = QWidget(), QWidget()
+    shown.show()
+    refreshes = {"shown": 0, "hidden": 0}
+    bus.subscribe(lambda events: refreshes.__setitem__("shown", refreshes["shown"] + 1), ["medicines"], shown, True)
+    bus.subscribe(lambda events: refreshes.__setitem__("hidden", refreshes["hidden"] + 1), ["medicines"], hidden, True)
+    for tick in range(10):
+        for med_id in range(100):  # e.g. a queued backlog of sales replayed in one pass
+            feed.publish(ChangeEvent("medicines", ChangeEvent.UPDATE, [med_id], ["stock"]))
+        app.processEvents()
+    print("after 1000 writes:", refreshes, bus.stats())
+    hidden.show()
+    print("hidden screen shown:", refreshes, bus.stats())
+
+
+if __name__ == "__main__":
+    main()
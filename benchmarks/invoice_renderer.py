@@ -0,0 +1,38 @@
+# benchmarks/invoice_renderer.py
+
+"""
+Batch invoice export speed: renders the same three-line sale as count
+invoices into one PDF with InvoiceRenderer.
+
+    python -m benchmarks.invoice_renderer [count]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from PyQt6.QtGui import QGuiApplication
+
+from ui.invoice_renderer import InvoiceRenderer, invoice_from_sale
+
+
+def main():
+    app = QGuiApplication(sys.argv)
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    sale = {"id": 1, "sale_date": "2024-01-01 10:00:00", "customer_name": "Walk-in", "customer_phone": "",
+            "customer_email": "", "total_amount": 41.25,
+            "items": [{"med_id": 1, "name": "Paracetamol 500mg", "qty": 2, "price": 5.5},
+                      {"med_id": 2, "name": "Amoxicillin 250mg", "qty": 1, "price": 12.75},
+                      {"med_id": 3, "name": "Vitamin D3", "qty": 1, "price": 17.5}]}
+    invoices = [dict(invoice_from_sale(sale), number=i) for i in range(1, count + 1)]
+    path = os.path.join(tempfile.gettempdir(), "pharmacare_invoice_benchmark.pdf")
+    started = time.perf_counter()
+    written = InvoiceRenderer().render_to_pdf(invoices, path)
+    elapsed = time.perf_counter() - started
+    print(f"{written} invoices in {elapsed:.2f}s ({written / elapsed:.0f} invoices/s), "
+          f"{os.path.getsize(path) / 1024:.0f} KiB -> {path}")
+
+
+if __name__ == "__main__":
+    main()
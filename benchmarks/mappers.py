@@ -0,0 +1,83 @@
+# benchmarks/mappers.py
+
+"""
+Row mapping speed: Model.from_db_row per row against the generated mappers
+in database.mappers, on 100k-row fetches from an in-memory database.
+
+    python -m benchmarks.mappers
+"""
+
+import json
+import sqlite3
+import time
+
+from database.mappers import (CUSTOMER_COLUMNS, MEDICINE_COLUMNS, SALE_LIST_COLUMNS, STATEMENT_CACHE_SIZE,
+                              USER_COLUMNS, load_sale_items, map_customers, map_medicines, map_sales, map_users)
+from models.customer import Customer
+from models.medicine import Medicine
+from models.money import Money
+from models.user import User
+
+ROWS = 100_000
+
+
+def main():
+    conn = sqlite3.connect(":memory:", cached_statements=STATEMENT_CACHE_SIZE)
+    conn.execute("""CREATE TABLE medicines (id INTEGER PRIMARY KEY, name TEXT, brand TEXT, category TEXT,
+                    price_minor INTEGER, stock INTEGER, low_stock_alert INTEGER, expiry_date TEXT, description TEXT,
+                    created_at TEXT, row_version INTEGER, barcode TEXT, cost_price_minor INTEGER)""")
+    conn.execute("""CREATE TABLE customers (id INTEGER PRIMARY KEY, name TEXT, phone TEXT, email TEXT, address TEXT,
+                    created_at TEXT, row_version INTEGER)""")
+    conn.execute("""CREATE TABLE users (id INTEGER PRIMARY KEY, full_name TEXT, email TEXT, password TEXT,
+                    created_at TEXT)""")
+    conn.execute("""CREATE TABLE sales (id INTEGER PRIMARY KEY, customer_id INTEGER, customer_name TEXT,
+                    customer_phone TEXT, customer_email TEXT, total_amount_minor INTEGER, sale_date TEXT,
+                    items_json TEXT, subtotal_minor INTEGER, discount_minor INTEGER, tax_minor INTEGER,
+                    discount_rate TEXT, tax_rate TEXT)""")
+    items = json.dumps([{"med_id": 1, "qty": 2, "price": 12.5, "name": "Paracetamol"}])
+    conn.executemany("INSERT INTO medicines VALUES (?, ?, 'Brand', 'Category', 950, 100, 10, '2027-01-01', "
+                     "'Description', '2024-01-01 10:00:00', 1, ?, 700)",
+                     ((i, f"Medicine {i}", f"{i:013d}") for i in range(ROWS)))
+    conn.executemany("INSERT INTO customers VALUES (?, ?, '555-0100', 'c@example.com', 'Street', "
+                     "'2024-01-01 10:00:00', 1)", ((i, f"Customer {i}") for i in range(ROWS)))
+    conn.executemany("INSERT INTO users VALUES (?, ?, 'u@example.com', 'hash', '2024-01-01 10:00:00')",
+                     ((i, f"User {i}") for i in range(ROWS)))
+    conn.executemany("INSERT INTO sales VALUES (?, 1, 'Walk-in', '', '', 2500, '2024-01-01 10:00:00', ?, 2500, 0, 0, '0', '0')",
+                     ((i, items) for i in range(ROWS)))
+
+    def manual_sales(rows):
+        return [{"id": r[0], "customer_id": r[1], "customer_name": r[2], "customer_phone": r[3],
+                 "customer_email": r[4], "total_amount": Money(r[5]), "sale_date": r[6],
+                 "items": load_sale_items(r[7]), "subtotal": Money(r[8]), "discount": Money(r[9]),
+                 "tax": Money(r[10]), "discount_rate": r[11], "tax_rate": r[12]}
+                for r in rows]
+
+    def best_of(fn, repeat=5):
+        best = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - started)
+        return best
+
+    cases = [
+        ("Medicine", f"SELECT {MEDICINE_COLUMNS} FROM medicines", lambda rows: [Medicine.from_db_row(r) for r in rows],
+         map_medicines),
+        ("Customer", f"SELECT {CUSTOMER_COLUMNS} FROM customers", lambda rows: [Customer.from_db_row(r) for r in rows],
+         map_customers),
+        ("User", f"SELECT {USER_COLUMNS} FROM users", lambda rows: [User.from_db_row(r) for r in rows], map_users),
+        ("Sale dict", f"SELECT {SALE_LIST_COLUMNS} FROM sales", manual_sales, map_sales),
+    ]
+    print(f"{'Rows':<10}{'fetch':>10}{'from_db_row':>14}{'mapper':>10}{'speed-up':>10}   ({ROWS} rows, best of 5)")
+    for label, sql, old_mapper, new_mapper in cases:
+        rows = conn.execute(sql).fetchall()
+        fetch = best_of(lambda: conn.execute(sql).fetchall())
+        old = best_of(lambda: old_mapper(rows))
+        new = best_of(lambda: new_mapper(rows))
+        assert [o if isinstance(o, dict) else o.to_dict() for o in old_mapper(rows[:3])] == \
+               [o if isinstance(o, dict) else o.to_dict() for o in new_mapper(rows[:3])]
+        print(f"{label:<10}{fetch * 1000:>8.1f}ms{old * 1000:>12.1f}ms{new * 1000:>8.1f}ms{old / new:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
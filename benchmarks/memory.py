@@ -0,0 +1,68 @@
+# benchmarks/memory.py
+
+"""
+Per-row memory footprint of the model classes.
+
+Compares the slotted models against the same classes backed by a per-instance
+__dict__ (how they were defined before). Field values are created up front
+and shared, so the numbers are the cost of the objects themselves, which is
+what every screen pays for each row it keeps.
+
+    python -m benchmarks.memory
+"""
+
+import gc
+import tracemalloc
+
+from models.medicine import Medicine
+from models.customer import Customer
+from models.user import User
+from models.sale import Sale
+
+ROWS = 100_000
+
+
+def dict_backed(cls):
+    """Returns a copy of cls without __slots__, i.e. with a per-instance __dict__."""
+    namespace = {name: value for name, value in vars(cls).items()
+                 if name not in ("__slots__", "__dict__", "__weakref__") and name not in cls.__slots__}
+    return type(f"Dict{cls.__name__}", (), namespace)
+
+
+def bytes_per_row(factory, rows):
+    """Allocates one object per row and returns the average number of bytes each one holds."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [factory(row) for row in rows]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    list_overhead = 8 * len(objects)  # The list's own pointer array
+    return (after - before - list_overhead) / len(objects)
+
+
+def main():
+    medicine_rows = [(i, f"Medicine {i}", "Brand", "Category", 9.5, 100, 10, "2027-01-01", "Description",
+                      "2024-01-01 10:00:00", 1) for i in range(ROWS)]
+    customer_rows = [(i, f"Customer {i}", f"555-{i:06d}", f"c{i}@example.com", "Street", "2024-01-01 10:00:00", 1)
+                     for i in range(ROWS)]
+    user_rows = [(i, f"User {i}", f"u{i}@example.com", "hash", "2024-01-01 10:00:00") for i in range(ROWS)]
+    sale_rows = [(i, "Walk-in", "", "", 25.0, "2024-01-01 10:00:00", '[{"med_id": 1, "qty": 2}]')
+                 for i in range(ROWS)]
+
+    cases = [
+        (Medicine, lambda cls: lambda r: cls(r[1], r[2], r[3], r[4], r[5], r[6], r[7], r[8], r[0], r[9], r[10]),
+         medicine_rows),
+        (Customer, lambda cls: lambda r: cls(r[0], r[1], r[2], r[3], r[4], r[5], r[6]), customer_rows),
+        (User, lambda cls: lambda r: cls(r[1], r[2], r[3], r[0], r[4]), user_rows),
+        (Sale, lambda cls: lambda r: cls(r[1], r[4], r[6], r[2], r[3], r[0], r[5]), sale_rows),
+    ]
+    print(f"{'Model':<10}{'__dict__':>12}{'__slots__':>12}{'saved':>10}   (bytes per row, {ROWS} rows)")
+    for cls, make_factory, rows in cases:
+        before = bytes_per_row(make_factory(dict_backed(cls)), rows)
+        after = bytes_per_row(make_factory(cls), rows)
+        print(f"{cls.__name__:<10}{before:>12.0f}{after:>12.0f}{1 - after / before:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
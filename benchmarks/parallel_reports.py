@@ -0,0 +1,64 @@
+# benchmarks/parallel_reports.py
+
+"""
+Sales report over a long date range: the report thread alone against
+ReportProcessPool with 1, 2, 4 and report_processes() processes, on a
+scratch database of random sales.
+
+    python -m benchmarks.parallel_reports [sales] [years]
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from database.db_manager import DBManager
+from database.parallel_reports import ReportProcessPool, report_processes
+from database.report_engine import format_sale_row
+
+
+def main():
+    sale_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    years = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    with tempfile.TemporaryDirectory() as directory:
+        db_name = os.path.join(directory, "bench.db")
+        db_manager = DBManager(db_name, error_reporter=lambda title, message: print(f"{title}: {message}"))
+        first_day = datetime(2021, 1, 1)
+        rows = []
+        for sale_id in range(1, sale_count + 1):
+            items = [{"med_id": random.randint(1, 500), "name": f"Medicine {random.randint(1, 500)}",
+                      "qty": random.randint(1, 5), "price": round(random.uniform(5, 500), 2)} for _ in range(4)]
+            total = round(sum(item["price"] * 100 * item["qty"] for item in items))
+            sale_date = first_day + timedelta(seconds=random.randint(0, years * 365 * 86400))
+            rows.append((sale_id, f"Customer {sale_id % 1000}", total, sale_date.strftime('%Y-%m-%d %H:%M:%S'),
+                         json.dumps(items), total, 0, 0))
+        db_manager.conn.executemany(
+            "INSERT INTO sales (id, customer_name, total_amount_minor, sale_date, items_json, subtotal_minor, "
+            "discount_minor, tax_minor) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        db_manager.conn.commit()
+        start_date = first_day.strftime('%Y-%m-%d')
+        end_date = (first_day + timedelta(days=years * 365)).strftime('%Y-%m-%d')
+        print(f"{sale_count} sales over {years} years, {os.cpu_count()} CPU(s)")
+
+        started = time.perf_counter()
+        serial = [format_sale_row(sale) for sale in db_manager.get_sales_in_date_range(start_date, end_date)]
+        baseline = time.perf_counter() - started
+        print(f"  report thread:  {baseline:.2f}s")
+        for processes in sorted({1, 2, 4, report_processes()}):
+            pool = ReportProcessPool(db_name, processes=processes, min_days=1)
+            pool.map_date_range("get_sales_tax_summary", start_date, start_date)  # Start the processes first
+            started = time.perf_counter()
+            partitions = pool.map_date_range("get_sales_in_date_range", start_date, end_date, format_sale_row)
+            elapsed = time.perf_counter() - started
+            pool.shutdown()
+            assert sum(len(partition) for partition in partitions) == len(serial)
+            print(f"  {processes} process(es): {elapsed:.2f}s ({baseline / elapsed:.1f}x)")
+        db_manager.close_db()
+
+
+if __name__ == "__main__":
+    main()
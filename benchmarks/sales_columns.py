@@ -0,0 +1,59 @@
+# benchmarks/sales_columns.py
+
+"""
+Grouping sold lines by medicine over a year: SQL against the NumPy column
+store, on an in-memory database of random sales (NumPy required).
+
+    python -m benchmarks.sales_columns [lines]
+"""
+
+import sqlite3
+import sys
+import time
+from datetime import date
+
+from database.sales_columns import SalesColumnStore, np
+
+
+def main():
+    if np is None:
+        sys.exit("NumPy is not installed.")
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    conn = sqlite3.connect(":memory:")
+    conn.executescript("""
+        CREATE TABLE sales (id INTEGER PRIMARY KEY, customer_id INTEGER, sale_date TEXT, total_amount_minor INTEGER);
+        CREATE TABLE sale_items (sale_id INTEGER, line_no INTEGER, med_id INTEGER, qty INTEGER, net_minor INTEGER,
+                                 PRIMARY KEY (sale_id, line_no));
+        CREATE TABLE sales_rollups (sale_day TEXT PRIMARY KEY, sale_count INTEGER);
+    """)
+    rng = np.random.default_rng(1)
+    sale_count = line_count // 4
+    days = rng.integers(date(2022, 1, 1).toordinal(), date(2025, 12, 31).toordinal(), sale_count)
+    conn.executemany("INSERT INTO sales (id, customer_id, sale_date) VALUES (?, ?, ?)",
+                     ((sale_id + 1, int(rng.integers(1, 2000)), date.fromordinal(int(day)).isoformat() + " 10:00:00")
+                      for sale_id, day in enumerate(np.sort(days))))
+    conn.executemany("INSERT INTO sale_items VALUES (?, ?, ?, ?, ?)",
+                     ((line // 4 + 1, line % 4 + 1, int(med), int(qty), int(qty) * 1500)
+                      for line, (med, qty) in enumerate(zip(rng.integers(1, 5000, line_count),
+                                                            rng.integers(1, 6, line_count)))))
+    store = SalesColumnStore()
+    started = time.perf_counter()
+    store.sync(conn)
+    print(f"Loaded {len(store)} lines in {time.perf_counter() - started:.2f}s")
+
+    started = time.perf_counter()
+    conn.execute("""SELECT i.med_id, SUM(i.qty), SUM(i.net_minor), COUNT(DISTINCT i.sale_id)
+                    FROM sale_items i JOIN sales s ON s.id = i.sale_id
+                    WHERE s.sale_date >= '2024-01-01' AND s.sale_date < '2025-01-01' GROUP BY i.med_id""").fetchall()
+    print(f"SQL group by medicine over 2024:     {(time.perf_counter() - started) * 1000:.1f}ms")
+    started = time.perf_counter()
+    by_medicine = store.group_sum("med_id", ("qty", "net_minor"), "2024-01-01", "2024-12-31")
+    print(f"Columns group by medicine over 2024: {(time.perf_counter() - started) * 1000:.1f}ms "
+          f"({len(by_medicine['med_id'])} medicines)")
+    started = time.perf_counter()
+    store.total(("net_minor",), "2024-01-01", "2024-12-31", customer_id=42)
+    print(f"Columns one customer's 2024 total:   {(time.perf_counter() - started) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
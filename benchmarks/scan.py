@@ -0,0 +1,77 @@
+# benchmarks/scan.py
+
+"""
+Checkout scan throughput.
+
+Builds a scratch database with a few thousand barcoded medicines and measures
+how many scans per second each stage of the scanner path sustains:
+
+  * indexed SQL: one SELECT on the unique idx_medicines_barcode index
+  * catalog:     DBManager.get_medicine_by_barcode (in-memory barcode index)
+  * checkout:    BillingScreen.scan_barcode end to end, i.e. lookup, stock
+                 check, cart update and totals, for a basket of 20 items
+
+    python -m benchmarks.scan [medicines] [scans]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from PyQt6.QtWidgets import QApplication
+
+from database.db_manager import DBManager
+from database.mappers import MEDICINE_COLUMNS, map_medicines
+from ui.billing_screen import BillingScreen
+
+BASKET_SIZE = 20
+
+
+def scans_per_second(scan, barcodes, scans):
+    """Runs scan(barcode) scans times, cycling through barcodes, and returns the rate."""
+    started = time.perf_counter()
+    for i in range(scans):
+        scan(barcodes[i % len(barcodes)])
+    return scans / (time.perf_counter() - started)
+
+
+def main():
+    medicines = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    scans = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    app = QApplication(sys.argv)
+    workdir = tempfile.mkdtemp(prefix="pharmacare_scan_")
+    db_manager = DBManager(os.path.join(workdir, "scan_benchmark.db"), error_reporter=lambda title, message: None)
+    db_manager.conn.executemany(
+        "INSERT INTO medicines (name, brand, category, price_minor, stock, low_stock_alert, barcode) "
+        "VALUES (?, 'Brand', 'Category', 950, 1000000, 10, ?)",
+        ((f"Medicine {i}", f"{i:013d}") for i in range(medicines)))
+    db_manager.conn.commit()
+    db_manager.invalidate_medicine_cache()
+    barcodes = [f"{i * (medicines // BASKET_SIZE):013d}" for i in range(BASKET_SIZE)]
+
+    def indexed_lookup(barcode):
+        rows = db_manager.conn.execute(f"SELECT {MEDICINE_COLUMNS} FROM medicines WHERE barcode = ?",
+                                       (barcode,)).fetchall()
+        return map_medicines(rows)[0]
+
+    screen = BillingScreen(outbox_path=os.path.join(workdir, "sale_outbox.db"))
+    screen.set_db_manager(db_manager)
+
+    def checkout_scan(barcode):
+        screen.barcode_scan_input.setText(barcode)
+        screen.scan_barcode()
+
+    db_manager.get_medicine_by_barcode(barcodes[0])  # Load the catalog outside the timings
+    print(f"{medicines} medicines, {scans} scans, basket of {BASKET_SIZE} items")
+    print(f"  indexed SQL lookup  {scans_per_second(indexed_lookup, barcodes, scans):>10,.0f} scans/s")
+    print(f"  catalog lookup      {scans_per_second(db_manager.get_medicine_by_barcode, barcodes, scans):>10,.0f} scans/s")
+    print(f"  checkout scan       {scans_per_second(checkout_scan, barcodes, scans):>10,.0f} scans/s")
+    assert screen.cart_model.rowCount() == BASKET_SIZE, screen.scan_status_label.text()
+
+    app.aboutToQuit.emit()
+    db_manager.close_db()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2 @@
+# conftest.py
+# Lets pytest import the application packages (database, models, ui) from the project root.
@@ -0,0 +1,314 @@
+# database/api_client.py
+
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from PyQt6.QtWidgets import QMessageBox
+
+from database.api_protocol import DEFAULT_HOST, DEFAULT_PORT, encode_value, decode_value
+from database.change_feed import ChangeEvent, ChangeFeed
+from database.db_manager import (SALES_ARCHIVE_HORIZON_DAYS, EXPIRY_ALERT_HORIZONS, LOGIN_HISTORY_LIMIT,
+                                 CUSTOMER_SEARCH_LIMIT)
+from models.money import Money
+
+# Seconds a call waits for the server. The GUI thread is blocked meanwhile, so keep it short
+DEFAULT_TIMEOUT = 3
+# While the server is unreachable calls fail at once; it is tried again after this many seconds,
+# doubling after each failed retry up to RETRY_MAX_SECONDS
+RETRY_MIN_SECONDS = 1
+RETRY_MAX_SECONDS = 30
+
+
+class ServerReachability:
+    """
+    Remembers that the server is down, so a checkout does not wait for a timeout
+    (and show an error) on every call. Shared by the clients of one server,
+    including the ones background threads get from new_connection().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.down_since = None  # time.monotonic() of the first failure of the current outage
+        self.retry_at = 0.0
+        self.retry_delay = RETRY_MIN_SECONDS
+
+    def should_try(self):
+        """False while the server is known to be down and the next retry is not due yet."""
+        with self._lock:
+            return self.down_since is None or time.monotonic() >= self.retry_at
+
+    def failed(self):
+        """Records a failed call; returns True if it started an outage (report it only then)."""
+        with self._lock:
+            now = time.monotonic()
+            first = self.down_since is None
+            if first:
+                self.down_since = now
+                self.retry_delay = RETRY_MIN_SECONDS
+            else:
+                self.retry_delay = min(self.retry_delay * 2, RETRY_MAX_SECONDS)
+            self.retry_at = now + self.retry_delay
+            return first
+
+    def succeeded(self):
+        """Records a successful call; returns True if it ended an outage."""
+        with self._lock:
+            recovered = self.down_since is not None
+            self.down_since = None
+            self.retry_delay = RETRY_MIN_SECONDS
+            return recovered
+
+
+class DBManagerClient:
+    """
+    Talks to a running database/api_server.py instead of opening pharmacy.db directly.
+    Exposes the same methods and return values as DBManager, so the screens can
+    use either one interchangeably.
+    """
+
+    def __init__(self, base_url=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}", timeout=DEFAULT_TIMEOUT,
+                 error_reporter=None, reachability=None):
+        """
+        Args:
+            base_url (str): Address of the API server, e.g. http://127.0.0.1:8765.
+            timeout (float): Seconds to wait for a response before giving up.
+            error_reporter (callable, optional): Same meaning as in DBManager.
+            reachability (ServerReachability, optional): Outage state shared with other clients
+                of the same server; a new one by default.
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.error_reporter = error_reporter
+        self.reachability = reachability or ServerReachability()
+        self.change_feed = ChangeFeed()
+        self.db_name = None  # The database file lives with the server
+
+    def _call(self, method, default, *args, **kwargs):
+        """
+        Performs one RPC. Errors the server reports are shown locally, exactly as
+        DBManager would have shown them; if the server cannot be reached, `default`
+        is returned just like DBManager does without a connection. An outage is
+        reported once; until the server answers again, calls return `default`
+        without waiting, except for one retry per backoff period.
+        """
+        if not self.reachability.should_try():
+            return default
+        body = json.dumps({"args": encode_value(list(args)), "kwargs": encode_value(kwargs)}).encode("utf-8")
+        request = urllib.request.Request(f"{self.base_url}/rpc/{method}", data=body,
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                payload = json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            self.reachability.succeeded()  # The server answered, with an error
+            try:
+                message = json.loads(e.read()).get("error", str(e))
+            except ValueError:
+                message = str(e)
+            self.show_error_message("Database Error", f"Server failed to run {method}: {message}")
+            return default
+        except (urllib.error.URLError, OSError) as e:
+            if self.reachability.failed():
+                self.show_error_message("Database Connection Error",
+                                        f"Could not reach the PharmaCare server at {self.base_url}: {e}\n"
+                                        "Changes cannot be saved until it is reachable again.")
+            return default
+
+        if self.reachability.succeeded():
+            print(f"Reconnected to PharmaCare server: {self.base_url}")
+        for title, message in payload.get("errors", []):
+            self.show_error_message(title, message)
+        self.change_feed.publish(*[ChangeEvent.from_dict(event) for event in payload.get("changes", [])])
+        return decode_value(payload.get("result"))
+
+    def connect_db(self):
+        """Checks that the server is reachable."""
+        try:
+            with urllib.request.urlopen(f"{self.base_url}/health", timeout=self.timeout):
+                print(f"Connected to PharmaCare server: {self.base_url}")
+                return True
+        except (urllib.error.URLError, OSError) as e:
+            print(f"Error connecting to PharmaCare server: {e}")
+            return False
+
+    def close_db(self):
+        """Nothing to close; each call uses its own HTTP request."""
+        pass
+
+    def data_version(self):
+        """
+        Returns the server's write counter (DBAPIServer.data_version): it changes whenever
+        any terminal's write has been applied. None while the server is unreachable.
+        """
+        return self._call("data_version", None)
+
+    def new_connection(self, error_reporter=None):
+        """Returns another client for the same server, for use in a background thread."""
+        return DBManagerClient(self.base_url, self.timeout, error_reporter, self.reachability)
+
+    # --- Users ---
+    def add_user(self, user):
+        return self._call("add_user", False, user)
+
+    def get_user_by_email(self, email):
+        return self._call("get_user_by_email", None, email)
+
+    # --- Medicines ---
+    def add_medicine(self, medicine):
+        return self._call("add_medicine", False, medicine)
+
+    def get_all_medicines(self):
+        return self._call("get_all_medicines", [])
+
+    def get_medicine_by_id(self, medicine_id):
+        return self._call("get_medicine_by_id", None, medicine_id)
+
+    def get_medicines_by_ids(self, medicine_ids):
+        return self._call("get_medicines_by_ids", [], list(medicine_ids))
+
+    def get_medicine_by_barcode(self, barcode):
+        return self._call("get_medicine_by_barcode", None, barcode)
+
+    def find_medicine_ids(self, search=None, category=None, low_stock=False, expiring_within_days=None):
+        return self._call("find_medicine_ids", [], search=search, category=category, low_stock=low_stock,
+                          expiring_within_days=expiring_within_days)
+
+    def get_medicine_categories(self):
+        return self._call("get_medicine_categories", [])
+
+    def update_medicine(self, medicine):
+        return self._call("update_medicine", False, medicine)
+
+    def try_update_medicine(self, medicine):
+        return self._call("try_update_medicine",
+                          {"status": "unavailable", "current": None, "message": "Server unreachable."}, medicine)
+
+    def update_medicine_stock(self, medicine_id, new_stock):
+        return self._call("update_medicine_stock", False, medicine_id, new_stock)
+
+    def delete_medicine(self, medicine_id):
+        return self._call("delete_medicine", False, medicine_id)
+
+    # --- Customers ---
+    def add_customer(self, customer):
+        return self._call("add_customer", False, customer)
+
+    def get_all_customers(self):
+        return self._call("get_all_customers", [])
+
+    def get_customer_by_id(self, customer_id):
+        return self._call("get_customer_by_id", None, customer_id)
+
+    def get_customers_by_ids(self, customer_ids):
+        return self._call("get_customers_by_ids", [], list(customer_ids))
+
+    def find_customers(self, query, limit=CUSTOMER_SEARCH_LIMIT):
+        return self._call("find_customers", [], query, limit)
+
+    def find_customer_by_phone(self, phone):
+        return self._call("find_customer_by_phone", None, phone)
+
+    def update_customer(self, customer):
+        return self._call("update_customer", False, customer)
+
+    def try_update_customer(self, customer):
+        return self._call("try_update_customer",
+                          {"status": "unavailable", "current": None, "message": "Server unreachable."}, customer)
+
+    def delete_customer(self, customer_id):
+        return self._call("delete_customer", False, customer_id)
+
+    # --- Login History ---
+    def add_login_email(self, email):
+        return self._call("add_login_email", False, email)
+
+    def get_login_emails(self, limit=LOGIN_HISTORY_LIMIT):
+        return self._call("get_login_emails", [], limit)
+
+    # --- Sales ---
+    def add_sale(self, customer_id, customer_name, customer_phone, customer_email, total_amount, items,
+                 client_ref=None, pricing=None):
+        return self._call("add_sale", False, customer_id, customer_name, customer_phone,
+                          customer_email, total_amount, items, client_ref, pricing)
+
+    def record_queued_sale(self, sale, allow_oversell=False):
+        result = self._call("record_queued_sale", None, sale, allow_oversell)
+        if result is None:
+            return {"status": "unavailable", "sale_id": None, "message": "PharmaCare server unreachable."}
+        return result
+
+    def get_all_sales(self, include_archived=False):
+        return self._call("get_all_sales", [], include_archived=include_archived)
+
+    def get_sales_by_ids(self, sale_ids):
+        return self._call("get_sales_by_ids", [], list(sale_ids))
+
+    # --- Sales Archive ---
+    def archive_old_sales(self, horizon_days=SALES_ARCHIVE_HORIZON_DAYS, batch_size=500):
+        return self._call("archive_old_sales", -1, horizon_days, batch_size)
+
+    def get_archive_years(self):
+        return self._call("get_archive_years", [])
+
+    def get_sales_archive_summary(self):
+        return self._call("get_sales_archive_summary",
+                          {"archived_sales": 0, "archived_amount": Money(0), "archived_through": None, "years": []})
+
+    # --- Dashboard Statistics ---
+    def get_total_medicines(self):
+        return self._call("get_total_medicines", 0)
+
+    def get_total_customers(self):
+        return self._call("get_total_customers", 0)
+
+    def get_total_sales_amount(self):
+        return self._call("get_total_sales_amount", Money(0))
+
+    def get_low_stock_medicines_count(self):
+        return self._call("get_low_stock_medicines_count", 0)
+
+    def get_expiring_medicines_count(self, days_threshold=30):
+        return self._call("get_expiring_medicines_count", 0, days_threshold)
+
+    def refresh_expiry_alerts(self, horizons=EXPIRY_ALERT_HORIZONS):
+        # The server builds the sets for its own date
+        return self._call("refresh_expiry_alerts", -1, list(horizons))
+
+    # --- Reports ---
+    def get_sales_in_date_range(self, start_date_str, end_date_str):
+        return self._call("get_sales_in_date_range", [], start_date_str, end_date_str)
+
+    def get_sales_tax_summary(self, start_date_str, end_date_str):
+        return self._call("get_sales_tax_summary", [], start_date_str, end_date_str)
+
+    def get_sales_by_medicine(self, start_date_str, end_date_str):
+        return self._call("get_sales_by_medicine", [], start_date_str, end_date_str)
+
+    def get_stock_valuation(self):
+        return self._call("get_stock_valuation", [])
+
+    def get_stock_valuation_page(self, category, brand, after=None, limit=100):
+        return self._call("get_stock_valuation_page", [], category, brand, after, limit)
+
+    def get_all_low_stock_medicines(self):
+        return self._call("get_all_low_stock_medicines", [])
+
+    def get_all_expiring_medicines(self, days_threshold=90):
+        return self._call("get_all_expiring_medicines", [], days_threshold)
+
+    def show_error_message(self, title, message):
+        """
+        Displays an error message box to the user.
+        If an error_reporter was supplied, the error is passed to it instead.
+        """
+        if self.error_reporter:
+            self.error_reporter(title, message)
+            return
+        msg_box = QMessageBox()
+        msg_box.setWindowTitle(title)
+        msg_box.setText(message)
+        msg_box.setIcon(QMessageBox.Icon.Critical)
+        msg_box.setStandardButtons(QMessageBox.StandardButton.Ok)
+        msg_box.exec()
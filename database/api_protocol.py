@@ -0,0 +1,149 @@
+# database/api_protocol.py
+
+"""
+Wire format shared by the local API server (database/api_server.py) and
+its client (database/api_client.py).
+
+Every request is a POST to /rpc/<method> with a JSON body of the form
+{"args": [...], "kwargs": {...}}. The response is
+{"result": ..., "errors": [[title, message], ...], "changes": [...]}, where
+"errors" carries the messages DBManager would have shown in a QMessageBox, so
+the client can show them on the terminal that made the call, and "changes"
+carries the ChangeEvents the call published, so the client's screens can patch
+the affected rows.
+"""
+
+from models.user import User
+from models.medicine import Medicine
+from models.customer import Customer
+from models.money import Money
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# DBManager methods that only read. These are served concurrently.
+READ_METHODS = {
+    "get_user_by_email",
+    "get_all_medicines",
+    "get_medicine_by_id",
+    "get_medicines_by_ids",
+    "get_medicine_by_barcode",
+    "find_medicine_ids",
+    "get_medicine_categories",
+    "get_all_customers",
+    "get_customer_by_id",
+    "get_customers_by_ids",
+    "find_customers",
+    "find_customer_by_phone",
+    "get_login_emails",
+    "get_all_sales",
+    "get_sales_by_ids",
+    "get_archive_years",
+    "get_sales_archive_summary",
+    "get_total_medicines",
+    "get_total_customers",
+    "get_total_sales_amount",
+    "get_low_stock_medicines_count",
+    "get_expiring_medicines_count",
+    "get_sales_in_date_range",
+    "get_sales_tax_summary",
+    "get_sales_by_medicine",
+    "get_stock_valuation",
+    "get_stock_valuation_page",
+    "get_all_low_stock_medicines",
+    "get_all_expiring_medicines",
+}
+
+# DBManager methods that modify the database. These go through the single writer queue.
+WRITE_METHODS = {
+    "add_user",
+    "add_medicine",
+    "update_medicine",
+    "try_update_medicine",
+    "update_medicine_stock",
+    "delete_medicine",
+    "add_customer",
+    "update_customer",
+    "try_update_customer",
+    "delete_customer",
+    "add_login_email",
+    "add_sale",
+    "record_queued_sale",
+    "archive_old_sales",
+    "refresh_expiry_alerts",
+}
+
+# Answered by the server itself rather than by a DBManager method.
+SERVER_METHODS = {
+    "data_version",
+}
+
+MODEL_KEY = "__model__"
+
+
+def encode_value(value):
+    """
+    Converts a DBManager argument or return value into something json.dumps accepts.
+    Model objects are tagged with their class name so they can be rebuilt on the other side.
+    """
+    if isinstance(value, Money):
+        return {MODEL_KEY: "Money", "minor": value.minor}
+    if isinstance(value, Medicine):
+        return {MODEL_KEY: "Medicine", **encode_value(value.to_dict())}
+    if isinstance(value, Customer):
+        return {MODEL_KEY: "Customer", **value.to_dict()}
+    if isinstance(value, User):
+        return {MODEL_KEY: "User", **value.to_dict()}
+    if isinstance(value, (list, tuple)):
+        return [encode_value(v) for v in value]
+    if isinstance(value, dict):
+        return {k: encode_value(v) for k, v in value.items()}
+    return value
+
+
+def decode_value(value):
+    """
+    Reverses encode_value, turning tagged dictionaries back into model objects.
+    """
+    if isinstance(value, list):
+        return [decode_value(v) for v in value]
+    if not isinstance(value, dict):
+        return value
+    model = value.get(MODEL_KEY)
+    if model == "Money":
+        return Money(value["minor"])
+    if model == "Medicine":
+        return Medicine(
+            medicine_id=value["id"],
+            name=value["name"],
+            brand=value["brand"],
+            category=value["category"],
+            price=decode_value(value["price"]),
+            stock=value["stock"],
+            low_stock_alert=value["low_stock_alert"],
+            expiry_date=value["expiry_date"],
+            description=value["description"],
+            created_at=value["created_at"],
+            row_version=value.get("row_version"),
+            barcode=value.get("barcode"),
+            cost_price=decode_value(value.get("cost_price"))
+        )
+    if model == "Customer":
+        return Customer(
+            customer_id=value["id"],
+            name=value["name"],
+            phone=value["phone"],
+            email=value["email"],
+            address=value["address"],
+            created_at=value["created_at"],
+            row_version=value.get("row_version")
+        )
+    if model == "User":
+        return User(
+            user_id=value["id"],
+            full_name=value["full_name"],
+            email=value["email"],
+            password=value["password"],
+            created_at=value["created_at"]
+        )
+    return {k: decode_value(v) for k, v in value.items()}
@@ -0,0 +1,226 @@
+# database/api_server.py
+
+"""
+Optional local HTTP/JSON service that owns pharmacy.db for several counters.
+
+Run it on the machine that holds the database:
+
+    python -m database.api_server --db pharmacy.db --port 8765
+
+and start each terminal with PHARMACARE_API_URL=http://<host>:8765 so that
+MainWindow uses DBManagerClient instead of opening the SQLite file itself.
+"""
+
+import argparse
+import json
+import queue
+import sqlite3
+import threading
+import uuid
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from database.db_manager import DBManager
+from database.mappers import STATEMENT_CACHE_SIZE
+from database.api_protocol import (
+    DEFAULT_HOST, DEFAULT_PORT, READ_METHODS, WRITE_METHODS, SERVER_METHODS, encode_value, decode_value
+)
+
+
+class ServiceDBManager(DBManager):
+    """
+    DBManager used inside the API server. Connections run in WAL mode so readers
+    never block the writer, and errors are collected instead of shown in a dialog.
+    """
+
+    def connect_db(self):
+        """
+        Opens a connection that can be handed between server threads.
+        Each instance is still only used by one thread at a time.
+        """
+        try:
+            self.conn = sqlite3.connect(self.db_name, timeout=30, check_same_thread=False,
+                                        cached_statements=STATEMENT_CACHE_SIZE)
+            self.conn.execute("PRAGMA foreign_keys = ON")
+            self.conn.execute("PRAGMA journal_mode = WAL")
+            print(f"Connected to database: {self.db_name}")
+        except sqlite3.Error as e:
+            print(f"Error connecting to database: {e}")
+            self.show_error_message("Database Connection Error",
+                                    f"Could not connect to the database: {e}")
+
+    def call(self, method, args, kwargs):
+        """
+        Invokes a DBManager method and returns (result, errors, changes), where errors is
+        the list of (title, message) pairs the method reported while running and changes
+        the ChangeEvents it published.
+        """
+        errors = []
+        changes = []
+        self.error_reporter = lambda title, message: errors.append([title, message])
+        self.change_feed.subscribe(changes.append)
+        try:
+            result = getattr(self, method)(*args, **kwargs)
+        finally:
+            self.error_reporter = None
+            self.change_feed.unsubscribe(changes.append)
+        return result, errors, changes
+
+
+class DBAPIServer:
+    """
+    Serves DBManager over HTTP. Reads are answered concurrently from a pool of
+    read connections; writes are serialized through one writer thread and queue.
+    """
+
+    def __init__(self, db_name="pharmacy.db", host=DEFAULT_HOST, port=DEFAULT_PORT, reader_count=4):
+        self.db_name = db_name
+        self.write_queue = queue.Queue()
+        self.write_count = 0  # Writes applied by the writer thread, see data_version()
+        self.write_count_lock = threading.Lock()
+        self.instance_id = uuid.uuid4().hex[:8]
+        self.readers = queue.Queue()
+        for _ in range(reader_count):
+            self.readers.put(ServiceDBManager(db_name))
+        self.writer_thread = threading.Thread(target=self._writer_loop, name="db-writer", daemon=True)
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.serve_thread = None
+
+    @property
+    def url(self):
+        """Base URL clients should use, e.g. http://127.0.0.1:8765."""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _writer_loop(self):
+        """Applies queued writes one at a time on the single writer connection."""
+        writer = ServiceDBManager(self.db_name)
+        while True:
+            job = self.write_queue.get()
+            if job is None:
+                break
+            method, args, kwargs, future = job
+            try:
+                result = writer.call(method, args, kwargs)
+            except Exception as e:
+                result = e
+            # Counted before the caller gets its answer, so a read that follows sees the new version
+            with self.write_count_lock:
+                self.write_count += 1
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+        writer.close_db()
+
+    def data_version(self):
+        """
+        Returns a token that changes whenever the writer thread has applied a write, the
+        server-wide counterpart of DBManager.data_version. It includes an ID of this server
+        run, so the count starting over after a restart never repeats an earlier token.
+        """
+        with self.write_count_lock:
+            return f"{self.instance_id}:{self.write_count}"
+
+    def dispatch(self, method, args, kwargs):
+        """Runs a read directly on a pooled connection, or hands a write to the writer thread."""
+        if method in SERVER_METHODS:
+            return getattr(self, method)(*args, **kwargs), [], []
+        if method in READ_METHODS:
+            reader = self.readers.get()
+            try:
+                return reader.call(method, args, kwargs)
+            finally:
+                self.readers.put(reader)
+        if method in WRITE_METHODS:
+            future = Future()
+            self.write_queue.put((method, args, kwargs, future))
+            return future.result()
+        raise ValueError(f"Unknown method: {method}")
+
+    def _make_handler(self):
+        server = self
+
+        class RequestHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/health":
+                    self._send_json(200, {"status": "ok", "pending_writes": server.write_queue.qsize()})
+                else:
+                    self._send_json(404, {"error": f"Unknown path: {self.path}"})
+
+            def do_POST(self):
+                if not self.path.startswith("/rpc/"):
+                    self._send_json(404, {"error": f"Unknown path: {self.path}"})
+                    return
+                method = self.path[len("/rpc/"):]
+                if method not in READ_METHODS and method not in WRITE_METHODS and method not in SERVER_METHODS:
+                    self._send_json(404, {"error": f"Unknown method: {method}"})
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    payload = json.loads(self.rfile.read(length) or b"{}")
+                    args = decode_value(payload.get("args", []))
+                    kwargs = decode_value(payload.get("kwargs", {}))
+                    result, errors, changes = server.dispatch(method, args, kwargs)
+                    self._send_json(200, {"result": encode_value(result), "errors": errors,
+                                          "changes": [event.to_dict() for event in changes]})
+                except Exception as e:
+                    self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+
+            def _send_json(self, status, body):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass  # Keep the console readable; errors are reported in the response body
+
+        return RequestHandler
+
+    def start(self):
+        """Starts the writer and serves requests in a background thread (useful for tests)."""
+        self.writer_thread.start()
+        self.serve_thread = threading.Thread(target=self.httpd.serve_forever, name="db-api", daemon=True)
+        self.serve_thread.start()
+        print(f"PharmaCare API server listening on {self.url}")
+
+    def serve_forever(self):
+        """Starts the writer and serves requests on the calling thread until interrupted."""
+        self.writer_thread.start()
+        print(f"PharmaCare API server listening on {self.url}")
+        try:
+            self.httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Stops accepting requests, drains the write queue and closes all connections."""
+        if self.serve_thread:
+            self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.writer_thread.is_alive():
+            self.write_queue.put(None)
+            self.writer_thread.join()
+        while not self.readers.empty():
+            self.readers.get().close_db()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PharmaCare local database API server")
+    parser.add_argument("--db", default="pharmacy.db", help="SQLite database file to serve")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to listen on")
+    parser.add_argument("--readers", type=int, default=4, help="Number of concurrent read connections")
+    args = parser.parse_args()
+
+    DBAPIServer(args.db, args.host, args.port, args.readers).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
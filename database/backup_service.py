@@ -0,0 +1,374 @@
+# database/backup_service.py
+
+import glob
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal, pyqtSlot
+
+SNAPSHOT_PATTERN = re.compile(r"^(?P<stem>.+)-(?P<stamp>\d{8}-\d{6})(?:-(?P<counter>\d+))?-(?P<label>[a-z]+)\.db$")
+
+
+class _BackupRestarted(Exception):
+    """Raised from the progress callback to give up on a step-wise copy that keeps restarting."""
+
+
+def archive_files(db_path):
+    """
+    Returns the yearly sales archives that belong to a database file, as {year: path}.
+    They are named <db>_archive_<year>.db, as DBManager.archive_old_sales creates them.
+    """
+    stem, _ = os.path.splitext(db_path)
+    archives = {}
+    for path in glob.glob(f"{glob.escape(stem)}_archive_*.db"):
+        suffix = path[len(stem) + len("_archive_"):-len(".db")]
+        if suffix.isdigit():
+            archives[int(suffix)] = path
+    return dict(sorted(archives.items()))
+
+
+def archived_sale_counts(db_path, archives):
+    """
+    Returns (sales the database's rollups say were archived, sales found in the archives).
+    The two are equal for a database and archive set that belong together.
+    """
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sales_rollups'").fetchone():
+            expected = conn.execute("SELECT COALESCE(SUM(sale_count), 0) FROM sales_rollups").fetchone()[0]
+        else:
+            expected = 0  # Taken before sales were archived at all
+    finally:
+        conn.close()
+    found = 0
+    for path in archives:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            found += conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0]
+        finally:
+            conn.close()
+    return expected, found
+
+
+class BackupService:
+    """
+    Takes consistent snapshots of the live database without stopping the counter.
+
+    Snapshots are copied with SQLite's online backup API a few pages at a time;
+    the source is only locked for the duration of one step, so sales keep being
+    recorded while a backup runs. Every snapshot is checked with
+    PRAGMA integrity_check before it is kept.
+
+    A snapshot is a set: the main database and its yearly sales archives
+    (see archive_files), copied and restored together so that the sales the
+    rollups count as archived are exactly the sales in the archives. If
+    archive_old_sales moves sales while the set is copied, it is copied again.
+
+    Snapshot files are named <db>-<YYYYmmdd-HHMMSS>-<label>.db, where label is
+    'auto' (scheduled, subject to retention), 'manual' or 'prerestore'; their
+    archives are <db>-<YYYYmmdd-HHMMSS>-<label>_archive_<year>.db.
+    """
+
+    def __init__(self, db_name="pharmacy.db", backup_dir="backups", keep=14, pages_per_step=256, step_pause=0.005,
+                 max_restarts=3):
+        """
+        Args:
+            db_name (str): The live database file.
+            backup_dir (str): Folder that holds the snapshots.
+            keep (int): Number of scheduled ('auto') snapshots to retain.
+            pages_per_step (int): Pages copied per backup step; smaller steps hold the lock for less time.
+            step_pause (float): Seconds to yield between steps so writers can get in.
+            max_restarts (int): SQLite restarts a step-wise copy whenever another connection
+                writes to the source. After this many restarts the rest is copied in one step.
+                Also the number of times a set is copied again if sales were archived meanwhile.
+        """
+        self.db_name = db_name
+        self.backup_dir = backup_dir
+        self.keep = keep
+        self.pages_per_step = pages_per_step
+        self.step_pause = step_pause
+        self.max_restarts = max_restarts
+
+    def create_snapshot(self, label="manual", progress=None):
+        """
+        Copies the live database and its archives into a new, verified snapshot.
+
+        Args:
+            label (str): 'auto', 'manual' or 'prerestore'.
+            progress (callable, optional): Called as progress(copied_pages, total_pages) while the
+                main database is copied.
+
+        Returns:
+            str: Path of the snapshot's main database file.
+
+        Raises:
+            sqlite3.Error: If the copy fails or the snapshot does not pass the integrity check.
+        """
+        os.makedirs(self.backup_dir, exist_ok=True)
+        path = self._new_snapshot_path(label)
+        started = time.perf_counter()
+        for attempt in range(self.max_restarts + 1):
+            # Target -> source; the main database is copied first, then the archives
+            copies = {path: self.db_name}
+            stem, _ = os.path.splitext(path)
+            copies.update({f"{stem}_archive_{year}.db": source for year, source in archive_files(self.db_name).items()})
+            try:
+                for target, source in copies.items():
+                    self._copy_file(source, target + ".partial", progress if target == path else None)
+                copied = archived_sale_counts(path + ".partial", [target + ".partial" for target in copies if target != path])
+                live = archived_sale_counts(self.db_name, archive_files(self.db_name).values())
+            except sqlite3.Error:
+                self._remove_files(target + ".partial" for target in copies)
+                raise
+            if copied == live:
+                break
+            # archive_old_sales moved sales between copying the main database and the archives
+            self._remove_files(target + ".partial" for target in copies)
+            print(f"Sales were archived during the backup; copying again (attempt {attempt + 2}).")
+        else:
+            raise sqlite3.DatabaseError("Sales kept being archived while the snapshot was taken; try again later.")
+        ok, message = self._verify_set(path + ".partial", [target + ".partial" for target in copies if target != path])
+        if not ok:
+            self._remove_files(target + ".partial" for target in copies)
+            raise sqlite3.DatabaseError(f"Snapshot failed integrity check: {message}")
+        for target in sorted(copies, key=lambda target: target == path):  # Archives first: a listed snapshot is complete
+            os.replace(target + ".partial", target)
+        print(f"Snapshot {path} created with {len(copies) - 1} archive(s) in {time.perf_counter() - started:.2f}s.")
+
+        if label == "auto":
+            self.prune()
+        return path
+
+    def _copy_file(self, source_path, target_path, progress):
+        """Copies one database file with the online backup API."""
+        source = sqlite3.connect(source_path, timeout=30)
+        target = sqlite3.connect(target_path)
+        try:
+            try:
+                self._copy_in_steps(source, target, progress)
+            except _BackupRestarted:
+                # Trading is too busy for a step-wise copy to catch up. Copy in one step; the live
+                # database runs in WAL mode (DBManager.connect_db), so the read transaction this
+                # holds for the whole copy does not block the checkout's writes.
+                print("Backup kept restarting because of concurrent writes; copying in one step.")
+                source.backup(target)
+                if progress:
+                    total = source.execute("PRAGMA page_count").fetchone()[0]
+                    progress(total, total)
+            # The copy inherits WAL mode; a snapshot should be a single self-contained file
+            target.execute("PRAGMA journal_mode = DELETE")
+        finally:
+            target.close()
+            source.close()
+
+    @staticmethod
+    def _remove_files(paths):
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _copy_in_steps(self, source, target, progress):
+        """Copies pages_per_step pages at a time, releasing the source between steps."""
+        state = {"remaining": None, "restarts": 0}
+
+        def on_step(status, remaining, total):
+            if state["remaining"] is not None and remaining >= state["remaining"]:
+                # No progress: the source changed under us and SQLite started over
+                state["restarts"] += 1
+                if state["restarts"] > self.max_restarts:
+                    raise _BackupRestarted()
+            state["remaining"] = remaining
+            if progress:
+                progress(total - remaining, total)
+            time.sleep(self.step_pause)
+
+        source.backup(target, pages=self.pages_per_step, progress=on_step)
+
+    def verify_snapshot(self, path):
+        """
+        Runs PRAGMA integrity_check on a snapshot and its archives.
+
+        Returns:
+            tuple: (ok, message) where message is 'ok' or the first problems found.
+        """
+        return self._verify_set(path, list(archive_files(path).values()))
+
+    def _verify_set(self, path, archives):
+        ok, message = self._verify_file(path, {"medicines", "customers", "sales"})
+        for archive in archives:
+            if ok:
+                ok, message = self._verify_file(archive, {"sales"})
+                message = message if ok else f"{os.path.basename(archive)}: {message}"
+        return ok, message
+
+    @staticmethod
+    def _verify_file(path, required_tables):
+        try:
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            try:
+                rows = conn.execute("PRAGMA integrity_check").fetchall()
+                # A file that is not a PharmaCare database passes integrity_check but is useless.
+                tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            return False, str(e)
+        problems = [row[0] for row in rows if row[0] != "ok"]
+        if problems:
+            return False, "; ".join(problems[:5])
+        missing = required_tables - tables
+        if missing:
+            return False, f"Missing tables: {', '.join(sorted(missing))}"
+        return True, "ok"
+
+    def list_snapshots(self):
+        """
+        Returns the snapshots in the backup folder, newest first, as dictionaries
+        with keys path, name, label, created_at (datetime), archives (paths) and
+        size (bytes, archives included).
+        """
+        if not os.path.isdir(self.backup_dir):
+            return []
+        stem = os.path.splitext(os.path.basename(self.db_name))[0]
+        snapshots = []
+        for name in os.listdir(self.backup_dir):
+            match = SNAPSHOT_PATTERN.match(name)
+            if not match or match.group("stem") != stem:
+                continue
+            path = os.path.join(self.backup_dir, name)
+            archives = list(archive_files(path).values())
+            order = (match.group("stamp"), int(match.group("counter") or 0))
+            snapshots.append((order, {
+                "path": path,
+                "name": name,
+                "label": match.group("label"),
+                "created_at": datetime.strptime(match.group("stamp"), "%Y%m%d-%H%M%S"),
+                "archives": archives,
+                "size": sum(os.path.getsize(file) for file in [path] + archives),
+            }))
+        snapshots.sort(key=lambda entry: entry[0], reverse=True)
+        return [snapshot for _, snapshot in snapshots]
+
+    def prune(self):
+        """Deletes scheduled snapshots beyond the retention count. Manual snapshots are kept."""
+        scheduled = [s for s in self.list_snapshots() if s["label"] == "auto"]
+        for snapshot in scheduled[self.keep:]:
+            self._remove_files([snapshot["path"]] + snapshot["archives"])
+            print(f"Snapshot {snapshot['path']} removed (retention {self.keep}).")
+
+    def restore_snapshot(self, path, target_conn):
+        """
+        Replaces the contents of the live database and its archives with a snapshot.
+
+        The snapshot is verified first and the current database is saved as a
+        'prerestore' snapshot, so a restore can itself be undone. The main
+        database is copied through target_conn (the application's own
+        connection), so SQLite locks the file properly and other open
+        connections see the restored data. The live archives are then replaced
+        by the snapshot's.
+
+        A snapshot taken before archives were saved with it can only be restored
+        while the archives on disk still match its rollups; they are kept as they are.
+
+        Returns:
+            str: Path of the safety snapshot taken before restoring.
+
+        Raises:
+            sqlite3.Error: If the snapshot is damaged, does not match the archives or
+                the database cannot be locked.
+        """
+        ok, message = self.verify_snapshot(path)
+        if not ok:
+            raise sqlite3.DatabaseError(f"Snapshot {os.path.basename(path)} is damaged: {message}")
+        archives = archive_files(path)
+        live_archives = archive_files(self.db_name)
+        keep_live_archives = False
+        if not archives:
+            expected, found = archived_sale_counts(path, live_archives.values())
+            if expected:
+                if expected != found:
+                    raise sqlite3.DatabaseError(
+                        f"Snapshot {os.path.basename(path)} was saved without its sales archives, and the "
+                        f"archives on disk no longer match it ({expected} archived sales counted, {found} "
+                        f"in the archives). Restoring it would lose or duplicate archived sales.")
+                keep_live_archives = True
+        safety_path = self.create_snapshot("prerestore")
+        source = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            source.backup(target_conn)
+        finally:
+            source.close()
+        if not keep_live_archives:
+            stem, _ = os.path.splitext(self.db_name)
+            self._remove_files(live_archive for year, live_archive in live_archives.items() if year not in archives)
+            for year, archive in archives.items():
+                source = sqlite3.connect(f"file:{archive}?mode=ro", uri=True)
+                target = sqlite3.connect(f"{stem}_archive_{year}.db")
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                    source.close()
+        print(f"Database restored from {path} with {len(archives)} archive(s).")
+        return safety_path
+
+    def _new_snapshot_path(self, label):
+        stem = os.path.splitext(os.path.basename(self.db_name))[0]
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.backup_dir, f"{stem}-{stamp}-{label}.db")
+        counter = 1
+        while os.path.exists(path):  # Two snapshots within the same second
+            path = os.path.join(self.backup_dir, f"{stem}-{stamp}-{counter}-{label}.db")
+            counter += 1
+        return path
+
+class BackupWorker(QObject):
+    """
+    Takes scheduled and on-demand snapshots from a background QThread.
+    """
+    backup_progress = pyqtSignal(int, int)  # copied pages, total pages
+    snapshot_created = pyqtSignal(str)  # path
+    backup_failed = pyqtSignal(str)  # message
+
+    def __init__(self, backup_service, interval_ms=60 * 60 * 1000):
+        """
+        Args:
+            backup_service (BackupService): Service that does the copying.
+            interval_ms (int): Time between scheduled snapshots; 0 disables the schedule.
+        """
+        super().__init__()
+        self.backup_service = backup_service
+        self.interval_ms = interval_ms
+        self.timer = None
+
+    @pyqtSlot()
+    def start(self):
+        """Starts the snapshot schedule."""
+        if self.interval_ms > 0:
+            self.timer = QTimer(self)
+            self.timer.timeout.connect(self.scheduled_snapshot)
+            self.timer.start(self.interval_ms)
+
+    @pyqtSlot()
+    def scheduled_snapshot(self):
+        self.snapshot("auto")
+
+    @pyqtSlot()
+    def manual_snapshot(self):
+        self.snapshot("manual")
+
+    def snapshot(self, label):
+        try:
+            path = self.backup_service.create_snapshot(label, progress=self.backup_progress.emit)
+        except (sqlite3.Error, OSError) as e:
+            print(f"Backup failed: {e}")
+            self.backup_failed.emit(str(e))
+            return
+        self.snapshot_created.emit(path)
+
+    @pyqtSlot()
+    def stop(self):
+        if self.timer:
+            self.timer.stop()
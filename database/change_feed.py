@@ -0,0 +1,72 @@
+# database/change_feed.py
+
+class ChangeEvent:
+    """
+    Describes one committed write, so screens can patch the affected rows
+    instead of reloading whole tables.
+
+    Attributes:
+        entity (str): Table that changed: "medicines", "customers", "sales", "users" or "login_history".
+        op (str): "insert", "update" or "delete".
+        ids (tuple): Primary keys of the affected rows.
+        fields (tuple or None): Columns that changed on update; None means "any column".
+    """
+    INSERT = "insert"
+    UPDATE = "update"
+    DELETE = "delete"
+
+    def __init__(self, entity, op, ids, fields=None):
+        self.entity = entity
+        self.op = op
+        self.ids = tuple(ids)
+        self.fields = tuple(fields) if fields is not None else None
+
+    def touches(self, *fields):
+        """True if this event may have changed any of the given columns."""
+        return self.op != ChangeEvent.UPDATE or self.fields is None or bool(set(fields) & set(self.fields))
+
+    def to_dict(self):
+        """Converts the event to a dictionary, used to send it over the local API."""
+        return {"entity": self.entity, "op": self.op, "ids": list(self.ids),
+                "fields": list(self.fields) if self.fields is not None else None}
+
+    @staticmethod
+    def from_dict(data):
+        """Rebuilds an event produced by to_dict."""
+        return ChangeEvent(data["entity"], data["op"], data["ids"], data["fields"])
+
+    def __repr__(self):
+        return f"ChangeEvent({self.entity} {self.op} ids={list(self.ids)} fields={self.fields})"
+
+
+class ChangeFeed:
+    """
+    Synchronous publish/subscribe hub for ChangeEvents, owned by DBManager.
+    Subscribers run on the thread that committed the write (the GUI thread
+    for the application's own DBManager).
+    """
+
+    def __init__(self):
+        self._subscribers = []
+
+    def subscribe(self, callback, entities=None):
+        """
+        Registers callback(event) for changes to the given entities (all entities if None).
+        """
+        self._subscribers.append((callback, set(entities) if entities else None))
+        return callback
+
+    def unsubscribe(self, callback):
+        self._subscribers = [(cb, ent) for cb, ent in self._subscribers if cb != callback]
+
+    def publish(self, *events):
+        """Delivers events to every interested subscriber, in order."""
+        for event in events:
+            for callback, entities in list(self._subscribers):
+                if entities is not None and event.entity not in entities:
+                    continue
+                try:
+                    callback(event)
+                except Exception as e:
+                    # One broken screen must not stop the others from updating.
+                    print(f"Error delivering {event}: {e}")
@@ -1,15 +1,75 @@
 # database/db_manager.py
 
+import os
+import glob
+import pathlib
 import sqlite3
 from PyQt6.QtWidgets import QMessageBox
 import bcrypt
+import copy
 import json
 from datetime import datetime, timedelta
 
 # Import models
 from models.user import User
 from models.medicine import Medicine
-from models.customer import Customer
+from models.customer import Customer, customer_lookup_keys, normalize_customer_name, phone_digits
+from models.money import Money, money_json_default
+from models.sale import price_sale
+from database.change_feed import ChangeEvent, ChangeFeed
+from database.migrations import (MigrationRunner, SALE_ITEMS_SCHEMA, SALE_PRICING_COLUMNS, SALE_SUBTOTAL_FROM_ITEMS,
+                                 SALE_ADJUSTMENT_FROM_TOTAL, insert_sale_items)
+from database.medicine_catalog import MedicineCatalog
+from database.medicine_query import MedicineQuery
+from database.sales_columns import sales_column_store
+from database.mappers import (STATEMENT_CACHE_SIZE, MEDICINE_COLUMNS, SALE_LIST_COLUMNS, map_medicines, map_customers,
+                              map_sales)
+
+# Columns a full medicine/customer edit may change, reported in ChangeEvent.fields
+MEDICINE_EDIT_FIELDS = ("name", "brand", "category", "price", "stock", "low_stock_alert", "expiry_date", "description",
+                        "barcode", "cost_price")
+CUSTOMER_EDIT_FIELDS = ("name", "phone", "email", "address")
+
+# Column list shared by the live sales table and the per-year archives
+SALE_COLUMNS = ("id, customer_id, customer_name, customer_phone, customer_email, total_amount_minor, sale_date, "
+                "items_json, client_ref, subtotal_minor, discount_minor, tax_minor, discount_rate, tax_rate")
+SALE_ITEM_COLUMNS = ("sale_id, line_no, med_id, name, qty, unit_price_minor, subtotal_minor, discount_minor, tax_minor, "
+                     "net_minor")
+
+# Sales older than this many days are moved to the yearly archives by archive_old_sales
+SALES_ARCHIVE_HORIZON_DAYS = 365
+
+# Emails remembered for the login screen's suggestions; add_login_email evicts the least recently used
+LOGIN_HISTORY_LIMIT = 20
+
+# Customer lookup (find_customers): matches returned by default, and how many trailing digits of a
+# caller's number are compared, so a number with or without its country/area code finds the customer
+CUSTOMER_SEARCH_LIMIT = 20
+CALLER_ID_DIGITS = 10
+
+# Expiry horizons (days) whose medicine sets refresh_expiry_alerts precomputes once a day
+EXPIRY_ALERT_HORIZONS = (30, 60, 90)
+
+# Dialog titles for the failed outcomes of try_update_medicine / try_update_customer
+UPDATE_ERROR_TITLES = {"conflict": "Update Conflict", "missing": "Update Error", "error": "Database Error"}
+
+
+def normalize_barcode(barcode):
+    """Strips a scanned or typed barcode; a blank barcode is stored as NULL (no barcode)."""
+    barcode = (barcode or "").strip()
+    return barcode or None
+
+
+def _optional_minor(amount):
+    """Minor units of an optional amount (e.g. a cost price); None is stored as NULL."""
+    return None if amount is None else Money.of(amount).minor
+
+
+def _medicine_write_error(e, medicine, action):
+    """Message for a failed medicine write, naming the clash if the barcode is already taken."""
+    if isinstance(e, sqlite3.IntegrityError) and "barcode" in str(e):
+        return f"Failed to {action} medicine: barcode {medicine.barcode} is already assigned to another medicine."
+    return f"Failed to {action} medicine: {e}"
 
 
 class DBManager:
@@ -18,25 +78,55 @@ class DBManager:
     Handles database initialization, table creation, and provides methods for
     basic CRUD operations (Create, Read, Update, Delete), including user authentication,
     medicine management, customer management, login email history, and sales.
+
+    Every committed write is published on `change_feed` as a ChangeEvent so the
+    screens can patch just the affected rows.
+
+    Medicine reads are served from `medicine_catalog`, a cache shared by every
+    screen (see database/medicine_catalog.py).
     """
 
-    def __init__(self, db_name="pharmacy.db"):
+    def __init__(self, db_name="pharmacy.db", error_reporter=None, read_only=False):
         """
         Initializes the DBManager with the specified database name.
         Connects to the database and ensures tables are created.
+
+        Args:
+            db_name (str): Path of the SQLite database file.
+            error_reporter (callable, optional): Called as error_reporter(title, message)
+                instead of showing a QMessageBox. Used where no GUI is available,
+                e.g. inside the local API server process.
+            read_only (bool): Open an existing database read-only and leave its schema alone,
+                e.g. for the report processes (see database/parallel_reports.py).
         """
         self.db_name = db_name
+        self.error_reporter = error_reporter
+        self.read_only = read_only
+        self.change_feed = ChangeFeed()
         self.conn = None
+        self.medicine_catalog = None
+        self._customer_fts = None  # Whether migration 12 could create customers_fts; checked on first search
         self.connect_db()
-        self.create_tables()
+        if not read_only:
+            self.create_tables()
+        if self.conn:
+            self.medicine_catalog = MedicineCatalog(self.conn)
+            # Subscribed first, so the cache is current before any screen handles the event
+            self.change_feed.subscribe(self.medicine_catalog.on_change, ["medicines"])
 
     def connect_db(self):
         """
         Establishes a connection to the SQLite database.
-        If the database file does not exist, it will be created.
+        If the database file does not exist, it will be created (unless read-only).
         """
         try:
-            self.conn = sqlite3.connect(self.db_name)
+            if self.read_only:
+                self.conn = sqlite3.connect(f"{pathlib.Path(self.db_name).resolve().as_uri()}?mode=ro", uri=True,
+                                            cached_statements=STATEMENT_CACHE_SIZE)
+            else:
+                self.conn = sqlite3.connect(self.db_name, cached_statements=STATEMENT_CACHE_SIZE)
+                # Readers (reports, backups, other terminals) then never block a checkout's writes
+                self.conn.execute("PRAGMA journal_mode = WAL")
             self.conn.execute("PRAGMA foreign_keys = ON")
             print(f"Connected to database: {self.db_name}")
         except sqlite3.Error as e:
@@ -49,86 +139,36 @@ class DBManager:
         Closes the database connection.
         """
         if self.conn:
+            stats = self.medicine_catalog.stats()
+            print(f"Medicine cache: {stats['hits']} hits, {stats['misses']} misses, "
+                  f"{stats['rows_refreshed']} rows refreshed, {stats['invalidations']} invalidations.")
             self.conn.close()
             print("Database connection closed.")
 
     def create_tables(self):
         """
-        Creates necessary tables in the database if they do not already exist.
-        Tables include: users, medicines, sales, customers, and login_history.
+        Creates or upgrades the database schema by running the pending migrations
+        in database/migrations.py (tracked in PRAGMA user_version).
+        Tables include: users, medicines, sales, sale_items, customers, login_history, sales_rollups,
+        stock_valuation, expiry_buckets, expiry_alerts and (where FTS5 is available) customers_fts.
         """
         if not self.conn:
             print("Cannot create tables: No database connection.")
             return
 
-        cursor = self.conn.cursor()
-
-        # Users table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                full_name TEXT NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-
-        # Medicines table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS medicines (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                brand TEXT,
-                category TEXT,
-                price REAL NOT NULL,
-                stock INTEGER NOT NULL,
-                low_stock_alert INTEGER DEFAULT 10,
-                expiry_date TEXT,
-                description TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-
-        # Customers table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS customers (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                phone TEXT UNIQUE,
-                email TEXT UNIQUE,
-                address TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-
-        # Sales table
-        # items_json will store a JSON string of the items sold
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS sales (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                customer_id INTEGER,
-                customer_name TEXT,
-                customer_phone TEXT,
-                customer_email TEXT,
-                total_amount REAL NOT NULL,
-                sale_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                items_json TEXT NOT NULL, -- Stores JSON string of sold items: [{"med_id": 1, "qty": 2, "price": 12.5, "name": "Paracetamol"}]
-                FOREIGN KEY (customer_id) REFERENCES customers(id) ON DELETE SET NULL
-            )
-        """)
-
-        # login_history table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS login_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                email TEXT UNIQUE NOT NULL,
-                last_login TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+        try:
+            MigrationRunner(self.conn).run()
+            print("Tables checked/created successfully.")
+        except sqlite3.Error as e:
+            self.show_error_message("Database Upgrade Error", f"Could not upgrade the database schema: {e}")
 
-        self.conn.commit()
-        print("Tables checked/created successfully.")
+    def new_connection(self, error_reporter=None):
+        """
+        Returns a fresh DBManager on the same database file.
+        SQLite connections cannot be shared between threads, so background
+        workers open their own through this method.
+        """
+        return DBManager(self.db_name, error_reporter=error_reporter)
 
     def add_user(self, user):
         """Adds a new user to the 'users' table."""
@@ -142,6 +182,7 @@ class DBManager:
             )
             self.conn.commit()
             print(f"User '{user.email}' added successfully.")
+            self.change_feed.publish(ChangeEvent("users", ChangeEvent.INSERT, [cursor.lastrowid]))
             return True
         except sqlite3.IntegrityError as e:
             if "UNIQUE constraint failed: users.email" in str(e):
@@ -172,27 +213,29 @@ class DBManager:
         try:
             cursor = self.conn.cursor()
             cursor.execute(
-                """INSERT INTO medicines (name, brand, category, price, stock, low_stock_alert, expiry_date, description)
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-                (medicine.name, medicine.brand, medicine.category, medicine.price,
-                 medicine.stock, medicine.low_stock_alert, medicine.expiry_date, medicine.description)
+                """INSERT INTO medicines (name, brand, category, price_minor, stock, low_stock_alert, expiry_date,
+                                          description, barcode, cost_price_minor)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (medicine.name, medicine.brand, medicine.category, Money.of(medicine.price).minor,
+                 medicine.stock, medicine.low_stock_alert, medicine.expiry_date, medicine.description,
+                 normalize_barcode(medicine.barcode), _optional_minor(medicine.cost_price))
             )
             self.conn.commit()
             print(f"Medicine '{medicine.name}' added successfully.")
+            self.change_feed.publish(ChangeEvent("medicines", ChangeEvent.INSERT, [cursor.lastrowid]))
             return True
         except sqlite3.Error as e:
-            self.show_error_message("Database Error", f"Failed to add medicine: {e}")
+            self.show_error_message("Database Error", _medicine_write_error(e, medicine, "add"))
             return False
 
     def get_all_medicines(self):
-        """Retrieves all medicines from the 'medicines' table."""
+        """
+        Retrieves all medicines, ordered by name, from the shared catalog cache.
+        The returned Medicine objects are shared between screens; do not modify them.
+        """
         if not self.conn: return []
         try:
-            cursor = self.conn.cursor()
-            cursor.execute(
-                "SELECT id, name, brand, category, price, stock, low_stock_alert, expiry_date, description, created_at FROM medicines ORDER BY name ASC")
-            rows = cursor.fetchall()
-            return [Medicine.from_db_row(row) for row in rows]
+            return self.medicine_catalog.all()
         except sqlite3.Error as e:
             self.show_error_message("Database Error", f"Failed to retrieve medicines: {e}")
             return []
@@ -200,47 +243,185 @@ class DBManager:
     def get_medicine_by_id(self, medicine_id):
         """
         Retrieves a single medicine by its ID.
-        Returns a Medicine object or None if not found.
+        Returns a Medicine object or None if not found. The object is a private
+        copy, so callers may edit it and pass it to try_update_medicine.
         """
         if not self.conn: return None
         try:
-            cursor = self.conn.cursor()
-            cursor.execute(
-                "SELECT id, name, brand, category, price, stock, low_stock_alert, expiry_date, description, created_at FROM medicines WHERE id = ?",
-                (medicine_id,))
-            row = cursor.fetchone()
-            if row:
-                return Medicine.from_db_row(row)
-            return None
+            medicine = self.medicine_catalog.get(medicine_id)
+            return copy.copy(medicine) if medicine else None
         except sqlite3.Error as e:
             self.show_error_message("Database Error", f"Failed to retrieve medicine by ID: {e}")
             return None
 
+    def get_medicines_by_ids(self, medicine_ids):
+        """
+        Retrieves the medicines with the given IDs, used to patch screens after a change.
+        Returns a list of shared Medicine objects from the catalog cache (missing IDs are skipped).
+        """
+        if not self.conn or not medicine_ids: return []
+        try:
+            return self.medicine_catalog.get_many(medicine_ids)
+        except sqlite3.Error as e:
+            self.show_error_message("Database Error", f"Failed to retrieve medicines by ID: {e}")
+            return []
+
+    def get_medicine_by_barcode(self, barcode):
+        """
+        Looks up the medicine a scanned barcode belongs to, from the catalog cache's barcode index.
+
+        Args:
+            barcode (str): The scanned or typed code; surrounding whitespace is ignored.
+
+        Returns:
+            Medicine: The shared catalog object (do not modify it), or None if no medicine has this barcode.
+        """
+        barcode = normalize_barcode(barcode)
+        if not self.conn or not barcode: return None
+        try:
+            return self.medicine_catalog.get_by_barcode(barcode)
+        except sqlite3.Error as e:
+            self.show_error_message("Database Error", f"Failed to look up barcode: {e}")
+            return None
+
+    def invalidate_medicine_cache(self):
+        """Drops the medicine catalog cache, e.g. after the database was restored from a backup."""
+        if self.medicine_catalog:
+            self.medicine_catalog.invalidate()
+
+    def data_version(self):
+        """
+        Returns PRAGMA data_version: it changes whenever another connection (another
+        terminal, the API server, a background worker) commits to the database.
+        """
+        if not self.conn: return None
+        try:
+            return self.conn.execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"Error reading the data version: {e}")
+            return None
+
+    def reset_after_restore(self):
+        """
+        Catches up with a database file whose contents were replaced by a backup restore:
+        upgrades the restored schema (a snapshot may predate the current one) and
+        drops everything cached from the old contents.
+        """
+        if not self.conn: return
+        self.create_tables()
+        self.invalidate_medicine_cache()
+        self._customer_fts = None
+        store = sales_column_store(self.db_name)
+        if store is not None:
+            store.reset()
+
+    def find_medicine_ids(self, search=None, category=None, low_stock=False, expiring_within_days=None):
+        """
+        Returns the IDs of the medicines matching every given filter, ordered by name.
+        The filters are combined with MedicineQuery and evaluated in SQL.
+
+        Args:
+            search (str, optional): Text contained in the name, brand or category.
+            category (str, optional): Exact category.
+            low_stock (bool): Only medicines at or below their low stock alert.
+            expiring_within_days (int, optional): Only medicines expired or expiring within this many days.
+
+        Returns:
+            list: Matching medicine IDs.
+        """
+        if not self.conn: return []
+        query = MedicineQuery().search(search).category(category)
+        if low_stock:
+            query.low_stock()
+        if expiring_within_days is not None:
+            query.expiring_within(expiring_within_days)
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(*query.to_sql("id"))
+            return [row[0] for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            self.show_error_message("Database Error", f"Failed to filter medicines: {e}")
+            return []
+
+    def get_medicine_categories(self):
+        """Returns the distinct, non-empty medicine categories in alphabetical order."""
+        if not self.conn: return []
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT DISTINCT category FROM medicines WHERE category IS NOT NULL AND category != '' "
+                           "ORDER BY category")
+            return [row[0] for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            self.show_error_message("Database Error", f"Failed to retrieve medicine categories: {e}")
+            return []
+
     def update_medicine(self, medicine):
-        """Updates an existing medicine record in the 'medicines' table."""
-        if not self.conn: return False
+        """
+        Updates an existing medicine record in the 'medicines' table.
+        If medicine.row_version is set and the row was changed by someone else
+        since it was read, nothing is written and a conflict error is shown.
+        """
+        outcome = self.try_update_medicine(medicine)
+        if outcome["status"] == "updated":
+            return True
+        if outcome["status"] != "unavailable":
+            self.show_error_message(UPDATE_ERROR_TITLES[outcome["status"]], outcome["message"])
+        return False
+
+    def try_update_medicine(self, medicine):
+        """
+        Conditionally updates a medicine and reports the outcome instead of showing a dialog,
+        so the caller can resolve conflicts.
+
+        The write only happens if the stored row_version still equals medicine.row_version
+        (the version the caller read); every successful write bumps row_version. A medicine
+        without a row_version overwrites unconditionally.
+
+        Returns:
+            dict: {"status": "updated" | "conflict" | "missing" | "error" | "unavailable",
+                   "current": the stored Medicine after the attempt (None if missing),
+                   "message": str}
+        """
+        if not self.conn:
+            return {"status": "unavailable", "current": None, "message": "No database connection."}
         if medicine.id is None:
-            self.show_error_message("Update Error", "Medicine ID is required to update a medicine.")
-            return False
+            return {"status": "error", "current": None,
+                    "message": "Medicine ID is required to update a medicine."}
         try:
             cursor = self.conn.cursor()
             cursor.execute(
-                """UPDATE medicines SET name=?, brand=?, category=?, price=?, stock=?,
-                   low_stock_alert=?, expiry_date=?, description=? WHERE id=?""",
-                (medicine.name, medicine.brand, medicine.category, medicine.price,
+                """UPDATE medicines SET name=?, brand=?, category=?, price_minor=?, stock=?,
+                   low_stock_alert=?, expiry_date=?, description=?, barcode=?, cost_price_minor=?,
+                   row_version = row_version + 1
+                   WHERE id=? AND (? IS NULL OR row_version = ?)""",
+                (medicine.name, medicine.brand, medicine.category, Money.of(medicine.price).minor,
                  medicine.stock, medicine.low_stock_alert, medicine.expiry_date,
-                 medicine.description, medicine.id)
+                 medicine.description, normalize_barcode(medicine.barcode), _optional_minor(medicine.cost_price),
+                 medicine.id, medicine.row_version, medicine.row_version)
             )
             self.conn.commit()
-            if cursor.rowcount > 0:
-                print(f"Medicine ID {medicine.id} updated successfully.")
-                return True
-            else:
-                self.show_error_message("Update Error", f"Medicine with ID {medicine.id} not found.")
-                return False
+            updated = cursor.rowcount > 0
         except sqlite3.Error as e:
-            self.show_error_message("Database Error", f"Failed to update medicine: {e}")
-            return False
+            if self.conn.in_transaction:
+                self.conn.rollback()
+            return {"status": "error", "current": None, "message": _medicine_write_error(e, medicine, "update")}
+
+        if updated:
+            print(f"Medicine ID {medicine.id} updated successfully.")
+            self.change_feed.publish(
+                ChangeEvent("medicines", ChangeEvent.UPDATE, [medicine.id], MEDICINE_EDIT_FIELDS))
+        # Read after the event, which refreshed the catalog's copy of the row
+        current = self.get_medicine_by_id(medicine.id)
+        if updated:
+            return {"status": "updated", "current": current, "message": ""}
+        if current is None:
+            return {"status": "missing", "current": None,
+                    "message": f"Medicine with ID {medicine.id} not found."}
+        print(f"Medicine ID {medicine.id} update conflict: "
+              f"read version {medicine.row_version}, stored version {current.row_version}.")
+        return {"status": "conflict", "current": current,
+                "message": f"Medicine '{current.name}' was changed on another terminal "
+                           f"while you were editing it. Reload it and try again."}
 
     def update_medicine_stock(self, medicine_id, new_stock):
         """
@@ -256,10 +437,12 @@ class DBManager:
         if not self.conn: return False
         try:
             cursor = self.conn.cursor()
-            cursor.execute("UPDATE medicines SET stock = ? WHERE id = ?", (new_stock, medicine_id))
+            cursor.execute("UPDATE medicines SET stock = ?, row_version = row_version + 1 WHERE id = ?",
+                           (new_stock, medicine_id))
             self.conn.commit()
             if cursor.rowcount > 0:
                 print(f"Medicine ID {medicine_id} stock updated to {new_stock}.")
+                self.change_feed.publish(ChangeEvent("medicines", ChangeEvent.UPDATE, [medicine_id], ["stock"]))
                 return True
             else:
                 self.show_error_message("Stock Update Error",
@@ -278,6 +461,7 @@ class DBManager:
             self.conn.commit()
             if cursor.rowcount > 0:
                 print(f"Medicine ID {medicine_id} deleted successfully.")
+                self.change_feed.publish(ChangeEvent("medicines", ChangeEvent.DELETE, [medicine_id]))
                 return True
             else:
                 self.show_error_message("Delete Error", f"Medicine with ID {medicine_id} not found.")
@@ -293,11 +477,14 @@ class DBManager:
         try:
             cursor = self.conn.cursor()
             cursor.execute(
-                "INSERT INTO customers (name, phone, email, address) VALUES (?, ?, ?, ?)",
-                (customer.name, customer.phone, customer.email, customer.address)
+                """INSERT INTO customers (name, phone, email, address, name_key, phone_digits, phone_digits_rev)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (customer.name, customer.phone, customer.email, customer.address,
+                 *customer_lookup_keys(customer.name, customer.phone))
             )
             self.conn.commit()
             print(f"Customer '{customer.name}' added successfully.")
+            self.change_feed.publish(ChangeEvent("customers", ChangeEvent.INSERT, [cursor.lastrowid]))
             return True
         except sqlite3.IntegrityError as e:
             if "UNIQUE constraint failed" in str(e):
@@ -314,9 +501,9 @@ class DBManager:
         if not self.conn: return []
         try:
             cursor = self.conn.cursor()
-            cursor.execute("SELECT id, name, phone, email, address, created_at FROM customers ORDER BY name ASC")
+            cursor.execute("SELECT id, name, phone, email, address, created_at, row_version FROM customers ORDER BY name ASC")
             rows = cursor.fetchall()
-            return [Customer.from_db_row(row) for row in rows]
+            return map_customers(rows)
         except sqlite3.Error as e:
             self.show_error_message("Database Error", f"Failed to retrieve customers: {e}")
             return []
@@ -329,7 +516,7 @@ class DBManager:
         if not self.conn: return None
         try:
             cursor = self.conn.cursor()
-            cursor.execute("SELECT id, name, phone, email, address, created_at FROM customers WHERE id = ?",
+            cursor.execute("SELECT id, name, phone, email, address, created_at, row_version FROM customers WHERE id = ?",
                            (customer_id,))
             row = cursor.fetchone()
             if row:
@@ -339,34 +526,182 @@ class DBManager:
             self.show_error_message("Database Error", f"Failed to retrieve customer by ID: {e}")
             return None
 
+    def find_customers(self, query, limit=CUSTOMER_SEARCH_LIMIT):
+        """
+        Finds customers by name, phone number or email, best matches first.
+
+        Every tier is an index range on the lookup keys of migration 12, so the
+        cost grows with the number of matches, not with the number of customers.
+        For a number: the exact number, then numbers ending in it (caller ID, on
+        the last CALLER_ID_DIGITS digits, so "0300 1234567" finds "+92 300 1234567"),
+        then numbers starting with it. For text: the exact name, then names
+        starting with it, then names with words starting with it (e.g. a surname),
+        then emails starting with it. Names and numbers are compared normalized
+        (models/customer.py), so case, accents, spaces and dashes do not matter.
+
+        Args:
+            query (str): Name, phone number or email as typed.
+            limit (int): Most customers returned.
+
+        Returns:
+            list: Customer objects, best match first (then by name).
+        """
+        if not self.conn: return []
+        name_key = normalize_customer_name(query)
+        if not name_key: return []
+        tiers = []  # (SQL selecting matching IDs, params), best first
+        digits = phone_digits(query)
+        if digits and not any(char.isalpha() for char in query):
+            caller_digits = digits[-CALLER_ID_DIGITS:][::-1]
+            tiers += [
+                ("SELECT id FROM customers WHERE phone_digits = ?", (digits,)),
+                # ':' sorts right after '9', so these ranges are "starts with"
+                ("SELECT id FROM customers WHERE phone_digits_rev >= ? AND phone_digits_rev < ?",
+                 (caller_digits, caller_digits + ":")),
+                ("SELECT id FROM customers WHERE phone_digits >= ? AND phone_digits < ?", (digits, digits + ":")),
+            ]
+        tiers += [
+            ("SELECT id FROM customers WHERE name_key = ?", (name_key,)),
+            ("SELECT id FROM customers WHERE name_key >= ? AND name_key < ?", (name_key, name_key + "\U0010ffff")),
+        ]
+        words = name_key.split()
+        if self._has_customer_fts():
+            # Every word as a prefix: "ali kh" -> "ali"* "kh"*
+            tiers.append(("SELECT rowid AS id FROM customers_fts WHERE customers_fts MATCH ?",
+                          (" ".join('"' + word.replace('"', '""') + '"*' for word in words),)))
+        else:
+            tiers.append(("SELECT id FROM customers WHERE " + " AND ".join(["' ' || name_key LIKE ? ESCAPE '\\'"] * len(words)),
+                          tuple("% " + word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                                for word in words)))
+        email = query.strip().lower()
+        tiers.append(("SELECT id FROM customers WHERE lower(email) >= ? AND lower(email) < ?",
+                      (email, email + "\U0010ffff")))
+
+        matches = " UNION ALL ".join(f"SELECT id, {rank} FROM ({sql} LIMIT ?)" for rank, (sql, _) in enumerate(tiers))
+        params = [value for _, tier_params in tiers for value in (*tier_params, limit)]
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                f"""WITH matches(id, rank) AS ({matches})
+                    SELECT c.id, c.name, c.phone, c.email, c.address, c.created_at, c.row_version
+                    FROM (SELECT id, MIN(rank) AS rank FROM matches GROUP BY id) m
+                    JOIN customers c ON c.id = m.id
+                    ORDER BY m.rank, c.name_key
+                    LIMIT ?""",
+                (*params, limit))
+            return map_customers(cursor.fetchall())
+        except sqlite3.Error as e:
+            self.show_error_message("Database Error", f"Failed to search customers: {e}")
+            return []
+
+    def find_customer_by_phone(self, phone):
+        """
+        Caller ID: the customer whose number ends in the same last CALLER_ID_DIGITS digits as phone.
+
+        Returns:
+            Customer: The customer, or None if no customer or more than one matches.
+        """
+        if not self.conn: return None
+        digits = phone_digits(phone)
+        if not digits: return None
+        caller_digits = digits[-CALLER_ID_DIGITS:][::-1]
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                "SELECT id, name, phone, email, address, created_at, row_version FROM customers "
+                "WHERE phone_digits_rev >= ? AND phone_digits_rev < ? LIMIT 2",
+                (caller_digits, caller_digits + ":"))
+            rows = cursor.fetchall()
+            return Customer.from_db_row(rows[0]) if len(rows) == 1 else None
+        except sqlite3.Error as e:
+            self.show_error_message("Database Error", f"Failed to look up caller: {e}")
+            return None
+
+    def _has_customer_fts(self):
+        if self._customer_fts is None:
+            self._customer_fts = self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'customers_fts'").fetchone() is not None
+        return self._customer_fts
+
+    def get_customers_by_ids(self, customer_ids):
+        """
+        Retrieves the customers with the given IDs, used to patch screens after a change.
+        Returns a list of Customer objects (missing IDs are skipped).
+        """
+        if not self.conn or not customer_ids: return []
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                "SELECT id, name, phone, email, address, created_at, row_version FROM customers WHERE id IN (SELECT value FROM json_each(?))",
+                (json.dumps(list(customer_ids)),))
+            return map_customers(cursor.fetchall())
+        except sqlite3.Error as e:
+            self.show_error_message("Database Error", f"Failed to retrieve customers by ID: {e}")
+            return []
+
     def update_customer(self, customer):
-        """Updates an existing customer record in the 'customers' table."""
-        if not self.conn: return False
+        """
+        Updates an existing customer record in the 'customers' table.
+        If customer.row_version is set and the row was changed by someone else
+        since it was read, nothing is written and a conflict error is shown.
+        """
+        outcome = self.try_update_customer(customer)
+        if outcome["status"] == "updated":
+            return True
+        if outcome["status"] != "unavailable":
+            self.show_error_message(UPDATE_ERROR_TITLES[outcome["status"]], outcome["message"])
+        return False
+
+    def try_update_customer(self, customer):
+        """
+        Conditionally updates a customer; see try_update_medicine for the versioning rules.
+
+        Returns:
+            dict: {"status": "updated" | "conflict" | "missing" | "error" | "unavailable",
+                   "current": the stored Customer after the attempt (None if missing),
+                   "message": str}
+        """
+        if not self.conn:
+            return {"status": "unavailable", "current": None, "message": "No database connection."}
         if customer.id is None:
-            self.show_message("Update Error", "Customer ID is required to update a customer.")
-            return False
+            return {"status": "error", "current": None,
+                    "message": "Customer ID is required to update a customer."}
         try:
             cursor = self.conn.cursor()
             cursor.execute(
-                """UPDATE customers SET name=?, phone=?, email=?, address=? WHERE id=?""",
-                (customer.name, customer.phone, customer.email, customer.address, customer.id)
+                """UPDATE customers SET name=?, phone=?, email=?, address=?, name_key=?, phone_digits=?,
+                                        phone_digits_rev=?, row_version = row_version + 1
+                   WHERE id=? AND (? IS NULL OR row_version = ?)""",
+                (customer.name, customer.phone, customer.email, customer.address,
+                 *customer_lookup_keys(customer.name, customer.phone), customer.id,
+                 customer.row_version, customer.row_version)
             )
             self.conn.commit()
-            if cursor.rowcount > 0:
-                print(f"Customer ID {customer.id} updated successfully.")
-                return True
-            else:
-                self.show_error_message("Update Error", f"Customer with ID {customer.id} not found.")
-                return False
+            updated = cursor.rowcount > 0
         except sqlite3.IntegrityError as e:
+            if self.conn.in_transaction:
+                self.conn.rollback()
             if "UNIQUE constraint failed" in str(e):
-                self.show_error_message("Customer Error", "Phone or Email already exists for another customer.")
-            else:
-                self.show_error_message("Database Error", f"Failed to update customer: {e}")
-            return False
+                return {"status": "error", "current": None,
+                        "message": "Phone or Email already exists for another customer."}
+            return {"status": "error", "current": None, "message": f"Failed to update customer: {e}"}
         except sqlite3.Error as e:
-            self.show_error_message("Database Error", f"Failed to update customer: {e}")
-            return False
+            if self.conn.in_transaction:
+                self.conn.rollback()
+            return {"status": "error", "current": None, "message": f"Failed to update customer: {e}"}
+
+        current = self.get_customer_by_id(customer.id)
+        if updated:
+            print(f"Customer ID {customer.id} updated successfully.")
+            self.change_feed.publish(
+                ChangeEvent("customers", ChangeEvent.UPDATE, [customer.id], CUSTOMER_EDIT_FIELDS))
+            return {"status": "updated", "current": current, "message": ""}
+        if current is None:
+            return {"status": "missing", "current": None,
+                    "message": f"Customer with ID {customer.id} not found."}
+        return {"status": "conflict", "current": current,
+                "message": f"Customer '{current.name}' was changed on another terminal "
+                           f"while you were editing it. Reload it and try again."}
 
     def delete_customer(self, customer_id):
         """Deletes a customer record from the 'customers' table by its ID."""
@@ -377,6 +712,7 @@ class DBManager:
             self.conn.commit()
             if cursor.rowcount > 0:
                 print(f"Customer ID {customer_id} deleted successfully.")
+                self.change_feed.publish(ChangeEvent("customers", ChangeEvent.DELETE, [customer_id]))
                 return True
             else:
                 self.show_error_message("Delete Error", f"Customer with ID {customer_id} not found.")
@@ -387,7 +723,10 @@ class DBManager:
 
     # --- Login History Methods ---
     def add_login_email(self, email):
-        """Adds or updates an email in the login_history table."""
+        """
+        Adds or updates an email in the login_history table, keeping only the
+        LOGIN_HISTORY_LIMIT most recently used emails.
+        """
         if not self.conn: return False
         try:
             cursor = self.conn.cursor()
@@ -395,19 +734,26 @@ class DBManager:
                 "INSERT OR REPLACE INTO login_history (email, last_login) VALUES (?, CURRENT_TIMESTAMP)",
                 (email,)
             )
+            login_id = cursor.lastrowid
+            # REPLACE gives the email a new id, so id breaks ties within the same second
+            cursor.execute("""
+                DELETE FROM login_history WHERE id NOT IN
+                    (SELECT id FROM login_history ORDER BY last_login DESC, id DESC LIMIT ?)
+            """, (LOGIN_HISTORY_LIMIT,))
             self.conn.commit()
             print(f"Login history updated for email: {email}")
+            self.change_feed.publish(ChangeEvent("login_history", ChangeEvent.UPDATE, [login_id]))
             return True
         except sqlite3.Error as e:
             print(f"Error updating login history for {email}: {e}")
             return False
 
-    def get_login_emails(self):
-        """Retrieves all emails from the login_history table, ordered by last_login descending."""
+    def get_login_emails(self, limit=LOGIN_HISTORY_LIMIT):
+        """Retrieves up to limit emails from the login_history table, most recently used first."""
         if not self.conn: return []
         try:
             cursor = self.conn.cursor()
-            cursor.execute("SELECT email FROM login_history ORDER BY last_login DESC")
+            cursor.execute("SELECT email FROM login_history ORDER BY last_login DESC, id DESC LIMIT ?", (limit,))
             emails = [row[0] for row in cursor.fetchall()]
             return emails
         except sqlite3.Error as e:
@@ -416,7 +762,8 @@ class DBManager:
 
     # --- Sales Management Methods ---
 
-    def add_sale(self, customer_id, customer_name, customer_phone, customer_email, total_amount, items):
+    def add_sale(self, customer_id, customer_name, customer_phone, customer_email, total_amount, items,
+                 client_ref=None, pricing=None):
         """
         Adds a new sale record to the 'sales' table.
         Also updates the stock of sold medicines.
@@ -426,9 +773,12 @@ class DBManager:
             customer_name (str): Name of the customer (even if not linked to ID).
             customer_phone (str): Phone of the customer (even if not linked to ID).
             customer_email (str): Email of the customer (even if not linked to ID).
-            total_amount (float): Total amount of the sale.
+            total_amount (Money): Total amount of the sale (a plain number is converted with Money.of).
             items (list): List of dictionaries, each representing a sold item:
-                          [{"med_id": int, "qty": int, "price": float, "name": str}]
+                          [{"med_id": int, "qty": int, "price": Money, "name": str}]
+            client_ref (str, optional): Unique reference from the terminal's sale outbox.
+            pricing (dict, optional): Subtotal, discount, tax and the two rates as shown at the
+                counter (see models.sale.price_sale); stored with the sale and its lines.
 
         Returns:
             bool: True if the sale was added successfully and stock updated, False otherwise.
@@ -439,37 +789,14 @@ class DBManager:
 
         try:
             cursor = self.conn.cursor()
-            # Start a transaction for atomicity
-            self.conn.execute("BEGIN TRANSACTION")
-
-            # Insert sale record
-            items_json = json.dumps(items)  # Convert items list to JSON string
-            cursor.execute(
-                """INSERT INTO sales (customer_id, customer_name, customer_phone, customer_email, total_amount, items_json)
-                   VALUES (?, ?, ?, ?, ?, ?)""",
-                (customer_id, customer_name, customer_phone, customer_email, total_amount, items_json)
-            )
-            sale_id = cursor.lastrowid  # Get the ID of the newly inserted sale
-
-            # Update medicine stock for each item sold
-            for item in items:
-                med_id = item['med_id']
-                qty_sold = item['qty']
-                # Get current stock
-                cursor.execute("SELECT stock FROM medicines WHERE id = ?", (med_id,))
-                current_stock_row = cursor.fetchone()
-                if not current_stock_row:
-                    raise ValueError(f"Medicine with ID {med_id} not found during stock update.")
-                current_stock = current_stock_row[0]
-                new_stock = current_stock - qty_sold
-                if new_stock < 0:
-                    raise ValueError(
-                        f"Insufficient stock for medicine ID {med_id}. Available: {current_stock}, Requested: {qty_sold}")
-
-                cursor.execute("UPDATE medicines SET stock = ? WHERE id = ?", (new_stock, med_id))
-
+            # Start a transaction for atomicity. IMMEDIATE takes the write lock up front so
+            # two terminals cannot both read the same stock and then both decrement it.
+            self.conn.execute("BEGIN IMMEDIATE TRANSACTION")
+            sale_id, _ = self._write_sale(cursor, customer_id, customer_name, customer_phone, customer_email,
+                                          total_amount, items, client_ref, pricing=pricing)
             self.conn.commit()  # Commit the transaction
             print(f"Sale ID {sale_id} recorded successfully and stock updated.")
+            self._publish_sale(sale_id, items)
             return True
         except ValueError as ve:
             self.conn.rollback()  # Rollback if stock is insufficient
@@ -480,11 +807,147 @@ class DBManager:
             self.show_error_message("Database Error", f"Failed to record sale: {e}")
             return False
 
-    def get_all_sales(self):
+    def record_queued_sale(self, sale, allow_oversell=False):
+        """
+        Records a sale taken from a terminal's outbox (see database/sale_outbox.py).
+        Unlike add_sale, it never shows a dialog; the outcome is returned so the
+        caller can decide whether to keep the sale queued.
+
+        Replays are idempotent: a sale whose client_ref is already stored is
+        reported as recorded again without touching stock.
+
+        Args:
+            sale (dict): Keys customer_id, customer_name, customer_phone, customer_email,
+                         total_amount, items and client_ref, and optionally pricing, as accepted by add_sale.
+            allow_oversell (bool): When False, insufficient stock rejects the sale, as at
+                the counter. When True (background replay of a sale already handed over),
+                the sale is always recorded, stock is floored at zero and every shortfall
+                is reported as a conflict.
+
+        Returns:
+            dict: {"status": "recorded" | "conflict" | "rejected" | "unavailable",
+                   "sale_id": int or None, "message": str}
+        """
+        if not self.conn:
+            return {"status": "unavailable", "sale_id": None, "message": "No database connection."}
+
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT id FROM sales WHERE client_ref = ?", (sale["client_ref"],))
+            existing = cursor.fetchone()
+            if existing:
+                return {"status": "recorded", "sale_id": existing[0], "message": "Already recorded."}
+
+            self.conn.execute("BEGIN IMMEDIATE TRANSACTION")
+            sale_id, shortfalls = self._write_sale(
+                cursor, sale["customer_id"], sale["customer_name"], sale["customer_phone"],
+                sale["customer_email"], sale["total_amount"], sale["items"], sale["client_ref"],
+                allow_oversell=allow_oversell, pricing=sale.get("pricing"))
+            self.conn.commit()
+        except ValueError as ve:
+            self.conn.rollback()
+            return {"status": "rejected", "sale_id": None, "message": str(ve)}
+        except sqlite3.IntegrityError as e:
+            self.conn.rollback()
+            if "client_ref" not in str(e):
+                return {"status": "rejected", "sale_id": None, "message": f"Failed to record sale: {e}"}
+            # Another connection stored the same outbox entry first.
+            cursor.execute("SELECT id FROM sales WHERE client_ref = ?", (sale["client_ref"],))
+            return {"status": "recorded", "sale_id": cursor.fetchone()[0], "message": "Already recorded."}
+        except sqlite3.OperationalError as e:
+            # Locked database, unreachable share, disk I/O: keep the sale queued and retry later.
+            if self.conn.in_transaction:
+                self.conn.rollback()
+            return {"status": "unavailable", "sale_id": None, "message": str(e)}
+        except sqlite3.Error as e:
+            if self.conn.in_transaction:
+                self.conn.rollback()
+            return {"status": "rejected", "sale_id": None, "message": f"Failed to record sale: {e}"}
+
+        print(f"Sale ID {sale_id} recorded from outbox ({sale['client_ref']}).")
+        self._publish_sale(sale_id, sale["items"])
+        if shortfalls:
+            return {"status": "conflict", "sale_id": sale_id, "message": "; ".join(shortfalls)}
+        return {"status": "recorded", "sale_id": sale_id, "message": ""}
+
+    def _publish_sale(self, sale_id, items):
+        """Announces a new sale and the stock it consumed."""
+        store = sales_column_store(self.db_name)
+        if store is not None and store.loaded:
+            try:
+                store.sync(self.conn)  # Append its lines now rather than at the next report
+            except sqlite3.Error as e:
+                print(f"Error updating the sales columns: {e}")
+        self.change_feed.publish(
+            ChangeEvent("sales", ChangeEvent.INSERT, [sale_id]),
+            ChangeEvent("medicines", ChangeEvent.UPDATE, sorted({item["med_id"] for item in items}), ["stock"])
+        )
+
+    def _write_sale(self, cursor, customer_id, customer_name, customer_phone, customer_email,
+                    total_amount, items, client_ref=None, allow_oversell=False, pricing=None):
+        """
+        Inserts a sale with its priced lines and decrements stock inside the caller's transaction.
+
+        Raises ValueError for pricing that does not add up, and for unknown medicines
+        or insufficient stock unless allow_oversell is set, in which case stock is
+        floored at zero and the problems are returned instead.
+
+        Returns:
+            tuple: (sale_id, shortfalls) where shortfalls is a list of messages.
+        """
+        # Insert sale record. Item prices go into the JSON as plain numbers (see money_json_default).
+        items_json = json.dumps([dict(item, price=Money.of(item["price"])) for item in items],
+                                default=money_json_default)
+        breakdown, lines = price_sale(items, total_amount, pricing)
+        cursor.execute(
+            """INSERT INTO sales (customer_id, customer_name, customer_phone, customer_email, total_amount_minor,
+                                  items_json, client_ref, subtotal_minor, discount_minor, tax_minor,
+                                  discount_rate, tax_rate)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (customer_id, customer_name, customer_phone, customer_email, Money.of(total_amount).minor, items_json,
+             client_ref, breakdown["subtotal"].minor, breakdown["discount"].minor, breakdown["tax"].minor,
+             breakdown["discount_rate"], breakdown["tax_rate"])
+        )
+        sale_id = cursor.lastrowid  # Get the ID of the newly inserted sale
+        insert_sale_items(cursor, sale_id, lines)
+
+        # Update medicine stock for each item sold. The decrement is relative to the stored
+        # value, so it never overwrites a stock edit made since the cart was filled.
+        shortfalls = []
+        for item in items:
+            med_id = item['med_id']
+            qty_sold = item['qty']
+            cursor.execute(
+                "UPDATE medicines SET stock = stock - ?, row_version = row_version + 1 WHERE id = ? AND stock >= ?",
+                (qty_sold, med_id, qty_sold))
+            if cursor.rowcount > 0:
+                continue
+
+            cursor.execute("SELECT stock FROM medicines WHERE id = ?", (med_id,))
+            current_stock_row = cursor.fetchone()
+            if not current_stock_row:
+                if not allow_oversell:
+                    raise ValueError(f"Medicine with ID {med_id} not found during stock update.")
+                shortfalls.append(f"Medicine ID {med_id} no longer exists; stock not updated.")
+                continue
+            current_stock = current_stock_row[0]
+            if not allow_oversell:
+                raise ValueError(
+                    f"Insufficient stock for medicine ID {med_id}. Available: {current_stock}, Requested: {qty_sold}")
+            shortfalls.append(f"Medicine ID {med_id} oversold by {qty_sold - current_stock}; stock set to 0.")
+            cursor.execute("UPDATE medicines SET stock = 0, row_version = row_version + 1 WHERE id = ?", (med_id,))
+
+        return sale_id, shortfalls
+
+    def get_all_sales(self, include_archived=False):
         """
         Retrieves all sales records from the 'sales' table.
         The 'items_json' column will be parsed back into a Python list.
 
+        Args:
+            include_archived (bool): Also read every yearly archive (see archive_old_sales).
+                By default only live sales, i.e. those inside the archive horizon, are returned.
+
         Returns:
             list: A list of dictionaries, each representing a sale.
                   Returns an empty list if no sales are found or on error.
@@ -492,27 +955,270 @@ class DBManager:
         if not self.conn: return []
         try:
             cursor = self.conn.cursor()
-            cursor.execute(
-                "SELECT id, customer_id, customer_name, customer_phone, customer_email, total_amount, sale_date, items_json FROM sales ORDER BY sale_date DESC")
-            rows = cursor.fetchall()
-            sales_data = []
-            for row in rows:
-                sale_dict = {
-                    "id": row[0],
-                    "customer_id": row[1],
-                    "customer_name": row[2],
-                    "customer_phone": row[3],
-                    "customer_email": row[4],
-                    "total_amount": row[5],
-                    "sale_date": row[6],
-                    "items": json.loads(row[7])  # Parse JSON string back to list
-                }
-                sales_data.append(sale_dict)
+            cursor.execute(f"SELECT {SALE_LIST_COLUMNS} FROM sales ORDER BY sale_date DESC")
+            sales_data = map_sales(cursor.fetchall())
+            if include_archived:
+                for year in self.get_archive_years():
+                    sales_data.extend(self._get_archived_sales(year))
+                sales_data.sort(key=lambda sale: sale["sale_date"], reverse=True)
             return sales_data
         except sqlite3.Error as e:
             self.show_error_message("Database Error", f"Failed to retrieve sales: {e}")
             return []
 
+    def get_sales_by_ids(self, sale_ids):
+        """
+        Retrieves the sales with the given IDs in the same format as get_all_sales,
+        used to add new sales to the screens without reloading the history.
+        """
+        if not self.conn or not sale_ids: return []
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                f"SELECT {SALE_LIST_COLUMNS} FROM sales WHERE id IN (SELECT value FROM json_each(?)) ORDER BY sale_date DESC",
+                (json.dumps(list(sale_ids)),))
+            return map_sales(cursor.fetchall())
+        except sqlite3.Error as e:
+            self.show_error_message("Database Error", f"Failed to retrieve sales by ID: {e}")
+            return []
+
+    # --- Sales Archive Methods ---
+    def _archive_path(self, year):
+        """Path of the archive database holding the given year's sales, next to the main database."""
+        stem, _ = os.path.splitext(self.db_name)
+        return f"{stem}_archive_{year}.db"
+
+    def get_archive_years(self):
+        """Returns the years that have an archive database, oldest first."""
+        stem, _ = os.path.splitext(self.db_name)
+        years = []
+        for path in glob.glob(f"{glob.escape(stem)}_archive_*.db"):
+            suffix = path[len(stem) + len("_archive_"):-len(".db")]
+            if suffix.isdigit():
+                years.append(int(suffix))
+        return sorted(years)
+
+    def _attach_archive(self, year):
+        """Attaches (creating if needed) the archive for a year and returns its schema name."""
+        alias = f"archive_{year}"
+        self.conn.execute(f"ATTACH DATABASE ? AS {alias}", (self._archive_path(year),))
+        self.conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {alias}.sales (
+                id INTEGER PRIMARY KEY,
+                customer_id INTEGER,
+                customer_name TEXT,
+                customer_phone TEXT,
+                customer_email TEXT,
+                total_amount_minor INTEGER NOT NULL,
+                sale_date TIMESTAMP,
+                items_json TEXT NOT NULL,
+                client_ref TEXT,
+                subtotal_minor INTEGER,
+                discount_minor INTEGER,
+                tax_minor INTEGER,
+                discount_rate TEXT,
+                tax_rate TEXT
+            )
+        """)
+        self.conn.execute(f"CREATE INDEX IF NOT EXISTS {alias}.idx_sales_sale_date ON sales(sale_date)")
+        self.conn.execute(SALE_ITEMS_SCHEMA.format(schema=f"{alias}."))
+        try:
+            self._upgrade_archive_money(alias)
+            self._upgrade_archive_pricing(alias)
+        except sqlite3.Error:
+            self._detach_archive(alias)
+            raise
+        return alias
+
+    def _upgrade_archive_money(self, alias):
+        """Converts an archive written before amounts were stored in minor units (see migration 7)."""
+        columns = [row[1] for row in self.conn.execute(f"PRAGMA {alias}.table_info(sales)").fetchall()]
+        if "total_amount" not in columns:
+            return
+        self.conn.execute("BEGIN IMMEDIATE TRANSACTION")
+        try:
+            if "total_amount_minor" not in columns:
+                self.conn.execute(f"ALTER TABLE {alias}.sales ADD COLUMN total_amount_minor INTEGER")
+            self.conn.execute(f"UPDATE {alias}.sales SET total_amount_minor = CAST(ROUND(total_amount * 100) AS INTEGER) "
+                              f"WHERE total_amount_minor IS NULL")
+            self.conn.execute(f"ALTER TABLE {alias}.sales DROP COLUMN total_amount")
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+        print(f"Converted sales archive {alias} to amounts in minor units.")
+
+    def _upgrade_archive_pricing(self, alias):
+        """Adds the sale pricing columns and line items (see migration 9) to an archive written before them."""
+        columns = [row[1] for row in self.conn.execute(f"PRAGMA {alias}.table_info(sales)").fetchall()]
+        if "tax_rate" in columns:
+            return
+        self.conn.execute("BEGIN IMMEDIATE TRANSACTION")
+        try:
+            for column, declaration in SALE_PRICING_COLUMNS:
+                if column not in columns:
+                    self.conn.execute(f"ALTER TABLE {alias}.sales ADD COLUMN {column} {declaration}")
+            self.conn.execute(f"UPDATE {alias}.sales SET {SALE_SUBTOTAL_FROM_ITEMS}")
+            self.conn.execute(f"UPDATE {alias}.sales SET {SALE_ADJUSTMENT_FROM_TOTAL}")
+            cursor = self.conn.cursor()
+            cursor.execute(f"SELECT id, total_amount_minor, items_json FROM {alias}.sales s "
+                           f"WHERE NOT EXISTS (SELECT 1 FROM {alias}.sale_items WHERE sale_id = s.id)")
+            for sale_id, total_amount_minor, items_json in cursor.fetchall():
+                try:
+                    _, lines = price_sale(json.loads(items_json), Money(total_amount_minor))
+                except (ValueError, KeyError, TypeError) as e:
+                    print(f"Archived sale {sale_id}: items could not be read ({e}); no line items stored.")
+                    continue
+                insert_sale_items(cursor, sale_id, lines, schema=f"{alias}.")
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+        print(f"Added sale pricing to sales archive {alias}.")
+
+    def _detach_archive(self, alias):
+        if self.conn.in_transaction:
+            self.conn.rollback()
+        self.conn.execute(f"DETACH DATABASE {alias}")
+
+    def _archive_years_for_range(self, cursor, start_date_str, end_date_str):
+        """Returns the archive years a date range reaches into; empty if the range is all live."""
+        cursor.execute("SELECT MAX(sale_day) FROM sales_rollups")
+        archived_through = cursor.fetchone()[0]
+        if not archived_through or start_date_str > archived_through:
+            return []
+        first_year = int(start_date_str[:4])
+        last_year = min(int(end_date_str[:4]), int(archived_through[:4]))
+        return [year for year in self.get_archive_years() if first_year <= year <= last_year]
+
+    def _get_archived_sales(self, year, start_date_str=None, end_date_exclusive=None):
+        """Reads sales from one yearly archive, optionally limited to a date range."""
+        alias = self._attach_archive(year)
+        try:
+            cursor = self.conn.cursor()
+            if start_date_str:
+                cursor.execute(
+                    f"SELECT {SALE_LIST_COLUMNS} FROM {alias}.sales WHERE sale_date >= ? AND sale_date < ? "
+                    f"ORDER BY sale_date DESC",
+                    (start_date_str, end_date_exclusive))
+            else:
+                cursor.execute(f"SELECT {SALE_LIST_COLUMNS} FROM {alias}.sales ORDER BY sale_date DESC")
+            return map_sales(cursor.fetchall())
+        finally:
+            self._detach_archive(alias)
+
+    def _get_archived_sales_by_medicine(self, year, start_date_str, end_date_exclusive):
+        """Per-medicine (med_id or -1, qty, sales, net_minor, name) of one yearly archive over a date range."""
+        alias = self._attach_archive(year)
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(f"""
+                SELECT COALESCE(i.med_id, -1), SUM(i.qty), COUNT(DISTINCT i.sale_id), SUM(i.net_minor), MAX(i.name)
+                FROM {alias}.sales s JOIN {alias}.sale_items i ON i.sale_id = s.id
+                WHERE s.sale_date >= ? AND s.sale_date < ?
+                GROUP BY 1
+            """, (start_date_str, end_date_exclusive))
+            return cursor.fetchall()
+        finally:
+            self._detach_archive(alias)
+
+    def archive_old_sales(self, horizon_days=SALES_ARCHIVE_HORIZON_DAYS, batch_size=500):
+        """
+        Moves sales older than the horizon into per-year archive databases
+        (pharmacy_archive_<year>.db) and adds them to the daily sales_rollups.
+
+        Sales are moved in batches of batch_size, each in its own short transaction,
+        so the counter is never locked out for long. A batch copies the rows with
+        INSERT OR IGNORE before deleting them, so an interrupted run can simply be
+        repeated.
+
+        Args:
+            horizon_days (int): Sales older than this many days are archived.
+            batch_size (int): Sales moved per transaction.
+
+        Returns:
+            int: Number of sales archived, or -1 on error.
+        """
+        if not self.conn: return -1
+        cutoff = (datetime.now() - timedelta(days=horizon_days)).strftime('%Y-%m-%d')
+        moved_ids = []
+        alias = None
+        failed = False
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT DISTINCT substr(sale_date, 1, 4) FROM sales WHERE sale_date < ?", (cutoff,))
+            years = sorted(int(row[0]) for row in cursor.fetchall())
+            for year in years:
+                alias = self._attach_archive(year)
+                year_start, next_year_start = f"{year}-01-01", f"{year + 1}-01-01"
+                while True:
+                    self.conn.execute("BEGIN IMMEDIATE TRANSACTION")
+                    cursor.execute(
+                        "SELECT id FROM sales WHERE sale_date >= ? AND sale_date < ? AND sale_date < ? ORDER BY id LIMIT ?",
+                        (year_start, next_year_start, cutoff, batch_size))
+                    ids = [row[0] for row in cursor.fetchall()]
+                    if not ids:
+                        self.conn.rollback()
+                        break
+                    ids_json = json.dumps(ids)
+                    cursor.execute(
+                        f"INSERT OR IGNORE INTO {alias}.sales ({SALE_COLUMNS}) "
+                        f"SELECT {SALE_COLUMNS} FROM main.sales WHERE id IN (SELECT value FROM json_each(?))", (ids_json,))
+                    cursor.execute(
+                        f"INSERT OR IGNORE INTO {alias}.sale_items ({SALE_ITEM_COLUMNS}) "
+                        f"SELECT {SALE_ITEM_COLUMNS} FROM main.sale_items WHERE sale_id IN (SELECT value FROM json_each(?))",
+                        (ids_json,))
+                    cursor.execute("""
+                        INSERT INTO sales_rollups (sale_day, sale_count, total_amount_minor, subtotal_minor,
+                                                   discount_minor, tax_minor)
+                        SELECT substr(sale_date, 1, 10), COUNT(*), SUM(total_amount_minor), SUM(subtotal_minor),
+                               SUM(discount_minor), SUM(tax_minor)
+                        FROM main.sales WHERE id IN (SELECT value FROM json_each(?))
+                        GROUP BY substr(sale_date, 1, 10)
+                        ON CONFLICT(sale_day) DO UPDATE SET
+                            sale_count = sale_count + excluded.sale_count,
+                            total_amount_minor = total_amount_minor + excluded.total_amount_minor,
+                            subtotal_minor = subtotal_minor + excluded.subtotal_minor,
+                            discount_minor = discount_minor + excluded.discount_minor,
+                            tax_minor = tax_minor + excluded.tax_minor
+                    """, (ids_json,))
+                    # Their sale_items rows go with them (ON DELETE CASCADE)
+                    cursor.execute("DELETE FROM main.sales WHERE id IN (SELECT value FROM json_each(?))", (ids_json,))
+                    self.conn.commit()
+                    moved_ids.extend(ids)
+                self._detach_archive(alias)
+                alias = None
+                print(f"Archived sales of {year} older than {cutoff} into {self._archive_path(year)}.")
+        except sqlite3.Error as e:
+            if self.conn.in_transaction:
+                self.conn.rollback()
+            if alias:
+                self._detach_archive(alias)
+            self.show_error_message("Database Error", f"Failed to archive sales: {e}")
+            failed = True
+        if moved_ids:
+            # Batches committed before any error stay archived
+            self.change_feed.publish(ChangeEvent("sales", ChangeEvent.DELETE, moved_ids))
+        return -1 if failed else len(moved_ids)
+
+    def get_sales_archive_summary(self):
+        """
+        Returns {"archived_sales": int, "archived_amount": Money, "archived_through": 'YYYY-MM-DD' or None,
+                 "years": [int, ...]} describing what archive_old_sales has moved so far.
+        """
+        summary = {"archived_sales": 0, "archived_amount": Money(0), "archived_through": None,
+                   "years": self.get_archive_years()}
+        if not self.conn: return summary
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT COALESCE(SUM(sale_count), 0), COALESCE(SUM(total_amount_minor), 0), MAX(sale_day) "
+                           "FROM sales_rollups")
+            summary["archived_sales"], archived_minor, summary["archived_through"] = cursor.fetchone()
+            summary["archived_amount"] = Money(archived_minor)
+        except sqlite3.Error as e:
+            print(f"Error reading sales archive summary: {e}")
+        return summary
+
     # --- Dashboard Statistics Methods ---
 
     def get_total_medicines(self):
@@ -543,17 +1249,20 @@ class DBManager:
 
     def get_total_sales_amount(self):
         """
-        Returns the sum of total_amount from all sales.
+        Returns the sum of total_amount from all sales as Money, including archived sales
+        (taken from their daily rollups rather than the archives themselves).
+        The sum is an exact integer sum of minor units.
         """
-        if not self.conn: return 0.0
+        if not self.conn: return Money(0)
         try:
             cursor = self.conn.cursor()
-            cursor.execute("SELECT SUM(total_amount) FROM sales")
+            cursor.execute("SELECT (SELECT COALESCE(SUM(total_amount_minor), 0) FROM sales) + "
+                           "(SELECT COALESCE(SUM(total_amount_minor), 0) FROM sales_rollups)")
             total = cursor.fetchone()[0]
-            return total if total is not None else 0.0
+            return Money(total or 0)
         except sqlite3.Error as e:
             print(f"Error getting total sales amount: {e}")
-            return 0.0
+            return Money(0)
 
     def get_low_stock_medicines_count(self):
         """
@@ -573,25 +1282,81 @@ class DBManager:
         Returns the count of medicines expiring within a given number of days
         or already expired.
         Expiry date format is YYYY-MM-DD.
+
+        The count is read from today's precomputed alert set when there is one for
+        this horizon (see refresh_expiry_alerts). Otherwise whole expiry weeks are
+        summed from expiry_buckets and only the last, partial week is counted on
+        idx_medicines_expiry_date.
         """
         if not self.conn: return 0
         try:
             cursor = self.conn.cursor()
-            today = datetime.now().strftime('%Y-%m-%d')
-            future_date = (datetime.now() + timedelta(days=days_threshold)).strftime('%Y-%m-%d')
-
-            # Select medicines where expiry_date is less than or equal to future_date (within threshold)
-            # OR expiry_date is less than today (already expired)
-            # AND expiry_date is not NULL
+            today = datetime.now()
+            if self._expiry_alerts_current(cursor, days_threshold, today):
+                cursor.execute("SELECT COUNT(*) FROM expiry_alerts WHERE horizon_days = ?", (days_threshold,))
+                return cursor.fetchone()[0]
+            future = today + timedelta(days=days_threshold)
+            future_date = future.strftime('%Y-%m-%d')
+            week_start = (future - timedelta(days=future.weekday())).strftime('%Y-%m-%d')
             cursor.execute("""
-                SELECT COUNT(id) FROM medicines
-                WHERE expiry_date IS NOT NULL AND (expiry_date <= ? OR expiry_date < ?)
-            """, (future_date, today))
+                SELECT (SELECT COALESCE(SUM(sku_count), 0) FROM expiry_buckets WHERE week_start < ?)
+                     + (SELECT COUNT(*) FROM medicines WHERE expiry_date >= ? AND expiry_date <= ?)
+            """, (week_start, week_start, future_date))
             return cursor.fetchone()[0]
         except sqlite3.Error as e:
             print(f"Error getting expiring medicines count: {e}")
             return 0
 
+    def _expiry_alerts_current(self, cursor, days_threshold, today):
+        """True if the alert set for this horizon was built today."""
+        cursor.execute("SELECT as_of FROM expiry_alert_runs WHERE horizon_days = ?", (days_threshold,))
+        row = cursor.fetchone()
+        return row is not None and row[0] == today.strftime('%Y-%m-%d')
+
+    def refresh_expiry_alerts(self, horizons=EXPIRY_ALERT_HORIZONS, today=None):
+        """
+        Rebuilds the precomputed expiry sets: for each horizon, the medicines that have
+        expired or expire within that many days of today. Triggers on medicines keep the
+        sets current through the day (see migration 11); they only go stale when the date
+        changes, so this runs once a day (database/expiry_scheduler.py). Horizons already
+        built today by any terminal are skipped.
+
+        Args:
+            horizons (tuple): Horizons in days.
+            today (datetime, optional): Date to build the sets for; defaults to now.
+
+        Returns:
+            int: Number of sets rebuilt, or -1 on error.
+        """
+        if not self.conn: return -1
+        today = today or datetime.now()
+        as_of = today.strftime('%Y-%m-%d')
+        rebuilt = 0
+        try:
+            self.conn.execute("BEGIN IMMEDIATE TRANSACTION")
+            cursor = self.conn.cursor()
+            for horizon in horizons:
+                if self._expiry_alerts_current(cursor, horizon, today):
+                    continue
+                cutoff = (today + timedelta(days=horizon)).strftime('%Y-%m-%d')
+                cursor.execute("DELETE FROM expiry_alerts WHERE horizon_days = ?", (horizon,))
+                cursor.execute("""
+                    INSERT INTO expiry_alerts (horizon_days, med_id)
+                    SELECT ?, id FROM medicines WHERE expiry_date IS NOT NULL AND expiry_date <= ?
+                """, (horizon, cutoff))
+                cursor.execute("""
+                    INSERT INTO expiry_alert_runs (horizon_days, as_of, cutoff) VALUES (?, ?, ?)
+                    ON CONFLICT(horizon_days) DO UPDATE SET as_of = excluded.as_of, cutoff = excluded.cutoff
+                """, (horizon, as_of, cutoff))
+                rebuilt += 1
+            self.conn.commit()
+            return rebuilt
+        except sqlite3.Error as e:
+            if self.conn.in_transaction:
+                self.conn.rollback()
+            print(f"Error refreshing expiry alerts: {e}")
+            return -1
+
     # --- New: Reporting System Methods ---
 
     def get_sales_in_date_range(self, start_date_str, end_date_str):
@@ -616,27 +1381,20 @@ class DBManager:
             end_date_obj = datetime.strptime(end_date_str, '%Y-%m-%d')
             end_date_inclusive = (end_date_obj + timedelta(days=1)).strftime('%Y-%m-%d')
 
-            cursor.execute("""
-                SELECT id, customer_id, customer_name, customer_phone, customer_email, total_amount, sale_date, items_json
+            cursor.execute(f"""
+                SELECT {SALE_LIST_COLUMNS}
                 FROM sales
-                WHERE sale_date BETWEEN ? AND ?
+                WHERE sale_date >= ? AND sale_date < ?
                 ORDER BY sale_date DESC
             """, (start_date_str, end_date_inclusive))  # Use < for exclusive end date
-
-            rows = cursor.fetchall()
-            sales_data = []
-            for row in rows:
-                sale_dict = {
-                    "id": row[0],
-                    "customer_id": row[1],
-                    "customer_name": row[2],
-                    "customer_phone": row[3],
-                    "customer_email": row[4],
-                    "total_amount": row[5],
-                    "sale_date": row[6],
-                    "items": json.loads(row[7])
-                }
-                sales_data.append(sale_dict)
+            sales_data = map_sales(cursor.fetchall())
+
+            # Only open the yearly archives the range actually reaches into
+            archive_years = self._archive_years_for_range(cursor, start_date_str, end_date_str)
+            for year in archive_years:
+                sales_data.extend(self._get_archived_sales(year, start_date_str, end_date_inclusive))
+            if archive_years:
+                sales_data.sort(key=lambda sale: sale["sale_date"], reverse=True)
             return sales_data
         except sqlite3.Error as e:
             self.show_error_message("Database Error", f"Failed to retrieve sales report: {e}")
@@ -645,6 +1403,185 @@ class DBManager:
             self.show_error_message("Date Parsing Error", f"Invalid date format or range: {e}")
             return []
 
+    def get_sales_by_medicine(self, start_date_str, end_date_str):
+        """
+        Units sold, number of sales and revenue per medicine over a date range (inclusive).
+        The live sales are served from the NumPy column store (database/sales_columns.py)
+        when NumPy is installed, otherwise summed in SQL; the yearly archives the range
+        reaches into are summed in SQL and added in.
+
+        Args:
+            start_date_str (str): Start date in 'YYYY-MM-DD' format.
+            end_date_str (str): End date in 'YYYY-MM-DD' format.
+
+        Returns:
+            list: Dictionaries {"med_id": int or None, "name": str, "qty": int, "sale_count": int,
+                  "revenue": Money}, highest revenue first, or an empty list on error/no data.
+        """
+        if not self.conn: return []
+        try:
+            end_date_exclusive = (datetime.strptime(end_date_str, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+            cursor = self.conn.cursor()
+            store = sales_column_store(self.db_name)
+            if store is not None:
+                store.sync(self.conn)
+                groups = store.group_sum("med_id", ("qty", "net_minor"), start_date_str, end_date_str)
+                totals = list(zip(groups["med_id"].tolist(), groups["qty"].tolist(), groups["sales"].tolist(),
+                                  groups["net_minor"].tolist()))
+            else:
+                cursor.execute("""
+                    SELECT COALESCE(i.med_id, -1), SUM(i.qty), COUNT(DISTINCT i.sale_id), SUM(i.net_minor)
+                    FROM sales s JOIN sale_items i ON i.sale_id = s.id
+                    WHERE s.sale_date >= ? AND s.sale_date < ?
+                    GROUP BY 1
+                """, (start_date_str, end_date_exclusive))
+                totals = cursor.fetchall()
+
+            # A sale is either live or archived, so the archives' sale counts simply add up
+            archived_names = {}
+            archive_years = self._archive_years_for_range(cursor, start_date_str, end_date_str)
+            if archive_years:
+                merged = {med_id: [qty, sale_count, net_minor] for med_id, qty, sale_count, net_minor in totals}
+                for year in archive_years:
+                    for med_id, qty, sale_count, net_minor, name in self._get_archived_sales_by_medicine(
+                            year, start_date_str, end_date_exclusive):
+                        row = merged.setdefault(med_id, [0, 0, 0])
+                        row[0] += qty
+                        row[1] += sale_count
+                        row[2] += net_minor
+                        archived_names.setdefault(med_id, name)
+                totals = [(med_id, *row) for med_id, row in merged.items()]
+
+            # Current names from the catalog; medicines deleted since keep the name they were sold under
+            med_ids = [med_id for med_id, _, _, _ in totals if med_id != -1]
+            names = {med.id: med.name for med in self.get_medicines_by_ids(med_ids)}
+            missing = [med_id for med_id in med_ids if med_id not in names]
+            if missing:
+                cursor.execute("SELECT med_id, name FROM sale_items WHERE med_id IN (SELECT value FROM json_each(?)) "
+                               "GROUP BY med_id", (json.dumps(missing),))
+                names.update(cursor.fetchall())
+                for med_id in missing:
+                    names.setdefault(med_id, archived_names.get(med_id))
+            report = [{"med_id": None if med_id == -1 else med_id,
+                       "name": names.get(med_id) or "Unknown medicine",
+                       "qty": qty, "sale_count": sale_count, "revenue": Money(net_minor)}
+                      for med_id, qty, sale_count, net_minor in totals]
+            report.sort(key=lambda row: (-row["revenue"].minor, row["name"]))
+            return report
+        except sqlite3.Error as e:
+            self.show_error_message("Database Error", f"Failed to retrieve sales by medicine: {e}")
+            return []
+        except ValueError as e:
+            self.show_error_message("Date Parsing Error", f"Invalid date format or range: {e}")
+            return []
+
+    def get_sales_tax_summary(self, start_date_str, end_date_str):
+        """
+        Daily subtotal, discount, tax and total of the sales in a date range (inclusive),
+        summed in SQL over the stored pricing columns (idx_sales_pricing covers the query).
+        Archived days are taken from their rollups.
+
+        Args:
+            start_date_str (str): Start date in 'YYYY-MM-DD' format.
+            end_date_str (str): End date in 'YYYY-MM-DD' format.
+
+        Returns:
+            list: Dictionaries {"day": 'YYYY-MM-DD', "sale_count": int, "subtotal", "discount",
+                  "tax", "total": Money}, oldest day first, or an empty list on error/no data.
+        """
+        if not self.conn: return []
+        try:
+            end_date_exclusive = (datetime.strptime(end_date_str, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+            cursor = self.conn.cursor()
+            cursor.execute("""
+                SELECT day, SUM(sale_count), SUM(subtotal_minor), SUM(discount_minor), SUM(tax_minor),
+                       SUM(total_amount_minor)
+                FROM (
+                    SELECT substr(sale_date, 1, 10) AS day, COUNT(*) AS sale_count, SUM(subtotal_minor) AS subtotal_minor,
+                           SUM(discount_minor) AS discount_minor, SUM(tax_minor) AS tax_minor,
+                           SUM(total_amount_minor) AS total_amount_minor
+                    FROM sales
+                    WHERE sale_date >= ? AND sale_date < ?
+                    GROUP BY day
+                    UNION ALL
+                    SELECT sale_day, sale_count, subtotal_minor, discount_minor, tax_minor, total_amount_minor
+                    FROM sales_rollups
+                    WHERE sale_day BETWEEN ? AND ?
+                )
+                GROUP BY day
+                ORDER BY day
+            """, (start_date_str, end_date_exclusive, start_date_str, end_date_str))
+            return [{"day": day, "sale_count": count, "subtotal": Money(subtotal), "discount": Money(discount),
+                     "tax": Money(tax), "total": Money(total)}
+                    for day, count, subtotal, discount, tax, total in cursor.fetchall()]
+        except sqlite3.Error as e:
+            self.show_error_message("Database Error", f"Failed to retrieve tax summary: {e}")
+            return []
+        except ValueError as e:
+            self.show_error_message("Date Parsing Error", f"Invalid date format or range: {e}")
+            return []
+
+    def get_stock_valuation(self):
+        """
+        Stock value per category and brand, at cost and at retail price.
+
+        The totals live in the stock_valuation table, which triggers on medicines keep
+        current as stock moves (see migration 10), so this reads one small row per group
+        instead of the whole catalog.
+
+        Returns:
+            list: Dictionaries {"category": str, "brand": str ('' when not set), "sku_count": int,
+                  "units": int, "cost_value": Money, "retail_value": Money, "uncosted_units": int},
+                  ordered by category and brand, or an empty list on error.
+                  uncosted_units counts units of medicines without a cost price.
+        """
+        if not self.conn: return []
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute("""
+                SELECT category, brand, sku_count, units, cost_value_minor, retail_value_minor, uncosted_units
+                FROM stock_valuation ORDER BY category, brand
+            """)
+            return [{"category": category, "brand": brand, "sku_count": sku_count, "units": units,
+                     "cost_value": Money(cost_value), "retail_value": Money(retail_value),
+                     "uncosted_units": uncosted_units}
+                    for category, brand, sku_count, units, cost_value, retail_value, uncosted_units
+                    in cursor.fetchall()]
+        except sqlite3.Error as e:
+            self.show_error_message("Database Error", f"Failed to retrieve stock valuation: {e}")
+            return []
+
+    def get_stock_valuation_page(self, category, brand, after=None, limit=100):
+        """
+        One page of the medicines in a stock valuation group, in name order.
+
+        Pages are keyed on the last row of the previous page rather than an offset,
+        so every page is a short range scan of idx_medicines_valuation_group.
+
+        Args:
+            category (str): Group category as returned by get_stock_valuation ('' for none).
+            brand (str): Group brand ('' for none).
+            after (tuple, optional): (name, id) of the last medicine on the previous page.
+            limit (int): Medicines per page.
+
+        Returns:
+            list: Medicine objects, or an empty list after the last page or on error.
+        """
+        if not self.conn: return []
+        after_name, after_id = after if after else ("", 0)
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(f"""
+                SELECT {MEDICINE_COLUMNS} FROM medicines
+                WHERE COALESCE(category, '') = ? AND COALESCE(brand, '') = ? AND (name, id) > (?, ?)
+                ORDER BY name, id
+                LIMIT ?
+            """, (category, brand, after_name, after_id, limit))
+            return map_medicines(cursor.fetchall())
+        except sqlite3.Error as e:
+            self.show_error_message("Database Error", f"Failed to retrieve stock valuation details: {e}")
+            return []
+
     def get_all_low_stock_medicines(self):
         """
         Retrieves all medicines where current stock is less than or equal to low_stock_alert.
@@ -655,14 +1592,14 @@ class DBManager:
         if not self.conn: return []
         try:
             cursor = self.conn.cursor()
-            cursor.execute("""
-                SELECT id, name, brand, category, price, stock, low_stock_alert, expiry_date, description, created_at
+            cursor.execute(f"""
+                SELECT {MEDICINE_COLUMNS}
                 FROM medicines
                 WHERE stock <= low_stock_alert
                 ORDER BY stock ASC, name ASC
             """)
             rows = cursor.fetchall()
-            return [Medicine.from_db_row(row) for row in rows]
+            return map_medicines(rows)
         except sqlite3.Error as e:
             self.show_error_message("Database Error", f"Failed to retrieve low stock medicines: {e}")
             return []
@@ -672,6 +1609,9 @@ class DBManager:
         Retrieves all medicines expiring within a given number of days from today,
         or medicines that have already expired.
 
+        Served from today's precomputed alert set for the horizon when there is one,
+        otherwise by a range scan of idx_medicines_expiry_date.
+
         Args:
             days_threshold (int): Number of days from today to consider as "expiring soon".
 
@@ -681,17 +1621,24 @@ class DBManager:
         if not self.conn: return []
         try:
             cursor = self.conn.cursor()
-            today = datetime.now().strftime('%Y-%m-%d')
-            future_date = (datetime.now() + timedelta(days=days_threshold)).strftime('%Y-%m-%d')
-
-            cursor.execute("""
-                SELECT id, name, brand, category, price, stock, low_stock_alert, expiry_date, description, created_at
-                FROM medicines
-                WHERE expiry_date IS NOT NULL AND (expiry_date <= ? OR expiry_date < ?)
-                ORDER BY expiry_date ASC, name ASC
-            """, (future_date, today))
+            today = datetime.now()
+            if self._expiry_alerts_current(cursor, days_threshold, today):
+                cursor.execute(f"""
+                    SELECT {MEDICINE_COLUMNS}
+                    FROM medicines
+                    WHERE id IN (SELECT med_id FROM expiry_alerts WHERE horizon_days = ?)
+                    ORDER BY expiry_date ASC, name ASC
+                """, (days_threshold,))
+            else:
+                future_date = (today + timedelta(days=days_threshold)).strftime('%Y-%m-%d')
+                cursor.execute(f"""
+                    SELECT {MEDICINE_COLUMNS}
+                    FROM medicines
+                    WHERE expiry_date IS NOT NULL AND expiry_date <= ?
+                    ORDER BY expiry_date ASC, name ASC
+                """, (future_date,))
             rows = cursor.fetchall()
-            return [Medicine.from_db_row(row) for row in rows]
+            return map_medicines(rows)
         except sqlite3.Error as e:
             self.show_error_message("Database Error", f"Failed to retrieve expiring medicines: {e}")
             return []
@@ -699,7 +1646,11 @@ class DBManager:
     def show_error_message(self, title, message):
         """
         Displays an error message box to the user.
+        If an error_reporter was supplied, the error is passed to it instead.
         """
+        if self.error_reporter:
+            self.error_reporter(title, message)
+            return
         msg_box = QMessageBox()
         msg_box.setWindowTitle(title)
         msg_box.setText(message)
@@ -759,19 +1710,23 @@ if __name__ == "__main__":
     if paracetamol_id and amoxicillin_id and john_doe_id:
         # Example sale 1: Linked to a customer
         items_sale1 = [
-            {"med_id": paracetamol_id, "qty": 2, "price": 5.50, "name": "Paracetamol 500mg"},
-            {"med_id": amoxicillin_id, "qty": 1, "price": 12.75, "name": "Amoxicillin 250mg"}
+            {"med_id": paracetamol_id, "qty": 2, "price": Money.of("5.50"), "name": "Paracetamol 500mg"},
+            {"med_id": amoxicillin_id, "qty": 1, "price": Money.of("12.75"), "name": "Amoxicillin 250mg"}
         ]
-        total_sale1 = sum(item['qty'] * item['price'] for item in items_sale1)
+        subtotal_sale1 = sum(item['qty'] * item['price'] for item in items_sale1)
+        discount_sale1 = subtotal_sale1.percentage(10)
+        total_sale1 = subtotal_sale1 - discount_sale1
+        pricing_sale1 = {"subtotal": subtotal_sale1, "discount": discount_sale1, "tax": Money(0),
+                         "discount_rate": "10", "tax_rate": "0"}
         if db_manager.add_sale(john_doe_id, "John Doe", "123-456-7890", "john.doe@example.com", total_sale1,
-                               items_sale1):
+                               items_sale1, pricing=pricing_sale1):
             print(f"Sale 1 recorded for John Doe. Total: {total_sale1:.2f}")
         else:
             print("Sale 1 failed.")
 
         # Example sale 2: Walk-in customer
         items_sale2 = [
-            {"med_id": paracetamol_id, "qty": 1, "price": 5.50, "name": "Paracetamol 500mg"}
+            {"med_id": paracetamol_id, "qty": 1, "price": Money.of("5.50"), "name": "Paracetamol 500mg"}
         ]
         total_sale2 = sum(item['qty'] * item['price'] for item in items_sale2)
         if db_manager.add_sale(None, "Walk-in Customer", "", "", total_sale2, items_sale2):
@@ -783,10 +1738,11 @@ if __name__ == "__main__":
         past_date_sale_items = [{"med_id": paracetamol_id, "qty": 3, "price": 5.50, "name": "Paracetamol 500mg"}]
         past_date = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d %H:%M:%S')
         db_manager.conn.execute(
-            """INSERT INTO sales (customer_id, customer_name, customer_phone, customer_email, total_amount, sale_date, items_json)
-               VALUES (?, ?, ?, ?, ?, ?, ?)""",
-            (john_doe_id, "John Doe", "123-456-7890", "john.doe@example.com", 16.50, past_date,
-             json.dumps(past_date_sale_items))
+            """INSERT INTO sales (customer_id, customer_name, customer_phone, customer_email, total_amount_minor, sale_date,
+                                  items_json, subtotal_minor, discount_minor, tax_minor)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0, 0)""",
+            (john_doe_id, "John Doe", "123-456-7890", "john.doe@example.com", 1650, past_date,
+             json.dumps(past_date_sale_items), 1650)
         )
         db_manager.conn.commit()
         print(f"Past dated sale recorded for John Doe on {past_date}.")
@@ -821,6 +1777,10 @@ if __name__ == "__main__":
         datetime.now().strftime('%Y-%m-%d')
     )
     print(f"Sales in last 30 days: {len(sales_last_30_days)} records")
+    for day in db_manager.get_sales_tax_summary((datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d'),
+                                                datetime.now().strftime('%Y-%m-%d')):
+        print(f"  {day['day']}: {day['sale_count']} sale(s), subtotal {day['subtotal']:.2f}, "
+              f"discount {day['discount']:.2f}, tax {day['tax']:.2f}, total {day['total']:.2f}")
     for sale in sales_last_30_days:
         print(f"  - Sale ID: {sale['id']}, Date: {sale['sale_date']}, Total: {sale['total_amount']:.2f}")
 
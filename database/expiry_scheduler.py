@@ -0,0 +1,76 @@
+# database/expiry_scheduler.py
+
+from datetime import datetime, timedelta
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal, pyqtSlot
+
+from database.db_manager import EXPIRY_ALERT_HORIZONS
+
+# Seconds after midnight at which the new day's sets are built
+MIDNIGHT_GRACE_SECONDS = 5
+
+
+def ms_until_next_day(now=None):
+    """Milliseconds from now until just after the next midnight."""
+    now = now or datetime.now()
+    next_day = (now + timedelta(days=1)).replace(hour=0, minute=0, second=MIDNIGHT_GRACE_SECONDS, microsecond=0)
+    return int((next_day - now).total_seconds() * 1000)
+
+
+class ExpiryAlertWorker(QObject):
+    """
+    Builds the day's expiry alert sets (DBManager.refresh_expiry_alerts) from a
+    background QThread: once when it starts and then just after every midnight.
+
+    Between rebuilds the sets are kept current by triggers on medicines, so the
+    dashboard and the expiring medicines report read them instead of scanning the
+    catalog; this worker only has to roll them over to the new date.
+    """
+    alerts_refreshed = pyqtSignal(str)  # date the sets were built for (YYYY-MM-DD)
+    refresh_failed = pyqtSignal()
+
+    def __init__(self, db_manager, horizons=EXPIRY_ALERT_HORIZONS):
+        """
+        Args:
+            db_manager: The GUI thread's DBManager (or DBManagerClient); the worker opens its own
+                        connection from it with new_connection() once it is running in its thread.
+            horizons (tuple): Horizons in days to build sets for.
+        """
+        super().__init__()
+        self.source_db_manager = db_manager
+        self.horizons = horizons
+        self.db_manager = None
+        self.timer = None
+
+    @pyqtSlot()
+    def start(self):
+        """Opens this thread's connection, builds today's sets and schedules the next rebuild."""
+        self.db_manager = self.source_db_manager.new_connection(
+            error_reporter=lambda title, message: print(f"Expiry alerts: {title}: {message}"))
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.refresh)
+        self.refresh()
+
+    @pyqtSlot()
+    def refresh(self):
+        """Rebuilds the sets for today (a no-op for sets another terminal already built) and re-arms the timer."""
+        if not self.db_manager:
+            return
+        today = datetime.now()
+        rebuilt = self.db_manager.refresh_expiry_alerts(self.horizons)
+        if rebuilt < 0:
+            self.refresh_failed.emit()
+        else:
+            if rebuilt:
+                print(f"Expiry alerts: rebuilt {rebuilt} set(s) for {today:%Y-%m-%d}.")
+            self.alerts_refreshed.emit(today.strftime('%Y-%m-%d'))
+        self.timer.start(ms_until_next_day())
+
+    @pyqtSlot()
+    def stop(self):
+        """Stops the schedule and closes this thread's connection."""
+        if self.timer:
+            self.timer.stop()
+        if self.db_manager:
+            self.db_manager.close_db()
+            self.db_manager = None
@@ -0,0 +1,107 @@
+# database/mappers.py
+
+"""
+Generated row mappers for DBManager.
+
+SQLite hands rows back as plain tuples, which is the cheapest row format the
+sqlite3 module offers. Turning them into model objects one
+Model.from_db_row(row) call at a time costs a function call, keyword
+argument packing and __init__ per row. The mappers below are compiled once
+at import time into a single loop that unpacks each tuple and assigns the
+attributes directly, which is several times faster on large fetches (see
+benchmarks/mappers.py).
+
+Models mapped this way must be plain records: __init__ is not called.
+
+Money columns are stored as INTEGER minor units and come back as Money.
+"""
+
+import json
+
+from models.medicine import Medicine
+from models.customer import Customer
+from models.user import User
+from models.money import Money
+
+# Column lists in the order the mappers expect them
+MEDICINE_COLUMNS = ("id, name, brand, category, price_minor, stock, low_stock_alert, expiry_date, description, "
+                    "created_at, row_version, barcode, cost_price_minor")
+CUSTOMER_COLUMNS = "id, name, phone, email, address, created_at, row_version"
+USER_COLUMNS = "id, full_name, email, password, created_at"
+SALE_LIST_COLUMNS = ("id, customer_id, customer_name, customer_phone, customer_email, total_amount_minor, sale_date, "
+                     "items_json, subtotal_minor, discount_minor, tax_minor, discount_rate, tax_rate")
+
+# Sized for our query set (about 80 distinct statements) with room for the report queries,
+# so repeated calls never re-prepare their SQL. The sqlite3 default is 128.
+STATEMENT_CACHE_SIZE = 256
+
+
+def compile_object_mapper(cls, attributes, converters=None):
+    """
+    Generates map_rows(rows) -> list of cls instances, setting attributes[i] from column i.
+    converters maps an attribute to a function applied to that column (e.g. Money).
+    """
+    converters = converters or {}
+    names = [f"c{i}" for i in range(len(attributes))]
+    lines = [
+        "def map_rows(rows):",
+        "    result = []",
+        "    append = result.append",
+        f"    for {', '.join(names)}, in rows:",
+        "        obj = new(cls)",
+    ]
+    lines += [f"        obj.{attribute} = conv_{attribute}({name})" if attribute in converters
+              else f"        obj.{attribute} = {name}" for attribute, name in zip(attributes, names)]
+    lines += ["        append(obj)", "    return result"]
+    namespace = {"new": object.__new__, "cls": cls}
+    namespace.update({f"conv_{attribute}": converter for attribute, converter in converters.items()})
+    exec("\n".join(lines), namespace)
+    map_rows = namespace["map_rows"]
+    map_rows.__doc__ = f"Maps ({', '.join(attributes)}) rows to {cls.__name__} objects."
+    return map_rows
+
+
+def compile_dict_mapper(keys, converters=None):
+    """
+    Generates map_rows(rows) -> list of dicts, storing column i under keys[i].
+    converters maps a key to a function applied to that column (e.g. json.loads).
+    """
+    converters = converters or {}
+    names = [f"c{i}" for i in range(len(keys))]
+    values = [f"{repr(key)}: conv_{key}({name})" if key in converters else f"{repr(key)}: {name}"
+              for key, name in zip(keys, names)]
+    source = "\n".join([
+        "def map_rows(rows):",
+        f"    return [{{{', '.join(values)}}} for {', '.join(names)}, in rows]",
+    ])
+    namespace = {f"conv_{key}": converter for key, converter in converters.items()}
+    exec(source, namespace)
+    map_rows = namespace["map_rows"]
+    map_rows.__doc__ = f"Maps ({', '.join(keys)}) rows to dictionaries."
+    return map_rows
+
+
+def optional_money(minor):
+    """Money for a nullable minor-units column; NULL stays None."""
+    return None if minor is None else Money(minor)
+
+
+def load_sale_items(items_json):
+    """Parses a sale's items_json, turning each item's price into Money."""
+    items = json.loads(items_json)
+    for item in items:
+        item["price"] = Money.of(item["price"])
+    return items
+
+
+map_medicines = compile_object_mapper(Medicine, [
+    "id", "name", "brand", "category", "price", "stock", "low_stock_alert", "expiry_date", "description",
+    "created_at", "row_version", "barcode", "cost_price"], {"price": Money, "cost_price": optional_money})
+map_customers = compile_object_mapper(Customer, [
+    "id", "name", "phone", "email", "address", "created_at", "row_version"])
+map_users = compile_object_mapper(User, ["id", "full_name", "email", "password", "created_at"])
+# Sales are passed around as dictionaries (see DBManager.get_all_sales); items_json becomes "items".
+map_sales = compile_dict_mapper(
+    ["id", "customer_id", "customer_name", "customer_phone", "customer_email", "total_amount", "sale_date", "items",
+     "subtotal", "discount", "tax", "discount_rate", "tax_rate"],
+    {"total_amount": Money, "items": load_sale_items, "subtotal": Money, "discount": Money, "tax": Money})
@@ -0,0 +1,137 @@
+# database/medicine_catalog.py
+
+import bisect
+import json
+import sqlite3
+
+from database.change_feed import ChangeEvent
+from database.mappers import MEDICINE_COLUMNS, map_medicines
+
+
+class MedicineCatalog:
+    """
+    Process-wide cache of the medicines table, owned by DBManager.
+
+    The medicine screen, the billing screen and the stock report all read the
+    whole catalog; with the cache they share one set of Medicine objects
+    instead of each querying SQLite and building their own.
+
+    Cached Medicine objects are shared and must be treated as read-only. When a
+    medicine changes, its object is replaced rather than modified, so screens
+    still holding the old object can compare old and new values.
+
+    The cache stays current in two ways:
+      * Writes through this process's DBManager publish ChangeEvents; the rows
+        they name are re-read (or dropped on delete).
+      * Writes by other connections (other terminals, the API server) change
+        PRAGMA data_version; the whole catalog is then reloaded on next use.
+    """
+
+    def __init__(self, conn):
+        """
+        Args:
+            conn (sqlite3.Connection): Connection of the owning DBManager.
+        """
+        self.conn = conn
+        self._by_id = None  # {id: Medicine}; None until first use or after an invalidation
+        self._by_name = []  # Sorted [(name, id)], the order get_all_medicines returns
+        self._by_barcode = {}  # {barcode: id}, for checkout scans
+        self._data_version = None
+        self.hits = 0
+        self.misses = 0
+        self.rows_refreshed = 0
+        self.invalidations = 0
+
+    def all(self):
+        """Returns every medicine ordered by name, like SELECT ... ORDER BY name."""
+        by_id = self._current()
+        return [by_id[medicine_id] for _, medicine_id in self._by_name]
+
+    def get(self, medicine_id):
+        """Returns the cached Medicine with this ID, or None."""
+        return self._current().get(medicine_id)
+
+    def get_many(self, medicine_ids):
+        """Returns the cached medicines with these IDs; unknown IDs are skipped."""
+        by_id = self._current()
+        return [by_id[medicine_id] for medicine_id in medicine_ids if medicine_id in by_id]
+
+    def get_by_barcode(self, barcode):
+        """Returns the cached Medicine with this barcode, or None."""
+        by_id = self._current()
+        medicine_id = self._by_barcode.get(barcode)
+        return by_id[medicine_id] if medicine_id is not None else None
+
+    def invalidate(self):
+        """Drops the cache; the next read reloads it (e.g. after a backup was restored)."""
+        if self._by_id is not None:
+            self.invalidations += 1
+        self._by_id = None
+        self._by_name = []
+        self._by_barcode = {}
+
+    def on_change(self, event):
+        """ChangeFeed subscriber: refreshes only the medicines named in the event."""
+        if self._by_id is None or event.entity != "medicines":
+            return
+        if event.op == ChangeEvent.DELETE:
+            for medicine_id in event.ids:
+                self._remove(medicine_id)
+            return
+        try:
+            rows = self.conn.execute(
+                f"SELECT {MEDICINE_COLUMNS} FROM medicines WHERE id IN (SELECT value FROM json_each(?))",
+                (json.dumps(list(event.ids)),)).fetchall()
+        except sqlite3.Error as e:
+            print(f"Medicine cache refresh failed, reloading on next use: {e}")
+            self.invalidate()
+            return
+        found = set()
+        for medicine in map_medicines(rows):
+            self._remove(medicine.id)
+            self._by_id[medicine.id] = medicine
+            bisect.insort(self._by_name, (medicine.name, medicine.id))
+            if medicine.barcode:
+                self._by_barcode[medicine.barcode] = medicine.id
+            found.add(medicine.id)
+        for medicine_id in set(event.ids) - found:
+            self._remove(medicine_id)  # Deleted again before we got to read it
+        self.rows_refreshed += len(found)
+
+    def stats(self):
+        """Returns the cache counters, e.g. for logging."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "rows": len(self._by_id) if self._by_id is not None else 0,
+            "rows_refreshed": self.rows_refreshed,
+            "invalidations": self.invalidations,
+        }
+
+    def _current(self):
+        """Returns the id index, reloading it if it was never loaded or another connection wrote."""
+        data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if self._by_id is not None and data_version != self._data_version:
+            self.invalidate()
+        if self._by_id is None:
+            self.misses += 1
+            rows = self.conn.execute(f"SELECT {MEDICINE_COLUMNS} FROM medicines").fetchall()
+            self._by_id = {medicine.id: medicine for medicine in map_medicines(rows)}
+            self._by_name = sorted((medicine.name, medicine.id) for medicine in self._by_id.values())
+            self._by_barcode = {medicine.barcode: medicine.id for medicine in self._by_id.values() if medicine.barcode}
+            self._data_version = data_version
+        else:
+            self.hits += 1
+        return self._by_id
+
+    def _remove(self, medicine_id):
+        medicine = self._by_id.pop(medicine_id, None)
+        if medicine is not None:
+            key = (medicine.name, medicine.id)
+            position = bisect.bisect_left(self._by_name, key)
+            if position < len(self._by_name) and self._by_name[position] == key:
+                del self._by_name[position]
+            if medicine.barcode and self._by_barcode.get(medicine.barcode) == medicine_id:
+                del self._by_barcode[medicine.barcode]
@@ -0,0 +1,67 @@
+# database/medicine_query.py
+
+from datetime import datetime, timedelta
+
+
+class MedicineQuery:
+    """
+    Composable filter over the medicines table.
+
+    Each method adds one condition and returns the query, so filters can be
+    chained in any combination:
+
+        MedicineQuery().search("para").category("Pain Relief").low_stock().to_sql()
+
+    The conditions are written to match the indexes created by migration 5:
+    category uses idx_medicines_category, expiring_within uses
+    idx_medicines_expiry_date and low_stock uses the partial index
+    idx_medicines_low_stock. search is a substring match, which no index can
+    serve; it is applied to the rows the other conditions leave.
+    """
+
+    def __init__(self):
+        self._conditions = []
+        self._params = []
+
+    def where(self, condition, *params):
+        """Adds a raw SQL condition with its parameters."""
+        self._conditions.append(condition)
+        self._params.extend(params)
+        return self
+
+    def search(self, text):
+        """Name, brand or category contains text (case-insensitive)."""
+        text = (text or "").strip()
+        if not text:
+            return self
+        pattern = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        return self.where("(name LIKE ? ESCAPE '\\' OR brand LIKE ? ESCAPE '\\' OR category LIKE ? ESCAPE '\\')",
+                          pattern, pattern, pattern)
+
+    def category(self, category):
+        """Exact category, as listed by DBManager.get_medicine_categories()."""
+        if not category:
+            return self
+        return self.where("category = ?", category)
+
+    def low_stock(self):
+        """Stock at or below the medicine's own alert level."""
+        return self.where("stock <= low_stock_alert")
+
+    def expiring_within(self, days, today=None):
+        """Already expired or expiring within the given number of days (as on the dashboard)."""
+        today = today or datetime.now()
+        future_date = (today + timedelta(days=days)).strftime('%Y-%m-%d')
+        return self.where("expiry_date IS NOT NULL AND expiry_date <= ?", future_date)
+
+    def is_empty(self):
+        return not self._conditions
+
+    def to_sql(self, columns="id"):
+        """
+        Returns (sql, params) selecting the given columns of the matching medicines, ordered by name.
+        """
+        sql = f"SELECT {columns} FROM medicines"
+        if self._conditions:
+            sql += " WHERE " + " AND ".join(self._conditions)
+        return sql + " ORDER BY name ASC", list(self._params)
@@ -0,0 +1,622 @@
+# database/migrations.py
+
+"""
+Versioned schema migrations for pharmacy.db.
+
+The schema version is stored in PRAGMA user_version. On startup DBManager runs
+every migration newer than that version, in order. To change the schema, append
+a Migration with the next version number; never edit one that has shipped.
+
+Migrations must be safe to re-run: databases created before this framework
+existed start at version 0 but may already contain some of the later columns,
+and a migration interrupted halfway is simply run again on the next start.
+"""
+
+import json
+import sqlite3
+import time
+
+from models.customer import normalize_customer_name, phone_digits
+from models.money import Money
+from models.sale import price_sale
+
+
+def column_exists(cursor, table, column):
+    """True if the table already has the column."""
+    cursor.execute(f"PRAGMA table_info({table})")
+    return column in [row[1] for row in cursor.fetchall()]
+
+
+def add_column_if_missing(cursor, table, column, declaration):
+    """Adds a column to an existing table if it is not there yet."""
+    if not column_exists(cursor, table, column):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+
+
+class Migration:
+    """
+    One schema step.
+
+    Attributes:
+        version (int): Value of PRAGMA user_version once this step is complete.
+        description (str): Shown in the migration log.
+        schema (callable): schema(cursor) makes the (fast) structural changes. It runs
+            in a single transaction together with the version bump.
+        backfill (callable, optional): backfill(runner) fills in data for existing rows,
+            normally through runner.backfill(), which commits in small chunks so the
+            counter is not locked out while a large table is rewritten. The version is
+            only bumped after the backfill has finished.
+    """
+
+    def __init__(self, version, description, schema, backfill=None):
+        self.version = version
+        self.description = description
+        self.schema = schema
+        self.backfill = backfill
+
+
+class MigrationRunner:
+    """
+    Applies pending migrations to a connection and reports how long each step took.
+    """
+
+    def __init__(self, conn, migrations=None, chunk_size=1000, chunk_pause=0.01):
+        """
+        Args:
+            conn (sqlite3.Connection): Connection to migrate.
+            migrations (list, optional): Migrations to apply; defaults to MIGRATIONS.
+            chunk_size (int): Rows updated per backfill transaction.
+            chunk_pause (float): Seconds to wait between backfill chunks so other writers can get in.
+        """
+        self.conn = conn
+        self.migrations = sorted(migrations if migrations is not None else MIGRATIONS, key=lambda m: m.version)
+        self.chunk_size = chunk_size
+        self.chunk_pause = chunk_pause
+
+    @property
+    def latest_version(self):
+        return self.migrations[-1].version if self.migrations else 0
+
+    def current_version(self):
+        return self.conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def pending(self):
+        """Returns the migrations newer than the database's version."""
+        version = self.current_version()
+        return [m for m in self.migrations if m.version > version]
+
+    def run(self):
+        """
+        Applies every pending migration in order.
+
+        Returns:
+            list: (version, description, seconds) for each migration applied.
+
+        Raises:
+            sqlite3.Error: If a migration fails; the database stays at the last completed version.
+        """
+        version = self.current_version()
+        if version > self.latest_version:
+            print(f"Warning: database schema version {version} is newer than this application "
+                  f"(version {self.latest_version}).")
+            return []
+
+        applied = []
+        for migration in self.pending():
+            started = time.perf_counter()
+            if not self._apply(migration):
+                continue  # Another connection applied it while we waited for the lock
+            elapsed = time.perf_counter() - started
+            applied.append((migration.version, migration.description, elapsed))
+            print(f"Migration {migration.version} ({migration.description}) applied in {elapsed:.3f}s.")
+        if applied:
+            print(f"Database schema migrated to version {self.current_version()}.")
+        return applied
+
+    def _apply(self, migration):
+        cursor = self.conn.cursor()
+        # IMMEDIATE takes the write lock first, so two terminals starting at once
+        # cannot both run the same step.
+        self.conn.execute("BEGIN IMMEDIATE TRANSACTION")
+        try:
+            if self.current_version() >= migration.version:
+                self.conn.rollback()
+                return False
+            step_started = time.perf_counter()
+            migration.schema(cursor)
+            if not migration.backfill:
+                cursor.execute(f"PRAGMA user_version = {int(migration.version)}")
+            self.conn.commit()
+            print(f"  schema step: {time.perf_counter() - step_started:.3f}s")
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+
+        if migration.backfill:
+            migration.backfill(self)
+            self.conn.execute("BEGIN IMMEDIATE TRANSACTION")
+            self.conn.execute(f"PRAGMA user_version = {int(migration.version)}")
+            self.conn.commit()
+        return True
+
+    def backfill(self, table, assignments, pending_condition, params=()):
+        """
+        Updates every row matching pending_condition, chunk_size rows per transaction.
+
+        pending_condition must stop matching a row once it has been updated (e.g.
+        "amount_minor IS NULL"), which is what makes an interrupted backfill resumable.
+
+        Args:
+            table (str): Table to update.
+            assignments (str): SET clause, e.g. "amount_minor = CAST(ROUND(amount * 100) AS INTEGER)".
+            pending_condition (str): WHERE clause selecting rows that still need the update.
+            params (tuple): Parameters for assignments followed by pending_condition.
+
+        Returns:
+            int: Number of rows updated.
+        """
+        total = 0
+        started = time.perf_counter()
+        while True:
+            self.conn.execute("BEGIN IMMEDIATE TRANSACTION")
+            try:
+                cursor = self.conn.execute(
+                    f"UPDATE {table} SET {assignments} WHERE rowid IN "
+                    f"(SELECT rowid FROM {table} WHERE {pending_condition} LIMIT {int(self.chunk_size)})",
+                    params)
+                updated = cursor.rowcount
+                self.conn.commit()
+            except sqlite3.Error:
+                self.conn.rollback()
+                raise
+            total += updated
+            if updated < self.chunk_size:
+                break
+            time.sleep(self.chunk_pause)
+        print(f"  backfill {table}: {total} row(s) in {time.perf_counter() - started:.3f}s")
+        return total
+
+
+# --- Migrations ---
+
+def _v1_initial_tables(cursor):
+    # Users table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            full_name TEXT NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Medicines table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS medicines (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            brand TEXT,
+            category TEXT,
+            price REAL NOT NULL,
+            stock INTEGER NOT NULL,
+            low_stock_alert INTEGER DEFAULT 10,
+            expiry_date TEXT,
+            description TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Customers table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS customers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            phone TEXT UNIQUE,
+            email TEXT UNIQUE,
+            address TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Sales table
+    # items_json will store a JSON string of the items sold
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sales (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer_id INTEGER,
+            customer_name TEXT,
+            customer_phone TEXT,
+            customer_email TEXT,
+            total_amount REAL NOT NULL,
+            sale_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            items_json TEXT NOT NULL, -- Stores JSON string of sold items: [{"med_id": 1, "qty": 2, "price": 12.5, "name": "Paracetamol"}]
+            FOREIGN KEY (customer_id) REFERENCES customers(id) ON DELETE SET NULL
+        )
+    """)
+
+    # login_history table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS login_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT UNIQUE NOT NULL,
+            last_login TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def _v2_sale_client_ref(cursor):
+    # Outbox reference of the terminal that rang up the sale; makes replays idempotent
+    add_column_if_missing(cursor, "sales", "client_ref", "TEXT")
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_sales_client_ref ON sales(client_ref)")
+
+
+def _v3_row_versions(cursor):
+    # Bumped on every write; see DBManager.try_update_medicine / try_update_customer
+    add_column_if_missing(cursor, "medicines", "row_version", "INTEGER NOT NULL DEFAULT 1")
+    add_column_if_missing(cursor, "customers", "row_version", "INTEGER NOT NULL DEFAULT 1")
+
+
+def _v4_sales_archive(cursor):
+    # Daily totals of sales moved to the yearly archive databases (see DBManager.archive_old_sales),
+    # so dashboard totals never need to open the archives.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sales_rollups (
+            sale_day TEXT PRIMARY KEY, -- YYYY-MM-DD
+            sale_count INTEGER NOT NULL,
+            total_amount REAL NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_sale_date ON sales(sale_date)")
+
+
+def _v5_medicine_filter_indexes(cursor):
+    # Serve the medicine screen filters (see database/medicine_query.py)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_medicines_category ON medicines(category)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_medicines_expiry_date ON medicines(expiry_date)")
+    # Partial index: only the low-stock rows, already in name order
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_medicines_low_stock ON medicines(name) WHERE stock <= low_stock_alert")
+
+
+def _v6_medicine_barcodes(cursor):
+    # Barcode / SKU for checkout scanning. NULL means "no barcode"; the unique index allows any number of those.
+    add_column_if_missing(cursor, "medicines", "barcode", "TEXT")
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_medicines_barcode ON medicines(barcode)")
+
+
+# Money moves from REAL (float) columns to INTEGER minor units (paisa); see models/money.py.
+# Migration 7 adds and fills the new columns, migration 8 drops the old ones once every row is converted.
+MONEY_COLUMNS = [
+    # (table, old REAL column, new INTEGER column)
+    ("medicines", "price", "price_minor"),
+    ("sales", "total_amount", "total_amount_minor"),
+    ("sales_rollups", "total_amount", "total_amount_minor"),
+]
+
+
+def _v7_money_minor_units_schema(cursor):
+    for table, _, minor_column in MONEY_COLUMNS:
+        add_column_if_missing(cursor, table, minor_column, "INTEGER")
+
+
+def _v7_money_minor_units_backfill(runner):
+    cursor = runner.conn.cursor()
+    for table, real_column, minor_column in MONEY_COLUMNS:
+        if column_exists(cursor, table, real_column):
+            # ROUND() rounds halves away from zero, like Money.of()
+            runner.backfill(table, f"{minor_column} = CAST(ROUND({real_column} * 100) AS INTEGER)",
+                            f"{minor_column} IS NULL")
+
+
+def _v8_drop_real_money_columns(cursor):
+    if sqlite3.sqlite_version_info < (3, 35, 0):
+        raise sqlite3.NotSupportedError(
+            f"Dropping the old money columns needs SQLite 3.35 or newer (found {sqlite3.sqlite_version}).")
+    for table, real_column, minor_column in MONEY_COLUMNS:
+        if column_exists(cursor, table, real_column):
+            # Rows written by an older terminal after the backfill would still lack the new value
+            cursor.execute(f"UPDATE {table} SET {minor_column} = CAST(ROUND({real_column} * 100) AS INTEGER) "
+                           f"WHERE {minor_column} IS NULL")
+            cursor.execute(f"ALTER TABLE {table} DROP COLUMN {real_column}")
+
+
+# Sale pricing for sales recorded before it was stored (also used when an old archive is attached):
+# the subtotal comes from the items, and the difference to the amount charged is a discount or tax.
+# A sale whose items cannot be read counts its whole amount as subtotal, like an archived day.
+SALE_SUBTOTAL_FROM_ITEMS = ("subtotal_minor = CASE WHEN json_valid(sales.items_json) THEN "
+                            "(SELECT COALESCE(SUM(CAST(ROUND(json_extract(value, '$.price') * 100) "
+                            "AS INTEGER) * json_extract(value, '$.qty')), 0) FROM json_each(sales.items_json)) "
+                            "ELSE total_amount_minor END")
+SALE_ADJUSTMENT_FROM_TOTAL = ("discount_minor = MAX(subtotal_minor - total_amount_minor, 0), "
+                              "tax_minor = MAX(total_amount_minor - subtotal_minor, 0)")
+SALE_PRICING_COLUMNS = [
+    ("subtotal_minor", "INTEGER"),
+    ("discount_minor", "INTEGER"),
+    ("tax_minor", "INTEGER"),
+    ("discount_rate", "TEXT"),  # Percentage as typed at the counter, e.g. '10' or '17.5'; NULL if not known
+    ("tax_rate", "TEXT"),
+]
+SALE_ITEMS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS {schema}sale_items (
+        sale_id INTEGER NOT NULL REFERENCES sales(id) ON DELETE CASCADE,
+        line_no INTEGER NOT NULL,
+        med_id INTEGER,
+        name TEXT,
+        qty INTEGER NOT NULL,
+        unit_price_minor INTEGER NOT NULL,
+        subtotal_minor INTEGER NOT NULL,
+        discount_minor INTEGER NOT NULL, -- Share of the sale's discount
+        tax_minor INTEGER NOT NULL, -- Share of the sale's tax
+        net_minor INTEGER NOT NULL, -- subtotal - discount + tax
+        PRIMARY KEY (sale_id, line_no)
+    )
+"""
+
+
+def insert_sale_items(cursor, sale_id, lines, schema=""):
+    """Stores the priced lines of a sale (see models.sale.price_sale)."""
+    cursor.executemany(
+        f"INSERT INTO {schema}sale_items (sale_id, line_no, med_id, name, qty, unit_price_minor, subtotal_minor, "
+        f"discount_minor, tax_minor, net_minor) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [(sale_id, line_no, line["med_id"], line["name"], line["qty"], line["unit_price"].minor,
+          line["subtotal"].minor, line["discount"].minor, line["tax"].minor, line["net"].minor)
+         for line_no, line in enumerate(lines, start=1)])
+
+
+def _v9_sale_pricing_schema(cursor):
+    for column, declaration in SALE_PRICING_COLUMNS:
+        add_column_if_missing(cursor, "sales", column, declaration)
+    cursor.execute(SALE_ITEMS_SCHEMA.format(schema=""))
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sale_items_med_id ON sale_items(med_id)")
+    # Covers the tax/discount report (DBManager.get_sales_tax_summary), so it never reads the sales rows
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_pricing ON sales(sale_date, subtotal_minor, discount_minor, "
+                   "tax_minor, total_amount_minor)")
+    for column in ("subtotal_minor", "discount_minor", "tax_minor"):
+        add_column_if_missing(cursor, "sales_rollups", column, "INTEGER")
+
+
+def _v9_sale_pricing_backfill(runner):
+    runner.backfill("sales", SALE_SUBTOTAL_FROM_ITEMS, "subtotal_minor IS NULL")
+    runner.backfill("sales", SALE_ADJUSTMENT_FROM_TOTAL, "discount_minor IS NULL")
+    # Archived days: their sales are no longer here to price, so the whole amount counts as subtotal
+    runner.backfill("sales_rollups", "subtotal_minor = total_amount_minor, discount_minor = 0, tax_minor = 0",
+                    "subtotal_minor IS NULL")
+
+    # Lines of existing sales, chunk_size sales per transaction
+    total = 0
+    last_id = 0
+    started = time.perf_counter()
+    while True:
+        runner.conn.execute("BEGIN IMMEDIATE TRANSACTION")
+        try:
+            cursor = runner.conn.cursor()
+            cursor.execute(
+                "SELECT id, total_amount_minor, items_json FROM sales s WHERE id > ? AND NOT EXISTS "
+                "(SELECT 1 FROM sale_items WHERE sale_id = s.id) ORDER BY id LIMIT ?",
+                (last_id, runner.chunk_size))
+            rows = cursor.fetchall()
+            for sale_id, total_amount_minor, items_json in rows:
+                try:
+                    _, lines = price_sale(json.loads(items_json), Money(total_amount_minor))
+                except (ValueError, KeyError, TypeError) as e:
+                    print(f"  sale {sale_id}: items could not be read ({e}); no line items stored.")
+                    continue
+                insert_sale_items(cursor, sale_id, lines)
+            runner.conn.commit()
+        except sqlite3.Error:
+            runner.conn.rollback()
+            raise
+        total += len(rows)
+        if len(rows) < runner.chunk_size:
+            break
+        last_id = rows[-1][0]
+        time.sleep(runner.chunk_pause)
+    print(f"  backfill sale_items: {total} sale(s) in {time.perf_counter() - started:.3f}s")
+
+
+# Stock valuation per (category, brand), kept current by triggers on medicines so every
+# connection's stock movements (sales, edits, other terminals, the API server) update it.
+# A missing category or brand is grouped under ''. Units without a cost price add nothing to
+# cost_value_minor and are counted in uncosted_units instead.
+_VALUATION_ADD = """
+    INSERT INTO stock_valuation (category, brand, sku_count, units, cost_value_minor, retail_value_minor,
+                                 uncosted_units)
+    VALUES (COALESCE(NEW.category, ''), COALESCE(NEW.brand, ''), 1, NEW.stock,
+            NEW.stock * COALESCE(NEW.cost_price_minor, 0), NEW.stock * NEW.price_minor,
+            CASE WHEN NEW.cost_price_minor IS NULL THEN NEW.stock ELSE 0 END)
+    ON CONFLICT(category, brand) DO UPDATE SET
+        sku_count = sku_count + excluded.sku_count,
+        units = units + excluded.units,
+        cost_value_minor = cost_value_minor + excluded.cost_value_minor,
+        retail_value_minor = retail_value_minor + excluded.retail_value_minor,
+        uncosted_units = uncosted_units + excluded.uncosted_units;
+"""
+_VALUATION_REMOVE = """
+    UPDATE stock_valuation SET
+        sku_count = sku_count - 1,
+        units = units - OLD.stock,
+        cost_value_minor = cost_value_minor - OLD.stock * COALESCE(OLD.cost_price_minor, 0),
+        retail_value_minor = retail_value_minor - OLD.stock * OLD.price_minor,
+        uncosted_units = uncosted_units - CASE WHEN OLD.cost_price_minor IS NULL THEN OLD.stock ELSE 0 END
+    WHERE category = COALESCE(OLD.category, '') AND brand = COALESCE(OLD.brand, '');
+"""
+_VALUATION_DROP_EMPTY = """
+    DELETE FROM stock_valuation
+    WHERE category = COALESCE(OLD.category, '') AND brand = COALESCE(OLD.brand, '') AND sku_count = 0;
+"""
+
+
+def _v10_stock_valuation(cursor):
+    add_column_if_missing(cursor, "medicines", "cost_price_minor", "INTEGER")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stock_valuation (
+            category TEXT NOT NULL,
+            brand TEXT NOT NULL,
+            sku_count INTEGER NOT NULL,
+            units INTEGER NOT NULL,
+            cost_value_minor INTEGER NOT NULL,
+            retail_value_minor INTEGER NOT NULL,
+            uncosted_units INTEGER NOT NULL,
+            PRIMARY KEY (category, brand)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_medicines_valuation_insert AFTER INSERT ON medicines "
+                   f"BEGIN {_VALUATION_ADD} END")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_medicines_valuation_delete AFTER DELETE ON medicines "
+                   f"BEGIN {_VALUATION_REMOVE} {_VALUATION_DROP_EMPTY} END")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_medicines_valuation_update "
+                   f"AFTER UPDATE OF stock, price_minor, cost_price_minor, category, brand ON medicines "
+                   f"BEGIN {_VALUATION_REMOVE} {_VALUATION_ADD} {_VALUATION_DROP_EMPTY} END")
+    # Rebuilt from scratch, so a re-run after an interruption starts from the right totals
+    cursor.execute("DELETE FROM stock_valuation")
+    cursor.execute("""
+        INSERT INTO stock_valuation (category, brand, sku_count, units, cost_value_minor, retail_value_minor,
+                                     uncosted_units)
+        SELECT COALESCE(category, ''), COALESCE(brand, ''), COUNT(*), SUM(stock),
+               SUM(stock * COALESCE(cost_price_minor, 0)), SUM(stock * price_minor),
+               SUM(CASE WHEN cost_price_minor IS NULL THEN stock ELSE 0 END)
+        FROM medicines
+        GROUP BY COALESCE(category, ''), COALESCE(brand, '')
+    """)
+    # Drill-down pages through one group's SKUs in name order (DBManager.get_stock_valuation_page)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_medicines_valuation_group "
+                   "ON medicines(COALESCE(category, ''), COALESCE(brand, ''), name, id)")
+
+
+
+# Expiry timeline: medicines per expiry week (the Monday on or before the expiry date), kept
+# current by triggers so expiry counts for any horizon read a few bucket rows plus one partial
+# week. A date SQLite cannot parse is bucketed under itself, which keeps it on the same side of
+# every cutoff as the plain string comparison on medicines.expiry_date.
+def _expiry_week(row):
+    return f"COALESCE(date({row}.expiry_date, '-6 days', 'weekday 1'), {row}.expiry_date)"
+
+
+_EXPIRY_BUCKET_ADD = f"""
+    INSERT INTO expiry_buckets (week_start, sku_count, units)
+    SELECT {_expiry_week("NEW")}, 1, NEW.stock WHERE NEW.expiry_date IS NOT NULL
+    ON CONFLICT(week_start) DO UPDATE SET
+        sku_count = sku_count + excluded.sku_count,
+        units = units + excluded.units;
+"""
+_EXPIRY_BUCKET_REMOVE = f"""
+    UPDATE expiry_buckets SET sku_count = sku_count - 1, units = units - OLD.stock
+    WHERE week_start = {_expiry_week("OLD")};
+    DELETE FROM expiry_buckets WHERE week_start = {_expiry_week("OLD")} AND sku_count = 0;
+"""
+# The daily alert sets (expiry_alerts, rebuilt by DBManager.refresh_expiry_alerts) follow
+# medicine edits made during the day, against the cutoff of each horizon's last rebuild.
+_EXPIRY_ALERT_ADD = """
+    INSERT INTO expiry_alerts (horizon_days, med_id)
+    SELECT horizon_days, NEW.id FROM expiry_alert_runs WHERE NEW.expiry_date <= cutoff;
+"""
+_EXPIRY_ALERT_REMOVE = """
+    DELETE FROM expiry_alerts
+    WHERE horizon_days IN (SELECT horizon_days FROM expiry_alert_runs) AND med_id = OLD.id;
+"""
+
+
+def _v11_expiry_timeline(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS expiry_buckets (
+            week_start TEXT PRIMARY KEY,
+            sku_count INTEGER NOT NULL,
+            units INTEGER NOT NULL
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS expiry_alert_runs (
+            horizon_days INTEGER PRIMARY KEY,
+            as_of TEXT NOT NULL,
+            cutoff TEXT NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS expiry_alerts (
+            horizon_days INTEGER NOT NULL,
+            med_id INTEGER NOT NULL,
+            PRIMARY KEY (horizon_days, med_id)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_medicines_expiry_insert AFTER INSERT ON medicines "
+                   f"BEGIN {_EXPIRY_BUCKET_ADD} {_EXPIRY_ALERT_ADD} END")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_medicines_expiry_delete AFTER DELETE ON medicines "
+                   f"BEGIN {_EXPIRY_BUCKET_REMOVE} {_EXPIRY_ALERT_REMOVE} END")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_medicines_expiry_bucket_update "
+                   f"AFTER UPDATE OF expiry_date, stock ON medicines "
+                   f"BEGIN {_EXPIRY_BUCKET_REMOVE} {_EXPIRY_BUCKET_ADD} END")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_medicines_expiry_alert_update "
+                   f"AFTER UPDATE OF expiry_date ON medicines "
+                   f"BEGIN {_EXPIRY_ALERT_REMOVE} {_EXPIRY_ALERT_ADD} END")
+    # Rebuilt from scratch, so a re-run after an interruption starts from the right counts.
+    # The alert sets start empty; the expiry scheduler builds them for today.
+    cursor.execute("DELETE FROM expiry_buckets")
+    cursor.execute(f"""
+        INSERT INTO expiry_buckets (week_start, sku_count, units)
+        SELECT {_expiry_week("medicines")}, COUNT(*), SUM(stock)
+        FROM medicines WHERE expiry_date IS NOT NULL
+        GROUP BY 1
+    """)
+    cursor.execute("DELETE FROM expiry_alerts")
+    cursor.execute("DELETE FROM expiry_alert_runs")
+
+
+# Customer lookup keys (DBManager.find_customers): the normalized name and the digits of the phone
+# number, also reversed so the last digits of a caller's number are an index prefix. They are
+# computed in Python (models/customer.py) and written by DBManager with the customer.
+def _customer_fts_available(cursor):
+    cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+    return bool(cursor.fetchone()[0])
+
+
+def _v12_customer_lookup_schema(cursor):
+    add_column_if_missing(cursor, "customers", "name_key", "TEXT")
+    add_column_if_missing(cursor, "customers", "phone_digits", "TEXT")
+    add_column_if_missing(cursor, "customers", "phone_digits_rev", "TEXT")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_customers_name_key ON customers(name_key)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_customers_phone_digits ON customers(phone_digits)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_customers_phone_rev ON customers(phone_digits_rev)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_customers_email_lower ON customers(lower(email))")
+    if not _customer_fts_available(cursor):
+        return  # Word-prefix search falls back to LIKE
+    # Words of the name key, so "alv" finds "jose alvarez"; kept in step with name_key by triggers
+    cursor.execute("CREATE VIRTUAL TABLE IF NOT EXISTS customers_fts "
+                   "USING fts5(name_key, content='customers', content_rowid='id')")
+    # Rows whose key is still NULL (not yet backfilled, or written by an older terminal) are not in the index
+    cursor.execute("CREATE TRIGGER IF NOT EXISTS trg_customers_fts_insert AFTER INSERT ON customers "
+                   "WHEN NEW.name_key IS NOT NULL BEGIN "
+                   "INSERT INTO customers_fts(rowid, name_key) VALUES (NEW.id, NEW.name_key); END")
+    cursor.execute("CREATE TRIGGER IF NOT EXISTS trg_customers_fts_delete AFTER DELETE ON customers "
+                   "WHEN OLD.name_key IS NOT NULL BEGIN "
+                   "INSERT INTO customers_fts(customers_fts, rowid, name_key) VALUES ('delete', OLD.id, OLD.name_key); "
+                   "END")
+    cursor.execute("CREATE TRIGGER IF NOT EXISTS trg_customers_fts_update AFTER UPDATE OF name_key ON customers BEGIN "
+                   "INSERT INTO customers_fts(customers_fts, rowid, name_key) "
+                   "SELECT 'delete', OLD.id, OLD.name_key WHERE OLD.name_key IS NOT NULL; "
+                   "INSERT INTO customers_fts(rowid, name_key) SELECT NEW.id, NEW.name_key WHERE NEW.name_key IS NOT NULL; "
+                   "END")
+
+
+def _v12_customer_lookup_backfill(runner):
+    runner.conn.create_function("customer_name_key", 1, normalize_customer_name, deterministic=True)
+    runner.conn.create_function("customer_phone_digits", 1, phone_digits, deterministic=True)
+    runner.conn.create_function("reversed_text", 1, lambda text: text[::-1] if text else None, deterministic=True)
+    runner.backfill("customers",
+                    "name_key = customer_name_key(name), phone_digits = customer_phone_digits(phone), "
+                    "phone_digits_rev = reversed_text(customer_phone_digits(phone))",
+                    "name_key IS NULL")
+
+MIGRATIONS = [
+    Migration(1, "Initial tables", _v1_initial_tables),
+    Migration(2, "Sale outbox references", _v2_sale_client_ref),
+    Migration(3, "Row versions for medicines and customers", _v3_row_versions),
+    Migration(4, "Sales archive rollups and sale date index", _v4_sales_archive),
+    Migration(5, "Medicine filter indexes", _v5_medicine_filter_indexes),
+    Migration(6, "Medicine barcodes", _v6_medicine_barcodes),
+    Migration(7, "Money in minor units", _v7_money_minor_units_schema, _v7_money_minor_units_backfill),
+    Migration(8, "Drop floating-point money columns", _v8_drop_real_money_columns),
+    Migration(9, "Sale pricing and line items", _v9_sale_pricing_schema, _v9_sale_pricing_backfill),
+    Migration(10, "Stock valuation", _v10_stock_valuation),
+    Migration(11, "Expiry timeline and alert sets", _v11_expiry_timeline),
+    Migration(12, "Customer lookup keys", _v12_customer_lookup_schema, _v12_customer_lookup_backfill),
+]
@@ -0,0 +1,148 @@
+# database/parallel_reports.py
+
+"""
+Process pool for reports over long date ranges.
+
+A sales report over several years spends most of its time in Python, decoding
+each sale's items_json and formatting its row, so one thread cannot go faster
+than one core. ReportProcessPool splits the date range into partitions and has
+a pool of processes compute them side by side, each on its own read-only
+connection (DBManager(read_only=True)); the report worker then joins the
+partitions back together in date order.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timedelta
+
+from database.db_manager import DBManager
+
+# Ranges shorter than this are computed in the report thread; starting the processes costs more
+PARALLEL_MIN_DAYS = 180
+# Partitions per process, so one busy stretch of dates does not leave the other processes idle
+PARTITIONS_PER_PROCESS = 4
+
+
+def report_processes():
+    """Number of report processes worth starting on this machine (1 means: do not use a pool)."""
+    return min(os.cpu_count() or 1, 8)
+
+
+def partition_date_range(start_date_str, end_date_str, partitions):
+    """
+    Splits an inclusive date range into consecutive inclusive ranges of (nearly) equal length.
+
+    Returns:
+        list: [(start 'YYYY-MM-DD', end 'YYYY-MM-DD'), ...], oldest first.
+    """
+    start = datetime.strptime(start_date_str, '%Y-%m-%d')
+    days = (datetime.strptime(end_date_str, '%Y-%m-%d') - start).days + 1
+    partitions = max(1, min(partitions, days))
+    ranges = []
+    first = 0
+    for index in range(partitions):
+        last = (index + 1) * days // partitions - 1
+        ranges.append(((start + timedelta(days=first)).strftime('%Y-%m-%d'),
+                       (start + timedelta(days=last)).strftime('%Y-%m-%d')))
+        first = last + 1
+    return ranges
+
+
+# --- Inside the report processes ---
+
+_connections = {}  # db_name -> read-only DBManager, kept open for the process's next partitions
+
+
+def _read_only_db_manager(db_name):
+    db_manager = _connections.get(db_name)
+    if db_manager is None:
+        errors = []
+        db_manager = DBManager(db_name, error_reporter=lambda title, message: errors.append(f"{title}: {message}"),
+                               read_only=True)
+        db_manager.errors = errors
+        _connections[db_name] = db_manager
+    return db_manager
+
+
+def _compute_partition(db_name, method, start_date_str, end_date_str, format_row):
+    """
+    Runs one DBManager date range query (e.g. get_sales_in_date_range) over one partition.
+
+    Returns:
+        list: The records, or the rows format_row made of them.
+    """
+    db_manager = _read_only_db_manager(db_name)
+    db_manager.errors.clear()
+    records = getattr(db_manager, method)(start_date_str, end_date_str)
+    if db_manager.errors:
+        # DBManager reported the error and returned an empty list; do not pass that off as "no data"
+        raise RuntimeError("\n".join(db_manager.errors))
+    return [format_row(record) for record in records] if format_row else records
+
+
+class ReportProcessPool:
+    """
+    Computes date range reports in a pool of processes.
+
+    The processes are started on first use and kept for later reports. They use
+    the "spawn" start method: forking a process that runs Qt threads is unsafe.
+    """
+
+    def __init__(self, db_name, processes=None, min_days=PARALLEL_MIN_DAYS):
+        """
+        Args:
+            db_name (str): Path of the database the processes open read-only.
+            processes (int, optional): Pool size; defaults to report_processes().
+            min_days (int): Shortest range worth splitting (see splits()).
+        """
+        self.db_name = db_name
+        self.processes = processes or report_processes()
+        self.min_days = min_days
+        self._executor = None
+
+    def splits(self, start_date_str, end_date_str):
+        """True if a report over this range should be computed in the pool."""
+        days = (datetime.strptime(end_date_str, '%Y-%m-%d') - datetime.strptime(start_date_str, '%Y-%m-%d')).days + 1
+        return self.processes > 1 and days >= self.min_days
+
+    def map_date_range(self, method, start_date_str, end_date_str, format_row=None, cancelled=lambda: False,
+                       progress=lambda done, total: None):
+        """
+        Runs a DBManager date range query over the partitions of a range in the pool.
+
+        Args:
+            method (str): DBManager method taking (start_date_str, end_date_str), e.g. "get_sales_tax_summary".
+            format_row (callable, optional): Module-level function applied to each record inside the
+                processes, so formatting is spread across the cores too.
+            cancelled (callable): Polled while waiting; once it returns True the partitions
+                not yet started are dropped and None is returned.
+            progress (callable): Called as progress(partitions done, partitions).
+
+        Returns:
+            list: One list of records (or rows) per partition, oldest partition first; None if cancelled.
+
+        Raises:
+            RuntimeError: If a partition failed.
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.processes, mp_context=multiprocessing.get_context("spawn"))
+        ranges = partition_date_range(start_date_str, end_date_str, self.processes * PARTITIONS_PER_PROCESS)
+        futures = [self._executor.submit(_compute_partition, self.db_name, method, start, end, format_row)
+                   for start, end in ranges]
+        pending = set(futures)
+        progress(0, len(futures))
+        while pending:
+            _, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            if cancelled():
+                for future in pending:
+                    future.cancel()
+                return None
+            progress(len(futures) - len(pending), len(futures))
+        return [future.result() for future in futures]
+
+    def shutdown(self):
+        """Stops the processes."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,430 @@
+# database/report_engine.py
+
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from PyQt6.QtCore import QObject, QThread, Qt, pyqtSignal, pyqtSlot
+from PyQt6.QtWidgets import QApplication
+
+from database.parallel_reports import ReportProcessPool, report_processes
+from models.money import Money
+
+# Report types, as shown in the Reports screen
+SALES_REPORT = "Sales by Date Range"
+TAX_REPORT = "Tax & Discount Summary"
+SALES_BY_MEDICINE_REPORT = "Sales by Medicine"
+STOCK_REPORT = "Current Stock Overview"
+STOCK_VALUATION_REPORT = "Stock Valuation"
+STOCK_VALUATION_DETAIL = "Stock Valuation Detail"  # One page of a valuation group, opened from the valuation report
+LOW_STOCK_REPORT = "Low Stock Medicines"
+EXPIRING_REPORT = "Expiring Medicines"
+
+# Tables each report reads; a ChangeEvent on one of them invalidates the cached results
+REPORT_DEPENDENCIES = {
+    SALES_REPORT: ("sales",),
+    TAX_REPORT: ("sales",),
+    SALES_BY_MEDICINE_REPORT: ("sales", "medicines"),
+    STOCK_REPORT: ("medicines",),
+    STOCK_VALUATION_REPORT: ("medicines",),
+    STOCK_VALUATION_DETAIL: ("medicines",),
+    LOW_STOCK_REPORT: ("medicines",),
+    EXPIRING_REPORT: ("medicines",),
+}
+
+# Reports computed over a start and end date
+DATE_RANGE_REPORTS = (SALES_REPORT, TAX_REPORT, SALES_BY_MEDICINE_REPORT)
+
+EXPIRING_REPORT_DAYS = 90
+VALUATION_PAGE_SIZE = 100  # Medicines per drill-down page
+PROGRESS_CHUNK = 500  # Rows formatted between progress updates / cancellation checks
+
+
+class ReportCancelled(Exception):
+    """Raised inside a report job once it has been cancelled."""
+
+
+class ReportJob:
+    """
+    One request for a report, handed from the ReportEngine to its worker thread.
+
+    Attributes:
+        job_id (int): Increasing number identifying the request.
+        report_type (str): One of the *_REPORT constants.
+        params (tuple): Report parameters, e.g. (start_date, end_date).
+        key (tuple): Cache key: (report_type, params, versions of the tables it reads).
+    """
+
+    def __init__(self, job_id, report_type, params, key):
+        self.job_id = job_id
+        self.report_type = report_type
+        self.params = params
+        self.key = key
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        """Asks the worker to stop; safe to call from any thread."""
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+
+def _format_rows(job, records, format_row, progress):
+    """Formats records into table rows in chunks, reporting progress and honouring cancellation."""
+    rows = []
+    total = len(records)
+    for start in range(0, total, PROGRESS_CHUNK):
+        if job.cancelled:
+            raise ReportCancelled()
+        rows.extend(format_row(record) for record in records[start:start + PROGRESS_CHUNK])
+        progress(min(start + PROGRESS_CHUNK, total), total)
+    return rows
+
+
+# Row formatters of the date range reports live at module level, so the report processes can run them
+def format_sale_row(sale):
+    return [str(sale["id"]), sale["customer_name"], f"{sale['total_amount']:.2f}", sale["sale_date"],
+            ", ".join([f"{item['name']} (x{item['qty']})" for item in sale["items"]])]
+
+
+def format_tax_day_row(day):
+    return [day["day"], str(day["sale_count"]), f"{day['subtotal']:.2f}", f"{day['discount']:.2f}",
+            f"{day['tax']:.2f}", f"{day['total']:.2f}"]
+
+
+def _map_date_range(pool, job, method, format_row, progress):
+    """Runs a date range query for job in the process pool; see ReportProcessPool.map_date_range."""
+    start_date, end_date = job.params
+    partitions = pool.map_date_range(method, start_date, end_date, format_row, lambda: job.cancelled, progress)
+    if partitions is None:
+        raise ReportCancelled()
+    return partitions
+
+
+def build_report(db_manager, job, progress, pool=None):
+    """
+    Computes a report.
+
+    Args:
+        db_manager: Connection to read from (the worker thread's own).
+        job (ReportJob): The report to compute.
+        progress (callable): Called as progress(done, total); total 0 means "busy".
+        pool (ReportProcessPool, optional): Splits the sales and tax reports over long ranges
+            across processes (see database/parallel_reports.py).
+
+    Returns:
+        dict: {"headers": [...], "rows": [[str, ...], ...], "empty_message": str}. The stock
+              valuation report adds "row_keys", the (category, brand) of each row (None for
+              the total), and its detail pages add "next_params" (None on the last page) and
+              "continues" (True after the first page).
+
+    Raises:
+        ReportCancelled: If the job was cancelled while running.
+    """
+    progress(0, 0)
+    total_row = None
+    rows = None  # Set here when the rows were already formatted in the report processes
+    extra = {}
+    if job.report_type == SALES_REPORT:
+        start_date, end_date = job.params
+        headers = ["Sale ID", "Customer Name", "Total Amount (PKR)", "Sale Date", "Items Sold"]
+        empty_message = f"No sales found between {start_date} and {end_date}."
+        format_row = format_sale_row
+        if pool and pool.splits(start_date, end_date):
+            # Newest partition first, like get_sales_in_date_range. A sale stamped exactly at
+            # midnight can fall in two neighbouring partitions, so keep its first row only.
+            seen = set()
+            rows = [row for partition in reversed(_map_date_range(pool, job, "get_sales_in_date_range",
+                                                                  format_sale_row, progress))
+                    for row in partition if row[0] not in seen and not seen.add(row[0])]
+        else:
+            records = db_manager.get_sales_in_date_range(start_date, end_date)
+    elif job.report_type == TAX_REPORT:
+        start_date, end_date = job.params
+        if pool and pool.splits(start_date, end_date):
+            # The partitions hold whole, distinct days, oldest first
+            records = [day for partition in _map_date_range(pool, job, "get_sales_tax_summary", None, progress)
+                       for day in partition]
+        else:
+            records = db_manager.get_sales_tax_summary(start_date, end_date)
+        headers = ["Date", "Sales", "Subtotal (PKR)", "Discount (PKR)", "Tax (PKR)", "Total (PKR)"]
+        empty_message = f"No sales found between {start_date} and {end_date}."
+        format_row = format_tax_day_row
+        if records:
+            total_row = ["Total", str(sum(day["sale_count"] for day in records))] + [
+                f"{sum((day[key] for day in records), Money(0)):.2f}" for key in ("subtotal", "discount", "tax", "total")]
+    elif job.report_type == SALES_BY_MEDICINE_REPORT:
+        start_date, end_date = job.params
+        records = db_manager.get_sales_by_medicine(start_date, end_date)
+        headers = ["Medicine ID", "Medicine Name", "Units Sold", "Sales", "Revenue (PKR)"]
+        empty_message = f"No sales found between {start_date} and {end_date}."
+        format_row = lambda med: [
+            str(med["med_id"]) if med["med_id"] is not None else "N/A", med["name"], str(med["qty"]),
+            str(med["sale_count"]), f"{med['revenue']:.2f}"]
+        if records:
+            total_row = ["Total", "", str(sum(med["qty"] for med in records)), "",
+                         f"{sum((med['revenue'] for med in records), Money(0)):.2f}"]
+    elif job.report_type == STOCK_REPORT:
+        records = db_manager.get_all_medicines()
+        headers = ["ID", "Medicine Name", "Brand", "Category", "Current Stock", "Price (PKR)", "Expiry Date"]
+        empty_message = "No medicines found in inventory."
+        format_row = lambda med: [
+            str(med.id), med.name, med.brand if med.brand else "N/A", med.category if med.category else "N/A",
+            str(med.stock), f"{med.price:.2f}", med.expiry_date if med.expiry_date else "N/A"]
+    elif job.report_type == STOCK_VALUATION_REPORT:
+        records = db_manager.get_stock_valuation()
+        headers = ["Category", "Brand", "SKUs", "Units", "Cost Value (PKR)", "Retail Value (PKR)", "Units Without Cost"]
+        empty_message = "No medicines found in inventory."
+        format_row = lambda group: [
+            group["category"] or "N/A", group["brand"] or "N/A", str(group["sku_count"]), str(group["units"]),
+            f"{group['cost_value']:.2f}", f"{group['retail_value']:.2f}", str(group["uncosted_units"])]
+        extra["row_keys"] = [(group["category"], group["brand"]) for group in records]
+        if records:
+            total_row = ["Total", ""] + [str(sum(group[key] for group in records)) for key in ("sku_count", "units")] + [
+                f"{sum((group[key] for group in records), Money(0)):.2f}" for key in ("cost_value", "retail_value")] + [
+                str(sum(group["uncosted_units"] for group in records))]
+            extra["row_keys"].append(None)
+    elif job.report_type == STOCK_VALUATION_DETAIL:
+        category, brand, after = job.params
+        records = db_manager.get_stock_valuation_page(category, brand, after, VALUATION_PAGE_SIZE)
+        headers = ["ID", "Medicine Name", "Barcode", "Units", "Cost Price (PKR)", "Cost Value (PKR)", "Price (PKR)",
+                   "Retail Value (PKR)"]
+        empty_message = f"No medicines in {category or 'N/A'} / {brand or 'N/A'}."
+        format_row = lambda med: [
+            str(med.id), med.name, med.barcode or "", str(med.stock),
+            f"{med.cost_price:.2f}" if med.cost_price is not None else "N/A",
+            f"{med.cost_price * med.stock:.2f}" if med.cost_price is not None else "N/A",
+            f"{med.price:.2f}", f"{med.price * med.stock:.2f}"]
+        last = records[-1] if len(records) == VALUATION_PAGE_SIZE else None
+        extra["next_params"] = (category, brand, (last.name, last.id)) if last else None
+        extra["continues"] = after is not None
+    elif job.report_type == LOW_STOCK_REPORT:
+        records = db_manager.get_all_low_stock_medicines()
+        headers = ["ID", "Medicine Name", "Brand", "Current Stock", "Low Alert Threshold", "Expiry Date"]
+        empty_message = "No medicines currently have low stock."
+        format_row = lambda med: [
+            str(med.id), med.name, med.brand if med.brand else "N/A", str(med.stock), str(med.low_stock_alert),
+            med.expiry_date if med.expiry_date else "N/A"]
+    elif job.report_type == EXPIRING_REPORT:
+        days_threshold, _ = job.params
+        records = db_manager.get_all_expiring_medicines(days_threshold=days_threshold)
+        headers = ["ID", "Medicine Name", "Brand", "Current Stock", "Expiry Date"]
+        empty_message = f"No medicines expiring within the next {days_threshold} days or already expired."
+        format_row = lambda med: [
+            str(med.id), med.name, med.brand if med.brand else "N/A", str(med.stock),
+            med.expiry_date if med.expiry_date else "N/A"]
+    else:
+        raise ValueError(f"Unknown report type: {job.report_type}")
+
+    if job.cancelled:
+        raise ReportCancelled()
+    if rows is None:
+        rows = _format_rows(job, records, format_row, progress)
+    if total_row:
+        rows.append(total_row)
+    return {"headers": headers, "rows": rows, "empty_message": empty_message, **extra}
+
+
+class ReportWorker(QObject):
+    """
+    Computes reports in a background QThread, on its own database connection.
+    """
+    job_progress = pyqtSignal(int, int, int)  # job id, done, total (0 = busy)
+    job_finished = pyqtSignal(object, object)  # ReportJob, result
+    job_failed = pyqtSignal(object, str)  # ReportJob, message
+    job_cancelled = pyqtSignal(object)  # ReportJob
+
+    def __init__(self, db_manager):
+        """
+        Args:
+            db_manager: The GUI thread's DBManager (or DBManagerClient); the worker opens its
+                        own connection from it with new_connection() once it runs in its thread.
+        """
+        super().__init__()
+        self.source_db_manager = db_manager
+        self.db_manager = None
+        self.pool = None
+        self._errors = []
+
+    @pyqtSlot()
+    def start(self):
+        self.db_manager = self.source_db_manager.new_connection(
+            error_reporter=lambda title, message: self._errors.append(f"{title}: {message}"))
+        # Long date ranges are split across processes; only possible on a local database file
+        if getattr(self.db_manager, "conn", None) and report_processes() > 1:
+            self.pool = ReportProcessPool(self.db_manager.db_name)
+
+    @pyqtSlot(object)
+    def run(self, job):
+        if job.cancelled:
+            self.job_cancelled.emit(job)
+            return
+        self._errors = []
+        conn = getattr(self.db_manager, "conn", None)  # None when talking to the API server
+        if conn:
+            # Lets a cancel interrupt a long query instead of waiting for it to finish
+            conn.set_progress_handler(lambda: job.cancelled, 10000)
+        try:
+            result = build_report(self.db_manager, job,
+                                  lambda done, total: self.job_progress.emit(job.job_id, done, total), self.pool)
+        except ReportCancelled:
+            self.job_cancelled.emit(job)
+            return
+        except Exception as e:
+            print(f"Report '{job.report_type}' failed: {e}")
+            self.job_failed.emit(job, str(e))
+            return
+        finally:
+            if conn:
+                conn.set_progress_handler(None, 0)
+        if job.cancelled:
+            self.job_cancelled.emit(job)  # Interrupted inside a query
+            return
+        if self._errors:
+            # DBManager reported the error and returned an empty list; do not cache that as "no data"
+            self.job_failed.emit(job, "\n".join(self._errors))
+            return
+        self.job_finished.emit(job, result)
+
+    @pyqtSlot()
+    def stop(self):
+        if self.pool:
+            self.pool.shutdown()
+        if self.db_manager:
+            self.db_manager.close_db()
+
+
+class ReportEngine(QObject):
+    """
+    Runs reports as cancellable background jobs and caches their results.
+
+    Results are cached under (report type, parameters, data version), where the
+    data version counts the ChangeEvents seen for the tables the report reads,
+    plus db_manager.data_version() for writes made outside this process's
+    DBManager: the connection's PRAGMA data_version, or in API mode the server's
+    write counter (other terminals, the sale sync worker).
+    Asking again for a report whose data has not changed is answered from the
+    cache at once; a relevant write makes the next request recompute it. Only one
+    job runs at a time: a new request cancels the one in progress.
+    """
+    report_ready = pyqtSignal(str, object, bool)  # report type, result, served from cache
+    report_progress = pyqtSignal(int, int)  # done, total (0 = busy)
+    report_failed = pyqtSignal(str, str)  # report type, message
+    report_cancelled = pyqtSignal(str)  # report type
+    job_requested = pyqtSignal(object)  # ReportJob, delivered to the worker thread
+
+    def __init__(self, db_manager, max_cached=32, parent=None):
+        """
+        Args:
+            db_manager: The GUI thread's DBManager (or DBManagerClient).
+            max_cached (int): Results kept; the least recently used are dropped first.
+        """
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.max_cached = max_cached
+        self._cache = OrderedDict()
+        self._versions = {}  # table -> number of ChangeEvents seen
+        self._resets = 0  # reset() calls, so keys taken before a restore never match again
+        self._next_job_id = 1
+        self.current_job = None
+        self.hits = 0
+        self.misses = 0
+        db_manager.change_feed.subscribe(self.on_data_changed)
+
+        self.thread = QThread(self)
+        self.worker = ReportWorker(db_manager)
+        self.worker.moveToThread(self.thread)
+        self.thread.started.connect(self.worker.start)
+        # finished is emitted from the worker thread, so stop() closes its connection there
+        self.thread.finished.connect(self.worker.stop, Qt.ConnectionType.DirectConnection)
+        self.job_requested.connect(self.worker.run)
+        self.worker.job_progress.connect(self._on_job_progress)
+        self.worker.job_finished.connect(self._on_job_finished)
+        self.worker.job_failed.connect(self._on_job_failed)
+        self.worker.job_cancelled.connect(self._on_job_cancelled)
+        QApplication.instance().aboutToQuit.connect(self.stop)
+        self.thread.start()
+
+    @staticmethod
+    def report_params(report_type, start_date=None, end_date=None):
+        """Returns the parameters that identify a report request."""
+        if report_type in DATE_RANGE_REPORTS:
+            return (start_date, end_date)
+        if report_type == EXPIRING_REPORT:
+            # Depends on today's date, so yesterday's result is not reused
+            return (EXPIRING_REPORT_DAYS, datetime.now().strftime('%Y-%m-%d'))
+        return ()
+
+    def cache_key(self, report_type, params):
+        versions = tuple(self._versions.get(table, 0) for table in REPORT_DEPENDENCIES[report_type])
+        return (report_type, params, versions, self.db_manager.data_version(), self._resets)
+
+    def request(self, report_type, params):
+        """
+        Shows a report: from the cache if it is still current, otherwise by starting a job.
+        The outcome arrives through report_ready / report_failed / report_cancelled.
+        """
+        key = self.cache_key(report_type, params)
+        if self.current_job and self.current_job.key == key and not self.current_job.cancelled:
+            return  # Already being computed
+        self.cancel()
+        result = self._cache.get(key)
+        if result is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            self.report_ready.emit(report_type, result, True)
+            return
+        self.misses += 1
+        self.current_job = ReportJob(self._next_job_id, report_type, params, key)
+        self._next_job_id += 1
+        self.job_requested.emit(self.current_job)
+
+    def cancel(self):
+        """Cancels the job in progress, if any."""
+        if self.current_job:
+            self.current_job.cancel()
+
+    def reset(self):
+        """Cancels the running job and drops every cached result, e.g. after a backup was restored."""
+        self.cancel()
+        self._cache.clear()
+        self._resets += 1
+
+    def on_data_changed(self, event):
+        """ChangeFeed subscriber: moves the table's data version on, dropping the results that read it."""
+        self._versions[event.entity] = self._versions.get(event.entity, 0) + 1
+        for key in [key for key in self._cache if event.entity in REPORT_DEPENDENCIES[key[0]]]:
+            del self._cache[key]
+
+    def _on_job_progress(self, job_id, done, total):
+        if self.current_job and self.current_job.job_id == job_id:
+            self.report_progress.emit(done, total)
+
+    def _on_job_finished(self, job, result):
+        # A write during the job may or may not be included; only cache results that are still current
+        if job.key == self.cache_key(job.report_type, job.params):
+            self._cache[job.key] = result
+            while len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+        if job is self.current_job:
+            self.current_job = None
+            self.report_ready.emit(job.report_type, result, False)
+
+    def _on_job_failed(self, job, message):
+        if job is self.current_job:
+            self.current_job = None
+            self.report_failed.emit(job.report_type, message)
+
+    def _on_job_cancelled(self, job):
+        if job is self.current_job:
+            self.current_job = None
+            self.report_cancelled.emit(job.report_type)
+
+    @pyqtSlot()
+    def stop(self):
+        """Cancels the running job and stops the worker thread."""
+        if self.thread.isRunning():
+            self.cancel()
+            self.thread.quit()
+            self.thread.wait()
@@ -0,0 +1,198 @@
+# database/sale_outbox.py
+
+import json
+import sqlite3
+import uuid
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal, pyqtSlot
+
+from models.money import money_json_default
+
+
+class SaleOutbox:
+    """
+    Durable, terminal-local queue of sales waiting to be recorded in the main database.
+
+    BillingScreen writes every sale here first, so a locked or unreachable
+    pharmacy.db never loses a sale. Entries are replayed strictly in the order
+    they were rung up (see SaleSyncWorker).
+
+    A sale the counter records at once is queued 'in_flight', so the worker
+    leaves it alone while the counter tries; if the database cannot be reached
+    it goes back to 'pending'. Each entry moves from 'pending' (or 'in_flight') to one of:
+        'synced'   - recorded in the main database (sale_id is set)
+        'conflict' - recorded, but stock could not cover it; last_error explains
+        'rejected' - refused at the counter (e.g. insufficient stock) and never recorded
+    """
+
+    def __init__(self, path="sale_outbox.db"):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = FULL")  # A queued sale must survive a power cut
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                client_ref TEXT UNIQUE NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                sale_id INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                synced_at TIMESTAMP
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_status ON outbox(status, seq)")
+        self.conn.commit()
+
+    def enqueue(self, sale, in_flight=False):
+        """
+        Appends a sale and returns it with its new 'client_ref'.
+
+        Args:
+            sale (dict): Keys customer_id, customer_name, customer_phone,
+                         customer_email, total_amount and items (see DBManager.add_sale).
+                         Money amounts are stored as plain numbers and come back as such.
+            in_flight (bool): The caller records the sale itself right away; the worker
+                              skips it unless record_failed_attempt() hands it back.
+        """
+        sale = dict(sale, client_ref=uuid.uuid4().hex)
+        self.conn.execute("INSERT INTO outbox (client_ref, payload, status) VALUES (?, ?, ?)",
+                          (sale["client_ref"], json.dumps(sale, default=money_json_default),
+                           "in_flight" if in_flight else "pending"))
+        self.conn.commit()
+        return sale
+
+    def pending(self, limit=50):
+        """Returns the oldest pending entries as a list of (seq, sale) tuples."""
+        cursor = self.conn.execute(
+            "SELECT seq, payload FROM outbox WHERE status = 'pending' ORDER BY seq ASC LIMIT ?", (limit,))
+        return [(seq, json.loads(payload)) for seq, payload in cursor.fetchall()]
+
+    def pending_count(self):
+        """Number of sales still waiting to reach the main database (the backlog depth)."""
+        return self.conn.execute("SELECT COUNT(*) FROM outbox WHERE status = 'pending'").fetchone()[0]
+
+    def requeue_in_flight(self):
+        """
+        Hands sales the counter was recording when the application stopped to the worker.
+        Replays are idempotent (DBManager.record_queued_sale), so one that did reach the
+        database is not recorded twice. Returns the number of entries requeued.
+        """
+        cursor = self.conn.execute("UPDATE outbox SET status = 'pending' WHERE status = 'in_flight'")
+        self.conn.commit()
+        return cursor.rowcount
+
+    def mark_synced(self, client_ref, sale_id, conflict=None):
+        """Marks an entry as recorded; a conflict message keeps it visible for review."""
+        self.conn.execute(
+            """UPDATE outbox SET status = ?, sale_id = ?, last_error = ?, synced_at = CURRENT_TIMESTAMP,
+                   attempts = attempts + 1
+               WHERE client_ref = ?""",
+            ("conflict" if conflict else "synced", sale_id, conflict, client_ref))
+        self.conn.commit()
+
+    def mark_rejected(self, client_ref, message):
+        """Marks an entry as refused by the main database; it will not be retried."""
+        self.conn.execute(
+            "UPDATE outbox SET status = 'rejected', last_error = ?, attempts = attempts + 1 WHERE client_ref = ?",
+            (message, client_ref))
+        self.conn.commit()
+
+    def record_failed_attempt(self, client_ref, message):
+        """Keeps an entry pending (an in-flight one becomes pending) after the main database could not be reached."""
+        self.conn.execute(
+            "UPDATE outbox SET status = 'pending', attempts = attempts + 1, last_error = ? WHERE client_ref = ?",
+            (message, client_ref))
+        self.conn.commit()
+
+    def conflicts(self):
+        """Returns (client_ref, sale_id, message) for sales recorded with stock conflicts."""
+        return self.conn.execute(
+            "SELECT client_ref, sale_id, last_error FROM outbox WHERE status = 'conflict' ORDER BY seq ASC"
+        ).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+
+class SaleSyncWorker(QObject):
+    """
+    Replays the outbox into the main database from a background QThread.
+
+    Sales are replayed oldest first and replay stops at the first one the
+    database cannot take, so the order in which sales hit stock is always the
+    order they were rung up. Because those sales were already handed over at the
+    counter, stock conflicts are resolved deterministically: the sale is recorded,
+    stock is floored at zero and the entry is kept as a 'conflict' for review.
+    """
+    backlog_changed = pyqtSignal(int)
+    sale_synced = pyqtSignal(str, int)  # client_ref, sale_id
+    sale_conflict = pyqtSignal(str, str)  # client_ref, message
+    change_published = pyqtSignal(object)  # ChangeEvent committed on the worker's connection
+
+    def __init__(self, db_manager, outbox_path, interval_ms=15000):
+        """
+        Args:
+            db_manager: The GUI thread's DBManager (or DBManagerClient); the worker opens its own
+                        connection from it with new_connection() once it is running in its thread.
+            outbox_path (str): File used by the SaleOutbox.
+            interval_ms (int): How often to retry while sales are pending.
+        """
+        super().__init__()
+        self.source_db_manager = db_manager
+        self.outbox_path = outbox_path
+        self.interval_ms = interval_ms
+        self.db_manager = None
+        self.outbox = None
+        self.timer = None
+
+    @pyqtSlot()
+    def start(self):
+        """Opens this thread's connections and starts the periodic retry."""
+        self.db_manager = self.source_db_manager.new_connection(
+            error_reporter=lambda title, message: print(f"Sale sync: {title}: {message}"))
+        self.db_manager.change_feed.subscribe(self.change_published.emit)
+        self.outbox = SaleOutbox(self.outbox_path)
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.sync_now)
+        self.timer.start(self.interval_ms)
+        self.sync_now()
+
+    @pyqtSlot()
+    def sync_now(self):
+        """Replays pending sales in order until the outbox is empty or the database is unavailable."""
+        if not self.outbox:
+            return
+        while True:
+            batch = self.outbox.pending()
+            if not batch:
+                break
+            for _, sale in batch:
+                outcome = self.db_manager.record_queued_sale(sale, allow_oversell=True)
+                status = outcome["status"]
+                if status == "unavailable":
+                    self.outbox.record_failed_attempt(sale["client_ref"], outcome["message"])
+                    self.backlog_changed.emit(self.outbox.pending_count())
+                    return
+                if status == "rejected":
+                    self.outbox.mark_rejected(sale["client_ref"], outcome["message"])
+                    self.sale_conflict.emit(sale["client_ref"], outcome["message"])
+                    continue
+                conflict = outcome["message"] if status == "conflict" else None
+                self.outbox.mark_synced(sale["client_ref"], outcome["sale_id"], conflict)
+                if conflict:
+                    self.sale_conflict.emit(sale["client_ref"], conflict)
+                self.sale_synced.emit(sale["client_ref"], outcome["sale_id"])
+        self.backlog_changed.emit(0)
+
+    @pyqtSlot()
+    def stop(self):
+        """Stops retrying and closes this thread's connections."""
+        if self.timer:
+            self.timer.stop()
+        if self.outbox:
+            self.outbox.close()
+            self.outbox = None
+        if self.db_manager:
+            self.db_manager.close_db()
@@ -0,0 +1,228 @@
+# database/sales_columns.py
+
+"""
+Column store of the sold lines, for analytical reports.
+
+Reports that group sales (e.g. revenue per medicine over a year) would read
+every sale_items row through SQLite and Python tuples. SalesColumnStore keeps
+one NumPy array per column instead: a year of lines is filtered and summed in
+a few vectorized passes over memory.
+
+NumPy is optional. Without it sales_column_store() returns None and the
+DBManager answers the same questions with SQL.
+"""
+
+import os
+import threading
+from datetime import date
+
+try:
+    import numpy as np
+except ImportError:  # Optional: DBManager falls back to SQL
+    np = None
+
+# Column name -> dtype. One row per line of a live sale (archived sales live in the yearly archives).
+SALE_LINE_COLUMNS = {
+    "sale_id": "int64",
+    "day": "int32",  # date.toordinal() of the sale date; 0 if it could not be read
+    "customer_id": "int64",  # -1 for walk-in customers
+    "med_id": "int64",  # -1 if the line has no medicine ID
+    "qty": "int64",
+    "net_minor": "int64",  # Line amount after its share of discount and tax, in minor units
+}
+FETCH_CHUNK = 50000  # Lines converted per batch while loading
+INITIAL_CAPACITY = 1024
+
+# julianday() - 1721424.5 is the proleptic Gregorian ordinal, as date.toordinal() counts it
+_LINES_SINCE = """
+    SELECT i.sale_id, COALESCE(CAST(julianday(substr(s.sale_date, 1, 10)) - 1721424.5 AS INTEGER), 0),
+           COALESCE(s.customer_id, -1), COALESCE(i.med_id, -1), i.qty, i.net_minor
+    FROM sale_items i JOIN sales s ON s.id = i.sale_id
+    WHERE i.sale_id > ?
+    ORDER BY i.sale_id, i.line_no
+"""
+# Identifies the last sale loaded; if it changed, the database file was replaced (e.g. a backup restored)
+_SALE_FINGERPRINT = "SELECT sale_date, total_amount_minor FROM sales WHERE id = ?"
+
+_stores = {}  # Absolute database path -> SalesColumnStore, shared by the connections of this process
+_stores_lock = threading.Lock()
+
+
+def sales_column_store(db_name):
+    """Returns the process-wide column store for a database file, or None if NumPy is not installed."""
+    if np is None:
+        return None
+    path = os.path.abspath(db_name)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = SalesColumnStore()
+        return store
+
+
+def day_ordinal(date_str):
+    """Ordinal of a 'YYYY-MM-DD' date, as stored in the "day" column."""
+    return date.fromisoformat(date_str[:10]).toordinal()
+
+
+class SalesColumnStore:
+    """
+    The lines of the live sales as NumPy columns (SALE_LINE_COLUMNS).
+
+    sync() appends the lines of sales newer than the last one loaded, so after
+    the first load it reads only new sales (DBManager calls it after each sale
+    and before each query). The columns are reloaded when the loaded lines may
+    no longer be the live ones: archiving moves old sales out of the live table,
+    which is noticed from sales_rollups, and a restored backup (by any process)
+    no longer has the last sale loaded, or has a different sale under its ID.
+
+    The store is shared by every DBManager of the process on the same file (the
+    GUI thread's and the report worker's), so access goes through a lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._arrays = {name: np.empty(INITIAL_CAPACITY, dtype) for name, dtype in SALE_LINE_COLUMNS.items()}
+        self._size = 0
+        self.last_sale_id = 0
+        self._last_sale = None  # _SALE_FINGERPRINT row of last_sale_id
+        self._archived_sales = None  # SUM(sales_rollups.sale_count) when loaded; None = not loaded yet
+        self.loads = 0
+        self.lines_appended = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def loaded(self):
+        """True once sync() has loaded the columns."""
+        return self._archived_sales is not None
+
+    def reset(self):
+        """Forgets the loaded lines, e.g. after a backup was restored; the next sync() loads them again."""
+        with self._lock:
+            self._size = 0
+            self.last_sale_id = 0
+            self._last_sale = None
+            self._archived_sales = None
+
+    def sync(self, conn):
+        """
+        Brings the columns up to date with the sales in the database.
+
+        Args:
+            conn (sqlite3.Connection): Connection of the calling thread.
+
+        Returns:
+            int: Number of lines appended.
+        """
+        with self._lock:
+            archived = conn.execute("SELECT COALESCE(SUM(sale_count), 0) FROM sales_rollups").fetchone()[0]
+            replaced = (self.last_sale_id
+                        and conn.execute(_SALE_FINGERPRINT, (self.last_sale_id,)).fetchone() != self._last_sale)
+            if archived != self._archived_sales or replaced:
+                self._size = 0
+                self.last_sale_id = 0
+                self._last_sale = None
+                self._archived_sales = archived
+                self.loads += 1
+            cursor = conn.execute(_LINES_SINCE, (self.last_sale_id,))
+            appended = 0
+            while True:
+                rows = cursor.fetchmany(FETCH_CHUNK)
+                if not rows:
+                    break
+                self._append(np.array(rows, dtype=np.int64))
+                appended += len(rows)
+            if appended:
+                self._last_sale = conn.execute(_SALE_FINGERPRINT, (self.last_sale_id,)).fetchone()
+            self.lines_appended += appended
+            return appended
+
+    def _append(self, block):
+        needed = self._size + len(block)
+        capacity = len(self._arrays["sale_id"])
+        if needed > capacity:
+            capacity = max(needed, capacity * 2)  # Doubling keeps appends amortized O(1)
+            for name, array in self._arrays.items():
+                grown = np.empty(capacity, array.dtype)
+                grown[:self._size] = array[:self._size]
+                self._arrays[name] = grown
+        for index, name in enumerate(SALE_LINE_COLUMNS):
+            self._arrays[name][self._size:needed] = block[:, index]
+        self._size = needed
+        self.last_sale_id = int(block[-1, 0])
+
+    def _mask(self, start_date, end_date, equals):
+        columns = {name: array[:self._size] for name, array in self._arrays.items()}
+        mask = np.ones(self._size, dtype=bool)
+        if start_date:
+            mask &= columns["day"] >= day_ordinal(start_date)
+        if end_date:
+            mask &= columns["day"] <= day_ordinal(end_date)
+        for name, value in equals.items():
+            mask &= columns[name] == value
+        return columns, mask
+
+    def total(self, values, start_date=None, end_date=None, **equals):
+        """
+        Sums columns over the lines matching the filters.
+
+        Args:
+            values (tuple): Columns to sum, e.g. ("qty", "net_minor").
+            start_date, end_date (str, optional): Inclusive 'YYYY-MM-DD' range of sale dates.
+            **equals: Column filters, e.g. customer_id=7.
+
+        Returns:
+            dict: {column: int, "lines": int}
+        """
+        with self._lock:
+            columns, mask = self._mask(start_date, end_date, equals)
+            result = {name: int(columns[name][mask].sum()) for name in values}
+            result["lines"] = int(np.count_nonzero(mask))
+            return result
+
+    def group_sum(self, by, values, start_date=None, end_date=None, **equals):
+        """
+        Groups the lines matching the filters by one column and sums others.
+
+        Args:
+            by (str): Column to group by, e.g. "med_id", "customer_id" or "day".
+            values (tuple): Columns to sum, e.g. ("qty", "net_minor").
+            start_date, end_date (str, optional): Inclusive 'YYYY-MM-DD' range of sale dates.
+            **equals: Column filters, e.g. customer_id=7.
+
+        Returns:
+            dict: {by: keys, column: sums..., "sales": number of distinct sales}, NumPy arrays
+                  aligned by group, keys ascending.
+        """
+        with self._lock:
+            columns, mask = self._mask(start_date, end_date, equals)
+            keys = columns[by][mask]
+            groups, inverse = _group_index(keys)
+            result = {by: groups}
+            for name in values:
+                # Float sums are exact below 2**53 minor units, far beyond any till's takings
+                result[name] = np.rint(np.bincount(inverse, weights=columns[name][mask],
+                                                   minlength=len(groups))).astype(np.int64)
+            # A sale counts once per group even if it has several lines in it. The lines are stored in
+            # sale order, so these keys are sorted but for the lines within each sale, which the
+            # stable (merging) sort handles in about linear time.
+            pairs = np.sort(columns["sale_id"][mask] * max(len(groups), 1) + inverse, kind="stable")
+            first = np.ones(len(pairs), dtype=bool)
+            first[1:] = pairs[1:] != pairs[:-1]
+            result["sales"] = np.bincount(pairs[first] % max(len(groups), 1), minlength=len(groups))
+            return result
+
+
+def _group_index(keys):
+    """Returns (sorted distinct keys, index of each key's group)."""
+    if not len(keys):
+        return keys, np.zeros(0, dtype=np.int64)
+    low, high = int(keys.min()), int(keys.max())
+    if high - low > max(4 * len(keys), 1 << 16):
+        return np.unique(keys, return_inverse=True)  # Sparse keys: sort them
+    # Dense keys such as medicine IDs or days: count into a table instead of sorting
+    offsets = keys - low
+    present = np.bincount(offsets, minlength=high - low + 1) > 0
+    return np.flatnonzero(present) + low, (np.cumsum(present) - 1)[offsets]
@@ -1,5 +1,6 @@
 # main.py
 
+import multiprocessing
 import sys
 from PyQt6.QtWidgets import QApplication
 from ui.main_window import MainWindow # Import the MainWindow
@@ -14,5 +15,6 @@ def main():
     sys.exit(app.exec())
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # The report processes (database/parallel_reports.py) in a frozen build
     main()
 
@@ -1,22 +1,74 @@
 # models/customer.py
 
+import re
+import unicodedata
+
+_NON_DIGITS = re.compile(r"\D")
+
+
+def normalize_customer_name(name):
+    """
+    Search key of a customer name: case-folded, accents removed and whitespace collapsed,
+    so "  José  ALVAREZ" and "jose alvarez" find each other.
+    """
+    decomposed = unicodedata.normalize("NFKD", name or "")
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.casefold().split())
+
+
+def phone_digits(phone):
+    """
+    Digits of a phone number as typed in any format ("+92 (300) 123-4567" -> "923001234567").
+    Returns None if it has no digits.
+    """
+    digits = _NON_DIGITS.sub("", phone or "")
+    return digits or None
+
+
+def customer_lookup_keys(name, phone):
+    """
+    Returns the stored lookup keys of a customer (see DBManager.find_customers):
+    (name_key, phone_digits, phone_digits_rev).
+    """
+    digits = phone_digits(phone)
+    return normalize_customer_name(name), digits, digits[::-1] if digits else None
+
+
 class Customer:
     """
     Represents a customer in the PharmaCare system.
     """
-    def __init__(self, customer_id=None, name=None, phone=None, email=None, address=None, created_at=None):
+    __slots__ = ("id", "name", "phone", "email", "address", "created_at", "row_version")
+
+    def __init__(self, customer_id=None, name=None, phone=None, email=None, address=None, created_at=None,
+                 row_version=None):
         self.id = customer_id
         self.name = name
         self.phone = phone
         self.email = email
         self.address = address
         self.created_at = created_at
+        self.row_version = row_version  # Version of the stored row this object was read from
+
+    def to_dict(self):
+        """
+        Converts the Customer object to a dictionary.
+        """
+        return {
+            "name": self.name,
+            "phone": self.phone,
+            "email": self.email,
+            "address": self.address,
+            "id": self.id,
+            "created_at": self.created_at,
+            "row_version": self.row_version
+        }
 
     @classmethod
     def from_db_row(cls, row):
         """
         Creates a Customer object from a database row (tuple).
-        Assumes row format: (id, name, phone, email, address, created_at)
+        Assumes row format: (id, name, phone, email, address, created_at[, row_version])
         """
         if not row:
             return None
@@ -26,7 +78,8 @@ class Customer:
             phone=row[2],
             email=row[3],
             address=row[4],
-            created_at=row[5]
+            created_at=row[5],
+            row_version=row[6] if len(row) > 6 else None
         )
 
     def __repr__(self):
@@ -1,13 +1,19 @@
 # models/medicine.py
 
+from models.money import Money
+
 class Medicine:
     """
     Represents a medicine in the PharmaCare inventory.
     This class acts as a data model for the 'medicines' table.
     """
+    # Slots instead of a per-instance __dict__: the catalog is held by several screens at once
+    __slots__ = ("id", "name", "brand", "category", "price", "stock", "low_stock_alert", "expiry_date",
+                 "description", "created_at", "row_version", "barcode", "cost_price")
+
     def __init__(self, name, brand, category, price, stock,
                  low_stock_alert=10, expiry_date=None, description=None,
-                 medicine_id=None, created_at=None):
+                 medicine_id=None, created_at=None, row_version=None, barcode=None, cost_price=None):
         """
         Initializes a Medicine object.
 
@@ -15,13 +21,17 @@ class Medicine:
             name (str): Name of the medicine (e.g., "Paracetamol 500mg").
             brand (str): Brand name (e.g., "Tylenol").
             category (str): Category (e.g., "Pain Relief", "Antibiotic").
-            price (float): Selling price of the medicine.
+            price (Money): Selling price of the medicine.
             stock (int): Current stock quantity.
             low_stock_alert (int, optional): Threshold for low stock alert. Defaults to 10.
             expiry_date (str, optional): Expiry date in YYYY-MM-DD format.
             description (str, optional): A brief description of the medicine.
             medicine_id (int, optional): Unique ID of the medicine. Auto-generated by DB if None.
             created_at (str, optional): Timestamp of medicine record creation. Auto-generated by DB if None.
+            row_version (int, optional): Version of the stored row this object was read from.
+                                         Used to detect concurrent edits; None for new medicines.
+            barcode (str, optional): Barcode / SKU printed on the pack, unique per medicine.
+            cost_price (Money, optional): Purchase cost per unit, for stock valuation. None if not known.
         """
         self.id = medicine_id
         self.name = name
@@ -33,6 +43,9 @@ class Medicine:
         self.expiry_date = expiry_date
         self.description = description
         self.created_at = created_at
+        self.row_version = row_version
+        self.barcode = barcode
+        self.cost_price = cost_price
 
     def to_dict(self):
         """
@@ -48,15 +61,19 @@ class Medicine:
             "expiry_date": self.expiry_date,
             "description": self.description,
             "id": self.id,
-            "created_at": self.created_at
+            "created_at": self.created_at,
+            "row_version": self.row_version,
+            "barcode": self.barcode,
+            "cost_price": self.cost_price
         }
 
     @staticmethod
     def from_db_row(row):
         """
         Creates a Medicine object from a database row (tuple).
-        Assumes row order: (id, name, brand, category, price, stock,
-                           low_stock_alert, expiry_date, description, created_at)
+        Assumes row order: (id, name, brand, category, price_minor, stock,
+                           low_stock_alert, expiry_date, description, created_at[, row_version[, barcode
+                           [, cost_price_minor]]])
         """
         if row:
             return Medicine(
@@ -64,12 +81,15 @@ class Medicine:
                 name=row[1],
                 brand=row[2],
                 category=row[3],
-                price=row[4],
+                price=Money(row[4]),
                 stock=row[5],
                 low_stock_alert=row[6],
                 expiry_date=row[7],
                 description=row[8],
-                created_at=row[9]
+                created_at=row[9],
+                row_version=row[10] if len(row) > 10 else None,
+                barcode=row[11] if len(row) > 11 else None,
+                cost_price=Money(row[12]) if len(row) > 12 and row[12] is not None else None
             )
         return None
 
@@ -78,10 +98,10 @@ class Medicine:
 
 # Example usage
 if __name__ == "__main__":
-    med1 = Medicine("Amoxicillin 250mg", "Amoxil", "Antibiotic", 25.0, 50, expiry_date="2025-12-31")
+    med1 = Medicine("Amoxicillin 250mg", "Amoxil", "Antibiotic", Money.of("25.00"), 50, expiry_date="2025-12-31")
     print(med1)
     print(med1.to_dict())
 
-    db_row = (1, "Paracetamol 500mg", "Tylenol", "Pain Relief", 12.5, 150, 20, "2024-10-15", "Fever reducer", "2023-05-01 11:30:00")
+    db_row = (1, "Paracetamol 500mg", "Tylenol", "Pain Relief", 1250, 150, 20, "2024-10-15", "Fever reducer", "2023-05-01 11:30:00")
     med2 = Medicine.from_db_row(db_row)
     print(med2)
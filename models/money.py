@@ -0,0 +1,179 @@
+# models/money.py
+
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from functools import total_ordering
+
+MINOR_UNITS = 100  # Paisa per rupee
+_CENT = Decimal(1).scaleb(-2)
+_HUNDRED = Decimal(100)
+
+
+@total_ordering
+class Money:
+    """
+    An exact amount of money, held as a whole number of minor units (paisa).
+
+    Prices and sale totals are stored in the database as INTEGER minor units
+    (medicines.price_minor, sales.total_amount_minor) and read back as Money,
+    so sums never drift the way REAL (float) columns do.
+
+    Money supports the arithmetic the application needs and nothing that
+    could silently round: amounts add and subtract, multiply by a whole
+    quantity, and percentage() applies a discount or tax rate with explicit
+    rounding. It formats like a number (f"{price:.2f}").
+
+        Money.of("12.50") + Money.of(0.1) * 3  ->  Money('12.80')
+    """
+    __slots__ = ("minor",)
+
+    def __init__(self, minor=0):
+        """
+        Args:
+            minor (int): Amount in minor units, e.g. 1250 for 12.50.
+        """
+        self.minor = int(minor)
+
+    @classmethod
+    def of(cls, amount):
+        """
+        Converts an amount in major units (rupees) to Money, rounding to the paisa.
+
+        Args:
+            amount (Money, Decimal, int, float or str): e.g. 12.5, "12.50" or Decimal("12.5").
+                Floats are converted through their shortest repr, so 0.1 is exactly 0.10.
+
+        Raises:
+            ValueError: If amount is not a number.
+        """
+        if isinstance(amount, Money):
+            return amount
+        if isinstance(amount, float):
+            amount = repr(amount)
+        try:
+            value = Decimal(amount.strip() if isinstance(amount, str) else amount)
+        except (InvalidOperation, TypeError):
+            raise ValueError(f"Not an amount of money: {amount!r}")
+        if not value.is_finite():
+            raise ValueError(f"Not an amount of money: {amount!r}")
+        return cls(int((value * MINOR_UNITS).to_integral_value(ROUND_HALF_UP)))
+
+    @classmethod
+    def parse(cls, text):
+        """Parses a typed amount such as "12.5"; raises ValueError if it is not a number."""
+        return cls.of(str(text))
+
+    def to_decimal(self):
+        """Returns the amount in major units as an exact Decimal with two places."""
+        return Decimal(self.minor).scaleb(-2)
+
+    def percentage(self, rate):
+        """Returns rate percent of this amount, rounded half up to the paisa (e.g. a discount or tax)."""
+        rate = rate if isinstance(rate, Decimal) else Decimal(str(rate))
+        return Money(int((Decimal(self.minor) * rate / _HUNDRED).to_integral_value(ROUND_HALF_UP)))
+
+    def allocate(self, weights):
+        """
+        Splits this amount in proportion to weights, e.g. a sale's discount across its lines.
+        The parts always add up to exactly this amount: the paisa left over after rounding
+        down go to the parts with the largest remainders (earliest first on a tie).
+
+        Args:
+            weights (list): Money or int weights, one per part; if they are all zero the
+                whole amount goes to the first part.
+
+        Returns:
+            list: Money parts, in the order of weights.
+        """
+        if not weights:
+            return []
+        units = [w.minor if isinstance(w, Money) else int(w) for w in weights]
+        total_weight = sum(units)
+        if total_weight <= 0:
+            return [Money(self.minor)] + [Money(0)] * (len(units) - 1)
+        sign = -1 if self.minor < 0 else 1
+        amount = abs(self.minor)
+        shares = [divmod(amount * unit, total_weight) for unit in units]
+        parts = [share for share, _ in shares]
+        leftover = amount - sum(parts)
+        for index in sorted(range(len(shares)), key=lambda i: -shares[i][1])[:leftover]:
+            parts[index] += 1
+        return [Money(sign * part) for part in parts]
+
+    # --- Arithmetic ---
+    def __add__(self, other):
+        if isinstance(other, Money):
+            return Money(self.minor + other.minor)
+        if isinstance(other, int) and other == 0:  # Lets sum() start from its default 0
+            return self
+        return NotImplemented
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, Money):
+            return Money(self.minor - other.minor)
+        return NotImplemented
+
+    def __mul__(self, quantity):
+        if isinstance(quantity, int) and not isinstance(quantity, bool):
+            return Money(self.minor * quantity)
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __neg__(self):
+        return Money(-self.minor)
+
+    def __abs__(self):
+        return Money(abs(self.minor))
+
+    # --- Comparison ---
+    def __eq__(self, other):
+        if isinstance(other, Money):
+            return self.minor == other.minor
+        return NotImplemented
+
+    def __lt__(self, other):
+        if isinstance(other, Money):
+            return self.minor < other.minor
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.minor)
+
+    def __bool__(self):
+        return self.minor != 0
+
+    # --- Conversion ---
+    def __float__(self):
+        return self.minor / MINOR_UNITS
+
+    def __str__(self):
+        return str(self.to_decimal())
+
+    def __repr__(self):
+        return f"Money('{self}')"
+
+    def __format__(self, format_spec):
+        return format(self.to_decimal(), format_spec) if format_spec else str(self)
+
+
+def money_json_default(value):
+    """
+    json.dumps(default=...) hook that writes Money as a plain JSON number, e.g. 12.5.
+    The number is the float's shortest repr, which for whole paisa is the exact amount,
+    so Money.of() reads it back unchanged.
+    """
+    if isinstance(value, Money):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+# Example usage
+if __name__ == "__main__":
+    prices = [Money.of(0.1)] * 3
+    print(sum(prices), "vs float", sum([0.1] * 3))
+    subtotal = Money.of("1250.55") * 3
+    discount = subtotal.percentage(Decimal("7.5"))
+    print(subtotal, discount, subtotal - discount, f"{subtotal - discount:>12,.2f}")
+    print(Money.of("10.00").allocate([1, 1, 1]))
@@ -1,12 +1,16 @@
 # models/sale.py
 
 import json
+from models.money import Money
 
 class Sale:
     """
     Represents a sales transaction in the PharmaCare system.
     This class acts as a data model for the 'sales' table.
     """
+    __slots__ = ("id", "customer_name", "customer_phone", "customer_email", "total_amount", "items_json",
+                 "sale_date")
+
     def __init__(self, customer_name, total_amount, items_json,
                  customer_phone=None, customer_email=None,
                  sale_id=None, sale_date=None):
@@ -15,7 +19,7 @@ class Sale:
 
         Args:
             customer_name (str): Name of the customer.
-            total_amount (float): Total amount of the sale.
+            total_amount (Money): Total amount of the sale.
             items_json (str): JSON string representing the list of items sold.
                               Format: [{"med_id": 1, "qty": 2, "price": 12.5, "name": "Paracetamol"}]
             customer_phone (str, optional): Customer's phone number.
@@ -65,7 +69,7 @@ class Sale:
         """
         Creates a Sale object from a database row (tuple).
         Assumes row order: (id, customer_name, customer_phone, customer_email,
-                           total_amount, sale_date, items_json)
+                           total_amount_minor, sale_date, items_json)
         """
         if row:
             return Sale(
@@ -73,7 +77,7 @@ class Sale:
                 customer_name=row[1],
                 customer_phone=row[2],
                 customer_email=row[3],
-                total_amount=row[4],
+                total_amount=Money(row[4]),
                 sale_date=row[5],
                 items_json=row[6]
             )
@@ -82,19 +86,81 @@ class Sale:
     def __repr__(self):
         return f"Sale(ID={self.id}, Customer='{self.customer_name}', Total={self.total_amount})"
 
+
+def price_sale(items, total_amount, pricing=None):
+    """
+    Works out the stored pricing of a sale: the sale-level breakdown and the net
+    amount of every line. The discount is spread over the lines in proportion to
+    their subtotals and the tax in proportion to their discounted amounts (see
+    Money.allocate), so the lines always add up to the sale exactly.
+
+    Args:
+        items (list): [{"med_id": int, "qty": int, "price": Money or number, "name": str}]
+        total_amount (Money or number): Amount charged.
+        pricing (dict, optional): "subtotal", "discount" and "tax" (Money or numbers) and
+            "discount_rate" / "tax_rate" (percentages as str or Decimal) as shown at the
+            counter. Without it (older terminals, imported sales) the difference between
+            the items and the amount charged is recorded as a discount or as tax.
+
+    Returns:
+        tuple: (breakdown, lines) where breakdown is {"subtotal", "discount", "tax": Money,
+               "discount_rate", "tax_rate": str or None} and lines is a list of
+               {"med_id", "name", "qty", "unit_price", "subtotal", "discount", "tax", "net"}.
+
+    Raises:
+        ValueError: If the pricing does not add up to the items and the amount charged.
+    """
+    total = Money.of(total_amount)
+    unit_prices = [Money.of(item["price"]) for item in items]
+    line_subtotals = [price * item["qty"] for price, item in zip(unit_prices, items)]
+    subtotal = sum(line_subtotals, Money(0))
+    if pricing is None:
+        adjustment = total - subtotal
+        discount, tax = max(-adjustment, Money(0)), max(adjustment, Money(0))
+        discount_rate = tax_rate = None
+    else:
+        if Money.of(pricing["subtotal"]) != subtotal:
+            raise ValueError(f"Sale subtotal {Money.of(pricing['subtotal'])} does not match its items ({subtotal}).")
+        discount, tax = Money.of(pricing["discount"]), Money.of(pricing["tax"])
+        if subtotal - discount + tax != total:
+            raise ValueError(f"Sale total {total} does not equal subtotal {subtotal} - discount {discount} "
+                             f"+ tax {tax}.")
+        discount_rate, tax_rate = pricing.get("discount_rate"), pricing.get("tax_rate")
+
+    line_discounts = discount.allocate(line_subtotals)
+    line_taxes = tax.allocate([s - d for s, d in zip(line_subtotals, line_discounts)])
+    lines = [
+        {"med_id": item["med_id"], "name": item.get("name"), "qty": item["qty"], "unit_price": price,
+         "subtotal": line_subtotal, "discount": line_discount, "tax": line_tax,
+         "net": line_subtotal - line_discount + line_tax}
+        for item, price, line_subtotal, line_discount, line_tax
+        in zip(items, unit_prices, line_subtotals, line_discounts, line_taxes)
+    ]
+    breakdown = {"subtotal": subtotal, "discount": discount, "tax": tax,
+                 "discount_rate": None if discount_rate is None else str(discount_rate),
+                 "tax_rate": None if tax_rate is None else str(tax_rate)}
+    return breakdown, lines
+
 # Example usage
 if __name__ == "__main__":
     items_sold = [
         {"med_id": 1, "name": "Paracetamol", "qty": 2, "price": 12.5},
         {"med_id": 3, "name": "Vitamin D3", "qty": 1, "price": 18.75}
     ]
-    sale1 = Sale("Alice Wonderland", 43.75, json.dumps(items_sold), "123-456-7890")
+    sale1 = Sale("Alice Wonderland", Money.of("43.75"), json.dumps(items_sold), "123-456-7890")
     print(sale1)
     print(sale1.to_dict())
     print("Items:", sale1.get_items())
 
-    db_row = (1, "Bob Builder", "987-654-3210", "bob@example.com", 50.0, "2023-05-02 14:00:00",
+    db_row = (1, "Bob Builder", "987-654-3210", "bob@example.com", 5000, "2023-05-02 14:00:00",
               '[{"med_id": 2, "qty": 1, "price": 50.0}]')
     sale2 = Sale.from_db_row(db_row)
     print(sale2)
     print("Items from DB:", sale2.get_items())
+
+    breakdown, lines = price_sale(items_sold, Money.of("40.16"),
+                                  {"subtotal": Money.of("43.75"), "discount": Money.of("4.38"),
+                                   "tax": Money.of("0.79"), "discount_rate": "10", "tax_rate": "2"})
+    print(breakdown)
+    for line in lines:
+        print(line)
@@ -5,6 +5,8 @@ class User:
     Represents a user in the PharmaCare system.
     This class acts as a data model for the 'users' table.
     """
+    __slots__ = ("id", "full_name", "email", "password", "created_at")
+
     def __init__(self, full_name, email, password, user_id=None, created_at=None):
         """
         Initializes a User object.
@@ -0,0 +1,27 @@
+# tests/conftest.py
+
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")  # Screens and timers need a QApplication, not a display
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    from PyQt6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def errors():
+    """Errors DBManager reported instead of showing a dialog, as (title, message) pairs."""
+    return []
+
+
+@pytest.fixture
+def db_manager(tmp_path, errors):
+    from database.db_manager import DBManager
+    db_manager = DBManager(str(tmp_path / "pharmacy.db"), error_reporter=lambda title, message: errors.append((title, message)))
+    yield db_manager
+    db_manager.close_db()
@@ -0,0 +1,128 @@
+# tests/test_api_client.py
+
+"""
+Round trips through DBManagerClient to a DBAPIServer on a free port.
+
+Run: python -m pytest tests
+"""
+
+import socket
+
+import pytest
+
+from database.api_client import DBManagerClient, ServerReachability
+from database.api_server import DBAPIServer
+from database.change_feed import ChangeEvent
+from database.db_manager import DBManager
+from models.customer import Customer
+from models.medicine import Medicine
+from models.money import Money
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = DBAPIServer(str(tmp_path / "api.db"), port=0, reader_count=2)
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def errors():
+    return []
+
+
+@pytest.fixture
+def client(server, errors):
+    return DBManagerClient(server.url, error_reporter=lambda title, message: errors.append((title, message)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_write_then_read(client, errors):
+    events = []
+    client.change_feed.subscribe(events.append)
+
+    assert client.connect_db()
+    assert client.add_medicine(Medicine("Panadol", "GSK", "Pain", 12.5, 40))
+    [medicine] = client.get_all_medicines()
+
+    assert medicine.name == "Panadol"
+    assert medicine.price == Money.of("12.50")
+    assert medicine.stock == 40
+    assert client.get_medicine_by_id(medicine.id).name == "Panadol"
+    assert [(event.entity, event.op, event.ids) for event in events] == [("medicines", ChangeEvent.INSERT, (medicine.id,))]
+    assert errors == []
+
+
+def test_update_is_visible_to_other_clients(server, client, errors):
+    assert client.add_customer(Customer(name="Ali Khan", phone="0300 1234567"))
+    [customer] = client.get_all_customers()
+    customer.phone = "0301 7654321"
+    assert client.update_customer(customer)
+
+    other = DBManagerClient(server.url)
+    assert other.get_customer_by_id(customer.id).phone == "0301 7654321"
+    assert errors == []
+
+
+def test_server_error_is_reported_and_default_returned(client, errors):
+    assert client._call("no_such_method", "default") == "default"
+    assert errors and errors[0][0] == "Database Error"
+    assert "no_such_method" in errors[0][1]
+
+
+def test_key_error_inside_a_method_is_a_server_error(client, errors, monkeypatch):
+    def broken(self):
+        raise KeyError("client_ref")
+    monkeypatch.setattr(DBManager, "get_all_medicines", broken)
+
+    assert client.get_all_medicines() == []
+    assert len(errors) == 1
+    assert "KeyError" in errors[0][1] and "Unknown method" not in errors[0][1]
+
+
+def test_database_error_is_relayed_from_the_server(client, errors):
+    assert client.add_customer(Customer(name="Ali Khan", phone="0300 1234567"))
+    assert not client.add_customer(Customer(name="Sara Ali", phone="0300 1234567"))
+    assert [title for title, _ in errors] == ["Customer Error"]
+
+
+def test_unreachable_server_is_reported_once_then_backs_off(errors):
+    client = DBManagerClient(f"http://127.0.0.1:{free_port()}", timeout=0.5,
+                             error_reporter=lambda title, message: errors.append((title, message)))
+    assert client.get_all_medicines() == []
+    assert client.get_medicine_by_id(1) is None
+    assert [title for title, _ in errors] == ["Database Connection Error"]
+    # The second call did not wait: it returned during the backoff period without trying
+    assert client.reachability.down_since is not None
+    assert not client.reachability.should_try()
+
+
+def test_recovers_after_the_backoff(server, errors):
+    reachability = ServerReachability()
+    reachability.failed()
+    reachability.retry_at = 0  # Retry is due
+    client = DBManagerClient(server.url, reachability=reachability,
+                             error_reporter=lambda title, message: errors.append((title, message)))
+    assert client.get_all_medicines() == []
+    assert reachability.down_since is None
+    assert client.new_connection().reachability is reachability
+    assert errors == []
+
+
+def test_data_version_changes_with_every_write(server, client):
+    other = DBManagerClient(server.url)
+    before = client.data_version()
+    assert before is not None
+    assert client.data_version() == before
+
+    assert other.add_medicine(Medicine("Panadol", "GSK", "Pain", 12.5, 40))
+    after = client.data_version()
+    assert after != before
+    other.get_all_medicines()
+    assert client.data_version() == after
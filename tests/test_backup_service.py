@@ -0,0 +1,99 @@
+# tests/test_backup_service.py
+
+import os
+import sqlite3
+
+import pytest
+
+from database.backup_service import BackupService, archive_files
+from models.medicine import Medicine
+
+OLD_SALE_DATES = ["2023-03-01 10:00:00", "2024-06-01 09:00:00"]
+
+
+@pytest.fixture
+def service(db_manager, tmp_path):
+    return BackupService(db_manager.db_name, backup_dir=str(tmp_path / "backups"))
+
+
+@pytest.fixture
+def sales(db_manager):
+    """Two old sales, in 2023 and 2024, plus one of today; returns their IDs."""
+    db_manager.add_medicine(Medicine("Panadol", "GSK", "Pain", 10, 100))
+    med_id = db_manager.conn.execute("SELECT id FROM medicines").fetchone()[0]
+    for _ in range(len(OLD_SALE_DATES) + 1):
+        db_manager.add_sale(None, "Walk-in", "", "", 10, [{"med_id": med_id, "qty": 1, "price": 10, "name": "Panadol"}])
+    ids = [row[0] for row in db_manager.conn.execute("SELECT id FROM sales ORDER BY id")]
+    for sale_id, sale_date in zip(ids, OLD_SALE_DATES):
+        db_manager.conn.execute("UPDATE sales SET sale_date = ? WHERE id = ?", (sale_date, sale_id))
+    db_manager.conn.commit()
+    return ids
+
+
+def all_sale_ids(db_manager):
+    return sorted(sale["id"] for sale in db_manager.get_all_sales(include_archived=True))
+
+
+def test_snapshot_includes_the_archives(db_manager, service, sales):
+    db_manager.archive_old_sales(horizon_days=30)
+
+    path = service.create_snapshot()
+
+    assert sorted(archive_files(path)) == [2023, 2024]
+    ok, message = service.verify_snapshot(path)
+    assert ok, message
+    [snapshot] = service.list_snapshots()
+    assert snapshot["path"] == path
+    assert sorted(snapshot["archives"]) == sorted(archive_files(path).values())
+    assert snapshot["size"] == sum(os.path.getsize(file) for file in [path] + snapshot["archives"])
+    assert not [name for name in os.listdir(service.backup_dir) if name.endswith(".partial")]
+
+
+def test_restore_replaces_the_archives(db_manager, service, sales):
+    db_manager.archive_old_sales(horizon_days=30)
+    path = service.create_snapshot()
+    os.remove(archive_files(db_manager.db_name)[2024])
+
+    service.restore_snapshot(path, db_manager.conn)
+
+    assert db_manager.get_archive_years() == [2023, 2024]
+    assert all_sale_ids(db_manager) == sales
+    assert db_manager.get_sales_archive_summary()["archived_sales"] == 2
+
+
+def test_restore_from_before_archiving_removes_the_archives(db_manager, service, sales):
+    path = service.create_snapshot()
+    db_manager.archive_old_sales(horizon_days=30)
+
+    safety_path = service.restore_snapshot(path, db_manager.conn)
+
+    assert db_manager.get_archive_years() == []
+    assert sorted(sale["id"] for sale in db_manager.get_all_sales()) == sales
+    assert db_manager.get_sales_archive_summary()["archived_sales"] == 0
+    # The safety snapshot kept the archives that were replaced
+    assert sorted(archive_files(safety_path)) == [2023, 2024]
+
+
+def test_snapshot_without_archives_restores_only_while_they_match(db_manager, service, sales):
+    db_manager.archive_old_sales(horizon_days=30)
+    path = service.create_snapshot()
+    for archive in archive_files(path).values():
+        os.remove(archive)  # As taken before archives were saved with the snapshot
+
+    service.restore_snapshot(path, db_manager.conn)
+    assert all_sale_ids(db_manager) == sales
+
+    os.remove(archive_files(db_manager.db_name)[2023])
+    with pytest.raises(sqlite3.DatabaseError, match="without its sales archives"):
+        service.restore_snapshot(path, db_manager.conn)
+    assert db_manager.get_sales_archive_summary()["archived_sales"] == 2
+
+
+def test_prune_removes_the_archives_of_old_snapshots(db_manager, service, sales):
+    db_manager.archive_old_sales(horizon_days=30)
+    service.keep = 1
+    first = service.create_snapshot("auto")
+    second = service.create_snapshot("auto")
+
+    assert [snapshot["path"] for snapshot in service.list_snapshots()] == [second]
+    assert archive_files(first) == {}
@@ -0,0 +1,204 @@
+# tests/test_concurrency.py
+
+"""
+Row versioning and stock updates under concurrent writers.
+
+Several processes hammer the same few medicines and customers at once:
+selling single units, restocking through try_update_medicine with a
+read-modify-write retry loop, and renaming customers. Afterwards the stock
+of every medicine must equal its opening stock plus everything restocked
+minus everything sold, and every row_version must equal the number of
+writes that row received. A lost update breaks one of these invariants.
+"""
+
+import copy
+import multiprocessing
+import random
+import sqlite3
+import time
+
+import pytest
+
+from database.db_manager import DBManager
+from models.customer import Customer
+from models.medicine import Medicine
+
+PROCESSES = 4
+ITERATIONS = 60
+MEDICINE_COUNT = 3
+CUSTOMER_COUNT = 2
+OPENING_STOCK = 1000
+RESTOCK_QTY = 5
+
+
+def _quiet_reporter(title, message):
+    pass  # Lock timeouts are expected here and retried by the worker
+
+
+def _worker(args):
+    """Runs one process's share of the load and returns what it managed to write."""
+    db_name, seed, iterations = args
+    rng = random.Random(seed)
+    db = DBManager(db_name, error_reporter=_quiet_reporter)
+    sold = {}
+    restocked = {}
+    medicine_writes = {}
+    customer_writes = {}
+    conflicts = 0
+
+    for _ in range(iterations):
+        action = rng.random()
+        if action < 0.5:
+            med_id = rng.randint(1, MEDICINE_COUNT)
+            items = [{"med_id": med_id, "qty": 1, "price": 1.0, "name": f"Stress {med_id}"}]
+            while not db.add_sale(None, "Stress", "", "", 1.0, items):
+                time.sleep(0.001)  # Locked; try again
+            sold[med_id] = sold.get(med_id, 0) + 1
+            medicine_writes[med_id] = medicine_writes.get(med_id, 0) + 1
+        elif action < 0.85:
+            med_id = rng.randint(1, MEDICINE_COUNT)
+            while True:
+                medicine = db.get_medicine_by_id(med_id)
+                if medicine is None:
+                    time.sleep(0.001)
+                    continue
+                medicine.stock += RESTOCK_QTY
+                outcome = db.try_update_medicine(medicine)
+                if outcome["status"] == "updated":
+                    break
+                if outcome["status"] == "conflict":
+                    conflicts += 1
+                time.sleep(0.001)
+            restocked[med_id] = restocked.get(med_id, 0) + RESTOCK_QTY
+            medicine_writes[med_id] = medicine_writes.get(med_id, 0) + 1
+        else:
+            customer_id = rng.randint(1, CUSTOMER_COUNT)
+            while True:
+                customer = db.get_customer_by_id(customer_id)
+                if customer is None:
+                    time.sleep(0.001)
+                    continue
+                customer.name = f"Customer {customer_id} (edit {rng.randint(0, 10 ** 6)})"
+                outcome = db.try_update_customer(customer)
+                if outcome["status"] == "updated":
+                    break
+                if outcome["status"] == "conflict":
+                    conflicts += 1
+                time.sleep(0.001)
+            customer_writes[customer_id] = customer_writes.get(customer_id, 0) + 1
+
+    db.close_db()
+    return sold, restocked, medicine_writes, customer_writes, conflicts
+
+
+def _merge_counts(target, counts):
+    for key, value in counts.items():
+        target[key] = target.get(key, 0) + value
+
+
+@pytest.fixture
+def medicine(db_manager):
+    db_manager.add_medicine(Medicine("Panadol", "GSK", "Pain", 10, 100))
+    return copy.copy(db_manager.get_all_medicines()[0])  # Catalog objects are shared and read-only
+
+
+@pytest.fixture
+def customer(db_manager):
+    db_manager.add_customer(Customer(name="Ali Khan", phone="0300 1234567"))
+    return db_manager.get_all_customers()[0]
+
+
+def test_concurrent_writers_lose_no_updates(tmp_path):
+    db_name = str(tmp_path / "stress.db")
+    setup = DBManager(db_name, error_reporter=_quiet_reporter)
+    setup.conn.execute("PRAGMA journal_mode = WAL")  # Persistent; lets readers run beside the writer
+    for i in range(1, MEDICINE_COUNT + 1):
+        setup.add_medicine(Medicine(f"Stress {i}", "Brand", "Stress", 1.0, OPENING_STOCK))
+    for i in range(1, CUSTOMER_COUNT + 1):
+        setup.add_customer(Customer(name=f"Customer {i}", phone=f"000-{i:04d}"))
+    setup.close_db()
+
+    with multiprocessing.get_context("spawn").Pool(PROCESSES) as pool:
+        results = pool.map(_worker, [(db_name, seed, ITERATIONS) for seed in range(PROCESSES)])
+
+    sold, restocked, medicine_writes, customer_writes = {}, {}, {}, {}
+    for worker_sold, worker_restocked, worker_med_writes, worker_cust_writes, _ in results:
+        _merge_counts(sold, worker_sold)
+        _merge_counts(restocked, worker_restocked)
+        _merge_counts(medicine_writes, worker_med_writes)
+        _merge_counts(customer_writes, worker_cust_writes)
+
+    conn = sqlite3.connect(db_name)
+    try:
+        medicines = conn.execute("SELECT id, stock, row_version FROM medicines ORDER BY id").fetchall()
+        customers = conn.execute("SELECT id, row_version FROM customers ORDER BY id").fetchall()
+    finally:
+        conn.close()
+    assert medicines == [(med_id, OPENING_STOCK + restocked.get(med_id, 0) - sold.get(med_id, 0),
+                          1 + medicine_writes.get(med_id, 0)) for med_id in range(1, MEDICINE_COUNT + 1)]
+    assert customers == [(customer_id, 1 + customer_writes.get(customer_id, 0))
+                         for customer_id in range(1, CUSTOMER_COUNT + 1)]
+
+
+def test_stale_medicine_write_from_another_process_is_a_conflict(db_manager, medicine, errors):
+    other = DBManager(db_manager.db_name)
+    try:
+        fresh = other.get_medicine_by_id(medicine.id)
+        fresh.stock = 90
+        assert other.try_update_medicine(fresh)["status"] == "updated"
+    finally:
+        other.close_db()
+
+    medicine.stock = 150
+    outcome = db_manager.try_update_medicine(medicine)
+
+    assert outcome["status"] == "conflict"
+    assert outcome["current"].stock == 90
+    assert outcome["current"].row_version == medicine.row_version + 1
+    assert db_manager.get_medicine_by_id(medicine.id).stock == 90
+    assert errors == []
+
+
+def test_try_update_medicine_bumps_row_version(db_manager, medicine):
+    medicine.stock = 80
+    outcome = db_manager.try_update_medicine(medicine)
+
+    assert outcome["status"] == "updated"
+    assert outcome["current"].stock == 80
+    assert outcome["current"].row_version == medicine.row_version + 1
+    # The version that was read is now stale
+    assert db_manager.try_update_medicine(medicine)["status"] == "conflict"
+
+
+def test_try_update_medicine_without_version_overwrites(db_manager, medicine):
+    db_manager.try_update_medicine(db_manager.get_medicine_by_id(medicine.id))
+    medicine.row_version = None
+    medicine.stock = 70
+
+    assert db_manager.try_update_medicine(medicine)["status"] == "updated"
+    assert db_manager.get_medicine_by_id(medicine.id).stock == 70
+
+
+def test_try_update_medicine_reports_missing_row(db_manager, medicine):
+    db_manager.delete_medicine(medicine.id)
+    outcome = db_manager.try_update_medicine(medicine)
+    assert outcome["status"] == "missing"
+    assert outcome["current"] is None
+
+
+def test_try_update_customer_detects_conflict(db_manager, customer):
+    edited_elsewhere = db_manager.get_customer_by_id(customer.id)
+    edited_elsewhere.name = "Ali Raza"
+    assert db_manager.try_update_customer(edited_elsewhere)["status"] == "updated"
+
+    customer.name = "Ali Hassan"
+    outcome = db_manager.try_update_customer(customer)
+
+    assert outcome["status"] == "conflict"
+    assert outcome["current"].name == "Ali Raza"
+    assert db_manager.get_customer_by_id(customer.id).name == "Ali Raza"
+
+
+def test_try_update_customer_reports_missing_row(db_manager, customer):
+    db_manager.delete_customer(customer.id)
+    assert db_manager.try_update_customer(customer)["status"] == "missing"
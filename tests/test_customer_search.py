@@ -0,0 +1,85 @@
+# tests/test_customer_search.py
+
+import pytest
+
+from models.customer import Customer
+
+CUSTOMERS = [
+    ("Ali Khan", "0300 1234567", "ak@example.com"),
+    ("Alina Shah", "0321-5550000", None),
+    ("Sara Ali", None, "ali.sara@example.com"),
+    ("Khan Traders", "042 111 222 333", None),
+    ("  José  ALVAREZ", "+1 (555) 010-9999", None),
+    ("Bilal Ahmed", "+92 300 1234567", None),
+    ("100% Pure_Water", None, None),
+]
+
+
+@pytest.fixture(params=["fts", "like"])
+def db_manager(request, db_manager):
+    """Runs every search test with the FTS5 word index and with its LIKE fallback."""
+    for name, phone, email in CUSTOMERS:
+        assert db_manager.add_customer(Customer(name=name, phone=phone, email=email))
+    if request.param == "like":
+        db_manager._customer_fts = False
+    elif not db_manager._has_customer_fts():
+        pytest.skip("SQLite was built without FTS5")
+    return db_manager
+
+
+def names(customers):
+    return [customer.name.strip() for customer in customers]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("ali", ["Ali Khan", "Alina Shah", "Sara Ali"]),  # Name prefix before a later word
+    ("Ali Khan", ["Ali Khan"]),
+    ("khan", ["Khan Traders", "Ali Khan"]),
+    ("alv", ["José  ALVAREZ"]),
+    ("JOSE", ["José  ALVAREZ"]),
+    ("ali.s", ["Sara Ali"]),  # Email prefix
+    ("ak@EXAMPLE", ["Ali Khan"]),
+    ("zzz", []),
+    ("   ", []),
+])
+def test_text_queries_rank_exact_then_prefix_then_word_then_email(db_manager, query, expected):
+    assert names(db_manager.find_customers(query)) == expected
+
+
+def test_wildcards_are_matched_literally(db_manager):
+    assert names(db_manager.find_customers("%")) == []
+    assert names(db_manager.find_customers("_")) == []
+    assert names(db_manager.find_customers("100%")) == ["100% Pure_Water"]
+    assert names(db_manager.find_customers("pure_w")) == ["100% Pure_Water"]
+    assert names(db_manager.find_customers("purexw")) == []
+
+
+def test_phone_queries_rank_exact_then_caller_id_then_prefix(db_manager):
+    # Exact digits first; the same number with a country code matches on its last digits
+    assert names(db_manager.find_customers("0300-123-4567")) == ["Ali Khan", "Bilal Ahmed"]
+    assert names(db_manager.find_customers("+92 300 1234567")) == ["Bilal Ahmed", "Ali Khan"]
+    assert names(db_manager.find_customers("0321")) == ["Alina Shah"]
+    assert names(db_manager.find_customers("9999")) == ["José  ALVAREZ"]  # Ends in it
+
+
+def test_limit(db_manager):
+    assert names(db_manager.find_customers("ali", limit=2)) == ["Ali Khan", "Alina Shah"]
+
+
+def test_caller_id_needs_a_unique_match(db_manager):
+    assert db_manager.find_customer_by_phone("03215550000").name == "Alina Shah"
+    assert db_manager.find_customer_by_phone("300 1234567") is None  # Ali Khan and Bilal Ahmed
+    assert db_manager.find_customer_by_phone("no digits") is None
+
+
+def test_edits_update_the_lookup_keys(db_manager):
+    customer = db_manager.find_customers("khan traders")[0]
+    customer.name = "Zafar Stores"
+    customer.phone = "042 999 888 777"
+    assert db_manager.try_update_customer(customer)["status"] == "updated"
+
+    assert names(db_manager.find_customers("khan")) == ["Ali Khan"]
+    assert names(db_manager.find_customers("stores")) == ["Zafar Stores"]
+    assert db_manager.find_customer_by_phone("042999888777").name == "Zafar Stores"
+    db_manager.delete_customer(customer.id)
+    assert db_manager.find_customers("zafar") == []
@@ -0,0 +1,72 @@
+# tests/test_email_suggestions.py
+
+import pytest
+
+from ui.email_suggestions import EmailSuggestions
+
+
+@pytest.fixture
+def suggestions():
+    store = EmailSuggestions(capacity=3)
+    store.load(["sara@pharmacare.pk", "Admin@Gmail.com", "ali@gmail.com"])  # Most recently used first
+    return store
+
+
+def test_load_keeps_recency_order(suggestions):
+    assert suggestions.emails() == ["sara@pharmacare.pk", "Admin@Gmail.com", "ali@gmail.com"]
+    assert len(suggestions) == 3
+
+
+def test_completes_address_and_domain_case_insensitively(suggestions):
+    assert suggestions.complete("ADM") == ["Admin@Gmail.com"]
+    assert suggestions.complete("gmail") == ["Admin@Gmail.com", "ali@gmail.com"]
+    assert suggestions.complete("  pharma") == ["sara@pharmacare.pk"]
+    assert suggestions.complete("x") == []
+    assert suggestions.complete("") == suggestions.emails()
+    assert suggestions.complete("a", limit=1) == ["Admin@Gmail.com"]
+
+
+def test_touch_moves_an_email_to_the_front(suggestions):
+    suggestions.touch("ali@gmail.com")
+    assert suggestions.emails() == ["ali@gmail.com", "sara@pharmacare.pk", "Admin@Gmail.com"]
+    assert suggestions.complete("gmail") == ["ali@gmail.com", "Admin@Gmail.com"]
+
+
+def test_least_recently_used_is_evicted_beyond_capacity(suggestions):
+    suggestions.touch("zara@outlook.com")
+
+    assert suggestions.emails() == ["zara@outlook.com", "sara@pharmacare.pk", "Admin@Gmail.com"]
+    assert suggestions.complete("ali") == []
+    assert suggestions.complete("gmail") == ["Admin@Gmail.com"]
+    assert suggestions.complete("outlook") == ["zara@outlook.com"]
+
+
+def test_eviction_prunes_the_trie():
+    store = EmailSuggestions(capacity=1)
+    store.touch("first@example.com")
+    store.touch("second@test.org")
+
+    assert store.complete("f") == []
+    assert store.complete("example") == []
+    assert set(store._root.children) == {"s", "t"}
+
+
+def test_email_sharing_a_prefix_with_its_domain_is_counted_once():
+    store = EmailSuggestions(capacity=2)
+    store.touch("gm@gmail.com")  # Indexed twice under "g"
+    assert store.complete("gm") == ["gm@gmail.com"]
+
+    store.touch("a@b.pk")
+    store.touch("c@d.pk")
+    assert store.complete("g") == []
+    assert "g" not in store._root.children
+
+
+def test_matches_the_login_history_order(db_manager):
+    for email in ("ali@gmail.com", "Admin@Gmail.com", "sara@pharmacare.pk", "ali@gmail.com"):
+        db_manager.add_login_email(email)
+    store = EmailSuggestions(capacity=20)
+    store.load(db_manager.get_login_emails())
+
+    assert store.emails() == ["ali@gmail.com", "sara@pharmacare.pk", "Admin@Gmail.com"]
+    assert store.complete("gmail") == ["ali@gmail.com", "Admin@Gmail.com"]
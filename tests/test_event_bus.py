@@ -0,0 +1,167 @@
+# tests/test_event_bus.py
+
+import pytest
+
+from database.change_feed import ChangeEvent, ChangeFeed
+from ui.event_bus import EventBus, LazyRefreshMixin, coalesce_events
+
+
+def update(entity, *ids, fields=("stock",)):
+    return ChangeEvent(entity, ChangeEvent.UPDATE, ids, fields)
+
+
+def summary(events):
+    return [(event.entity, event.op, event.ids, event.fields) for event in events]
+
+
+def test_coalesce_merges_only_neighbours():
+    events = [update("medicines", 1), update("medicines", 2), update("medicines", 1),
+              ChangeEvent("medicines", ChangeEvent.DELETE, [2]), update("medicines", 3),
+              update("customers", 7)]
+
+    assert summary(coalesce_events(events)) == [
+        ("medicines", "update", (1, 2), ("stock",)),
+        ("medicines", "delete", (2,), None),
+        ("medicines", "update", (3,), ("stock",)),
+        ("customers", "update", (7,), ("stock",)),
+    ]
+
+
+def test_coalesce_unions_fields_and_keeps_any_column():
+    assert summary(coalesce_events([update("medicines", 1), update("medicines", 2, fields=("price_minor", "stock"))])) \
+        == [("medicines", "update", (1, 2), ("stock", "price_minor"))]
+    assert summary(coalesce_events([update("medicines", 1), update("medicines", 2, fields=None),
+                                    update("medicines", 3)])) == [("medicines", "update", (1, 2, 3), None)]
+    assert coalesce_events([]) == []
+
+
+@pytest.fixture
+def feed():
+    return ChangeFeed()
+
+
+@pytest.fixture
+def bus(qapp, feed):
+    return EventBus(feed)
+
+
+@pytest.fixture
+def screen(qapp):
+    from PyQt6.QtWidgets import QWidget
+    widget = QWidget()
+    yield widget
+    widget.close()
+
+
+def test_a_burst_is_delivered_once_per_pass_of_the_event_loop(qapp, bus, feed, screen):
+    screen.show()
+    batches = []
+    bus.subscribe(batches.append, ["medicines"], screen, batch=True)
+
+    for med_id in range(100):
+        feed.publish(update("medicines", med_id))
+    feed.publish(update("customers", 1))  # Not subscribed
+    assert batches == []
+    qapp.processEvents()
+
+    assert summary(batches[0]) == [("medicines", "update", tuple(range(100)), ("stock",))]
+    assert len(batches) == 1
+    assert bus.stats()["events_coalesced"] == 99
+
+
+def test_events_for_a_hidden_screen_are_held_until_it_is_shown(qapp, bus, feed, screen):
+    received = []
+    bus.subscribe(received.append, ["medicines"], screen)
+
+    for med_id in (1, 2, 1):
+        feed.publish(update("medicines", med_id))
+        qapp.processEvents()
+    assert received == []
+    assert bus.stats()["held_events"] == 1
+
+    screen.show()
+    assert summary(received) == [("medicines", "update", (1, 2), ("stock",))]
+    assert bus.stats()["held_events"] == 0
+
+
+def test_a_broken_callback_does_not_stop_the_others(qapp, bus, feed):
+    received = []
+
+    def broken(event):
+        raise RuntimeError("boom")
+
+    bus.subscribe(broken)
+    bus.subscribe(received.append)
+    feed.publish(update("medicines", 1))
+    qapp.processEvents()
+    assert len(received) == 1
+
+
+def test_discard_held_drops_the_events_of_a_screen(qapp, bus, feed, screen):
+    received = []
+    bus.subscribe(received.append, screen=screen)
+    feed.publish(update("medicines", 1))
+    bus.flush()
+
+    bus.discard_held(screen)
+    screen.show()
+    assert received == []
+
+
+@pytest.fixture
+def lazy_screen(qapp, bus):
+    from PyQt6.QtWidgets import QWidget
+
+    class Screen(LazyRefreshMixin, QWidget):
+        def __init__(self):
+            super().__init__()
+            self.event_bus = bus
+            self.refreshes = 0
+
+        def refresh_screen(self):
+            self.refreshes += 1
+
+    widget = Screen()
+    yield widget
+    widget.close()
+
+
+def test_hidden_screen_reloads_once_when_shown(lazy_screen):
+    lazy_screen.mark_stale()
+    lazy_screen.mark_stale()
+    assert (lazy_screen.refreshes, lazy_screen.refreshes_deferred) == (0, 2)
+
+    lazy_screen.show()
+    assert lazy_screen.refresh_if_stale()
+    assert not lazy_screen.refresh_if_stale()
+    assert lazy_screen.refreshes == 1
+
+
+def test_visible_screen_reloads_at_once(lazy_screen):
+    lazy_screen.show()
+    lazy_screen.mark_stale()
+    assert lazy_screen.refreshes == 1
+    assert not lazy_screen.stale
+
+
+def test_marking_stale_discards_held_row_patches(qapp, bus, feed, lazy_screen):
+    patches = []
+    bus.subscribe(patches.append, screen=lazy_screen)
+    feed.publish(update("medicines", 1))
+    bus.flush()
+
+    lazy_screen.mark_stale()
+    lazy_screen.show()
+    assert patches == []
+
+
+def test_screen_without_refresh_screen_fails_on_lookup(qapp):
+    from PyQt6.QtWidgets import QWidget
+
+    class Incomplete(LazyRefreshMixin, QWidget):
+        pass
+
+    widget = Incomplete()
+    widget.stale = True
+    with pytest.raises(AttributeError):
+        widget.refresh_if_stale()
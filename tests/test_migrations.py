@@ -0,0 +1,94 @@
+# tests/test_migrations.py
+
+import json
+import sqlite3
+
+import pytest
+
+from database.migrations import MIGRATIONS, MigrationRunner, _v1_initial_tables
+
+ITEMS = [{"med_id": 1, "qty": 2, "price": 12.5, "name": "Panadol"},
+         {"med_id": 2, "qty": 1, "price": 5.0, "name": "Calpol"}]
+
+
+@pytest.fixture
+def baseline_conn(tmp_path):
+    """A database as the application created it before migrations existed: version 0, with data."""
+    conn = sqlite3.connect(str(tmp_path / "pharmacy.db"))
+    _v1_initial_tables(conn.cursor())
+    conn.executemany("INSERT INTO medicines (name, brand, category, price, stock, expiry_date) VALUES (?, ?, ?, ?, ?, ?)",
+                     [("Panadol", "GSK", "Pain", 12.5, 40, "2030-01-10"), ("Calpol", "GSK", "Pain", 19.99, 10, None)])
+    conn.executemany("INSERT INTO customers (name, phone) VALUES (?, ?)",
+                     [("  José  ALVAREZ", "+92 (300) 123-4567"), ("Ali Khan", None)])
+    conn.executemany("INSERT INTO sales (customer_name, total_amount, sale_date, items_json) VALUES (?, ?, ?, ?)",
+                     [("Walk-in", 28.0, "2024-01-05 10:00:00", json.dumps(ITEMS)),
+                      ("Walk-in", 10.0, "2024-01-06 10:00:00", "not json")])
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def test_baseline_database_migrates_to_latest(baseline_conn):
+    runner = MigrationRunner(baseline_conn, chunk_size=1, chunk_pause=0)
+
+    applied = runner.run()
+
+    assert [version for version, _, _ in applied] == [migration.version for migration in MIGRATIONS]
+    assert runner.current_version() == runner.latest_version == MIGRATIONS[-1].version
+    assert runner.pending() == []
+    assert runner.run() == []  # Nothing left to apply
+    assert baseline_conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    assert baseline_conn.execute("SELECT COUNT(*) FROM medicines").fetchone()[0] == 2
+
+
+def test_newer_database_is_left_alone(baseline_conn):
+    baseline_conn.execute(f"PRAGMA user_version = {MIGRATIONS[-1].version + 1}")
+    assert MigrationRunner(baseline_conn).run() == []
+
+
+def test_money_moves_to_minor_units(baseline_conn):
+    MigrationRunner(baseline_conn, chunk_size=1, chunk_pause=0).run()
+
+    assert baseline_conn.execute("SELECT price_minor FROM medicines ORDER BY id").fetchall() == [(1250,), (1999,)]
+    assert baseline_conn.execute("SELECT total_amount_minor FROM sales ORDER BY id").fetchall() == [(2800,), (1000,)]
+    assert "price" not in columns(baseline_conn, "medicines")
+    assert "total_amount" not in columns(baseline_conn, "sales")
+
+
+def test_sale_pricing_and_items_are_backfilled(baseline_conn):
+    MigrationRunner(baseline_conn, chunk_size=1, chunk_pause=0).run()
+
+    # Items add up to 30.00 and 28.00 was charged: the difference is recorded as a discount
+    assert baseline_conn.execute(
+        "SELECT subtotal_minor, discount_minor, tax_minor FROM sales WHERE id = 1").fetchone() == (3000, 200, 0)
+    lines = baseline_conn.execute(
+        "SELECT line_no, med_id, qty, unit_price_minor, subtotal_minor, discount_minor, net_minor "
+        "FROM sale_items WHERE sale_id = 1 ORDER BY line_no").fetchall()
+    assert lines == [(1, 1, 2, 1250, 2500, 167, 2333), (2, 2, 1, 500, 500, 33, 467)]
+    # Unreadable items do not stop the migration; the whole amount counts as subtotal
+    assert baseline_conn.execute(
+        "SELECT subtotal_minor, discount_minor, tax_minor FROM sales WHERE id = 2").fetchone() == (1000, 0, 0)
+    assert baseline_conn.execute("SELECT COUNT(*) FROM sale_items WHERE sale_id = 2").fetchone()[0] == 0
+
+
+def test_stock_aggregates_are_built_from_existing_medicines(baseline_conn):
+    MigrationRunner(baseline_conn, chunk_size=1, chunk_pause=0).run()
+
+    assert baseline_conn.execute(
+        "SELECT category, brand, sku_count, units, retail_value_minor, uncosted_units FROM stock_valuation"
+    ).fetchall() == [("Pain", "GSK", 2, 50, 40 * 1250 + 10 * 1999, 50)]
+    # 2030-01-10 is a Thursday; its week starts on Monday the 7th
+    assert baseline_conn.execute("SELECT week_start, sku_count, units FROM expiry_buckets").fetchall() == [
+        ("2030-01-07", 1, 40)]
+
+
+def test_customer_lookup_keys_are_backfilled(baseline_conn):
+    MigrationRunner(baseline_conn, chunk_size=1, chunk_pause=0).run()
+
+    assert baseline_conn.execute(
+        "SELECT name_key, phone_digits, phone_digits_rev FROM customers ORDER BY id").fetchall() == [
+        ("jose alvarez", "923001234567", "765432100329"), ("ali khan", None, None)]
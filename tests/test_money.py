@@ -0,0 +1,75 @@
+# tests/test_money.py
+
+from decimal import Decimal
+
+import pytest
+
+from models.money import Money
+
+
+@pytest.mark.parametrize("amount, minor", [
+    ("12.50", 1250),
+    (12.5, 1250),
+    (0.1, 10),
+    (Decimal("19.99"), 1999),
+    (7, 700),
+    (" 3.2 ", 320),
+    ("0.005", 1),  # Halves round up, away from zero
+    ("-0.005", -1),
+    ("1.004", 100),
+    (2.675, 268),  # The float's shortest repr is 2.675, not 2.67499999...
+])
+def test_of_rounds_to_the_paisa(amount, minor):
+    assert Money.of(amount).minor == minor
+
+
+@pytest.mark.parametrize("amount", ["", "abc", None, float("nan"), float("inf")])
+def test_of_rejects_non_amounts(amount):
+    with pytest.raises(ValueError):
+        Money.of(amount)
+
+
+def test_sums_do_not_drift():
+    assert sum([Money.of(0.1)] * 3) == Money.of("0.30")
+    assert Money.of("12.50") + Money.of(0.1) * 3 == Money.of("12.80")
+
+
+@pytest.mark.parametrize("amount, rate, expected", [
+    ("100.00", "10", "10.00"),
+    ("3751.65", Decimal("7.5"), "281.37"),  # 281.37375
+    ("0.50", "5", "0.03"),  # 0.025 rounds half up
+    ("0.10", "17", "0.02"),  # 0.017
+    ("19.99", "0", "0.00"),
+])
+def test_percentage_rounds_half_up(amount, rate, expected):
+    assert Money.of(amount).percentage(rate) == Money.of(expected)
+
+
+def test_allocate_adds_up_exactly():
+    parts = Money.of("10.00").allocate([1, 1, 1])
+    assert parts == [Money.of("3.34"), Money.of("3.33"), Money.of("3.33")]
+    assert sum(parts) == Money.of("10.00")
+
+
+def test_allocate_gives_leftover_paisa_to_largest_remainders():
+    parts = Money(100).allocate([Money(1), Money(2), Money(2)])
+    # Shares are 20, 40 and 40 exactly
+    assert parts == [Money(20), Money(40), Money(40)]
+    parts = Money(10).allocate([2, 3, 2])
+    # 2.857..., 4.285..., 2.857...: the two paisa left over go to the largest remainders
+    assert parts == [Money(3), Money(4), Money(3)]
+    # On a tie the earliest part gets the paisa
+    assert Money(1).allocate([1, 1]) == [Money(1), Money(0)]
+
+
+def test_allocate_negative_and_degenerate_weights():
+    assert Money(-10).allocate([1, 1, 1]) == [Money(-4), Money(-3), Money(-3)]
+    assert Money(500).allocate([0, 0]) == [Money(500), Money(0)]
+    assert Money(500).allocate([]) == []
+
+
+def test_formatting():
+    price = Money.of("1250.5")
+    assert str(price) == "1250.50"
+    assert f"{price:>10,.2f}" == "  1,250.50"
+    assert float(price) == 1250.5
@@ -0,0 +1,90 @@
+# tests/test_sale_outbox.py
+
+from database.sale_outbox import SaleOutbox, SaleSyncWorker
+from models.medicine import Medicine
+
+
+def add_medicine(db_manager, stock):
+    db_manager.add_medicine(Medicine("Panadol", "GSK", "Pain", 5, stock))
+    return db_manager.conn.execute("SELECT id FROM medicines WHERE name = 'Panadol'").fetchone()[0]
+
+
+def queued_sale(med_id, qty):
+    return {"customer_id": None, "customer_name": "Walk-in", "customer_phone": "", "customer_email": "",
+            "total_amount": 5 * qty, "items": [{"med_id": med_id, "qty": qty, "price": 5, "name": "Panadol"}]}
+
+
+def stock(db_manager, med_id):
+    return db_manager.conn.execute("SELECT stock FROM medicines WHERE id = ?", (med_id,)).fetchone()[0]
+
+
+def sale_count(db_manager):
+    return db_manager.conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0]
+
+
+def test_replay_is_idempotent(db_manager, tmp_path):
+    med_id = add_medicine(db_manager, 10)
+    outbox = SaleOutbox(str(tmp_path / "outbox.db"))
+    sale = outbox.enqueue(queued_sale(med_id, 3))
+
+    first = db_manager.record_queued_sale(sale)
+    again = db_manager.record_queued_sale(sale)
+
+    assert first["status"] == "recorded"
+    assert again == {"status": "recorded", "sale_id": first["sale_id"], "message": "Already recorded."}
+    assert sale_count(db_manager) == 1
+    assert stock(db_manager, med_id) == 7
+    outbox.close()
+
+
+def test_counter_rejects_but_replay_records_a_conflict(db_manager):
+    med_id = add_medicine(db_manager, 2)
+    sale = dict(queued_sale(med_id, 5), client_ref="counter")
+    assert db_manager.record_queued_sale(sale)["status"] == "rejected"
+    assert sale_count(db_manager) == 0
+
+    outcome = db_manager.record_queued_sale(dict(sale, client_ref="replay"), allow_oversell=True)
+    assert outcome["status"] == "conflict"
+    assert stock(db_manager, med_id) == 0  # Floored, not negative
+
+
+def test_worker_replays_in_order_and_skips_in_flight(qapp, db_manager, tmp_path):
+    med_id = add_medicine(db_manager, 10)
+    path = str(tmp_path / "outbox.db")
+    outbox = SaleOutbox(path)
+    first = outbox.enqueue(queued_sale(med_id, 1))
+    second = outbox.enqueue(queued_sale(med_id, 2))
+    at_counter = outbox.enqueue(queued_sale(med_id, 4), in_flight=True)
+
+    worker = SaleSyncWorker(db_manager, path, interval_ms=60000)
+    synced = []
+    worker.sale_synced.connect(lambda client_ref, sale_id: synced.append(client_ref))
+    worker.start()
+    try:
+        assert synced == [first["client_ref"], second["client_ref"]]
+        assert outbox.pending_count() == 0
+        assert stock(db_manager, med_id) == 7  # The in-flight sale was left to the counter
+
+        # The counter could not reach the database: the sale goes back to the worker
+        outbox.record_failed_attempt(at_counter["client_ref"], "locked")
+        assert outbox.pending_count() == 1
+        worker.sync_now()
+        assert synced[-1] == at_counter["client_ref"]
+        assert stock(db_manager, med_id) == 3
+        assert sale_count(db_manager) == 3
+    finally:
+        worker.stop()
+        outbox.close()
+
+
+def test_in_flight_sales_are_requeued_after_a_restart(tmp_path):
+    path = str(tmp_path / "outbox.db")
+    outbox = SaleOutbox(path)
+    outbox.enqueue(queued_sale(1, 1), in_flight=True)
+    outbox.close()
+
+    outbox = SaleOutbox(path)
+    assert outbox.pending_count() == 0
+    assert outbox.requeue_in_flight() == 1
+    assert [sale["items"][0]["qty"] for _, sale in outbox.pending()] == [1]
+    outbox.close()
@@ -0,0 +1,81 @@
+# tests/test_sale_pricing.py
+
+from datetime import datetime
+
+import pytest
+
+from models.medicine import Medicine
+from models.money import Money
+from models.sale import price_sale
+
+ITEMS = [{"med_id": 1, "name": "Paracetamol", "qty": 2, "price": 12.5},
+         {"med_id": 3, "name": "Vitamin D3", "qty": 1, "price": 18.75}]
+# 43.75 less 10% (4.38) plus 2% tax on the rest (0.79)
+COUNTER_PRICING = {"subtotal": Money.of("43.75"), "discount": Money.of("4.38"), "tax": Money.of("0.79"),
+                   "discount_rate": "10", "tax_rate": "2"}
+
+
+def test_lines_add_up_to_the_sale():
+    breakdown, lines = price_sale(ITEMS, Money.of("40.16"), COUNTER_PRICING)
+
+    assert breakdown == {"subtotal": Money.of("43.75"), "discount": Money.of("4.38"), "tax": Money.of("0.79"),
+                         "discount_rate": "10", "tax_rate": "2"}
+    assert [line["subtotal"] for line in lines] == [Money.of("25.00"), Money.of("18.75")]
+    assert [line["discount"] for line in lines] == [Money.of("2.50"), Money.of("1.88")]
+    assert [line["tax"] for line in lines] == [Money.of("0.45"), Money.of("0.34")]
+    assert sum(line["discount"] for line in lines) == breakdown["discount"]
+    assert sum(line["tax"] for line in lines) == breakdown["tax"]
+    assert sum(line["net"] for line in lines) == Money.of("40.16")
+
+
+@pytest.mark.parametrize("total, discount, tax", [
+    ("40.00", "3.75", "0.00"),
+    ("45.00", "0.00", "1.25"),
+    ("43.75", "0.00", "0.00"),
+])
+def test_without_pricing_the_difference_is_a_discount_or_tax(total, discount, tax):
+    breakdown, lines = price_sale(ITEMS, total)
+
+    assert (breakdown["discount"], breakdown["tax"]) == (Money.of(discount), Money.of(tax))
+    assert breakdown["discount_rate"] is None and breakdown["tax_rate"] is None
+    assert sum(line["net"] for line in lines) == Money.of(total)
+
+
+def test_pricing_that_does_not_add_up_is_rejected():
+    with pytest.raises(ValueError, match="subtotal"):
+        price_sale(ITEMS, "40.16", dict(COUNTER_PRICING, subtotal=Money.of("43.00")))
+    with pytest.raises(ValueError, match="total"):
+        price_sale(ITEMS, "40.00", COUNTER_PRICING)
+
+
+def test_sale_is_stored_with_its_lines(db_manager, errors):
+    for name, price in (("Paracetamol", 12.5), ("Cough Syrup", 5), ("Vitamin D3", 18.75)):
+        db_manager.add_medicine(Medicine(name, "Brand", "General", price, 50))
+
+    assert db_manager.add_sale(None, "Walk-in", "", "", Money.of("40.16"), ITEMS, pricing=COUNTER_PRICING)
+
+    sale_row = db_manager.conn.execute(
+        "SELECT id, subtotal_minor, discount_minor, tax_minor, total_amount_minor, discount_rate, tax_rate "
+        "FROM sales").fetchone()
+    assert sale_row[1:] == (4375, 438, 79, 4016, "10", "2")
+    lines = db_manager.conn.execute(
+        "SELECT line_no, med_id, qty, unit_price_minor, subtotal_minor, discount_minor, tax_minor, net_minor "
+        "FROM sale_items WHERE sale_id = ? ORDER BY line_no", (sale_row[0],)).fetchall()
+    assert lines == [(1, 1, 2, 1250, 2500, 250, 45, 2295), (2, 3, 1, 1875, 1875, 188, 34, 1721)]
+
+    today = datetime.now().strftime("%Y-%m-%d")
+    [day] = db_manager.get_sales_tax_summary(today, today)
+    assert (day["subtotal"], day["discount"], day["tax"], day["total"]) == (
+        Money.of("43.75"), Money.of("4.38"), Money.of("0.79"), Money.of("40.16"))
+    assert errors == []
+
+
+def test_sale_with_inconsistent_pricing_is_not_stored(db_manager, errors):
+    db_manager.add_medicine(Medicine("Paracetamol", "Brand", "General", 12.5, 50))
+    items = ITEMS[:1]
+
+    assert not db_manager.add_sale(None, "Walk-in", "", "", Money.of("20.00"), items,
+                                   pricing={"subtotal": "25.00", "discount": "2.50", "tax": "0"})
+    assert db_manager.conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0] == 0
+    assert db_manager.get_medicine_by_id(1).stock == 50
+    assert [title for title, _ in errors] == ["Sale Error"]
@@ -0,0 +1,68 @@
+# tests/test_sales_archive.py
+
+from datetime import datetime
+
+import pytest
+
+from models.medicine import Medicine
+
+SALE_DATES = ["2023-03-01 10:00:00", "2023-06-30 23:00:00", "2023-07-01", "2024-06-01 09:00:00"]
+
+
+@pytest.fixture
+def sales(db_manager):
+    """Four old sales of 10.00 each plus one of today, oldest first; returns their IDs."""
+    db_manager.add_medicine(Medicine("Panadol", "GSK", "Pain", 10, 100))
+    med_id = db_manager.conn.execute("SELECT id FROM medicines").fetchone()[0]
+    for _ in range(len(SALE_DATES) + 1):
+        db_manager.add_sale(None, "Walk-in", "", "", 10, [{"med_id": med_id, "qty": 1, "price": 10, "name": "Panadol"}])
+    ids = [row[0] for row in db_manager.conn.execute("SELECT id FROM sales ORDER BY id")]
+    for sale_id, sale_date in zip(ids, SALE_DATES):
+        db_manager.conn.execute("UPDATE sales SET sale_date = ? WHERE id = ?", (sale_date, sale_id))
+    db_manager.conn.commit()
+    return ids
+
+
+def sale_ids(sales_list):
+    return sorted(sale["id"] for sale in sales_list)
+
+
+def test_archive_moves_old_sales_into_yearly_files(db_manager, sales, errors):
+    total_before = float(db_manager.get_total_sales_amount())
+
+    assert db_manager.archive_old_sales(horizon_days=30, batch_size=2) == 4
+    assert db_manager.get_archive_years() == [2023, 2024]
+    assert sale_ids(db_manager.get_all_sales()) == sales[4:]
+    assert sale_ids(db_manager.get_all_sales(include_archived=True)) == sales
+
+    summary = db_manager.get_sales_archive_summary()
+    assert summary["archived_sales"] == 4
+    assert float(summary["archived_amount"]) == 40
+    assert summary["archived_through"] == "2024-06-01"
+    assert float(db_manager.get_total_sales_amount()) == total_before
+    assert errors == []
+
+
+def test_archiving_again_moves_nothing(db_manager, sales):
+    db_manager.archive_old_sales(horizon_days=30)
+    assert db_manager.archive_old_sales(horizon_days=30) == 0
+    assert db_manager.get_sales_archive_summary()["archived_sales"] == 4
+
+
+def test_date_range_reads_only_the_archives_it_reaches(db_manager, sales):
+    db_manager.archive_old_sales(horizon_days=30)
+    today = datetime.now().strftime("%Y-%m-%d")
+
+    assert sale_ids(db_manager.get_sales_in_date_range("2023-06-30", "2023-06-30")) == [sales[1]]
+    assert sale_ids(db_manager.get_sales_in_date_range("2023-01-01", "2024-12-31")) == sales[:4]
+    assert sale_ids(db_manager.get_sales_in_date_range("2023-06-01", today)) == sales[1:]
+    assert sale_ids(db_manager.get_sales_in_date_range(today, today)) == [sales[4]]
+
+
+@pytest.mark.parametrize("archived", [False, True])
+def test_end_date_is_exclusive_of_the_next_day(db_manager, sales, archived):
+    # The sale dated exactly "2023-07-01" belongs to that day, not to a range ending 2023-06-30
+    if archived:
+        db_manager.archive_old_sales(horizon_days=30)
+    assert sale_ids(db_manager.get_sales_in_date_range("2023-06-01", "2023-06-30")) == [sales[1]]
+    assert sale_ids(db_manager.get_sales_in_date_range("2023-07-01", "2023-07-01")) == [sales[2]]
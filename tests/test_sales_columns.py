@@ -0,0 +1,86 @@
+# tests/test_sales_columns.py
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import sales_columns
+from models.medicine import Medicine
+
+pytest.importorskip("numpy")
+
+TODAY = datetime.now()
+
+
+def day(offset):
+    return (TODAY + timedelta(days=offset)).strftime("%Y-%m-%d")
+
+
+# (days ago, [(medicine index, qty)]); a medicine may appear twice in one sale
+SALES = [
+    (800, [(0, 1), (1, 2)]),  # Archived
+    (500, [(0, 3)]),  # Archived
+    (20, [(0, 1), (2, 4), (0, 2)]),
+    (10, [(1, 1)]),
+    (10, [(2, 2), (1, 5)]),
+    (0, [(0, 1)]),
+]
+RANGES = [(-900, 0), (-30, 0), (-10, -10), (-600, -400), (-9, -1), (1, 5)]
+
+
+@pytest.fixture
+def sales(db_manager):
+    for name, price in (("Panadol", 12.5), ("Calpol", 19.99), ("Brufen", 7.25)):
+        db_manager.add_medicine(Medicine(name, "Brand", "Pain", price, 1000))
+    med_ids = sorted(medicine.id for medicine in db_manager.get_all_medicines())
+    prices = {medicine.id: medicine.price for medicine in db_manager.get_all_medicines()}
+    for days_ago, lines in SALES:
+        items = [{"med_id": med_ids[index], "qty": qty, "price": prices[med_ids[index]], "name": f"#{index}"}
+                 for index, qty in lines]
+        total = sum((item["price"] * item["qty"] for item in items), 0)
+        assert db_manager.add_sale(None, "Walk-in", "", "", total, items)
+        sale_id = db_manager.conn.execute("SELECT MAX(id) FROM sales").fetchone()[0]
+        db_manager.conn.execute("UPDATE sales SET sale_date = ? WHERE id = ?", (f"{day(-days_ago)} 10:00:00", sale_id))
+        db_manager.conn.commit()
+    db_manager.archive_old_sales(horizon_days=365)
+    sales_columns.sales_column_store(db_manager.db_name).reset()  # Sale dates never change in the application
+
+
+def by_medicine(db_manager, start, end):
+    return sorted((row["med_id"], row["name"], row["qty"], row["sale_count"], row["revenue"])
+                  for row in db_manager.get_sales_by_medicine(day(start), day(end)))
+
+
+def test_column_store_matches_sql(db_manager, sales, monkeypatch, errors):
+    from_columns = {(start, end): by_medicine(db_manager, start, end) for start, end in RANGES}
+    assert sales_columns.sales_column_store(db_manager.db_name).loaded
+
+    monkeypatch.setattr(sales_columns, "np", None)  # As if NumPy were not installed
+    assert sales_columns.sales_column_store(db_manager.db_name) is None
+    from_sql = {(start, end): by_medicine(db_manager, start, end) for start, end in RANGES}
+
+    assert from_columns == from_sql
+    assert from_columns[(-900, 0)][0][2:4] == (8, 4)  # Panadol: 8 units in 4 sales, one with two lines of it
+    assert from_columns[(1, 5)] == []
+    assert errors == []
+
+
+def test_store_picks_up_new_sales(db_manager, sales):
+    before = by_medicine(db_manager, 0, 0)
+    medicine = db_manager.get_all_medicines()[0]
+    db_manager.add_sale(None, "Walk-in", "", "", medicine.price * 2,
+                        [{"med_id": medicine.id, "qty": 2, "price": medicine.price, "name": medicine.name}])
+
+    after = {row[0]: row for row in by_medicine(db_manager, 0, 0)}
+    previous = {row[0]: row for row in before}
+    assert after[medicine.id][2] == previous.get(medicine.id, (None, None, 0))[2] + 2
+
+
+def test_store_reloads_after_archiving(db_manager, sales):
+    store = sales_columns.sales_column_store(db_manager.db_name)
+    by_medicine(db_manager, -30, 0)
+    loads = store.loads
+
+    db_manager.archive_old_sales(horizon_days=15)
+    assert by_medicine(db_manager, -30, 0)  # Now partly read from the archive
+    assert store.loads == loads + 1
@@ -0,0 +1,127 @@
+# tests/test_stock_triggers.py
+
+"""
+The trigger-maintained stock aggregates must always equal what a full scan
+of medicines gives.
+"""
+
+import copy
+from datetime import datetime, timedelta
+
+import pytest
+
+from models.medicine import Medicine
+
+TODAY = datetime.now()
+
+
+def days(n):
+    return (TODAY + timedelta(days=n)).strftime("%Y-%m-%d")
+
+
+@pytest.fixture
+def medicines(db_manager):
+    """Medicines across two groups, with and without cost prices and expiry dates; returns their IDs."""
+    for medicine in [
+        Medicine("Panadol", "GSK", "Pain", 12.5, 40, expiry_date=days(3), cost_price=8),
+        Medicine("Calpol", "GSK", "Pain", 19.99, 10, expiry_date=days(40)),
+        Medicine("Brufen", "Abbott", "Pain", 7.25, 25, expiry_date=days(-5), cost_price=5.1),
+        Medicine("Zinc", None, None, 3, 100, cost_price=1),
+    ]:
+        assert db_manager.add_medicine(medicine)
+    return [medicine.id for medicine in db_manager.get_all_medicines()]
+
+
+def edit(db_manager, medicine_id, **changes):
+    medicine = copy.copy(db_manager.get_medicine_by_id(medicine_id))  # Catalog objects are read-only
+    for field, value in changes.items():
+        setattr(medicine, field, value)
+    assert db_manager.try_update_medicine(medicine)["status"] == "updated"
+
+
+def stock_changes(db_manager, medicines):
+    """Sells, restocks, reprices, regroups, re-dates and deletes medicines."""
+    panadol, calpol, brufen, zinc = sorted(medicines)
+    db_manager.add_sale(None, "Walk-in", "", "", 25, [{"med_id": panadol, "qty": 2, "price": 12.5, "name": "Panadol"}])
+    edit(db_manager, calpol, stock=30, cost_price=15, expiry_date=days(10))
+    edit(db_manager, brufen, brand="GSK", price=8)
+    edit(db_manager, zinc, category="Supplements", expiry_date=days(200))
+    db_manager.update_medicine_stock(zinc, 0)
+    db_manager.delete_medicine(panadol)
+    db_manager.add_medicine(Medicine("Disprin", "Reckitt", "Pain", 2, 60, expiry_date=days(-1)))
+
+
+def test_valuation_follows_every_stock_change(db_manager, medicines):
+    stock_changes(db_manager, medicines)
+
+    expected = db_manager.conn.execute("""
+        SELECT COALESCE(category, ''), COALESCE(brand, ''), COUNT(*), SUM(stock),
+               SUM(stock * COALESCE(cost_price_minor, 0)), SUM(stock * price_minor),
+               SUM(CASE WHEN cost_price_minor IS NULL THEN stock ELSE 0 END)
+        FROM medicines GROUP BY 1, 2 ORDER BY 1, 2
+    """).fetchall()
+    stored = db_manager.conn.execute("""
+        SELECT category, brand, sku_count, units, cost_value_minor, retail_value_minor, uncosted_units
+        FROM stock_valuation ORDER BY category, brand
+    """).fetchall()
+    assert stored == expected
+    assert [(group["category"], group["brand"]) for group in db_manager.get_stock_valuation()] == [
+        ("Pain", "GSK"), ("Pain", "Reckitt"), ("Supplements", "")]
+
+
+def test_valuation_drops_empty_groups(db_manager, medicines):
+    for medicine_id in medicines:
+        db_manager.delete_medicine(medicine_id)
+    assert db_manager.get_stock_valuation() == []
+
+
+def test_valuation_pages_through_a_group(db_manager, medicines):
+    first = db_manager.get_stock_valuation_page("Pain", "GSK", limit=1)
+    second = db_manager.get_stock_valuation_page("Pain", "GSK", after=(first[0].name, first[0].id), limit=1)
+    assert [m.name for m in first + second] == ["Calpol", "Panadol"]
+    assert db_manager.get_stock_valuation_page("Pain", "GSK", after=(second[0].name, second[0].id)) == []
+
+
+def test_expiry_buckets_follow_every_stock_change(db_manager, medicines):
+    stock_changes(db_manager, medicines)
+
+    expected = db_manager.conn.execute("""
+        SELECT date(expiry_date, '-6 days', 'weekday 1'), COUNT(*), SUM(stock)
+        FROM medicines WHERE expiry_date IS NOT NULL GROUP BY 1 ORDER BY 1
+    """).fetchall()
+    stored = db_manager.conn.execute("SELECT week_start, sku_count, units FROM expiry_buckets ORDER BY 1").fetchall()
+    assert stored == expected
+
+
+def test_expiry_alert_sets_follow_edits_made_during_the_day(db_manager, medicines):
+    panadol, calpol, brufen, zinc = sorted(medicines)
+    assert db_manager.refresh_expiry_alerts(horizons=(7, 30), today=TODAY) == 2
+    assert db_manager.refresh_expiry_alerts(horizons=(7, 30), today=TODAY) == 0  # Already built today
+
+    def alert_set(horizon):
+        return {row[0] for row in db_manager.conn.execute(
+            "SELECT med_id FROM expiry_alerts WHERE horizon_days = ?", (horizon,))}
+
+    assert alert_set(7) == alert_set(30) == {panadol, brufen}
+    edit(db_manager, calpol, expiry_date=days(20))
+    edit(db_manager, panadol, expiry_date=days(300))
+    db_manager.delete_medicine(brufen)
+    db_manager.add_medicine(Medicine("Disprin", "Reckitt", "Pain", 2, 60, expiry_date=days(1)))
+    disprin = max(medicine.id for medicine in db_manager.get_all_medicines())
+
+    assert alert_set(7) == {disprin}
+    assert alert_set(30) == {calpol, disprin}
+
+
+@pytest.mark.parametrize("alert_sets", [False, True])
+def test_expiring_count_agrees_with_a_full_scan(db_manager, medicines, alert_sets):
+    horizons = (0, 3, 7, 30, 90, 365)
+    if alert_sets:
+        db_manager.refresh_expiry_alerts(horizons=horizons)
+    stock_changes(db_manager, medicines)
+    for horizon in horizons:
+        expected = db_manager.conn.execute(
+            "SELECT COUNT(*) FROM medicines WHERE expiry_date IS NOT NULL AND expiry_date <= ?",
+            (days(horizon),)).fetchone()[0]
+        assert db_manager.get_expiring_medicines_count(horizon) == expected
+        assert len(db_manager.get_all_expiring_medicines(horizon)) == expected
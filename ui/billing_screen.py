@@ -2,28 +2,41 @@
 
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton,
-    QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox, QFrame,
+    QTableView, QHeaderView, QMessageBox, QFrame,
     QSizePolicy, QComboBox, QSpinBox, QApplication, QCompleter
 )
 from PyQt6.QtGui import QFont, QDoubleValidator # Import QDoubleValidator for numeric input
-from PyQt6.QtCore import Qt, QStringListModel, pyqtSignal
+from PyQt6.QtCore import Qt, QStringListModel, QSortFilterProxyModel, pyqtSignal, QThread, QTimer
 import json
+import os
 from datetime import datetime # Import datetime for invoice date
+from database.sale_outbox import SaleOutbox, SaleSyncWorker
+from database.change_feed import ChangeEvent
+from ui.table_models import EntityTableModel, IdFilterProxyModel, sale_columns
+from ui.event_bus import EventBus, LazyRefreshMixin
+from ui.invoice_renderer import INVOICE_DIR, InvoiceService, invoice_from_sale
+from ui.cart_model import CartModel, parse_percentage
 
 
-class BillingScreen(QWidget):
+class BillingScreen(LazyRefreshMixin, QWidget):
     # Define a signal that will be emitted when a sale is successfully processed
     sale_processed = pyqtSignal()
+    # Asks the background SaleSyncWorker to replay the outbox now
+    sync_requested = pyqtSignal()
 
-    def __init__(self):
+    def __init__(self, outbox_path="sale_outbox.db"):
         super().__init__()
         self.db_manager = None
-        self.cart_items = []
+        self.event_bus = None
+        self.cart_model = CartModel(self)
         self.selected_customer = None
+        self.outbox_path = outbox_path
+        self.sale_outbox = None
+        self.sync_thread = None
+        self.sync_worker = None
+        self.invoice_service = None  # Renders invoice PDFs in the background; started on first print
+        self.cart_model.totals_changed.connect(self.update_total_labels)
         self.setup_ui()
-        # Initialize discount and tax values
-        self.discount_percentage = 0.0
-        self.tax_percentage = 0.0
 
     def setup_ui(self):
         main_layout = QVBoxLayout(self)
@@ -57,7 +70,7 @@ class BillingScreen(QWidget):
             QLineEdit:focus, QComboBox:focus, QSpinBox:focus {
                 border: 2px solid #007bff;
             }
-            QTableWidget {
+            QTableWidget, QTableView {
                 background-color: #f8f8f8;
                 border-radius: 10px;
                 border: 1px solid #e0e0e0;
@@ -76,18 +89,38 @@ class BillingScreen(QWidget):
         top_layout.setSpacing(20)
 
         medicine_selection_layout = QVBoxLayout()
+        # Scanner mode: a barcode scanner types the code followed by Enter into this field
+        medicine_selection_layout.addWidget(QLabel("Scan Barcode:"))
+        self.barcode_scan_input = QLineEdit(self)
+        self.barcode_scan_input.setPlaceholderText("Scan or type a barcode and press Enter to add 1 to the cart")
+        self.barcode_scan_input.returnPressed.connect(self.scan_barcode)
+        medicine_selection_layout.addWidget(self.barcode_scan_input)
+        self.scan_status_label = QLabel("")
+        medicine_selection_layout.addWidget(self.scan_status_label)
+
         medicine_selection_layout.addWidget(QLabel("Select Medicine:"))
         self.medicine_search_input = QLineEdit(self)
         self.medicine_search_input.setPlaceholderText("Search medicine by name...")
         self.medicine_search_input.textChanged.connect(self.search_medicines_for_billing)
         medicine_selection_layout.addWidget(self.medicine_search_input)
 
-        self.available_medicines_table = QTableWidget(self)
-        self.available_medicines_table.setColumnCount(4)
-        self.available_medicines_table.setHorizontalHeaderLabels(["ID", "Name", "Price", "Stock"])
+        self.available_medicines_model = EntityTableModel([
+            ("ID", lambda m: m.id),
+            ("Name", lambda m: m.name),
+            ("Price", lambda m: f"{m.price:.2f}"),
+            ("Stock", lambda m: m.stock),
+        ], sort_key=lambda m: m.name, parent=self)
+        # The proxy filters on the Name column, so rows the model inserts or moves stay filtered
+        self.available_medicines_proxy = QSortFilterProxyModel(self)
+        self.available_medicines_proxy.setSourceModel(self.available_medicines_model)
+        self.available_medicines_proxy.setFilterKeyColumn(1)
+        self.available_medicines_proxy.setFilterCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        self.available_medicines_table = QTableView(self)
+        self.available_medicines_table.setModel(self.available_medicines_proxy)
         self.available_medicines_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        self.available_medicines_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.available_medicines_table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
+        self.available_medicines_table.verticalHeader().setVisible(False)
+        self.available_medicines_table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.available_medicines_table.setSelectionMode(QTableView.SelectionMode.SingleSelection)
         medicine_selection_layout.addWidget(self.available_medicines_table)
 
         add_to_cart_layout = QHBoxLayout()
@@ -106,17 +139,32 @@ class BillingScreen(QWidget):
         customer_selection_layout = QVBoxLayout()
         customer_selection_layout.addWidget(QLabel("Select Customer (Optional):"))
         self.customer_search_input = QLineEdit(self)
-        self.customer_search_input.setPlaceholderText("Search customer by name or phone...")
+        self.customer_search_input.setPlaceholderText("Search customer by name or phone (Enter: caller ID)...")
         self.customer_search_input.textChanged.connect(self.search_customers_for_billing)
+        self.customer_search_input.returnPressed.connect(self.lookup_caller)
         customer_selection_layout.addWidget(self.customer_search_input)
 
-        self.available_customers_table = QTableWidget(self)
-        self.available_customers_table.setColumnCount(3)
-        self.available_customers_table.setHorizontalHeaderLabels(["ID", "Name", "Phone"])
+        # Typing restarts this timer, so a search runs once the cashier pauses instead of on every key
+        self.customer_search_timer = QTimer(self)
+        self.customer_search_timer.setSingleShot(True)
+        self.customer_search_timer.setInterval(200)
+        self.customer_search_timer.timeout.connect(self.apply_customer_search)
+
+        self.available_customers_model = EntityTableModel([
+            ("ID", lambda c: c.id),
+            ("Name", lambda c: c.name),
+            ("Phone", lambda c: c.phone),
+        ], sort_key=lambda c: c.name, parent=self)
+        # The search runs in SQL (DBManager.find_customers); the proxy shows the matches, best first
+        self.available_customers_proxy = IdFilterProxyModel(self)
+        self.available_customers_proxy.setSourceModel(self.available_customers_model)
+        self.available_customers_table = QTableView(self)
+        self.available_customers_table.setModel(self.available_customers_proxy)
         self.available_customers_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        self.available_customers_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.available_customers_table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
-        self.available_customers_table.itemSelectionChanged.connect(self.customer_selected)
+        self.available_customers_table.verticalHeader().setVisible(False)
+        self.available_customers_table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.available_customers_table.setSelectionMode(QTableView.SelectionMode.SingleSelection)
+        self.available_customers_table.selectionModel().selectionChanged.connect(self.customer_selected)
         customer_selection_layout.addWidget(self.available_customers_table)
 
         self.clear_customer_button = self._create_button("Clear Customer", "#6c757d", font_size=13, padding="8px 15px")
@@ -138,7 +186,7 @@ class BillingScreen(QWidget):
                 font-weight: bold;
                 color: #2c3e50;
             }
-            QTableWidget {
+            QTableView {
                 background-color: #f8f8f8;
                 border-radius: 10px;
                 border: 1px solid #e0e0e0;
@@ -170,12 +218,12 @@ class BillingScreen(QWidget):
         cart_label.setFont(QFont("Arial", 20, QFont.Weight.Bold))
         cart_layout.addWidget(cart_label)
 
-        self.cart_table = QTableWidget(self)
-        self.cart_table.setColumnCount(5)
-        self.cart_table.setHorizontalHeaderLabels(["ID", "Medicine", "Price", "Qty", "Subtotal"])
+        self.cart_table = QTableView(self)
+        self.cart_table.setModel(self.cart_model)
         self.cart_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        self.cart_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.cart_table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
+        self.cart_table.verticalHeader().setVisible(False)
+        self.cart_table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.cart_table.setSelectionMode(QTableView.SelectionMode.SingleSelection)
         cart_layout.addWidget(self.cart_table)
 
         cart_buttons_layout = QHBoxLayout()
@@ -212,7 +260,7 @@ class BillingScreen(QWidget):
         self.discount_input.setFixedWidth(80)
         self.discount_input.setValidator(QDoubleValidator(0.0, 100.0, 2)) # 0-100%
         self.discount_input.setText("0.00")
-        self.discount_input.textChanged.connect(self.calculate_total_amount)
+        self.discount_input.textChanged.connect(self.apply_discount_and_tax)
         self.discount_amount_label = QLabel("0.00") # To show calculated discount amount
         self.discount_amount_label.setFont(QFont("Arial", 14))
         discount_layout.addWidget(discount_label)
@@ -230,7 +278,7 @@ class BillingScreen(QWidget):
         self.tax_input.setFixedWidth(80)
         self.tax_input.setValidator(QDoubleValidator(0.0, 100.0, 2)) # 0-100%
         self.tax_input.setText("0.00")
-        self.tax_input.textChanged.connect(self.calculate_total_amount)
+        self.tax_input.textChanged.connect(self.apply_discount_and_tax)
         self.tax_amount_label = QLabel("0.00") # To show calculated tax amount
         self.tax_amount_label.setFont(QFont("Arial", 14))
         tax_layout.addWidget(tax_label)
@@ -253,6 +301,11 @@ class BillingScreen(QWidget):
 
         # --- NEW: Process Sale and Print Invoice Buttons ---
         process_print_buttons_layout = QHBoxLayout()
+        # Shows how many sales are waiting in the offline outbox
+        self.sync_status_label = QLabel("All sales synced")
+        self.sync_status_label.setFont(QFont("Arial", 12))
+        self.sync_status_label.setStyleSheet("color: #28a745;")
+        process_print_buttons_layout.addWidget(self.sync_status_label)
         process_print_buttons_layout.addStretch() # Push buttons to the right
 
         self.process_sale_button = self._create_button("Process Sale", "#28a745")
@@ -279,7 +332,7 @@ class BillingScreen(QWidget):
                 font-weight: bold;
                 color: #2c3e50;
             }
-            QTableWidget {
+            QTableWidget, QTableView {
                 background-color: #f8f8f8;
                 border-radius: 10px;
                 border: 1px solid #e0e0e0;
@@ -301,11 +354,12 @@ class BillingScreen(QWidget):
         sales_history_label.setFont(QFont("Arial", 20, QFont.Weight.Bold))
         sales_history_layout.addWidget(sales_history_label)
 
-        self.sales_history_table = QTableWidget(self)
-        self.sales_history_table.setColumnCount(5)
-        self.sales_history_table.setHorizontalHeaderLabels(
-            ["Sale ID", "Customer", "Total Amount", "Date", "Items Sold"])
+        self.sales_history_model = EntityTableModel(sale_columns(), key=lambda sale: sale["id"],
+                                                    newest_first=True, parent=self)
+        self.sales_history_table = QTableView(self)
+        self.sales_history_table.setModel(self.sales_history_model)
         self.sales_history_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.sales_history_table.verticalHeader().setVisible(False)
         sales_history_layout.addWidget(self.sales_history_table)
 
         main_layout.addWidget(sales_history_frame)
@@ -313,7 +367,7 @@ class BillingScreen(QWidget):
         self.setStyleSheet("background-color: #f0f2f5;")
 
         # Initial calculation when UI is set up
-        self.calculate_total_amount()
+        self.update_total_labels()
 
 
     def _create_button(self, text, color, font_size=14, padding="12px 25px"):
@@ -348,177 +402,255 @@ class BillingScreen(QWidget):
         darker_rgb = tuple(max(0, int(c * (1 - factor))) for c in rgb)
         return f"#{darker_rgb[0]:02x}{darker_rgb[1]:02x}{darker_rgb[2]:02x}"
 
-    def set_db_manager(self, db_manager):
-        """Sets the DBManager instance for this screen and loads initial data."""
+    def set_db_manager(self, db_manager, event_bus=None):
+        """Sets the DBManager instance for this screen, subscribes to its changes and loads initial data."""
         self.db_manager = db_manager
+        self.event_bus = event_bus or EventBus(db_manager.change_feed, parent=self)
+        self.event_bus.subscribe(self.on_medicines_changed, ["medicines"], screen=self)
+        self.event_bus.subscribe(self.on_customers_changed, ["customers"], screen=self)
+        self.event_bus.subscribe(self.on_sales_changed, ["sales"], screen=self)
+        self.load_available_medicines()
+        self.load_available_customers()
+        self.load_sales_history()
+        self.start_sale_sync()
+
+    def refresh_screen(self):
+        """Reloads the medicine and customer lists and the sales history."""
         self.load_available_medicines()
         self.load_available_customers()
         self.load_sales_history()
-        self.calculate_total_amount() # Ensure totals are calculated on DB load
+
+    def on_medicines_changed(self, event):
+        """Patches only the medicines named in a ChangeEvent (e.g. the 3 SKUs a sale touched)."""
+        if event.op == ChangeEvent.DELETE:
+            self.available_medicines_model.remove_ids(event.ids)
+        else:
+            self.available_medicines_model.upsert_rows(self.db_manager.get_medicines_by_ids(event.ids))
+
+    def on_customers_changed(self, event):
+        """Patches only the customers named in a ChangeEvent."""
+        if event.op == ChangeEvent.DELETE:
+            self.available_customers_model.remove_ids(event.ids)
+        else:
+            self.available_customers_model.upsert_rows(self.db_manager.get_customers_by_ids(event.ids))
+        if self.customer_search_input.text().strip() and event.touches("name", "phone", "email"):
+            self.apply_customer_search()  # The changed rows may now match the search, or no longer match
+
+    def on_sales_changed(self, event):
+        """Adds newly recorded sales to the top of the history without reloading it."""
+        if event.op == ChangeEvent.DELETE:
+            self.sales_history_model.remove_ids(event.ids)
+        else:
+            self.sales_history_model.upsert_rows(self.db_manager.get_sales_by_ids(event.ids))
+
+    def start_sale_sync(self):
+        """Opens the offline sale outbox and starts replaying it in a background thread."""
+        self.stop_sale_sync()
+        self.sale_outbox = SaleOutbox(self.outbox_path)
+        self.sale_outbox.requeue_in_flight()  # Left over if the application stopped mid-sale
+
+        self.sync_thread = QThread(self)
+        self.sync_worker = SaleSyncWorker(self.db_manager, self.outbox_path)
+        self.sync_worker.moveToThread(self.sync_thread)
+        self.sync_thread.started.connect(self.sync_worker.start)
+        # finished is emitted from the worker thread, so stop() closes its connections there
+        self.sync_thread.finished.connect(self.sync_worker.stop, Qt.ConnectionType.DirectConnection)
+        self.sync_requested.connect(self.sync_worker.sync_now)
+        self.sync_worker.backlog_changed.connect(self.update_sync_status)
+        self.sync_worker.sale_synced.connect(self.on_background_sale_synced)
+        self.sync_worker.sale_conflict.connect(self.on_background_sale_conflict)
+        # Writes made on the worker's connection are replayed into this screen's change feed
+        self.sync_worker.change_published.connect(self.db_manager.change_feed.publish)
+        QApplication.instance().aboutToQuit.connect(self.stop_sale_sync)
+        self.sync_thread.start()
+        self.update_sync_status(self.sale_outbox.pending_count())
+
+    def stop_sale_sync(self):
+        """Stops the background sync thread and closes the outbox."""
+        if self.sync_thread:
+            self.sync_requested.disconnect(self.sync_worker.sync_now)
+            self.sync_thread.quit()
+            self.sync_thread.wait()
+            self.sync_thread = None
+            self.sync_worker = None
+        if self.sale_outbox:
+            self.sale_outbox.close()
+            self.sale_outbox = None
+
+    def update_sync_status(self, pending_count):
+        """Shows the outbox backlog depth next to the Process Sale button."""
+        if pending_count:
+            self.sync_status_label.setText(f"⏳ {pending_count} sale(s) waiting to sync")
+            self.sync_status_label.setStyleSheet("color: #dc3545;")
+        else:
+            self.sync_status_label.setText("All sales synced")
+            self.sync_status_label.setStyleSheet("color: #28a745;")
+
+    def on_background_sale_synced(self, client_ref, sale_id):
+        """Announces a queued sale reaching the main database; its rows arrive via the change feed."""
+        self.sale_processed.emit()
+
+    def on_background_sale_conflict(self, client_ref, message):
+        """Records stock conflicts found while replaying queued sales so they can be reviewed."""
+        print(f"Queued sale {client_ref} synced with conflict: {message}")
+        self.sync_status_label.setToolTip(f"Last sync conflict: {message}")
 
     def load_available_medicines(self):
         """Loads all medicines from the database into the available medicines table."""
         if not self.db_manager: return
-        medicines = self.db_manager.get_all_medicines()
-        self.available_medicines_table.setRowCount(len(medicines))
-        for row_idx, med in enumerate(medicines):
-            self.available_medicines_table.setItem(row_idx, 0, QTableWidgetItem(str(med.id)))
-            self.available_medicines_table.setItem(row_idx, 1, QTableWidgetItem(med.name))
-            self.available_medicines_table.setItem(row_idx, 2, QTableWidgetItem(f"{med.price:.2f}"))
-            self.available_medicines_table.setItem(row_idx, 3, QTableWidgetItem(str(med.stock)))
-        self.available_medicines_table.resizeColumnsToContents()
-        self.available_medicines_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.available_medicines_model.set_rows(self.db_manager.get_all_medicines())
 
     def search_medicines_for_billing(self):
         """Filters available medicines table based on search input."""
-        search_text = self.medicine_search_input.text().strip().lower()
-        for row in range(self.available_medicines_table.rowCount()):
-            name_match = search_text in self.available_medicines_table.item(row, 1).text().lower()
-            self.available_medicines_table.setRowHidden(row, not name_match)
+        self.available_medicines_proxy.setFilterFixedString(self.medicine_search_input.text().strip())
 
     def add_selected_medicine_to_cart(self):
         """Adds the selected medicine from the available medicines table to the cart."""
-        selected_rows = self.available_medicines_table.selectedItems()
+        selected_rows = self.available_medicines_table.selectionModel().selectedRows()
         if not selected_rows:
             self.show_message("Selection Error", "Please select a medicine from the list to add to cart.")
             return
 
-        row = selected_rows[0].row()
-        med_id = int(self.available_medicines_table.item(row, 0).text())
-        med_name = self.available_medicines_table.item(row, 1).text()
-        med_price = float(self.available_medicines_table.item(row, 2).text())
-        available_stock = int(self.available_medicines_table.item(row, 3).text())
-        quantity = self.quantity_spinbox.value()
+        med = self.available_medicines_model.row_object(
+            self.available_medicines_proxy.mapToSource(selected_rows[0]).row())
+        error = self._add_to_cart(med, self.quantity_spinbox.value())
+        if error:
+            self.show_message(*error)
+            return
+        self.available_medicines_table.clearSelection()
 
-        if quantity <= 0:
-            self.show_message("Input Error", "Quantity must be greater than zero.")
+    def scan_barcode(self):
+        """
+        Scanner mode: adds one of the medicine with the scanned barcode to the cart.
+        Problems are shown next to the scan field rather than in a dialog, so the
+        field keeps focus and the cashier can go on scanning.
+        """
+        barcode = self.barcode_scan_input.text().strip()
+        self.barcode_scan_input.clear()
+        if not barcode or not self.db_manager:
+            return
+        med = self.db_manager.get_medicine_by_barcode(barcode)
+        if med is None:
+            self._show_scan_status(f"Unknown barcode: {barcode}", is_error=True)
             return
-        if quantity > available_stock:
-            self.show_message("Stock Error", f"Only {available_stock} of {med_name} available in stock.")
+        error = self._add_to_cart(med, 1)
+        if error:
+            self._show_scan_status(error[1], is_error=True)
             return
+        self._show_scan_status(f"Added {med.name}")
 
-        # Check if item already in cart, update quantity
-        found_in_cart = False
-        for item in self.cart_items:
-            if item["med_id"] == med_id:
-                new_qty = item["qty"] + quantity
-                if new_qty > available_stock:
-                    self.show_message("Stock Error",
-                                      f"Adding {quantity} more would exceed available stock of {available_stock} for {med_name}.")
-                    return
-                item["qty"] = new_qty
-                item["subtotal"] = item["qty"] * item["price"]
-                found_in_cart = True
-                break
-
-        if not found_in_cart:
-            # Add new item to cart
-            subtotal = med_price * quantity
-            self.cart_items.append({
-                "med_id": med_id,
-                "name": med_name,
-                "price": med_price,
-                "qty": quantity,
-                "subtotal": subtotal
-            })
-
-        self.update_cart_display()
-        self.calculate_total_amount() # Recalculate all totals
-        self.available_medicines_table.clearSelection()
+    def _show_scan_status(self, text, is_error=False):
+        self.scan_status_label.setText(text)
+        style = "color: #dc3545;" if is_error else "color: #28a745;"
+        if self.scan_status_label.styleSheet() != style:  # Re-styling re-polishes the widget; skip it per scan
+            self.scan_status_label.setStyleSheet(style)
 
-    def update_cart_display(self):
-        """Refreshes the cart table with current cart items."""
-        self.cart_table.setRowCount(len(self.cart_items))
-        for row_idx, item in enumerate(self.cart_items):
-            self.cart_table.setItem(row_idx, 0, QTableWidgetItem(str(item["med_id"])))
-            self.cart_table.setItem(row_idx, 1, QTableWidgetItem(item["name"]))
-            self.cart_table.setItem(row_idx, 2, QTableWidgetItem(f"{item['price']:.2f}"))
-            self.cart_table.setItem(row_idx, 3, QTableWidgetItem(str(item["qty"])))
-            self.cart_table.setItem(row_idx, 4, QTableWidgetItem(f"{item['subtotal']:.2f}"))
-        self.cart_table.resizeColumnsToContents()
-        self.cart_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+    def _add_to_cart(self, med, quantity):
+        """
+        Adds a quantity of a medicine to the cart, merging it with the medicine's existing line.
+
+        Args:
+            med (Medicine): The medicine, as held by the available medicines table or the catalog.
+            quantity (int): Number of units to add.
+
+        Returns:
+            tuple: (title, message) describing why nothing was added, or None on success.
+        """
+        if quantity <= 0:
+            return ("Input Error", "Quantity must be greater than zero.")
+        if quantity > med.stock:
+            return ("Stock Error", f"Only {med.stock} of {med.name} available in stock.")
+
+        in_cart = self.cart_model.quantity(med.id)
+        if in_cart and in_cart + quantity > med.stock:
+            return ("Stock Error",
+                    f"Adding {quantity} more would exceed available stock of {med.stock} for {med.name}.")
+        self.cart_model.add(med.id, med.name, med.price, quantity)  # Totals follow via totals_changed
+        return None
 
     def remove_selected_cart_item(self):
         """Removes the selected item from the cart."""
-        selected_rows = self.cart_table.selectedItems()
+        selected_rows = self.cart_table.selectionModel().selectedRows()
         if not selected_rows:
             self.show_message("Selection Error", "Please select an item in the cart to remove.")
             return
 
-        row_idx = selected_rows[0].row()
-        del self.cart_items[row_idx]
-        self.update_cart_display()
-        self.calculate_total_amount() # Recalculate all totals
+        self.cart_model.remove_row(selected_rows[0].row())
 
     def clear_cart(self):
         """Clears all items from the shopping cart."""
-        self.cart_items = []
-        self.update_cart_display()
-        self.calculate_total_amount() # Recalculate all totals
+        self.cart_model.clear()
         self.show_message("Cart Cleared", "Shopping cart has been cleared.")
 
-    def calculate_total_amount(self):
-        """Calculates and displays the subtotal, discount, tax, and grand total."""
-        subtotal = sum(item["subtotal"] for item in self.cart_items)
-        self.subtotal_amount_label.setText(f"{subtotal:.2f}")
-
-        # Get discount and tax percentages from input fields
-        try:
-            self.discount_percentage = float(self.discount_input.text())
-        except ValueError:
-            self.discount_percentage = 0.0
-            self.discount_input.setText("0.00") # Reset to default if invalid
-
-        try:
-            self.tax_percentage = float(self.tax_input.text())
-        except ValueError:
-            self.tax_percentage = 0.0
-            self.tax_input.setText("0.00") # Reset to default if invalid
-
-        # Calculate discount amount
-        discount_amount = subtotal * (self.discount_percentage / 100.0)
-        self.discount_amount_label.setText(f"{discount_amount:.2f}")
-
-        # Calculate amount after discount
-        amount_after_discount = subtotal - discount_amount
-
-        # Calculate tax amount
-        tax_amount = amount_after_discount * (self.tax_percentage / 100.0)
-        self.tax_amount_label.setText(f"{tax_amount:.2f}")
+    def apply_discount_and_tax(self):
+        """Reads the discount and tax fields; only called when one of them is edited."""
+        self.cart_model.set_rates(parse_percentage(self.discount_input.text()),
+                                  parse_percentage(self.tax_input.text()))
 
-        # Calculate grand total
-        grand_total = amount_after_discount + tax_amount
-        self.grand_total_amount_label.setText(f"{grand_total:.2f}")
+    def update_total_labels(self):
+        """Shows the cart's subtotal, discount, tax, and grand total."""
+        totals = self.cart_model.totals()
+        self.subtotal_amount_label.setText(f"{totals['subtotal']:.2f}")
+        self.discount_amount_label.setText(f"{totals['discount']:.2f}")
+        self.tax_amount_label.setText(f"{totals['tax']:.2f}")
+        self.grand_total_amount_label.setText(f"{totals['grand_total']:.2f}")
 
     def load_available_customers(self):
         """Loads all customers from the database into the available customers table."""
         if not self.db_manager: return
-        customers = self.db_manager.get_all_customers()
-        self.available_customers_table.setRowCount(len(customers))
-        for row_idx, cust in enumerate(customers):
-            self.available_customers_table.setItem(row_idx, 0, QTableWidgetItem(str(cust.id)))
-            self.available_customers_table.setItem(row_idx, 1, QTableWidgetItem(cust.name))
-            self.available_customers_table.setItem(row_idx, 2, QTableWidgetItem(cust.phone if cust.phone else ""))
-        self.available_customers_table.resizeColumnsToContents()
-        self.available_customers_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.available_customers_model.set_rows(self.db_manager.get_all_customers())
+        if self.customer_search_input.text().strip():
+            self.apply_customer_search()
 
     def search_customers_for_billing(self):
-        """Filters available customers table based on search input."""
-        search_text = self.customer_search_input.text().strip().lower()
-        for row in range(self.available_customers_table.rowCount()):
-            name_match = search_text in self.available_customers_table.item(row, 1).text().lower()
-            phone_match = search_text in self.available_customers_table.item(row, 2).text().lower()
-            self.available_customers_table.setRowHidden(row, not (name_match or phone_match))
+        """Filters available customers table based on search input, once typing pauses."""
+        self.customer_search_timer.start()
+
+    def apply_customer_search(self):
+        """Shows the best matches for the customer search box (DBManager.find_customers)."""
+        self.customer_search_timer.stop()
+        query = self.customer_search_input.text().strip()
+        if not query or not self.db_manager:
+            self.available_customers_proxy.set_visible_ids(None)
+            return
+        matches = self.db_manager.find_customers(query)
+        self.available_customers_proxy.set_visible_ids([c.id for c in matches], ranked=True)
+
+    def lookup_caller(self, number=None):
+        """
+        Caller ID: selects the customer whose phone number ends in the same digits as the
+        number typed in the customer search box (or the given number, e.g. from the phone
+        system), whatever its format or country code.
+
+        Returns:
+            Customer: The selected customer, or None if no single customer has that number.
+        """
+        if not self.db_manager: return None
+        if number is not None:
+            self.customer_search_input.setText(number)
+        number = self.customer_search_input.text()
+        self.apply_customer_search()
+        if any(char.isalpha() for char in number):
+            return None  # A name, not a number
+        customer = self.db_manager.find_customer_by_phone(number)
+        if customer is None:
+            return None
+        if self.available_customers_model.row_for_id(customer.id) is None:
+            self.available_customers_model.upsert_rows([customer])  # Added since the list was loaded
+        source_row = self.available_customers_model.row_for_id(customer.id)
+        index = self.available_customers_proxy.mapFromSource(self.available_customers_model.index(source_row, 0))
+        if index.isValid():
+            self.available_customers_table.selectRow(index.row())
+        return customer
 
     def customer_selected(self):
         """Sets the selected customer based on table selection."""
-        selected_rows = self.available_customers_table.selectedItems()
+        selected_rows = self.available_customers_table.selectionModel().selectedRows()
         if not selected_rows:
             self.selected_customer = None
             return
 
-        row = selected_rows[0].row()
-        customer_id = int(self.available_customers_table.item(row, 0).text())
+        customer_id = self.available_customers_proxy.object_for_index(selected_rows[0]).id
         # Retrieve full customer object from DB for complete details
         self.selected_customer = self.db_manager.get_customer_by_id(customer_id)
         if self.selected_customer:
@@ -536,117 +668,134 @@ class BillingScreen(QWidget):
 
     def process_sale(self):
         """Processes the sale, records it in the database, and updates stock."""
-        if not self.cart_items:
+        if self.cart_model.is_empty():
             self.show_message("Sale Error", "The cart is empty. Please add medicines to proceed.")
             return
 
-        # Use the grand total from the label
-        final_total_amount = float(self.grand_total_amount_label.text())
+        totals = self.cart_model.totals()
+        final_total_amount = totals["grand_total"]
 
         customer_id = self.selected_customer.id if self.selected_customer else None
         customer_name = self.selected_customer.name if self.selected_customer else "Walk-in Customer"
         customer_phone = self.selected_customer.phone if self.selected_customer else ""
         customer_email = self.selected_customer.email if self.selected_customer else ""
 
-        # Prepare items for DB: [{"med_id": int, "qty": int, "price": float, "name": str}]
+        # Prepare items for DB: [{"med_id": int, "qty": int, "price": Money, "name": str}]
         items_for_db = [
-            {"med_id": item["med_id"], "qty": item["qty"], "price": item["price"], "name": item["name"]}
-            for item in self.cart_items
+            {"med_id": line.med_id, "qty": line.qty, "price": line.price, "name": line.name}
+            for line in self.cart_model.lines()
         ]
 
-        # In a more advanced system, you might also want to store discount and tax percentages
-        # with the sale record in the database. For now, we just pass the final total.
+        # Stored with the sale, so tax and discount reports need not re-derive them (see models.sale.price_sale)
+        pricing = {
+            "subtotal": totals["subtotal"],
+            "discount": totals["discount"],
+            "tax": totals["tax"],
+            "discount_rate": str(self.cart_model.discount_percentage),
+            "tax_rate": str(self.cart_model.tax_percentage),
+        }
+
+        queued_sale = {
+            "customer_id": customer_id,
+            "customer_name": customer_name,
+            "customer_phone": customer_phone,
+            "customer_email": customer_email,
+            "total_amount": final_total_amount,
+            "items": items_for_db,
+            "pricing": pricing
+        }
+
+        # Write the sale to the local outbox first so it survives a locked or unreachable database.
+        if self.sale_outbox.pending_count():
+            # Older sales are still queued; this one must wait its turn behind them.
+            self.sale_outbox.enqueue(queued_sale)
+            self.sync_requested.emit()
+            self._finish_sale(f"Sale of {final_total_amount:.2f} saved offline. "
+                              f"It will be recorded once earlier queued sales have synced.")
+            return
+
+        # In flight: the sync worker leaves it alone while the counter records it
+        sale = self.sale_outbox.enqueue(queued_sale, in_flight=True)
+        outcome = self.db_manager.record_queued_sale(sale)
+        if outcome["status"] == "rejected":
+            self.sale_outbox.mark_rejected(sale["client_ref"], outcome["message"])
+            self.show_message("Sale Error", outcome["message"])
+            return
+        if outcome["status"] == "unavailable":
+            self.sale_outbox.record_failed_attempt(sale["client_ref"], outcome["message"])
+            self._finish_sale(f"Database unavailable. Sale of {final_total_amount:.2f} saved offline "
+                              f"and will sync automatically.")
+            return
 
-        if self.db_manager.add_sale(customer_id, customer_name, customer_phone, customer_email, final_total_amount,
-                                    items_for_db):
-            self.show_message("Sale Complete", f"Sale of {final_total_amount:.2f} processed successfully!")
-            self.clear_cart()
-            self.clear_customer_selection()
-            self.load_available_medicines()
-            self.load_sales_history()
-            self.sale_processed.emit() # Emit signal after successful sale
-        # Error messages handled by DBManager's add_sale method
+        self.sale_outbox.mark_synced(sale["client_ref"], outcome["sale_id"])
+        self._finish_sale(f"Sale of {final_total_amount:.2f} processed successfully!")
+        # Stock and history rows were already patched from the sale's change events
+        self.sale_processed.emit() # Emit signal after successful sale
+
+    def _finish_sale(self, message):
+        """Confirms a completed sale to the cashier and resets the cart for the next customer."""
+        self.update_sync_status(self.sale_outbox.pending_count())
+        self.show_message("Sale Complete", message)
+        self.clear_cart()
+        self.clear_customer_selection()
 
     def load_sales_history(self):
         """Loads recent sales from the database into the sales history table."""
         if not self.db_manager: return
-        sales = self.db_manager.get_all_sales()
-        self.sales_history_table.setRowCount(len(sales))
-
-        for row_idx, sale in enumerate(sales):
-            self.sales_history_table.setItem(row_idx, 0, QTableWidgetItem(str(sale["id"])))
-            self.sales_history_table.setItem(row_idx, 1, QTableWidgetItem(sale["customer_name"]))
-            self.sales_history_table.setItem(row_idx, 2, QTableWidgetItem(f"{sale['total_amount']:.2f}"))
-            self.sales_history_table.setItem(row_idx, 3, QTableWidgetItem(sale["sale_date"]))
-
-            items_text = ", ".join([f"{item['name']} (x{item['qty']})" for item in sale["items"]])
-            self.sales_history_table.setItem(row_idx, 4, QTableWidgetItem(items_text))
+        self.sales_history_model.set_rows(self.db_manager.get_all_sales())
+
+    def _invoice_from_cart(self):
+        """Builds invoice data (see ui/invoice_renderer.py) for the current cart."""
+        totals = self.cart_model.totals()
+
+        customer = self.selected_customer
+        return {
+            "number": None,  # Not recorded yet
+            "date": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "customer_name": customer.name if customer else None,
+            "customer_phone": customer.phone if customer else None,
+            "customer_email": customer.email if customer else None,
+            "items": [{"name": line.name, "price": line.price, "qty": line.qty} for line in self.cart_model.lines()],
+            "summary": [
+                ("Subtotal", f"{totals['subtotal']:.2f}"),
+                (f"Discount ({self.cart_model.discount_percentage:.2f}%)", f"-{totals['discount']:.2f}"),
+                (f"Tax ({self.cart_model.tax_percentage:.2f}%)", f"+{totals['tax']:.2f}"),
+            ],
+            "total": totals["grand_total"],
+        }
 
-        self.sales_history_table.resizeColumnsToContents()
-        self.sales_history_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-
-    def _generate_invoice_content(self):
-        """Generates the detailed invoice content as a formatted string."""
-        if not self.cart_items:
-            return "No items in cart to generate an invoice."
+    def _print_invoice(self):
+        """
+        Writes the invoice for the cart to a PDF in the invoices folder, or, with an
+        empty cart, reprints the sale selected in the sales history.
+        """
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        selected = self.sales_history_table.selectionModel().selectedRows()
+        if not self.cart_model.is_empty():
+            invoice = self._invoice_from_cart()
+            path = os.path.join(INVOICE_DIR, f"invoice-draft-{stamp}.pdf")
+        elif selected:
+            sale = self.sales_history_model.row_object(selected[0].row())
+            invoice = invoice_from_sale(sale)
+            path = os.path.join(INVOICE_DIR, f"invoice-{sale['id']}.pdf")
+        else:
+            self.show_message("Print Invoice", "Add items to the cart or select a past sale to print its invoice.")
+            return
 
-        # Pharmacy Details (Placeholder - replace with actual details)
-        invoice_content = "--- PharmaCare Invoice ---\n"
-        invoice_content += "Pharmacy Name: PharmaCare\n"
-        invoice_content += "Address: 123 Health St, Wellness City\n"
-        invoice_content += "Contact: +92 3XX XXXXXXX | info@pharmacare.com\n"
-        invoice_content += f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-        invoice_content += "--------------------------\n\n"
+        if not self.invoice_service:
+            self.invoice_service = InvoiceService(self.db_manager, parent=self)
+            self.invoice_service.worker.finished.connect(self.on_invoice_written)
+            self.invoice_service.worker.failed.connect(self.on_invoice_failed)
+        self.print_invoice_button.setEnabled(False)
+        self.invoice_service.render_invoice(invoice, path)
 
-        # Customer Details
-        if self.selected_customer:
-            invoice_content += f"Customer: {self.selected_customer.name}\n"
-            if self.selected_customer.phone:
-                invoice_content += f"Phone: {self.selected_customer.phone}\n"
-            if self.selected_customer.email:
-                invoice_content += f"Email: {self.selected_customer.email}\n"
-            invoice_content += "\n"
-        else:
-            invoice_content += "Customer: Walk-in Customer\n\n"
-
-        # Items Sold
-        invoice_content += "{:<25} {:>10} {:>8} {:>12}\n".format("Medicine", "Price", "Qty", "Subtotal")
-        invoice_content += "-" * 60 + "\n"
-        for item in self.cart_items:
-            invoice_content += "{:<25} {:>10.2f} {:>8} {:>12.2f}\n".format(
-                item["name"], item["price"], item["qty"], item["subtotal"]
-            )
-        invoice_content += "-" * 60 + "\n"
-
-        # Summary of Charges
-        subtotal = sum(item["subtotal"] for item in self.cart_items)
-        discount_amount = subtotal * (self.discount_percentage / 100.0)
-        amount_after_discount = subtotal - discount_amount
-        tax_amount = amount_after_discount * (self.tax_percentage / 100.0)
-        grand_total = amount_after_discount + tax_amount
-
-        invoice_content += f"Subtotal: {'':<35} {subtotal:>10.2f}\n"
-        invoice_content += f"Discount ({self.discount_percentage:.2f}%): {'':<28} -{discount_amount:>10.2f}\n"
-        invoice_content += f"Tax ({self.tax_percentage:.2f}%): {'':<33} +{tax_amount:>10.2f}\n"
-        invoice_content += f"Grand Total: {'':<34} {grand_total:>10.2f}\n"
-        invoice_content += "--------------------------\n"
-        invoice_content += "Thank you for your purchase!\n"
-        invoice_content += "--------------------------"
-
-        return invoice_content
+    def on_invoice_written(self, path, count, seconds):
+        self.print_invoice_button.setEnabled(True)
+        self.show_message("Invoice Saved", f"Invoice saved to {os.path.abspath(path)}")
 
-    def _print_invoice(self):
-        """Displays the generated invoice content in a message box."""
-        invoice_text = self._generate_invoice_content()
-        self.show_message("Printable Invoice", invoice_text)
-        # For actual printing, you would use QPrintDialog and QPrinter here.
-        # Example (conceptual, requires more setup):
-        # printer = QPrinter()
-        # print_dialog = QPrintDialog(printer, self)
-        # if print_dialog.exec() == QPrintDialog.DialogCode.Accepted:
-        #     document = QTextDocument()
-        #     document.setPlainText(invoice_text)
-        #     document.print(printer)
+    def on_invoice_failed(self, message):
+        self.print_invoice_button.setEnabled(True)
+        self.show_message("Invoice Error", f"Could not write the invoice: {message}")
 
     def show_message(self, title, message):
         """Displays an information or error message box."""
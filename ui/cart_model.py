@@ -0,0 +1,152 @@
+# ui/cart_model.py
+
+from decimal import Decimal, InvalidOperation
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QVariant, pyqtSignal
+
+from models.money import Money
+
+
+def parse_percentage(text):
+    """Parses a discount/tax field; blank or invalid input counts as 0%."""
+    try:
+        value = Decimal((text or "").strip() or "0")
+    except InvalidOperation:
+        return Decimal(0)
+    return value if value.is_finite() else Decimal(0)
+
+
+class CartLine:
+    """One medicine in the cart."""
+    __slots__ = ("med_id", "name", "price", "qty", "subtotal")
+
+    def __init__(self, med_id, name, price, qty):
+        self.med_id = med_id
+        self.name = name
+        self.price = price  # Money
+        self.qty = qty
+        self.subtotal = price * qty
+
+
+class CartModel(QAbstractTableModel):
+    """
+    The billing screen's shopping cart, shown directly by a QTableView.
+
+    Lines are indexed by medicine ID, so adding to a line that is already in the
+    cart is a dictionary lookup and repaints that one row. The subtotal is kept
+    as a running Money total that each change adjusts by its own difference;
+    discount and tax are derived from it, so neither adding items nor changing a
+    rate ever walks the whole cart. totals_changed fires after every change.
+    """
+    totals_changed = pyqtSignal()
+
+    HEADERS = ["ID", "Medicine", "Price", "Qty", "Subtotal"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._lines = []  # Display order (order added)
+        self._row_by_id = {}
+        self.subtotal = Money(0)
+        self.discount_percentage = Decimal(0)
+        self.tax_percentage = Decimal(0)
+
+    # --- QAbstractTableModel interface ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._lines)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return QVariant()
+        line = self._lines[index.row()]
+        column = index.column()
+        if column == 0:
+            return str(line.med_id)
+        if column == 1:
+            return line.name
+        if column == 2:
+            return f"{line.price:.2f}"
+        if column == 3:
+            return str(line.qty)
+        return f"{line.subtotal:.2f}"
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return QVariant()
+        if orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return str(section + 1)
+
+    # --- Cart contents ---
+    def is_empty(self):
+        return not self._lines
+
+    def quantity(self, med_id):
+        """Units of this medicine already in the cart."""
+        row = self._row_by_id.get(med_id)
+        return self._lines[row].qty if row is not None else 0
+
+    def lines(self):
+        """Returns the cart lines in display order."""
+        return list(self._lines)
+
+    def add(self, med_id, name, price, qty):
+        """Adds qty units of a medicine, merging with its existing line."""
+        row = self._row_by_id.get(med_id)
+        if row is None:
+            line = CartLine(med_id, name, Money.of(price), qty)
+            row = len(self._lines)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._lines.append(line)
+            self._row_by_id[med_id] = row
+            self.endInsertRows()
+            self.subtotal += line.subtotal
+        else:
+            line = self._lines[row]
+            added = line.price * qty
+            line.qty += qty
+            line.subtotal += added
+            self.subtotal += added
+            self.dataChanged.emit(self.index(row, 3), self.index(row, 4))
+        self.totals_changed.emit()
+
+    def remove_row(self, row):
+        """Removes the line shown in the given row."""
+        line = self._lines[row]
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._lines[row]
+        del self._row_by_id[line.med_id]
+        for later_row in range(row, len(self._lines)):
+            self._row_by_id[self._lines[later_row].med_id] = later_row
+        self.endRemoveRows()
+        self.subtotal -= line.subtotal
+        self.totals_changed.emit()
+
+    def clear(self):
+        self.beginResetModel()
+        self._lines = []
+        self._row_by_id = {}
+        self.endResetModel()
+        self.subtotal = Money(0)
+        self.totals_changed.emit()
+
+    # --- Totals ---
+    def set_rates(self, discount_percentage, tax_percentage):
+        """Sets the discount and tax percentages (Decimal) applied to the subtotal."""
+        if (discount_percentage, tax_percentage) == (self.discount_percentage, self.tax_percentage):
+            return
+        self.discount_percentage = discount_percentage
+        self.tax_percentage = tax_percentage
+        self.totals_changed.emit()
+
+    def totals(self):
+        """
+        Returns:
+            dict: Money "subtotal", "discount", "tax" and "grand_total". The discount applies to
+                  the subtotal and the tax to the discounted amount, each rounded half up to the paisa.
+        """
+        discount = self.subtotal.percentage(self.discount_percentage)
+        tax = (self.subtotal - discount).percentage(self.tax_percentage)
+        return {"subtotal": self.subtotal, "discount": discount, "tax": tax,
+                "grand_total": self.subtotal - discount + tax}
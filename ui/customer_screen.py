@@ -2,21 +2,26 @@
 
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton,
-    QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox, QFrame,
+    QTableView, QHeaderView, QMessageBox, QFrame,
     QSizePolicy, QApplication
 )
 from PyQt6.QtGui import QFont
-from PyQt6.QtCore import Qt, pyqtSignal # Ensure pyqtSignal is imported
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal # Ensure pyqtSignal is imported
 from models.customer import Customer
+from database.change_feed import ChangeEvent
+from ui.table_models import EntityTableModel, IdFilterProxyModel, customer_columns
+from ui.event_bus import EventBus, LazyRefreshMixin
 
-class CustomerScreen(QWidget):
+class CustomerScreen(LazyRefreshMixin, QWidget):
     # Define a signal that will be emitted when customer data changes
     data_changed = pyqtSignal()
 
     def __init__(self):
         super().__init__()
         self.db_manager = None
+        self.event_bus = None
         self.selected_customer_id = None
+        self.selected_customer_version = None  # row_version the form was loaded from
         self.setup_ui()
 
     def setup_ui(self):
@@ -110,19 +115,28 @@ class CustomerScreen(QWidget):
         self.search_input.textChanged.connect(self.search_customers)
         search_layout.addWidget(self.search_input)
 
+        # Typing restarts this timer, so a search runs once the user pauses instead of on every key
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(200)
+        self.search_timer.timeout.connect(self.apply_search)
+
         main_layout.addWidget(search_frame)
 
-        self.customer_table = QTableWidget(self)
-        self.customer_table.setColumnCount(6)
-        self.customer_table.setHorizontalHeaderLabels([
-            "ID", "Name", "Phone", "Email", "Address", "Created At"
-        ])
+        # Rows are patched from DBManager change events instead of being rebuilt
+        self.customer_model = EntityTableModel(customer_columns(), sort_key=lambda c: c.name, parent=self)
+        # The search runs in SQL (DBManager.find_customers); the proxy shows the matches, best first
+        self.customer_proxy = IdFilterProxyModel(self)
+        self.customer_proxy.setSourceModel(self.customer_model)
+        self.customer_table = QTableView(self)
+        self.customer_table.setModel(self.customer_proxy)
         self.customer_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        self.customer_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.customer_table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
-        self.customer_table.itemSelectionChanged.connect(self.load_selected_customer_to_form)
+        self.customer_table.verticalHeader().setVisible(False)
+        self.customer_table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.customer_table.setSelectionMode(QTableView.SelectionMode.SingleSelection)
+        self.customer_table.selectionModel().selectionChanged.connect(self.load_selected_customer_to_form)
         self.customer_table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background-color: #FFFFFF;
                 border-radius: 15px;
                 border: 1px solid #e0e0e0;
@@ -135,10 +149,10 @@ class CustomerScreen(QWidget):
                 font-weight: bold;
                 color: #34495e;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 5px;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #e0f7fa;
                 color: #2c3e50;
             }
@@ -202,26 +216,31 @@ class CustomerScreen(QWidget):
         darker_rgb = tuple(max(0, int(c * (1 - factor))) for c in rgb)
         return f"#{darker_rgb[0]:02x}{darker_rgb[1]:02x}{darker_rgb[2]:02x}"
 
-    def set_db_manager(self, db_manager):
+    def set_db_manager(self, db_manager, event_bus=None):
+        """Sets the DBManager and subscribes to customer changes on the application's EventBus."""
         self.db_manager = db_manager
+        self.event_bus = event_bus or EventBus(db_manager.change_feed, parent=self)
+        self.event_bus.subscribe(self.on_customers_changed, ["customers"], screen=self)
+        self.load_customers()
+
+    def refresh_screen(self):
         self.load_customers()
 
     def load_customers(self):
         if not self.db_manager: return
-        customers = self.db_manager.get_all_customers()
-        self.customer_table.setRowCount(len(customers))
-
-        for row_idx, cust in enumerate(customers):
-            self.customer_table.setItem(row_idx, 0, QTableWidgetItem(str(cust.id)))
-            self.customer_table.setItem(row_idx, 1, QTableWidgetItem(cust.name))
-            self.customer_table.setItem(row_idx, 2, QTableWidgetItem(cust.phone if cust.phone else ""))
-            self.customer_table.setItem(row_idx, 3, QTableWidgetItem(cust.email if cust.email else ""))
-            self.customer_table.setItem(row_idx, 4, QTableWidgetItem(cust.address if cust.address else ""))
-            self.customer_table.setItem(row_idx, 5, QTableWidgetItem(cust.created_at if cust.created_at else ""))
-
-        self.customer_table.resizeColumnsToContents()
-        self.customer_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.customer_model.set_rows(self.db_manager.get_all_customers())
         self.clear_form()
+        if self.search_input.text().strip():
+            self.apply_search()
+
+    def on_customers_changed(self, event):
+        """Patches only the rows named in a customers ChangeEvent."""
+        if event.op == ChangeEvent.DELETE:
+            self.customer_model.remove_ids(event.ids)
+        else:
+            self.customer_model.upsert_rows(self.db_manager.get_customers_by_ids(event.ids))
+        if self.search_input.text().strip() and event.touches("name", "phone", "email"):
+            self.apply_search()  # The changed rows may now match the search, or no longer match
 
     def add_customer(self):
         name = self.name_input_widget.text().strip()
@@ -237,7 +256,7 @@ class CustomerScreen(QWidget):
 
         if self.db_manager.add_customer(new_customer):
             self.show_message("Success", f"Customer '{name}' added successfully.")
-            self.load_customers()
+            self.clear_form()
             self.data_changed.emit() # Emit signal after data change
         # Error messages are handled by DBManager
 
@@ -257,14 +276,15 @@ class CustomerScreen(QWidget):
 
         updated_customer = Customer(
             customer_id=self.selected_customer_id,
-            name=name, phone=phone, email=email, address=address
+            name=name, phone=phone, email=email, address=address,
+            row_version=self.selected_customer_version
         )
 
         if self.db_manager.update_customer(updated_customer):
             self.show_message("Success", f"Customer '{name}' updated successfully.")
-            self.load_customers()
+            self.clear_form()
             self.data_changed.emit() # Emit signal after data change
-        # Error messages are handled by DBManager
+        # Error messages (including edit conflicts) are handled by DBManager
 
     def delete_customer(self):
         if self.selected_customer_id is None:
@@ -295,16 +315,17 @@ class CustomerScreen(QWidget):
         ret = msg_box.exec()
 
         if ret == QMessageBox.StandardButton.Yes:
-            if self.db_manager.delete_customer(self.selected_customer_id):
-                self.show_message("Success", f"Customer ID {self.selected_customer_id} deleted successfully.")
-                self.load_customers()
+            customer_id = self.selected_customer_id  # Removing the row clears the selection
+            if self.db_manager.delete_customer(customer_id):
+                self.show_message("Success", f"Customer ID {customer_id} deleted successfully.")
+                self.clear_form()
                 self.data_changed.emit() # Emit signal after data change
             # Error messages are handled by DBManager
         else:
             self.show_message("Cancelled", "Deletion cancelled.")
 
     def load_selected_customer_to_form(self):
-        selected_rows = self.customer_table.selectedItems()
+        selected_rows = self.customer_table.selectionModel().selectedRows()
         if not selected_rows:
             self.clear_form()
             self.selected_customer_id = None
@@ -313,13 +334,14 @@ class CustomerScreen(QWidget):
             self.add_button.setEnabled(True)
             return
 
-        row = selected_rows[0].row()
-        self.selected_customer_id = int(self.customer_table.item(row, 0).text())
+        cust = self.customer_proxy.object_for_index(selected_rows[0])
+        self.selected_customer_id = cust.id
+        self.selected_customer_version = cust.row_version
 
-        self.name_input_widget.setText(self.customer_table.item(row, 1).text())
-        self.phone_input_widget.setText(self.customer_table.item(row, 2).text())
-        self.email_input_widget.setText(self.customer_table.item(row, 3).text())
-        self.address_input_widget.setText(self.customer_table.item(row, 4).text())
+        self.name_input_widget.setText(cust.name)
+        self.phone_input_widget.setText(cust.phone or "")
+        self.email_input_widget.setText(cust.email or "")
+        self.address_input_widget.setText(cust.address or "")
 
         self.update_button.setEnabled(True)
         self.delete_button.setEnabled(True)
@@ -331,6 +353,7 @@ class CustomerScreen(QWidget):
         self.email_input_widget.clear()
         self.address_input_widget.clear()
         self.selected_customer_id = None
+        self.selected_customer_version = None
         self.customer_table.clearSelection()
 
         self.add_button.setEnabled(True)
@@ -338,12 +361,18 @@ class CustomerScreen(QWidget):
         self.delete_button.setEnabled(False)
 
     def search_customers(self):
-        search_text = self.search_input.text().strip().lower()
-        for row in range(self.customer_table.rowCount()):
-            name_match = search_text in self.customer_table.item(row, 1).text().lower()
-            phone_match = search_text in self.customer_table.item(row, 2).text().lower()
-            email_match = search_text in self.customer_table.item(row, 3).text().lower()
-            self.customer_table.setRowHidden(row, not (name_match or phone_match or email_match))
+        self.search_timer.start()
+
+    def apply_search(self):
+        """Shows the customers matching the search box by name, phone or email, best match first."""
+        self.search_timer.stop()
+        query = self.search_input.text().strip()
+        if not query or not self.db_manager:
+            self.customer_proxy.set_visible_ids(None)
+            return
+        # Every match, not just the first page: this screen is for managing customers
+        matches = self.db_manager.find_customers(query, limit=max(self.customer_model.rowCount(), 1))
+        self.customer_proxy.set_visible_ids([c.id for c in matches], ranked=True)
 
     def show_message(self, title, message):
         msg_box = QMessageBox(self)
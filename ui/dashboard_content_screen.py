@@ -2,10 +2,14 @@
 
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QFrame, QSizePolicy, QApplication
 from PyQt6.QtGui import QFont, QColor
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QThread
 
+from database.change_feed import ChangeEvent
+from database.expiry_scheduler import ExpiryAlertWorker
+from ui.event_bus import EventBus, LazyRefreshMixin
 
-class DashboardContentScreen(QWidget):
+
+class DashboardContentScreen(LazyRefreshMixin, QWidget):
     """
     The enhanced dashboard content screen, displaying key pharmacy statistics.
     """
@@ -13,6 +17,9 @@ class DashboardContentScreen(QWidget):
     def __init__(self):
         super().__init__()
         self.db_manager = None  # Initialize db_manager
+        self.event_bus = None
+        self.expiry_thread = None
+        self.expiry_worker = None
         self.setup_ui()
 
     def setup_ui(self):
@@ -113,9 +120,61 @@ class DashboardContentScreen(QWidget):
         card_frame.value_label = value_label  # Store reference to update later
         return card_frame
 
-    def set_db_manager(self, db_manager):
-        """Sets the DBManager instance and loads initial dashboard statistics."""
+    def set_db_manager(self, db_manager, event_bus=None):
+        """
+        Sets the DBManager instance and starts the expiry alert schedule. The statistics are
+        loaded when the screen is first shown.
+        """
         self.db_manager = db_manager
+        self.event_bus = event_bus or EventBus(db_manager.change_feed, parent=self)
+        # Not held while hidden: a change only needs to flag the cards as stale
+        self.event_bus.subscribe(self.on_data_changed, ["medicines", "customers", "sales"], batch=True)
+        self.mark_stale()
+        self.start_expiry_alerts()
+
+    def start_expiry_alerts(self):
+        """Starts the background thread that builds each day's expiry alert sets."""
+        self.stop_expiry_alerts()
+        self.expiry_thread = QThread(self)
+        self.expiry_worker = ExpiryAlertWorker(self.db_manager)
+        self.expiry_worker.moveToThread(self.expiry_thread)
+        self.expiry_thread.started.connect(self.expiry_worker.start)
+        # finished is emitted from the worker thread, so stop() closes its connection there
+        self.expiry_thread.finished.connect(self.expiry_worker.stop, Qt.ConnectionType.DirectConnection)
+        self.expiry_worker.alerts_refreshed.connect(self.on_expiry_alerts_refreshed)
+        QApplication.instance().aboutToQuit.connect(self.stop_expiry_alerts)
+        self.expiry_thread.start()
+
+    def stop_expiry_alerts(self):
+        """Stops the expiry alert thread."""
+        if self.expiry_thread:
+            self.expiry_thread.quit()
+            self.expiry_thread.wait()
+            self.expiry_thread = None
+            self.expiry_worker = None
+
+    def on_expiry_alerts_refreshed(self, as_of):
+        """A new day's expiry sets are ready; the Expiring Soon card is read from them."""
+        self.mark_stale()
+
+    def on_data_changed(self, events):
+        """
+        Marks the stats stale once for a delivery of changes if any of them affects a card.
+        A sale publishes several events at once; the EventBus hands them over together.
+        While the dashboard is hidden this costs no queries; it reloads when next shown.
+        """
+        if any(self._affects_cards(event) for event in events):
+            self.mark_stale()
+
+    @staticmethod
+    def _affects_cards(event):
+        if event.entity == "medicines":
+            return event.touches("stock", "low_stock_alert", "expiry_date")  # e.g. a renamed medicine changes no card
+        if event.entity == "customers":
+            return event.op != ChangeEvent.UPDATE  # Only the customer count is shown
+        return True
+
+    def refresh_screen(self):
         self.load_dashboard_stats()
 
     def load_dashboard_stats(self):
@@ -177,4 +236,5 @@ if __name__ == "__main__":
     dashboard_content_screen = DashboardContentScreen()
     dashboard_content_screen.set_db_manager(db_manager)  # Pass the DB manager
     dashboard_content_screen.showMaximized()
+    dashboard_content_screen.refresh_if_stale()
     sys.exit(app.exec())
@@ -14,6 +14,7 @@ from ui.customer_screen import CustomerScreen
 from ui.billing_screen import BillingScreen
 from ui.settings_screen import SettingsScreen
 from ui.reports_screen import ReportsScreen
+from ui.event_bus import EventBus
 
 
 class DashboardScreen(QWidget):
@@ -28,6 +29,7 @@ class DashboardScreen(QWidget):
         self.setWindowTitle("PharmaCare - Dashboard")
         self.app_signals = None
         self.db_manager = None
+        self.event_bus = None
         self.current_user = None
 
         self.setup_ui()
@@ -196,13 +198,19 @@ class DashboardScreen(QWidget):
         self.active_button = None
         self.switch_screen(0, self.dashboard_button)
 
-        # --- Connect data change signals for auto-updates ---
-        self.medicines_content.data_changed.connect(self.billing_content.load_available_medicines)
-        self.customers_content.data_changed.connect(self.billing_content.load_available_customers)
+        # Screens keep each other up to date through the shared EventBus (see set_db_manager),
+        # so a change only repaints the rows and cards it affects, and only once they are shown.
+        # A restored backup replaces everything, so that reloads every screen.
+        self.settings_content.database_restored.connect(self.reload_all_screens)
 
-        self.medicines_content.data_changed.connect(self.dashboard_content.load_dashboard_stats)
-        self.customers_content.data_changed.connect(self.dashboard_content.load_dashboard_stats)
-        self.billing_content.sale_processed.connect(self.dashboard_content.load_dashboard_stats)
+    def reload_all_screens(self):
+        """
+        Marks every screen stale, e.g. after a backup was restored. The screen on show
+        reloads now; the others reload when they are next opened.
+        """
+        for screen in self._lazy_screens():
+            screen.mark_stale()
+        self.reports_content.mark_stale()
 
     def _create_sidebar_button(self, text, object_name):
         """Helper to create a styled sidebar button."""
@@ -225,17 +233,15 @@ class DashboardScreen(QWidget):
     def switch_screen(self, index, clicked_button):
         """
         Switches the content in the QStackedWidget and updates sidebar button styles.
-        Also triggers data refresh for the dashboard if it's being displayed,
-        and generates reports if the reports screen is displayed.
+
+        Hidden screens do not reload on every change; they only mark themselves stale
+        (see LazyRefreshMixin), and the screen being shown catches up here. Row-level
+        changes held for it by the EventBus are applied as it is shown.
         """
         self.content_stacked_widget.setCurrentIndex(index)
-
-        # If the dashboard screen is being shown, load its stats
-        if index == 0:
-            self.dashboard_content.load_dashboard_stats()
-        # If the reports screen is being shown, generate its default report
-        elif index == 4:
-            self.reports_content.generate_report()
+        screen = self.content_stacked_widget.widget(index)
+        if hasattr(screen, "refresh_if_stale"):
+            screen.refresh_if_stale()
 
         # Update button styles
         if self.active_button:
@@ -243,6 +249,15 @@ class DashboardScreen(QWidget):
         clicked_button.setChecked(True)
         self.active_button = clicked_button
 
+    def log_event_bus_stats(self):
+        stats = self.event_bus.stats()
+        print(f"Event bus: {stats['events']} events, {stats['deliveries']} deliveries, "
+              f"{stats['deliveries_held']} held for hidden screens, {stats['events_coalesced']} coalesced; "
+              f"{sum(screen.refreshes_deferred for screen in self._lazy_screens())} full reloads deferred.")
+
+    def _lazy_screens(self):
+        return (self.dashboard_content, self.medicines_content, self.customers_content, self.billing_content)
+
     def _emit_logout(self):
         """Emits a signal to request application logout."""
         if self.app_signals:
@@ -255,16 +270,16 @@ class DashboardScreen(QWidget):
 
     def set_db_manager(self, db_manager):
         """Sets the DBManager instance and passes it to sub-screens.
-        Also triggers initial dashboard stats load.
+        The dashboard stats load when the dashboard is first shown.
         """
         self.db_manager = db_manager
+        # One bus for every screen, so each write is coalesced once and held for the hidden pages
+        self.event_bus = EventBus(db_manager.change_feed, parent=self)
+        QApplication.instance().aboutToQuit.connect(self.log_event_bus_stats)
         # Pass DBManager to all content screens
-        self.dashboard_content.set_db_manager(db_manager)
-        self.medicines_content.set_db_manager(db_manager)
-        self.customers_content.set_db_manager(db_manager)
-        self.billing_content.set_db_manager(db_manager)
+        self.dashboard_content.set_db_manager(db_manager, self.event_bus)
+        self.medicines_content.set_db_manager(db_manager, self.event_bus)
+        self.customers_content.set_db_manager(db_manager, self.event_bus)
+        self.billing_content.set_db_manager(db_manager, self.event_bus)
         self.reports_content.set_db_manager(db_manager)
-        self.settings_content.db_manager = db_manager
-
-        # Ensure dashboard stats are loaded when DBManager is first set
-        self.dashboard_content.load_dashboard_stats()
+        self.settings_content.set_db_manager(db_manager)
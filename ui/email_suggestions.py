@@ -0,0 +1,111 @@
+# ui/email_suggestions.py
+
+import heapq
+from collections import OrderedDict
+from itertools import islice
+
+
+class _TrieNode:
+    __slots__ = ("children", "emails")
+
+    def __init__(self):
+        self.children = {}
+        self.emails = {}  # Every email stored at or below this node -> number of its keys that pass here
+
+
+class EmailSuggestions:
+    """
+    The login screen's remembered emails, most recently used first, with a
+    prefix trie for completion.
+
+    Each email is indexed under its full address and under its domain, so both
+    "adm" and "gmail" complete "admin@gmail.com" (case-insensitively). Every trie
+    node keeps the emails below it, so a keystroke walks one node per typed
+    character and ranks only the matches, never the whole list.
+
+    The store is bounded like login_history itself (DBManager.add_login_email):
+    touching an email beyond capacity evicts the least recently used one.
+    """
+
+    def __init__(self, capacity):
+        """
+        Args:
+            capacity (int): Most emails kept.
+        """
+        self.capacity = capacity
+        self._recency = OrderedDict()  # email -> use counter, least recently used first
+        self._uses = 0
+        self._root = _TrieNode()
+
+    def __len__(self):
+        return len(self._recency)
+
+    def emails(self):
+        """Returns the emails, most recently used first."""
+        return list(reversed(self._recency))
+
+    def load(self, emails):
+        """Replaces the contents with emails, given most recently used first."""
+        self._recency.clear()
+        self._uses = 0
+        self._root = _TrieNode()
+        for email in reversed(emails[:self.capacity]):
+            self.touch(email)
+
+    def touch(self, email):
+        """Records a use of email, adding it if needed and evicting the least recently used beyond capacity."""
+        self._uses += 1
+        if email in self._recency:
+            self._recency[email] = self._uses
+            self._recency.move_to_end(email)
+            return
+        self._recency[email] = self._uses
+        for key in self._keys(email):
+            self._index(key, email, add=True)
+        while len(self._recency) > self.capacity:
+            evicted, _ = self._recency.popitem(last=False)
+            for key in self._keys(evicted):
+                self._index(key, evicted, add=False)
+
+    def complete(self, prefix, limit=10):
+        """
+        Returns up to limit emails matching prefix at the start of the address or of its
+        domain, most recently used first.
+        """
+        node = self._root
+        for char in prefix.strip().lower():
+            node = node.children.get(char)
+            if node is None:
+                return []
+        if node is self._root:
+            return list(islice(reversed(self._recency), limit))
+        return heapq.nlargest(limit, node.emails, key=self._recency.__getitem__)
+
+    @staticmethod
+    def _keys(email):
+        address = email.lower()
+        _, at, domain = address.partition("@")
+        return (address, domain) if at and domain else (address,)
+
+    def _index(self, key, email, add):
+        node = self._root
+        path = [node]
+        for char in key:
+            child = node.children.get(char)
+            if child is None:
+                if not add:
+                    return
+                child = node.children[char] = _TrieNode()
+            node = child
+            path.append(node)
+        for depth, node in enumerate(path):
+            if add:
+                node.emails[email] = node.emails.get(email, 0) + 1
+            else:
+                node.emails[email] -= 1
+                if not node.emails[email]:
+                    del node.emails[email]
+                if depth and not node.emails:
+                    # Nothing below any more: cut the branch off at its first empty node
+                    del path[depth - 1].children[key[depth - 1]]
+                    break
@@ -0,0 +1,185 @@
+# ui/event_bus.py
+
+from PyQt6.QtCore import QObject, QEvent, QTimer
+
+from database.change_feed import ChangeEvent
+
+
+def coalesce_events(events):
+    """
+    Merges runs of consecutive events with the same entity and op into one event
+    naming all their IDs, e.g. the stock updates of twenty sales into one update.
+    Only neighbours are merged, so the order of inserts, updates and deletes is kept.
+
+    Returns:
+        list: The merged ChangeEvents.
+    """
+    runs = []  # [entity, op, {id: None}, fields or None]
+    for event in events:
+        run = runs[-1] if runs else None
+        if run is None or (run[0], run[1]) != (event.entity, event.op):
+            runs.append([event.entity, event.op, dict.fromkeys(event.ids),
+                         dict.fromkeys(event.fields) if event.fields is not None else None])
+            continue
+        run[2].update(dict.fromkeys(event.ids))
+        if run[3] is not None:
+            run[3] = run[3] | dict.fromkeys(event.fields) if event.fields is not None else None
+    return [ChangeEvent(entity, op, ids, fields) for entity, op, ids, fields in runs]
+
+
+class _Subscription:
+    """One screen callback registered with the EventBus."""
+    __slots__ = ("callback", "entities", "screen", "batch", "held")
+
+    def __init__(self, callback, entities, screen, batch):
+        self.callback = callback
+        self.entities = set(entities) if entities else None
+        self.screen = screen
+        self.batch = batch
+        self.held = []  # Events kept back while the screen is hidden
+
+
+class EventBus(QObject):
+    """
+    Application-level fan-out of the DBManager's ChangeEvents to the screens.
+
+    The bus subscribes to the change feed once and delivers on the next pass of
+    the event loop, so a burst of writes (a sale publishes one event per table it
+    touches, a queued backlog many more) reaches each screen as one coalesced
+    delivery instead of one refresh per write.
+
+    A subscription may name the screen it updates. While that screen is not
+    visible (e.g. another page of the dashboard's QStackedWidget is showing),
+    its events are held, coalesced, and delivered when the screen is next shown.
+    Caches that must never be stale, such as MedicineCatalog, stay on the change
+    feed itself.
+    """
+
+    def __init__(self, change_feed, parent=None):
+        """
+        Args:
+            change_feed (ChangeFeed): Feed of the GUI thread's DBManager (or DBManagerClient).
+        """
+        super().__init__(parent)
+        self._pending = []
+        self._subscriptions = []
+        self.events_received = 0
+        self.deliveries = 0
+        self.deliveries_held = 0  # Deliveries put off because the screen was hidden
+        self.events_coalesced = 0  # Events folded into another before delivery, counted per subscriber
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(0)
+        self.flush_timer.timeout.connect(self.flush)
+        change_feed.subscribe(self._on_change)
+
+    def subscribe(self, callback, entities=None, screen=None, batch=False):
+        """
+        Registers a callback for changes to the given entities (all entities if None).
+
+        Args:
+            callback (callable): callback(event) once per coalesced ChangeEvent, or, with
+                batch=True, callback(events) once per delivery, e.g. to reload a few cards.
+            entities (list, optional): Entity names such as "medicines".
+            screen (QWidget, optional): Screen the callback updates; its events are held
+                while it is hidden.
+            batch (bool): Deliver the whole list of events in one call.
+        """
+        subscription = _Subscription(callback, entities, screen, batch)
+        self._subscriptions.append(subscription)
+        if screen is not None:
+            screen.installEventFilter(self)
+        return callback
+
+    def unsubscribe(self, callback):
+        self._subscriptions = [s for s in self._subscriptions if s.callback != callback]
+
+    def _on_change(self, event):
+        self.events_received += 1
+        self._pending.append(event)
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def flush(self):
+        """Delivers the events published since the last flush."""
+        events, self._pending = self._pending, []
+        for subscription in list(self._subscriptions):
+            wanted = [e for e in events if subscription.entities is None or e.entity in subscription.entities]
+            if not wanted:
+                continue
+            if subscription.screen is not None and not subscription.screen.isVisible():
+                held = len(subscription.held) + len(wanted)
+                subscription.held = coalesce_events(subscription.held + wanted)
+                self.events_coalesced += held - len(subscription.held)
+                self.deliveries_held += 1
+                continue
+            self._deliver(subscription, wanted)
+
+    def discard_held(self, screen):
+        """Drops the events held for a screen, e.g. because it is going to reload everything."""
+        for subscription in self._subscriptions:
+            if subscription.screen is screen:
+                subscription.held = []
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Type.Show:
+            for subscription in list(self._subscriptions):
+                if subscription.screen is watched and subscription.held:
+                    held, subscription.held = subscription.held, []
+                    self._deliver(subscription, held)
+        return False
+
+    def _deliver(self, subscription, events):
+        merged = coalesce_events(events)
+        self.events_coalesced += len(events) - len(merged)
+        self.deliveries += 1
+        try:
+            if subscription.batch:
+                subscription.callback(merged)
+            else:
+                for event in merged:
+                    subscription.callback(event)
+        except Exception as e:
+            # One broken screen must not stop the others from updating.
+            print(f"Error delivering {merged}: {e}")
+
+    def stats(self):
+        """Returns the bus counters, e.g. for logging."""
+        return {
+            "events": self.events_received,
+            "deliveries": self.deliveries,
+            "deliveries_held": self.deliveries_held,
+            "events_coalesced": self.events_coalesced,
+            "held_events": sum(len(s.held) for s in self._subscriptions),
+        }
+
+
+class LazyRefreshMixin:
+    """
+    Dirty flag for a screen of the dashboard's QStackedWidget.
+
+    mark_stale() reloads a visible screen at once; a hidden one is only flagged,
+    and DashboardScreen.switch_screen calls refresh_if_stale() when it is shown,
+    so a screen that is never opened during a busy checkout never reloads.
+    Screens must define refresh_screen() to do the full reload.
+    """
+    stale = False
+    refreshes_deferred = 0  # mark_stale() calls that did not reload because the screen was hidden
+
+    def mark_stale(self):
+        """Reloads the screen now if it is visible, otherwise the next time it is shown."""
+        self.stale = True
+        if getattr(self, "event_bus", None):
+            self.event_bus.discard_held(self)  # The reload covers them
+        if self.isVisible():
+            self.refresh_if_stale()
+        else:
+            self.refreshes_deferred += 1
+
+    def refresh_if_stale(self):
+        """Reloads the screen if it was marked stale; returns True if it did."""
+        if not self.stale:
+            return False
+        self.stale = False
+        self.refresh_screen()
+        return True
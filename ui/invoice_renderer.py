@@ -0,0 +1,286 @@
+# ui/invoice_renderer.py
+
+import html
+import os
+import time
+from PyQt6.QtCore import QObject, QThread, QMarginsF, QRectF, QSizeF, Qt, pyqtSignal, pyqtSlot
+from PyQt6.QtGui import QFont, QPageLayout, QPageSize, QPainter, QPdfWriter, QTextDocument
+from PyQt6.QtWidgets import QApplication
+
+from models.money import Money
+
+PHARMACY_NAME = "PharmaCare"
+PHARMACY_ADDRESS = "123 Health St, Wellness City"
+PHARMACY_CONTACT = "+92 3XX XXXXXXX | info@pharmacare.com"
+
+INVOICE_DIR = "invoices"
+PDF_RESOLUTION = 300  # dpi; text is vector output, this only sets layout precision
+
+
+class InvoiceTemplate:
+    """
+    An invoice layout compiled once: the static header is rendered to HTML up
+    front, and the per-invoice parts are plain format strings, so filling in an
+    invoice is a handful of str.format calls.
+    """
+
+    STYLE = """
+        body { font-family: Arial; font-size: 10pt; color: #2c3e50; }
+        h1 { font-size: 18pt; color: #007bff; margin: 0; }
+        .muted { color: #7f8c8d; }
+        table.items { border-collapse: collapse; }
+        table.items th { background-color: #f0f2f5; text-align: left; padding: 4px; }
+        table.items td { padding: 4px; border-bottom: 1px solid #e0e0e0; }
+        .total { font-size: 12pt; font-weight: bold; }
+    """
+
+    def __init__(self, name=PHARMACY_NAME, address=PHARMACY_ADDRESS, contact=PHARMACY_CONTACT):
+        self.header = (
+            f"<h1>{html.escape(name)}</h1>"
+            f"<div class='muted'>{html.escape(address)}<br>{html.escape(contact)}</div><hr>"
+        )
+        self.details = ("<table width='100%'><tr><td><b>Invoice:</b> {number}<br><b>Date:</b> {date}</td>"
+                        "<td align='right'><b>Customer:</b> {customer}{contact}</td></tr></table><br>")
+        self.items_header = ("<table class='items' width='100%'><tr><th>Medicine</th><th align='right'>Price</th>"
+                             "<th align='right'>Qty</th><th align='right'>Subtotal</th></tr>")
+        self.item_row = ("<tr><td>{name}</td><td align='right'>{price:.2f}</td><td align='right'>{qty}</td>"
+                         "<td align='right'>{subtotal:.2f}</td></tr>")
+        self.summary_row = "<tr><td>{label}</td><td align='right'>{value}</td></tr>"
+        self.footer = "<br><div class='muted' align='center'>Thank you for your purchase!</div>"
+
+    def render(self, invoice):
+        """
+        Returns the HTML of one invoice.
+
+        Args:
+            invoice (dict): See invoice_from_sale() for the keys.
+        """
+        contact = "".join(f"<br>{html.escape(value)}" for value in (invoice.get("customer_phone"),
+                                                                    invoice.get("customer_email")) if value)
+        parts = [
+            self.header,
+            self.details.format(number=html.escape(str(invoice.get("number") or "Draft")),
+                                date=html.escape(invoice["date"]),
+                                customer=html.escape(invoice.get("customer_name") or "Walk-in Customer"),
+                                contact=contact),
+            self.items_header,
+        ]
+        for item in invoice["items"]:
+            parts.append(self.item_row.format(name=html.escape(str(item["name"])), price=item["price"],
+                                              qty=item["qty"], subtotal=item["price"] * item["qty"]))
+        parts.append("</table><br><table align='right' cellpadding='3'>")
+        for label, value in invoice["summary"]:
+            parts.append(self.summary_row.format(label=html.escape(label), value=html.escape(value)))
+        parts.append(self.summary_row.format(label="<span class='total'>Grand Total</span>",
+                                             value=f"<span class='total'>{invoice['total']:.2f}</span>"))
+        parts.append("</table>")
+        parts.append(self.footer)
+        return "".join(parts)
+
+
+_TEMPLATES = {}
+
+
+def get_template(name="default"):
+    """Returns the compiled invoice template, building it on first use."""
+    if name not in _TEMPLATES:
+        _TEMPLATES[name] = InvoiceTemplate()
+    return _TEMPLATES[name]
+
+
+def invoice_from_sale(sale):
+    """
+    Builds invoice data from a sale dictionary as returned by DBManager.get_all_sales.
+    A sale without stored pricing (e.g. the benchmark's) shows any difference between
+    the items and the amount charged as one adjustment line.
+    """
+    subtotal = sum((Money.of(item["price"]) * item["qty"] for item in sale["items"]), Money(0))
+    total = Money.of(sale["total_amount"])
+    summary = [("Subtotal", f"{subtotal:.2f}")]
+    if sale.get("discount") is not None:
+        for label, key, rate_key, sign in (("Discount", "discount", "discount_rate", "-"), ("Tax", "tax", "tax_rate", "+")):
+            if sale[key]:
+                rate = f" ({sale[rate_key]}%)" if sale.get(rate_key) is not None else ""
+                summary.append((f"{label}{rate}", f"{sign}{sale[key]:.2f}"))
+    else:
+        adjustment = total - subtotal
+        if adjustment:
+            summary.append(("Discount / Tax", f"{adjustment:+.2f}"))
+    return {
+        "number": sale["id"],
+        "date": sale["sale_date"],
+        "customer_name": sale["customer_name"],
+        "customer_phone": sale.get("customer_phone"),
+        "customer_email": sale.get("customer_email"),
+        "items": sale["items"],
+        "summary": summary,
+        "total": total,
+    }
+
+
+class InvoiceRenderer:
+    """
+    Writes invoices to PDF with QPdfWriter and QTextDocument.
+
+    One QTextDocument and one font are reused for every invoice, so the cost of
+    setting up fonts and style sheets is paid once per file, not once per invoice.
+    Safe to use from a worker thread (it only paints on a QPdfWriter).
+    """
+
+    def __init__(self, template=None):
+        self.template = template or get_template()
+        self.font = QFont("Arial", 10)
+
+    def render_to_pdf(self, invoices, path, progress=None, is_cancelled=None):
+        """
+        Writes invoices to one PDF, each starting on a new page.
+
+        Args:
+            invoices (iterable): Invoice dictionaries (see invoice_from_sale).
+            path (str): Output file.
+            progress (callable, optional): Called as progress(rendered_count) every 50 invoices.
+            is_cancelled (callable, optional): Checked between invoices; returning True stops early.
+
+        Returns:
+            int: Number of invoices written.
+        """
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        writer = QPdfWriter(path)
+        writer.setResolution(PDF_RESOLUTION)
+        writer.setPageLayout(QPageLayout(QPageSize(QPageSize.PageSizeId.A4), QPageLayout.Orientation.Portrait,
+                                         QMarginsF(15, 15, 15, 15), QPageLayout.Unit.Millimeter))
+        writer.setTitle("PharmaCare invoices")
+        painter = QPainter(writer)
+        page_width = writer.width()
+        page_height = writer.height()
+
+        document = QTextDocument()
+        document.documentLayout().setPaintDevice(writer)  # Lay out for the PDF's resolution
+        document.setDefaultFont(self.font)
+        document.setDefaultStyleSheet(InvoiceTemplate.STYLE)
+        document.setDocumentMargin(0)
+        document.setPageSize(QSizeF(page_width, page_height))
+
+        count = 0
+        try:
+            for invoice in invoices:
+                if is_cancelled and is_cancelled():
+                    break
+                document.setHtml(self.template.render(invoice))
+                for page in range(document.pageCount()):
+                    if count or page:
+                        writer.newPage()
+                    painter.save()
+                    painter.translate(0, -page * page_height)
+                    document.drawContents(painter, QRectF(0, page * page_height, page_width, page_height))
+                    painter.restore()
+                count += 1
+                if progress and count % 50 == 0:
+                    progress(count)
+        finally:
+            painter.end()
+        return count
+
+
+class InvoiceWorker(QObject):
+    """
+    Renders invoices in a background QThread.
+    """
+    progress = pyqtSignal(int, int)  # rendered, total
+    finished = pyqtSignal(str, int, float)  # path, invoices written, seconds
+    failed = pyqtSignal(str)  # message
+
+    def __init__(self, db_manager):
+        """
+        Args:
+            db_manager: The GUI thread's DBManager (or DBManagerClient); the worker opens its
+                        own connection from it with new_connection() once it runs in its thread.
+        """
+        super().__init__()
+        self.source_db_manager = db_manager
+        self.db_manager = None
+        self.renderer = None
+        self.cancel_requested = False
+
+    @pyqtSlot()
+    def start(self):
+        self.db_manager = self.source_db_manager.new_connection(
+            error_reporter=lambda title, message: print(f"Invoice export: {title}: {message}"))
+        self.renderer = InvoiceRenderer()
+
+    @pyqtSlot(object, str)
+    def render_invoice(self, invoice, path):
+        """Writes a single invoice."""
+        self._render([invoice], path)
+
+    @pyqtSlot(str, str, str)
+    def render_sales_range(self, start_date, end_date, path):
+        """Writes the invoices of every sale between two dates (inclusive), oldest first, to one file."""
+        sales = self.db_manager.get_sales_in_date_range(start_date, end_date)
+        sales.sort(key=lambda sale: (sale["sale_date"], sale["id"]))
+        self._render([invoice_from_sale(sale) for sale in sales], path)
+
+    def _render(self, invoices, path):
+        self.cancel_requested = False
+        started = time.perf_counter()
+        total = len(invoices)
+        if not total:
+            self.finished.emit(path, 0, 0.0)
+            return
+        self.progress.emit(0, total)
+        try:
+            count = self.renderer.render_to_pdf(invoices, path, progress=lambda done: self.progress.emit(done, total),
+                                                is_cancelled=lambda: self.cancel_requested)
+        except Exception as e:
+            print(f"Invoice rendering failed: {e}")
+            self.failed.emit(str(e))
+            return
+        elapsed = time.perf_counter() - started
+        print(f"{count} invoice(s) written to {path} in {elapsed:.2f}s.")
+        self.finished.emit(path, count, elapsed)
+
+    @pyqtSlot()
+    def stop(self):
+        self.cancel_requested = True
+        if self.db_manager:
+            self.db_manager.close_db()
+
+
+class InvoiceService(QObject):
+    """
+    Owns the invoice worker thread for a screen.
+    """
+    invoice_requested = pyqtSignal(object, str)
+    range_requested = pyqtSignal(str, str, str)
+
+    def __init__(self, db_manager, parent=None):
+        super().__init__(parent)
+        self.thread = QThread(self)
+        self.worker = InvoiceWorker(db_manager)
+        self.worker.moveToThread(self.thread)
+        self.thread.started.connect(self.worker.start)
+        # finished is emitted from the worker thread, so stop() closes its connection there
+        self.thread.finished.connect(self.worker.stop, Qt.ConnectionType.DirectConnection)
+        self.invoice_requested.connect(self.worker.render_invoice)
+        self.range_requested.connect(self.worker.render_sales_range)
+        QApplication.instance().aboutToQuit.connect(self.stop)
+        self.thread.start()
+
+    def render_invoice(self, invoice, path):
+        self.invoice_requested.emit(invoice, path)
+
+    def render_sales_range(self, start_date, end_date, path):
+        self.range_requested.emit(start_date, end_date, path)
+
+    def cancel(self):
+        """Stops a batch export after the invoice being rendered."""
+        self.worker.cancel_requested = True
+
+    @pyqtSlot()
+    def stop(self):
+        if self.thread.isRunning():
+            self.cancel()
+            self.thread.quit()
+            self.thread.wait()
@@ -10,7 +10,8 @@ import bcrypt
 
 # Import the User model and DBManager
 from models.user import User
-from database.db_manager import DBManager
+from database.db_manager import DBManager, LOGIN_HISTORY_LIMIT
+from ui.email_suggestions import EmailSuggestions
 
 
 class LoginScreen(QWidget):
@@ -21,6 +22,8 @@ class LoginScreen(QWidget):
         self.db_manager = None
         self.password_visible = False
         self.completer_model = QStringListModel()  # Initialize completer model
+        self.email_suggestions = EmailSuggestions(LOGIN_HISTORY_LIMIT)
+        self.email_suggestions_loaded = False
         self.completer = QCompleter(self)  # Initialize QCompleter
         self.setup_ui()
         self.setup_completer()  # Call setup_completer after setup_ui
@@ -217,18 +220,30 @@ class LoginScreen(QWidget):
         self.setStyleSheet("background-color: #f0f2f5;")
 
     def setup_completer(self):
-        """Sets up the QCompleter for the email input field."""
+        """
+        Sets up the QCompleter for the email input field. The completer does no filtering
+        of its own: each keystroke fills its model with the matches from the suggestion trie.
+        """
         self.completer.setModel(self.completer_model)
-        self.completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-        self.completer.setFilterMode(Qt.MatchFlag.MatchContains)  # Allows suggestions anywhere in the string
+        self.completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
         self.email_input.setCompleter(self.completer)
+        self.email_input.textEdited.connect(self.update_email_completions)
 
     def load_email_suggestions(self):
-        """Loads email suggestions from the database into the completer model."""
-        if self.db_manager:
-            emails = self.db_manager.get_login_emails()
-            self.completer_model.setStringList(emails)
-            print("Loaded email suggestions:", emails)  # For debugging
+        """Loads the remembered emails from the database, once; later logins update them in memory."""
+        if self.db_manager and not self.email_suggestions_loaded:
+            self.email_suggestions.load(self.db_manager.get_login_emails())
+            self.email_suggestions_loaded = True
+            print("Loaded email suggestions:", self.email_suggestions.emails())  # For debugging
+
+    def update_email_completions(self, text):
+        """Shows the remembered emails that start with the typed text (or whose domain does)."""
+        matches = self.email_suggestions.complete(text) if text.strip() else []
+        self.completer_model.setStringList(matches)
+        if matches and matches != [text]:
+            self.completer.complete()
+        else:
+            self.completer.popup().hide()
 
     def toggle_password_visibility(self):
         if self.password_visible:
@@ -300,8 +315,8 @@ class LoginScreen(QWidget):
                 self.show_message("Login Success", f"Welcome back, {user_data[1]}!")
 
                 # New: Add email to login history
-                self.db_manager.add_login_email(email)
-                self.load_email_suggestions()  # Refresh completer model to include new email
+                if self.db_manager.add_login_email(email):
+                    self.email_suggestions.touch(email)  # Same eviction as login_history, without a reload
 
                 # Clear fields after successful login
                 self.email_input.clear()
@@ -1,5 +1,6 @@
 # ui/main_window.py
 
+import os
 import sys
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QStackedWidget,
@@ -15,6 +16,7 @@ from ui.dashboard_screen import DashboardScreen  # Import the new DashboardScree
 
 # Import database manager
 from database.db_manager import DBManager
+from database.api_client import DBManagerClient
 
 # Import styles
 from styles.app_styles import APP_STYLES
@@ -50,8 +52,14 @@ class MainWindow(QMainWindow):
         # NEW: Set the application icon
         self.setWindowIcon(QIcon("assets/icon.png"))
 
-        # Initialize database manager
-        self.db_manager = DBManager()
+        # Initialize database manager. When PHARMACARE_API_URL is set, all screens talk to
+        # the shared database/api_server.py process instead of opening pharmacy.db directly.
+        api_url = os.environ.get("PHARMACARE_API_URL")
+        if api_url:
+            self.db_manager = DBManagerClient(api_url)
+            self.db_manager.connect_db()
+        else:
+            self.db_manager = DBManager()
 
         # Apply global styles
         QApplication.instance().setStyleSheet(APP_STYLES)
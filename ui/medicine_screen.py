@@ -2,22 +2,33 @@
 
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton,
-    QTableWidget, QTableWidgetItem, QHeaderView, QDateEdit, QComboBox,
+    QTableView, QHeaderView, QDateEdit, QComboBox,
     QMessageBox, QFrame, QSizePolicy, QSpacerItem, QApplication
 )
 from PyQt6.QtGui import QFont, QIcon
-from PyQt6.QtCore import Qt, QDate, pyqtSignal
+from PyQt6.QtCore import Qt, QDate, QTimer, pyqtSignal
 from models.medicine import Medicine  # THIS LINE WAS MISSING AND HAS BEEN ADDED BACK
+from models.money import Money
+from database.db_manager import MEDICINE_EDIT_FIELDS
+from database.change_feed import ChangeEvent
+from ui.table_models import EntityTableModel, IdFilterProxyModel, medicine_columns
+from ui.event_bus import EventBus, LazyRefreshMixin
 
+# "Expired / Expiring Soon" shows medicines expiring within this many days, as on the dashboard
+EXPIRY_SOON_DAYS = 30
 
-class MedicineScreen(QWidget):
+
+class MedicineScreen(LazyRefreshMixin, QWidget):
     # Define a signal that will be emitted when medicine data changes
     data_changed = pyqtSignal()
 
     def __init__(self):
         super().__init__()
         self.db_manager = None
+        self.event_bus = None
         self.selected_medicine_id = None
+        self.editing_medicine = None  # Medicine as stored when it was loaded into the form
+        self.form_snapshot = None  # The same medicine as the form first showed it
         self.setup_ui()
 
     def setup_ui(self):
@@ -62,8 +73,12 @@ class MedicineScreen(QWidget):
         self.brand_layout, self.brand_input_widget = self._create_labeled_input("Brand:", "Enter brand name (optional)")
         self.category_layout, self.category_input_widget = self._create_labeled_input("Category:",
                                                                                       "Enter category (e.g., Pain Relief)")
+        self.barcode_layout, self.barcode_input_widget = self._create_labeled_input("Barcode:",
+                                                                                    "Scan or enter barcode (optional)")
         self.price_layout, self.price_input_widget = self._create_labeled_input("Price:", "Enter price",
                                                                                 is_numeric=True)
+        self.cost_price_layout, self.cost_price_input_widget = self._create_labeled_input(
+            "Cost Price:", "Purchase cost per unit (optional)", is_numeric=True)
         self.stock_layout, self.stock_input_widget = self._create_labeled_input("Stock Quantity:",
                                                                                 "Enter stock quantity", is_numeric=True)
         self.low_stock_alert_layout, self.low_stock_alert_input_widget = self._create_labeled_input("Low Stock Alert:",
@@ -90,7 +105,9 @@ class MedicineScreen(QWidget):
         form_layout.addLayout(self.name_layout)
         form_layout.addLayout(self.brand_layout)
         form_layout.addLayout(self.category_layout)
+        form_layout.addLayout(self.barcode_layout)
         form_layout.addLayout(self.price_layout)
+        form_layout.addLayout(self.cost_price_layout)
         form_layout.addLayout(self.stock_layout)
         form_layout.addLayout(self.low_stock_alert_layout)
         form_layout.addLayout(self.description_layout)
@@ -157,20 +174,33 @@ class MedicineScreen(QWidget):
         self.filter_combo.currentIndexChanged.connect(self.apply_filter)
         search_filter_layout.addWidget(self.filter_combo)
 
+        self.category_filter_combo = QComboBox(self)
+        self.category_filter_combo.addItem("All Categories")
+        self.category_filter_combo.currentIndexChanged.connect(self.apply_filter)
+        search_filter_layout.addWidget(self.category_filter_combo)
+
+        # Typing restarts this timer, so a search runs once the user pauses instead of on every key
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(200)
+        self.search_timer.timeout.connect(self.apply_filter)
+
         main_layout.addWidget(search_filter_frame)
 
-        self.medicine_table = QTableWidget(self)
-        self.medicine_table.setColumnCount(10)
-        self.medicine_table.setHorizontalHeaderLabels([
-            "ID", "Name", "Brand", "Category", "Price", "Stock",
-            "Low Alert", "Expiry Date", "Description", "Created At"
-        ])
+        # Rows are patched from DBManager change events instead of being rebuilt
+        self.medicine_model = EntityTableModel(medicine_columns(), sort_key=lambda m: m.name, parent=self)
+        # Search and filters are evaluated in SQL; the proxy only hides the rows that did not match
+        self.medicine_proxy = IdFilterProxyModel(self)
+        self.medicine_proxy.setSourceModel(self.medicine_model)
+        self.medicine_table = QTableView(self)
+        self.medicine_table.setModel(self.medicine_proxy)
         self.medicine_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        self.medicine_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.medicine_table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
-        self.medicine_table.itemSelectionChanged.connect(self.load_selected_medicine_to_form)
+        self.medicine_table.verticalHeader().setVisible(False)
+        self.medicine_table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.medicine_table.setSelectionMode(QTableView.SelectionMode.SingleSelection)
+        self.medicine_table.selectionModel().selectionChanged.connect(self.load_selected_medicine_to_form)
         self.medicine_table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background-color: #FFFFFF;
                 border-radius: 15px;
                 border: 1px solid #e0e0e0;
@@ -183,10 +213,10 @@ class MedicineScreen(QWidget):
                 font-weight: bold;
                 color: #34495e;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 5px;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #e0f7fa;
                 color: #2c3e50;
             }
@@ -264,61 +294,88 @@ class MedicineScreen(QWidget):
         validator.setNotation(QDoubleValidator.Notation.StandardNotation)
         return validator
 
-    def set_db_manager(self, db_manager):
+    def set_db_manager(self, db_manager, event_bus=None):
+        """Sets the DBManager and subscribes to medicine changes on the application's EventBus."""
         self.db_manager = db_manager
+        self.event_bus = event_bus or EventBus(db_manager.change_feed, parent=self)
+        self.event_bus.subscribe(self.on_medicines_changed, ["medicines"], screen=self)
+        self.load_medicines()
+
+    def refresh_screen(self):
         self.load_medicines()
 
     def load_medicines(self):
         if not self.db_manager: return
-        medicines = self.db_manager.get_all_medicines()
-        self.medicine_table.setRowCount(len(medicines))
-
-        for row_idx, med in enumerate(medicines):
-            self.medicine_table.setItem(row_idx, 0, QTableWidgetItem(str(med.id)))
-            self.medicine_table.setItem(row_idx, 1, QTableWidgetItem(med.name))
-            self.medicine_table.setItem(row_idx, 2, QTableWidgetItem(med.brand if med.brand else ""))
-            self.medicine_table.setItem(row_idx, 3, QTableWidgetItem(med.category if med.category else ""))
-            self.medicine_table.setItem(row_idx, 4, QTableWidgetItem(f"{med.price:.2f}"))
-            self.medicine_table.setItem(row_idx, 5, QTableWidgetItem(str(med.stock)))
-            self.medicine_table.setItem(row_idx, 6, QTableWidgetItem(str(med.low_stock_alert)))
-            self.medicine_table.setItem(row_idx, 7, QTableWidgetItem(med.expiry_date if med.expiry_date else ""))
-            self.medicine_table.setItem(row_idx, 8, QTableWidgetItem(med.description if med.description else ""))
-            self.medicine_table.setItem(row_idx, 9, QTableWidgetItem(med.created_at if med.created_at else ""))
-
-        self.medicine_table.resizeColumnsToContents()
-        self.medicine_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.medicine_model.set_rows(self.db_manager.get_all_medicines())
+        self.load_categories()
+        self.apply_filter()
         self.clear_form()
 
-    def add_medicine(self):
+    def load_categories(self):
+        """Refills the category filter, keeping the current choice if it still exists."""
+        current = self.category_filter_combo.currentText()
+        self.category_filter_combo.blockSignals(True)
+        self.category_filter_combo.clear()
+        self.category_filter_combo.addItem("All Categories")
+        self.category_filter_combo.addItems(self.db_manager.get_medicine_categories())
+        index = self.category_filter_combo.findText(current)
+        self.category_filter_combo.setCurrentIndex(max(index, 0))
+        self.category_filter_combo.blockSignals(False)
+
+    def on_medicines_changed(self, event):
+        """Patches only the rows named in a medicines ChangeEvent."""
+        if event.op == ChangeEvent.DELETE:
+            self.medicine_model.remove_ids(event.ids)
+        else:
+            self.medicine_model.upsert_rows(self.db_manager.get_medicines_by_ids(event.ids))
+        if event.touches("category"):
+            self.load_categories()
+        if not self._filter_arguments():
+            return
+        if event.touches("name", "brand", "category", "stock", "low_stock_alert", "expiry_date"):
+            self.apply_filter()  # The changed rows may now match the filters, or no longer match
+
+    def _medicine_from_form(self, medicine_id=None, row_version=None):
+        """Builds a Medicine from the form inputs, or shows an input error and returns None."""
         name = self.name_input_widget.text().strip()
         brand = self.brand_input_widget.text().strip()
         category = self.category_input_widget.text().strip()
         price_text = self.price_input_widget.text().strip()
+        cost_price_text = self.cost_price_input_widget.text().strip()
         stock_text = self.stock_input_widget.text().strip()
         low_stock_alert_text = self.low_stock_alert_input_widget.text().strip()
         expiry_date = self.expiry_date_edit.date().toString(Qt.DateFormat.ISODate)
         description = self.description_input_widget.text().strip()
+        barcode = self.barcode_input_widget.text().strip() or None
 
         if not name or not price_text or not stock_text:
             self.show_message("Input Error", "Medicine Name, Price, and Stock are required.")
-            return
+            return None
 
         try:
-            price = float(price_text)
+            price = Money.parse(price_text)
+            cost_price = Money.parse(cost_price_text) if cost_price_text else None
             stock = int(stock_text)
             low_stock_alert = int(low_stock_alert_text) if low_stock_alert_text else 10
         except ValueError:
-            self.show_message("Input Error", "Price, Stock, and Low Stock Alert must be valid numbers.")
-            return
+            self.show_message("Input Error", "Price, Cost Price, Stock, and Low Stock Alert must be valid numbers.")
+            return None
 
-        new_medicine = Medicine(
+        return Medicine(
             name=name, brand=brand, category=category, price=price, stock=stock,
-            low_stock_alert=low_stock_alert, expiry_date=expiry_date, description=description
+            low_stock_alert=low_stock_alert, expiry_date=expiry_date, description=description,
+            medicine_id=medicine_id, row_version=row_version, barcode=barcode, cost_price=cost_price
         )
 
+    def add_medicine(self):
+        new_medicine = self._medicine_from_form()
+        if not new_medicine:
+            return
+        name = new_medicine.name
+
         if self.db_manager.add_medicine(new_medicine):
             self.show_message("Success", f"Medicine '{name}' added successfully.")
-            self.load_medicines()
+            self.clear_form()
             self.data_changed.emit()  # Emit signal after data change
         # Error messages are handled by DBManager
 
@@ -327,38 +384,87 @@ class MedicineScreen(QWidget):
             self.show_message("Selection Error", "Please select a medicine from the table to update.")
             return
 
-        name = self.name_input_widget.text().strip()
-        brand = self.brand_input_widget.text().strip()
-        category = self.category_input_widget.text().strip()
-        price_text = self.price_input_widget.text().strip()
-        stock_text = self.stock_input_widget.text().strip()
-        low_stock_alert_text = self.low_stock_alert_input_widget.text().strip()
-        expiry_date = self.expiry_date_edit.date().toString(Qt.DateFormat.ISODate)
-        description = self.description_input_widget.text().strip()
-
-        if not name or not price_text or not stock_text:
-            self.show_message("Input Error", "Medicine Name, Price, and Stock are required.")
-            return
-
-        try:
-            price = float(price_text)
-            stock = int(stock_text)
-            low_stock_alert = int(low_stock_alert_text) if low_stock_alert_text else 10
-        except ValueError:
-            self.show_message("Input Error", "Price, Stock, and Low Stock Alert must be valid numbers.")
+        updated_medicine = self._medicine_from_form(self.selected_medicine_id, self.editing_medicine.row_version)
+        if not updated_medicine:
             return
 
-        updated_medicine = Medicine(
-            medicine_id=self.selected_medicine_id,
-            name=name, brand=brand, category=category, price=price, stock=stock,
-            low_stock_alert=low_stock_alert, expiry_date=expiry_date, description=description
-        )
-
-        if self.db_manager.update_medicine(updated_medicine):
-            self.show_message("Success", f"Medicine '{name}' updated successfully.")
-            self.load_medicines()
+        # The update only applies if nobody changed the medicine since it was loaded.
+        # On a conflict the edit is merged onto the stored row and retried.
+        base, snapshot = self.editing_medicine, self.form_snapshot
+        merge_note = ""
+        outcome = self.db_manager.try_update_medicine(updated_medicine)
+        while outcome["status"] == "conflict":
+            theirs = outcome["current"]
+            updated_medicine, merge_note = self.resolve_update_conflict(base, snapshot, updated_medicine, theirs)
+            if updated_medicine is None:
+                self.show_message("Cancelled", "Update cancelled. Your changes are still in the form.")
+                return
+            base = snapshot = theirs
+            outcome = self.db_manager.try_update_medicine(updated_medicine)
+
+        if outcome["status"] == "updated":
+            self.show_message("Success", f"Medicine '{updated_medicine.name}' updated successfully.{merge_note}")
+            self.clear_form()
             self.data_changed.emit()  # Emit signal after data change
-        # Error messages are handled by DBManager
+        elif outcome["status"] != "unavailable":
+            self.show_message("Update Error", outcome["message"])
+
+    def resolve_update_conflict(self, base, snapshot, mine, theirs):
+        """
+        Three-way merges this terminal's edit with a version saved elsewhere in the meantime.
+
+        Fields only one side changed keep that side's value. Stock changed on both sides
+        (typically sales rung up while the form was open) keeps the other side's stock
+        and applies this edit as a delta, so concurrent sales are never erased. Any other
+        field changed differently on both sides is put to the user.
+
+        Args:
+            base (Medicine): The stored medicine the edit started from.
+            snapshot (Medicine): The same medicine as the form showed it (rounded values etc.).
+            mine (Medicine): The edited values.
+            theirs (Medicine): The medicine as stored now.
+
+        Returns:
+            tuple: (merged Medicine carrying theirs.row_version, or None if cancelled, note for the user)
+        """
+        merged = Medicine(name=theirs.name, brand=theirs.brand, category=theirs.category, price=theirs.price,
+                          stock=theirs.stock, medicine_id=theirs.id, row_version=theirs.row_version)
+        clashes = []
+        note = ""
+        for field in MEDICINE_EDIT_FIELDS:
+            mine_value, theirs_value = getattr(mine, field), getattr(theirs, field)
+            if mine_value == getattr(snapshot, field) or mine_value == theirs_value:
+                value = theirs_value
+            elif theirs_value == getattr(base, field):
+                value = mine_value
+            elif field == "stock":
+                value = max(0, theirs_value + (mine_value - snapshot.stock))
+                note = (f"\nStock was also changed on another terminal ({snapshot.stock} -> {theirs_value}); "
+                        f"your change of {mine_value - snapshot.stock:+d} was applied on top: {value}.")
+            else:
+                value = mine_value
+                clashes.append((field, mine_value, theirs_value))
+            setattr(merged, field, value)
+
+        if clashes:
+            details = "\n".join(f"{field.replace('_', ' ').title()}: yours '{mine_value}', saved '{theirs_value}'"
+                                for field, mine_value, theirs_value in clashes)
+            msg_box = QMessageBox(self)
+            msg_box.setWindowTitle("Update Conflict")
+            msg_box.setText(f"'{theirs.name}' was changed on another terminal while you were editing it.\n\n"
+                            f"{details}\n\nKeep your values for these fields?")
+            msg_box.setIcon(QMessageBox.Icon.Warning)
+            msg_box.setStandardButtons(QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No |
+                                       QMessageBox.StandardButton.Cancel)
+            msg_box.button(QMessageBox.StandardButton.Yes).setText("Keep Mine")
+            msg_box.button(QMessageBox.StandardButton.No).setText("Keep Saved")
+            ret = msg_box.exec()
+            if ret == QMessageBox.StandardButton.Cancel:
+                return None, ""
+            if ret == QMessageBox.StandardButton.No:
+                for field, _, theirs_value in clashes:
+                    setattr(merged, field, theirs_value)
+        return merged, note
 
     def delete_medicine(self):
         if self.selected_medicine_id is None:
@@ -389,16 +495,17 @@ class MedicineScreen(QWidget):
         ret = msg_box.exec()
 
         if ret == QMessageBox.StandardButton.Yes:
-            if self.db_manager.delete_medicine(self.selected_medicine_id):
-                self.show_message("Success", f"Medicine ID {self.selected_medicine_id} deleted successfully.")
-                self.load_medicines()
+            medicine_id = self.selected_medicine_id  # Removing the row clears the selection
+            if self.db_manager.delete_medicine(medicine_id):
+                self.show_message("Success", f"Medicine ID {medicine_id} deleted successfully.")
+                self.clear_form()
                 self.data_changed.emit()  # Emit signal after data change
             # Error messages are handled by DBManager
         else:
             self.show_message("Cancelled", "Deletion cancelled.")
 
     def load_selected_medicine_to_form(self):
-        selected_rows = self.medicine_table.selectedItems()
+        selected_rows = self.medicine_table.selectionModel().selectedRows()
         if not selected_rows:
             self.clear_form()
             self.selected_medicine_id = None
@@ -407,23 +514,26 @@ class MedicineScreen(QWidget):
             self.add_button.setEnabled(True)
             return
 
-        row = selected_rows[0].row()
-        self.selected_medicine_id = int(self.medicine_table.item(row, 0).text())
-
-        self.name_input_widget.setText(self.medicine_table.item(row, 1).text())
-        self.brand_input_widget.setText(self.medicine_table.item(row, 2).text())
-        self.category_input_widget.setText(self.medicine_table.item(row, 3).text())
-        self.price_input_widget.setText(self.medicine_table.item(row, 4).text())
-        self.stock_input_widget.setText(self.medicine_table.item(row, 5).text())
-        self.low_stock_alert_input_widget.setText(self.medicine_table.item(row, 6).text())
-
-        expiry_date_str = self.medicine_table.item(row, 7).text()
-        if expiry_date_str:
-            self.expiry_date_edit.setDate(QDate.fromString(expiry_date_str, Qt.DateFormat.ISODate))
+        med = self.medicine_proxy.object_for_index(selected_rows[0])
+        self.selected_medicine_id = med.id
+        self.editing_medicine = med
+
+        self.name_input_widget.setText(med.name)
+        self.brand_input_widget.setText(med.brand or "")
+        self.category_input_widget.setText(med.category or "")
+        self.barcode_input_widget.setText(med.barcode or "")
+        self.price_input_widget.setText(f"{med.price:.2f}")
+        self.cost_price_input_widget.setText(f"{med.cost_price:.2f}" if med.cost_price is not None else "")
+        self.stock_input_widget.setText(str(med.stock))
+        self.low_stock_alert_input_widget.setText(str(med.low_stock_alert))
+
+        if med.expiry_date:
+            self.expiry_date_edit.setDate(QDate.fromString(med.expiry_date, Qt.DateFormat.ISODate))
         else:
             self.expiry_date_edit.setDate(QDate.currentDate().addYears(1))
 
-        self.description_input_widget.setText(self.medicine_table.item(row, 8).text())
+        self.description_input_widget.setText(med.description or "")
+        self.form_snapshot = self._medicine_from_form(med.id, med.row_version)
 
         self.update_button.setEnabled(True)
         self.delete_button.setEnabled(True)
@@ -433,12 +543,16 @@ class MedicineScreen(QWidget):
         self.name_input_widget.clear()
         self.brand_input_widget.clear()
         self.category_input_widget.clear()
+        self.barcode_input_widget.clear()
         self.price_input_widget.clear()
+        self.cost_price_input_widget.clear()
         self.stock_input_widget.clear()
         self.low_stock_alert_input_widget.setText("10")
         self.expiry_date_edit.setDate(QDate.currentDate().addYears(1))
         self.description_input_widget.clear()
         self.selected_medicine_id = None
+        self.editing_medicine = None
+        self.form_snapshot = None
         self.medicine_table.clearSelection()
 
         self.add_button.setEnabled(True)
@@ -446,36 +560,31 @@ class MedicineScreen(QWidget):
         self.delete_button.setEnabled(False)
 
     def search_medicines(self):
-        search_text = self.search_input.text().strip().lower()
-        for row in range(self.medicine_table.rowCount()):
-            name_match = search_text in self.medicine_table.item(row, 1).text().lower()
-            brand_match = search_text in self.medicine_table.item(row, 2).text().lower()
-            category_match = search_text in self.medicine_table.item(row, 3).text().lower()
-            self.medicine_table.setRowHidden(row, not (name_match or brand_match or category_match))
-
-    def apply_filter(self):
+        self.search_timer.start()
+
+    def _filter_arguments(self):
+        """Returns the find_medicine_ids arguments for the current search box and filters."""
+        arguments = {}
+        search_text = self.search_input.text().strip()
+        if search_text:
+            arguments["search"] = search_text
+        if self.category_filter_combo.currentIndex() > 0:
+            arguments["category"] = self.category_filter_combo.currentText()
         filter_type = self.filter_combo.currentText()
-        all_medicines = self.db_manager.get_all_medicines() if self.db_manager else []
-
-        for row_idx in range(self.medicine_table.rowCount()):
-            self.medicine_table.setRowHidden(row_idx, False)
-
         if filter_type == "Low Stock":
-            for row_idx in range(self.medicine_table.rowCount()):
-                stock = int(self.medicine_table.item(row_idx, 5).text())
-                low_alert = int(self.medicine_table.item(row_idx, 6).text())
-                if stock > low_alert:
-                    self.medicine_table.setRowHidden(row_idx, True)
+            arguments["low_stock"] = True
         elif filter_type == "Expired / Expiring Soon":
-            today = QDate.currentDate()
-            for row_idx in range(self.medicine_table.rowCount()):
-                expiry_date_str = self.medicine_table.item(row_idx, 7).text()
-                if expiry_date_str:
-                    expiry_date = QDate.fromString(expiry_date_str, Qt.DateFormat.ISODate)
-                    if expiry_date >= today.addDays(30) or expiry_date < today:
-                        self.medicine_table.setRowHidden(row_idx, True)
-                else:
-                    self.medicine_table.setRowHidden(row_idx, True)
+            arguments["expiring_within_days"] = EXPIRY_SOON_DAYS
+        return arguments
+
+    def apply_filter(self):
+        """Shows only the medicines matching the search box and both filters."""
+        self.search_timer.stop()
+        arguments = self._filter_arguments()
+        if not arguments or not self.db_manager:
+            self.medicine_proxy.set_visible_ids(None)
+            return
+        self.medicine_proxy.set_visible_ids(self.db_manager.find_medicine_ids(**arguments))
 
     def show_message(self, title, message):
         msg_box = QMessageBox(self)
@@ -1,12 +1,19 @@
 # ui/reports_screen.py
 
+import os
 from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableWidget,
-    QTableWidgetItem, QHeaderView, QComboBox, QDateEdit, QFrame, QApplication,
-    QSizePolicy, QMessageBox # Added QMessageBox for show_message
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableView,
+    QHeaderView, QComboBox, QDateEdit, QFrame, QApplication,
+    QSizePolicy, QMessageBox, QProgressBar # Added QMessageBox for show_message
 )
 from PyQt6.QtGui import QFont
 from PyQt6.QtCore import Qt, QDate
+from database.report_engine import (
+    ReportEngine, DATE_RANGE_REPORTS, SALES_REPORT, TAX_REPORT, SALES_BY_MEDICINE_REPORT, STOCK_REPORT,
+    STOCK_VALUATION_REPORT, STOCK_VALUATION_DETAIL, LOW_STOCK_REPORT, EXPIRING_REPORT
+)
+from ui.table_models import ReportTableModel
+from ui.invoice_renderer import INVOICE_DIR, InvoiceService
 
 class ReportsScreen(QWidget):
     """
@@ -15,6 +22,10 @@ class ReportsScreen(QWidget):
     def __init__(self):
         super().__init__()
         self.db_manager = None # Will be set by DashboardScreen
+        self.report_engine = None # Runs the reports in the background; created in set_db_manager
+        self.invoice_service = None # Renders invoice PDFs in the background; started on first export
+        self.current_result = None # Last report shown; its row_keys / next_params drive the drill-down
+        self.requested_report = None # (report type, params, cache key) last requested; see refresh_if_stale
         self.setup_ui()
 
     def setup_ui(self):
@@ -65,10 +76,13 @@ class ReportsScreen(QWidget):
 
         controls_layout.addWidget(QLabel("Report Type:"))
         self.report_type_combo = QComboBox(self)
-        self.report_type_combo.addItem("Sales by Date Range")
-        self.report_type_combo.addItem("Current Stock Overview")
-        self.report_type_combo.addItem("Low Stock Medicines")
-        self.report_type_combo.addItem("Expiring Medicines")
+        self.report_type_combo.addItem(SALES_REPORT)
+        self.report_type_combo.addItem(TAX_REPORT)
+        self.report_type_combo.addItem(SALES_BY_MEDICINE_REPORT)
+        self.report_type_combo.addItem(STOCK_REPORT)
+        self.report_type_combo.addItem(STOCK_VALUATION_REPORT)
+        self.report_type_combo.addItem(LOW_STOCK_REPORT)
+        self.report_type_combo.addItem(EXPIRING_REPORT)
         self.report_type_combo.currentIndexChanged.connect(self.update_date_inputs_visibility)
         controls_layout.addWidget(self.report_type_combo)
 
@@ -91,19 +105,41 @@ class ReportsScreen(QWidget):
         self.generate_report_button.clicked.connect(self.generate_report)
         controls_layout.addWidget(self.generate_report_button)
 
+        self.cancel_report_button = self._create_button("Cancel", "#6c757d")
+        self.cancel_report_button.clicked.connect(self.cancel_report)
+        self.cancel_report_button.setEnabled(False)
+        controls_layout.addWidget(self.cancel_report_button)
+
+        # Writes every invoice in the date range to one PDF (e.g. for auditors)
+        self.export_invoices_button = self._create_button("Export Invoices (PDF)", "#17a2b8")
+        self.export_invoices_button.clicked.connect(self.export_invoices)
+        controls_layout.addWidget(self.export_invoices_button)
+
+        # Next page of a stock valuation drill-down
+        self.load_more_button = self._create_button("Load More", "#28a745")
+        self.load_more_button.clicked.connect(self.load_more)
+        self.load_more_button.setVisible(False)
+        controls_layout.addWidget(self.load_more_button)
+
+        self.report_progress_bar = QProgressBar(self)
+        self.report_progress_bar.setFixedWidth(200)
+        self.report_progress_bar.setVisible(False)
+        controls_layout.addWidget(self.report_progress_bar)
+
         controls_layout.addStretch() # Push controls to the left
 
         main_layout.addWidget(controls_frame)
 
         # --- Report Display Table ---
-        self.report_table = QTableWidget(self)
-        self.report_table.setColumnCount(0) # Will be set dynamically
-        self.report_table.setHorizontalHeaderLabels([]) # Will be set dynamically
+        self.report_model = ReportTableModel(self) # Columns are set per report
+        self.report_table = QTableView(self)
+        self.report_table.setModel(self.report_model)
         self.report_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        self.report_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.report_table.setSelectionMode(QTableWidget.SelectionMode.NoSelection) # Reports are usually read-only
+        self.report_table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.report_table.setSelectionMode(QTableView.SelectionMode.NoSelection) # Reports are usually read-only
+        self.report_table.doubleClicked.connect(self.drill_down)
         self.report_table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background-color: #FFFFFF;
                 border-radius: 15px;
                 border: 1px solid #e0e0e0;
@@ -116,7 +152,7 @@ class ReportsScreen(QWidget):
                 font-weight: bold;
                 color: #34495e;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 5px;
             }
         """)
@@ -162,133 +198,165 @@ class ReportsScreen(QWidget):
     def set_db_manager(self, db_manager):
         """Sets the DBManager instance for this screen."""
         self.db_manager = db_manager
-        # Automatically generate a default report when screen is loaded
+        self.report_engine = ReportEngine(db_manager, parent=self)
+        self.report_engine.report_ready.connect(self.display_report)
+        self.report_engine.report_progress.connect(self.update_report_progress)
+        self.report_engine.report_failed.connect(self.on_report_failed)
+        self.report_engine.report_cancelled.connect(self.on_report_cancelled)
+        # The default report is generated when the screen is first shown (refresh_if_stale)
+
+    def refresh_if_stale(self):
+        """
+        Called when the screen is shown. Requests the report again only if none was requested
+        yet, a table it reads has changed since, or (for the expiring report) the date moved on.
+
+        Returns:
+            bool: True if a report was requested.
+        """
+        if not self.report_engine:
+            return False
+        if self.requested_report:
+            report_type, params, key = self.requested_report
+            if report_type == EXPIRING_REPORT:
+                params = ReportEngine.report_params(report_type)
+            if self.report_engine.cache_key(report_type, params) == key:
+                return False
         self.generate_report()
+        return True
+
+    def mark_stale(self):
+        """
+        Forgets every report, e.g. after a backup was restored. The report on show is
+        generated again now; otherwise the next time the screen is shown.
+        """
+        if not self.report_engine:
+            return
+        self.report_engine.reset()
+        if self.isVisible():
+            self.refresh_if_stale()
 
     def update_date_inputs_visibility(self):
         """Hides/shows date inputs based on selected report type."""
         report_type = self.report_type_combo.currentText()
-        is_date_range_report = (report_type == "Sales by Date Range")
+        is_date_range_report = report_type in DATE_RANGE_REPORTS
         self.start_date_edit.setVisible(is_date_range_report)
         self.end_date_edit.setVisible(is_date_range_report)
         self.from_label.setVisible(is_date_range_report) # Use stored reference
         self.to_label.setVisible(is_date_range_report)   # Use stored reference
+        self.export_invoices_button.setVisible(report_type == SALES_REPORT)
+        self.report_table.setToolTip("Double-click a group to list its medicines."
+                                     if report_type == STOCK_VALUATION_REPORT else "")
 
     def generate_report(self):
-        """Generates the selected report and displays it in the table."""
+        """
+        Requests the selected report. Unchanged reports are shown from the cache at once;
+        others are computed in the background and shown by display_report.
+        """
         if not self.db_manager:
             self.show_message("Error", "Database manager not set.")
             return
 
         report_type = self.report_type_combo.currentText()
-        self.report_table.setRowCount(0) # Clear previous results
-
-        if report_type == "Sales by Date Range":
-            start_date = self.start_date_edit.date().toString(Qt.DateFormat.ISODate)
-            end_date = self.end_date_edit.date().toString(Qt.DateFormat.ISODate)
-            self._generate_sales_report(start_date, end_date)
-        elif report_type == "Current Stock Overview":
-            self._generate_current_stock_report()
-        elif report_type == "Low Stock Medicines":
-            self._generate_low_stock_report()
-        elif report_type == "Expiring Medicines":
-            self._generate_expiring_medicines_report()
-
-    def _generate_sales_report(self, start_date, end_date):
-        """Generates and displays a sales report for a given date range."""
-        sales = self.db_manager.get_sales_in_date_range(start_date, end_date)
-        if not sales:
-            self.show_message("No Data", f"No sales found between {start_date} and {end_date}.")
-            self.report_table.setColumnCount(0)
-            self.report_table.setHorizontalHeaderLabels([])
+        start_date = self.start_date_edit.date().toString(Qt.DateFormat.ISODate)
+        end_date = self.end_date_edit.date().toString(Qt.DateFormat.ISODate)
+        params = ReportEngine.report_params(report_type, start_date, end_date)
+        self._request_report(report_type, params)
+
+    def _request_report(self, report_type, params, keep_rows=False):
+        self.load_more_button.setVisible(False)
+        if not keep_rows:
+            self.requested_report = (report_type, params, self.report_engine.cache_key(report_type, params))
+        self.report_engine.request(report_type, params)
+        if self.report_engine.current_job:
+            if not keep_rows:
+                self.report_model.set_report([], []) # Clear previous results
+            self.cancel_report_button.setEnabled(True)
+            self.report_progress_bar.setRange(0, 0)
+            self.report_progress_bar.setVisible(True)
+
+    def drill_down(self, index):
+        """Lists the medicines of the stock valuation group that was double-clicked."""
+        row_keys = (self.current_result or {}).get("row_keys")
+        if not row_keys or not index.isValid() or not row_keys[index.row()]:
             return
-
-        headers = ["Sale ID", "Customer Name", "Total Amount (PKR)", "Sale Date", "Items Sold"]
-        self.report_table.setColumnCount(len(headers))
-        self.report_table.setHorizontalHeaderLabels(headers)
-        self.report_table.setRowCount(len(sales))
-
-        for row_idx, sale in enumerate(sales):
-            self.report_table.setItem(row_idx, 0, QTableWidgetItem(str(sale["id"])))
-            self.report_table.setItem(row_idx, 1, QTableWidgetItem(sale["customer_name"]))
-            self.report_table.setItem(row_idx, 2, QTableWidgetItem(f"{sale['total_amount']:.2f}"))
-            self.report_table.setItem(row_idx, 3, QTableWidgetItem(sale["sale_date"]))
-            items_text = ", ".join([f"{item['name']} (x{item['qty']})" for item in sale["items"]])
-            self.report_table.setItem(row_idx, 4, QTableWidgetItem(items_text))
-        self.report_table.resizeColumnsToContents()
-        self.report_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-
-    def _generate_current_stock_report(self):
-        """Generates and displays a report of all medicines and their current stock."""
-        medicines = self.db_manager.get_all_medicines()
-        if not medicines:
-            self.show_message("No Data", "No medicines found in inventory.")
-            self.report_table.setColumnCount(0)
-            self.report_table.setHorizontalHeaderLabels([])
+        category, brand = row_keys[index.row()]
+        self._request_report(STOCK_VALUATION_DETAIL, (category, brand, None))
+
+    def load_more(self):
+        """Appends the next page of the stock valuation drill-down."""
+        next_params = (self.current_result or {}).get("next_params")
+        if next_params:
+            self._request_report(STOCK_VALUATION_DETAIL, next_params, keep_rows=True)
+
+    def cancel_report(self):
+        """Cancels the report being computed."""
+        if self.report_engine:
+            self.report_engine.cancel()
+
+    def update_report_progress(self, done, total):
+        """Shows how many rows of the running report are ready (a busy bar while querying)."""
+        self.report_progress_bar.setRange(0, total)
+        self.report_progress_bar.setValue(done)
+
+    def _finish_report_job(self):
+        self.cancel_report_button.setEnabled(False)
+        self.report_progress_bar.setVisible(False)
+
+    def display_report(self, report_type, result, from_cache):
+        """Fills the table with a finished report."""
+        self._finish_report_job()
+        shown_type = STOCK_VALUATION_REPORT if report_type == STOCK_VALUATION_DETAIL else report_type
+        if shown_type != self.report_type_combo.currentText():
+            return # The user picked another report meanwhile
+        self.current_result = result
+        self.load_more_button.setVisible(bool(result.get("next_params")))
+        if result.get("continues"):
+            self.report_model.append_rows(result["rows"])
             return
-
-        headers = ["ID", "Medicine Name", "Brand", "Category", "Current Stock", "Price (PKR)", "Expiry Date"]
-        self.report_table.setColumnCount(len(headers))
-        self.report_table.setHorizontalHeaderLabels(headers)
-        self.report_table.setRowCount(len(medicines))
-
-        for row_idx, med in enumerate(medicines):
-            self.report_table.setItem(row_idx, 0, QTableWidgetItem(str(med.id)))
-            self.report_table.setItem(row_idx, 1, QTableWidgetItem(med.name))
-            self.report_table.setItem(row_idx, 2, QTableWidgetItem(med.brand if med.brand else "N/A"))
-            self.report_table.setItem(row_idx, 3, QTableWidgetItem(med.category if med.category else "N/A"))
-            self.report_table.setItem(row_idx, 4, QTableWidgetItem(str(med.stock)))
-            self.report_table.setItem(row_idx, 5, QTableWidgetItem(f"{med.price:.2f}"))
-            self.report_table.setItem(row_idx, 6, QTableWidgetItem(med.expiry_date if med.expiry_date else "N/A"))
-        self.report_table.resizeColumnsToContents()
-        self.report_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-
-    def _generate_low_stock_report(self):
-        """Generates and displays a report of medicines with low stock."""
-        low_stock_medicines = self.db_manager.get_all_low_stock_medicines()
-        if not low_stock_medicines:
-            self.show_message("No Data", "No medicines currently have low stock.")
-            self.report_table.setColumnCount(0)
-            self.report_table.setHorizontalHeaderLabels([])
+        if not result["rows"]:
+            self.report_model.set_report([], [])
+            self.show_message("No Data", result["empty_message"])
             return
+        self.report_model.set_report(result["headers"], result["rows"])
 
-        headers = ["ID", "Medicine Name", "Brand", "Current Stock", "Low Alert Threshold", "Expiry Date"]
-        self.report_table.setColumnCount(len(headers))
-        self.report_table.setHorizontalHeaderLabels(headers)
-        self.report_table.setRowCount(len(low_stock_medicines))
-
-        for row_idx, med in enumerate(low_stock_medicines):
-            self.report_table.setItem(row_idx, 0, QTableWidgetItem(str(med.id)))
-            self.report_table.setItem(row_idx, 1, QTableWidgetItem(med.name))
-            self.report_table.setItem(row_idx, 2, QTableWidgetItem(med.brand if med.brand else "N/A"))
-            self.report_table.setItem(row_idx, 3, QTableWidgetItem(str(med.stock)))
-            self.report_table.setItem(row_idx, 4, QTableWidgetItem(str(med.low_stock_alert)))
-            self.report_table.setItem(row_idx, 5, QTableWidgetItem(med.expiry_date if med.expiry_date else "N/A"))
-        self.report_table.resizeColumnsToContents()
-        self.report_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+    def on_report_failed(self, report_type, message):
+        self._finish_report_job()
+        self.show_message("Report Error", f"Could not generate '{report_type}':\n{message}")
+
+    def on_report_cancelled(self, report_type):
+        self._finish_report_job()
 
-    def _generate_expiring_medicines_report(self):
-        """Generates and displays a report of medicines expiring soon or already expired."""
-        expiring_medicines = self.db_manager.get_all_expiring_medicines(days_threshold=90)
-        if not expiring_medicines:
-            self.show_message("No Data", "No medicines expiring within the next 90 days or already expired.")
-            self.report_table.setColumnCount(0)
-            self.report_table.setHorizontalHeaderLabels([])
+    def export_invoices(self):
+        """Renders the invoices of all sales in the selected date range to a single PDF in the background."""
+        if not self.db_manager:
+            self.show_message("Error", "Database manager not set.")
             return
+        start_date = self.start_date_edit.date().toString(Qt.DateFormat.ISODate)
+        end_date = self.end_date_edit.date().toString(Qt.DateFormat.ISODate)
+        path = os.path.join(INVOICE_DIR, f"invoices-{start_date}_to_{end_date}.pdf")
+        if not self.invoice_service:
+            self.invoice_service = InvoiceService(self.db_manager, parent=self)
+            self.invoice_service.worker.finished.connect(self.on_invoices_exported)
+            self.invoice_service.worker.failed.connect(self.on_invoice_export_failed)
+        self.export_invoices_button.setEnabled(False)
+        self.export_invoices_button.setText("Exporting...")
+        self.invoice_service.render_sales_range(start_date, end_date, path)
+
+    def _finish_invoice_export(self):
+        self.export_invoices_button.setEnabled(True)
+        self.export_invoices_button.setText("Export Invoices (PDF)")
+
+    def on_invoices_exported(self, path, count, seconds):
+        self._finish_invoice_export()
+        if count == 0:
+            self.show_message("No Data", "No sales found in the selected date range.")
+            return
+        self.show_message("Invoices Exported",
+                          f"{count} invoice(s) written to {os.path.abspath(path)} in {seconds:.1f}s.")
 
-        headers = ["ID", "Medicine Name", "Brand", "Current Stock", "Expiry Date"]
-        self.report_table.setColumnCount(len(headers))
-        self.report_table.setHorizontalHeaderLabels(headers)
-        self.report_table.setRowCount(len(expiring_medicines))
-
-        for row_idx, med in enumerate(expiring_medicines):
-            self.report_table.setItem(row_idx, 0, QTableWidgetItem(str(med.id)))
-            self.report_table.setItem(row_idx, 1, QTableWidgetItem(med.name))
-            self.report_table.setItem(row_idx, 2, QTableWidgetItem(med.brand if med.brand else "N/A"))
-            self.report_table.setItem(row_idx, 3, QTableWidgetItem(str(med.stock)))
-            self.report_table.setItem(row_idx, 4, QTableWidgetItem(med.expiry_date if med.expiry_date else "N/A"))
-        self.report_table.resizeColumnsToContents()
-        self.report_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+    def on_invoice_export_failed(self, message):
+        self._finish_invoice_export()
+        self.show_message("Export Failed", f"Could not export the invoices: {message}")
 
     def show_message(self, title, message):
         """Displays an information or error message box."""
@@ -335,7 +403,7 @@ if __name__ == "__main__":
 
     # Add some dummy data for testing reports
     db_manager.add_medicine(
-        Medicine("Paracetamol 500mg", "Tylenol", "Pain Relief", 5.50, 100, expiry_date="2025-12-31"))
+        Medicine("Paracetamol 500mg", "Tylenol", "Pain Relief", 5.50, 100, expiry_date="2025-12-31", cost_price=3.20))
     db_manager.add_medicine(
         Medicine("Amoxicillin 250mg", "Amoxil", "Antibiotic", 12.75, 50, low_stock_alert=5, expiry_date="2024-10-15"))
     db_manager.add_medicine(Medicine("Expired Med", "Brand X", "Expired", 10.0, 5, expiry_date="2023-01-01"))
@@ -357,4 +425,5 @@ if __name__ == "__main__":
     reports_screen = ReportsScreen()
     reports_screen.set_db_manager(db_manager) # Pass the DB manager
     reports_screen.showMaximized()
+    reports_screen.refresh_if_stale()
     sys.exit(app.exec())
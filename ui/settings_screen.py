@@ -1,17 +1,33 @@
 # ui/settings_screen.py
 
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QApplication
+import os
+from PyQt6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableWidget, QTableWidgetItem,
+    QHeaderView, QProgressBar, QFrame, QMessageBox, QSpinBox, QApplication
+)
 from PyQt6.QtGui import QFont
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QThread, pyqtSignal
+
+from database.db_manager import DBManager, SALES_ARCHIVE_HORIZON_DAYS
+from database.backup_service import BackupService, BackupWorker
 
 class SettingsScreen(QWidget):
     """
-    UI for managing application settings. This is a placeholder screen
-    that can be expanded to include various configurable options.
+    UI for managing application settings, including database backups:
+    scheduled and manual snapshots, verification and restore.
     """
-    def __init__(self):
+    # Emitted after a snapshot has been restored, so other screens can reload
+    database_restored = pyqtSignal()
+    backup_requested = pyqtSignal()
+
+    def __init__(self, backup_interval_ms=60 * 60 * 1000, backup_keep=24):
         super().__init__()
         self.db_manager = None # Will be set by DashboardScreen
+        self.backup_interval_ms = backup_interval_ms
+        self.backup_keep = backup_keep
+        self.backup_service = None
+        self.backup_thread = None
+        self.backup_worker = None
         self.setup_ui()
 
     def setup_ui(self):
@@ -33,6 +49,101 @@ class SettingsScreen(QWidget):
         info_label.setStyleSheet("color: #34495e;")
         main_layout.addWidget(info_label)
 
+        # --- Database backups ---
+        backup_frame = QFrame(self)
+        backup_frame.setStyleSheet("""
+            QFrame {
+                background-color: #FFFFFF;
+                border-radius: 15px;
+            }
+            QLabel {
+                color: #34495e;
+            }
+            QTableWidget {
+                background-color: #f8f8f8;
+                border-radius: 10px;
+                border: 1px solid #e0e0e0;
+                font-size: 12px;
+            }
+        """)
+        backup_layout = QVBoxLayout(backup_frame)
+        backup_layout.setContentsMargins(25, 25, 25, 25)
+        backup_layout.setSpacing(10)
+
+        backup_title = QLabel("Database Backups")
+        backup_title.setFont(QFont("Arial", 20, QFont.Weight.Bold))
+        backup_layout.addWidget(backup_title)
+
+        self.backup_status_label = QLabel("Backups are taken automatically while the app is running.")
+        self.backup_status_label.setFont(QFont("Arial", 12))
+        backup_layout.addWidget(self.backup_status_label)
+
+        self.backup_progress_bar = QProgressBar()
+        self.backup_progress_bar.setVisible(False)
+        backup_layout.addWidget(self.backup_progress_bar)
+
+        self.snapshot_table = QTableWidget(self)
+        self.snapshot_table.setColumnCount(4)
+        self.snapshot_table.setHorizontalHeaderLabels(["Snapshot", "Type", "Created", "Size"])
+        self.snapshot_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.snapshot_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.snapshot_table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
+        self.snapshot_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        backup_layout.addWidget(self.snapshot_table)
+
+        button_layout = QHBoxLayout()
+        self.backup_now_button = self._create_button("Back Up Now", "#28a745")
+        self.verify_button = self._create_button("Verify Selected", "#007bff")
+        self.restore_button = self._create_button("Restore Selected", "#dc3545")
+        self.backup_now_button.clicked.connect(self.backup_now)
+        self.verify_button.clicked.connect(self.verify_selected_snapshot)
+        self.restore_button.clicked.connect(self.restore_selected_snapshot)
+        button_layout.addWidget(self.backup_now_button)
+        button_layout.addWidget(self.verify_button)
+        button_layout.addWidget(self.restore_button)
+        backup_layout.addLayout(button_layout)
+
+        main_layout.addWidget(backup_frame)
+
+        # --- Sales archive ---
+        archive_frame = QFrame(self)
+        archive_frame.setStyleSheet("""
+            QFrame {
+                background-color: #FFFFFF;
+                border-radius: 15px;
+            }
+            QLabel {
+                color: #34495e;
+            }
+        """)
+        archive_layout = QVBoxLayout(archive_frame)
+        archive_layout.setContentsMargins(25, 25, 25, 25)
+        archive_layout.setSpacing(10)
+
+        archive_title = QLabel("Sales Archive")
+        archive_title.setFont(QFont("Arial", 20, QFont.Weight.Bold))
+        archive_layout.addWidget(archive_title)
+
+        self.archive_status_label = QLabel("No sales have been archived yet.")
+        self.archive_status_label.setFont(QFont("Arial", 12))
+        archive_layout.addWidget(self.archive_status_label)
+
+        archive_row = QHBoxLayout()
+        horizon_label = QLabel("Archive sales older than (days):")
+        horizon_label.setFont(QFont("Arial", 12))
+        self.archive_horizon_input = QSpinBox()
+        self.archive_horizon_input.setRange(30, 3650)
+        self.archive_horizon_input.setValue(SALES_ARCHIVE_HORIZON_DAYS)
+        self.archive_button = self._create_button("Archive Now", "#6f42c1")
+        self.archive_button.clicked.connect(self.archive_old_sales)
+        archive_row.addWidget(horizon_label)
+        archive_row.addWidget(self.archive_horizon_input)
+        archive_row.addStretch()
+        archive_row.addWidget(self.archive_button)
+        archive_layout.addLayout(archive_row)
+
+        main_layout.addWidget(archive_frame)
+
         # Placeholder for future settings options
         # Example:
         # self.theme_setting_label = QLabel("Theme:", self)
@@ -46,10 +157,197 @@ class SettingsScreen(QWidget):
 
         self.setStyleSheet("background-color: #f0f2f5;")
 
+    def _create_button(self, text, color, font_size=13, padding="10px 20px"):
+        button = QPushButton(text)
+        button.setFont(QFont("Arial", font_size, QFont.Weight.Bold))
+        button.setStyleSheet(f"""
+            QPushButton {{
+                background-color: {color};
+                color: white;
+                border: none;
+                border-radius: 10px;
+                padding: {padding};
+            }}
+            QPushButton:hover {{
+                background-color: {self._darken_color(color)};
+            }}
+            QPushButton:pressed {{
+                background-color: {self._darken_color(color, 0.2)};
+            }}
+            QPushButton:disabled {{
+                background-color: #cccccc;
+                color: #888888;
+            }}
+        """)
+        return button
+
+    def _darken_color(self, hex_color, factor=0.1):
+        hex_color = hex_color.lstrip('#')
+        rgb = tuple(int(hex_color[i:i + 2], 16) for i in (0, 2, 4))
+        darker_rgb = tuple(max(0, int(c * (1 - factor))) for c in rgb)
+        return f"#{darker_rgb[0]:02x}{darker_rgb[1]:02x}{darker_rgb[2]:02x}"
+
     def set_db_manager(self, db_manager):
-        """Sets the DBManager instance for this screen."""
+        """Sets the DBManager instance for this screen and starts scheduled backups."""
         self.db_manager = db_manager
-        # No data loading needed for this basic placeholder, but useful for future features
+        self.load_archive_summary()
+        if not isinstance(db_manager, DBManager):
+            # DBManagerClient: the database lives on the API server, which owns its backups.
+            self.backup_status_label.setText("Backups are managed on the PharmaCare server.")
+            for button in (self.backup_now_button, self.verify_button, self.restore_button):
+                button.setEnabled(False)
+            return
+        backup_dir = os.path.join(os.path.dirname(os.path.abspath(db_manager.db_name)), "backups")
+        self.backup_service = BackupService(db_manager.db_name, backup_dir, keep=self.backup_keep)
+        self.load_snapshots()
+        self.start_backups()
+
+    def start_backups(self):
+        """Starts the backup worker thread and its snapshot schedule."""
+        self.stop_backups()
+        self.backup_thread = QThread(self)
+        self.backup_worker = BackupWorker(self.backup_service, self.backup_interval_ms)
+        self.backup_worker.moveToThread(self.backup_thread)
+        self.backup_thread.started.connect(self.backup_worker.start)
+        self.backup_thread.finished.connect(self.backup_worker.stop, Qt.ConnectionType.DirectConnection)
+        self.backup_requested.connect(self.backup_worker.manual_snapshot)
+        self.backup_worker.backup_progress.connect(self.on_backup_progress)
+        self.backup_worker.snapshot_created.connect(self.on_snapshot_created)
+        self.backup_worker.backup_failed.connect(self.on_backup_failed)
+        QApplication.instance().aboutToQuit.connect(self.stop_backups)
+        self.backup_thread.start()
+
+    def stop_backups(self):
+        """Stops the backup thread, letting a snapshot in progress finish first."""
+        if self.backup_thread:
+            self.backup_requested.disconnect(self.backup_worker.manual_snapshot)
+            self.backup_thread.quit()
+            self.backup_thread.wait()
+            self.backup_thread = None
+            self.backup_worker = None
+
+    def load_snapshots(self):
+        """Lists the snapshots in the backup folder, newest first."""
+        snapshots = self.backup_service.list_snapshots() if self.backup_service else []
+        self.snapshot_table.setRowCount(len(snapshots))
+        for row_idx, snapshot in enumerate(snapshots):
+            name_item = QTableWidgetItem(snapshot["name"])
+            name_item.setData(Qt.ItemDataRole.UserRole, snapshot["path"])
+            self.snapshot_table.setItem(row_idx, 0, name_item)
+            self.snapshot_table.setItem(row_idx, 1, QTableWidgetItem(
+                {"auto": "Scheduled", "manual": "Manual", "prerestore": "Before restore"}.get(
+                    snapshot["label"], snapshot["label"])))
+            self.snapshot_table.setItem(row_idx, 2, QTableWidgetItem(
+                snapshot["created_at"].strftime("%Y-%m-%d %H:%M:%S")))
+            self.snapshot_table.setItem(row_idx, 3, QTableWidgetItem(f"{snapshot['size'] / 1024:.0f} KB"))
+        if snapshots:
+            self.backup_status_label.setText(
+                f"Last backup: {snapshots[0]['created_at'].strftime('%Y-%m-%d %H:%M')} "
+                f"({len(snapshots)} snapshot(s) in {self.backup_service.backup_dir})")
+
+    def _selected_snapshot_path(self):
+        selected_rows = self.snapshot_table.selectionModel().selectedRows()
+        if not selected_rows:
+            self.show_message("Selection Error", "Please select a snapshot from the list.")
+            return None
+        return self.snapshot_table.item(selected_rows[0].row(), 0).data(Qt.ItemDataRole.UserRole)
+
+    def backup_now(self):
+        """Asks the backup worker for a manual snapshot; the copy runs in the background."""
+        if not self.backup_worker:
+            return
+        self.backup_now_button.setEnabled(False)
+        self.backup_status_label.setText("Backing up...")
+        self.backup_requested.emit()
+
+    def on_backup_progress(self, copied_pages, total_pages):
+        self.backup_progress_bar.setVisible(True)
+        self.backup_progress_bar.setMaximum(max(total_pages, 1))
+        self.backup_progress_bar.setValue(copied_pages)
+
+    def on_snapshot_created(self, path):
+        self.backup_progress_bar.setVisible(False)
+        self.backup_now_button.setEnabled(True)
+        self.load_snapshots()
+
+    def on_backup_failed(self, message):
+        self.backup_progress_bar.setVisible(False)
+        self.backup_now_button.setEnabled(True)
+        self.backup_status_label.setText(f"Last backup failed: {message}")
+
+    def verify_selected_snapshot(self):
+        """Runs an integrity check on the selected snapshot."""
+        path = self._selected_snapshot_path()
+        if not path:
+            return
+        ok, message = self.backup_service.verify_snapshot(path)
+        if ok:
+            self.show_message("Snapshot Verified", f"{os.path.basename(path)} passed the integrity check.")
+        else:
+            self.show_message("Snapshot Damaged", f"{os.path.basename(path)} failed the integrity check:\n{message}")
+
+    def restore_selected_snapshot(self):
+        """Replaces the live database with the selected snapshot after confirmation."""
+        path = self._selected_snapshot_path()
+        if not path:
+            return
+
+        msg_box = QMessageBox(self)
+        msg_box.setWindowTitle("Confirm Restore")
+        msg_box.setText(f"Replace all current data with the snapshot {os.path.basename(path)}?\n\n"
+                        "Sales and changes made since that snapshot will be removed. The current "
+                        "database is saved as a 'Before restore' snapshot first.")
+        msg_box.setIcon(QMessageBox.Icon.Warning)
+        msg_box.setStandardButtons(QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        msg_box.setDefaultButton(QMessageBox.StandardButton.No)
+        if msg_box.exec() != QMessageBox.StandardButton.Yes:
+            self.show_message("Cancelled", "Restore cancelled.")
+            return
+
+        try:
+            safety_path = self.backup_service.restore_snapshot(path, self.db_manager.conn)
+        except Exception as e:
+            self.show_message("Restore Failed", f"The database was not changed: {e}")
+            return
+        self.db_manager.reset_after_restore()
+        self.load_snapshots()
+        self.database_restored.emit()
+        self.show_message("Success", f"Database restored from {os.path.basename(path)}.\n"
+                                     f"The previous data was saved as {os.path.basename(safety_path)}.")
+
+    def load_archive_summary(self):
+        """Shows how many sales live in the yearly archives."""
+        summary = self.db_manager.get_sales_archive_summary()
+        if summary["archived_sales"]:
+            years = ", ".join(str(year) for year in summary["years"])
+            self.archive_status_label.setText(
+                f"{summary['archived_sales']} sale(s) worth {summary['archived_amount']:.2f} archived "
+                f"up to {summary['archived_through']} (archives: {years}).")
+        else:
+            self.archive_status_label.setText("No sales have been archived yet.")
+
+    def archive_old_sales(self):
+        """Moves sales older than the chosen number of days into the yearly archives."""
+        horizon_days = self.archive_horizon_input.value()
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            moved = self.db_manager.archive_old_sales(horizon_days)
+        finally:
+            QApplication.restoreOverrideCursor()
+        if moved < 0:
+            return  # DBManager has already shown the error
+        self.load_archive_summary()
+        self.show_message("Success", f"{moved} sale(s) older than {horizon_days} days archived.")
+
+    def show_message(self, title, message):
+        msg_box = QMessageBox(self)
+        msg_box.setWindowTitle(title)
+        msg_box.setText(message)
+        msg_box.setIcon(
+            QMessageBox.Icon.Information if title in ("Success", "Cancelled", "Snapshot Verified")
+            else QMessageBox.Icon.Warning)
+        msg_box.setStandardButtons(QMessageBox.StandardButton.Ok)
+        msg_box.exec()
 
 
 if __name__ == "__main__":
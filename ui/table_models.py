@@ -0,0 +1,261 @@
+# ui/table_models.py
+
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel, QVariant
+
+
+class EntityTableModel(QAbstractTableModel):
+    """
+    Read-only table model holding one object per row, indexed by the object's ID.
+
+    Screens load it once with set_rows() and afterwards apply row-level patches
+    (upsert_rows / remove_ids) when DBManager publishes a ChangeEvent, so a sale
+    touching 3 medicines repaints 3 rows instead of rebuilding the whole table.
+    """
+
+    def __init__(self, columns, key=lambda obj: obj.id, sort_key=None, newest_first=False, parent=None):
+        """
+        Args:
+            columns (list): (header, getter) pairs; getter(obj) returns the cell text.
+            key (callable): Returns the unique ID of a row object.
+            sort_key (callable, optional): Keeps inserted rows in this order (e.g. by name).
+            newest_first (bool): Without a sort_key, insert new rows at the top instead of the bottom.
+        """
+        super().__init__(parent)
+        self.columns = columns
+        self.key = key
+        self.sort_key = sort_key
+        self.newest_first = newest_first
+        self._rows = []
+        self._row_by_id = {}
+
+    # --- QAbstractTableModel interface ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return QVariant()
+        value = self.columns[index.column()][1](self._rows[index.row()])
+        return "" if value is None else str(value)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return QVariant()
+        if orientation == Qt.Orientation.Horizontal:
+            return self.columns[section][0]
+        return str(section + 1)
+
+    # --- Row access ---
+    def row_object(self, row):
+        """Returns the object shown in the given row."""
+        return self._rows[row]
+
+    def row_for_id(self, object_id):
+        """Returns the row showing the given ID, or None."""
+        return self._row_by_id.get(object_id)
+
+    def objects(self):
+        """Returns all row objects in display order."""
+        return list(self._rows)
+
+    # --- Loading and patching ---
+    def set_rows(self, objects):
+        """Replaces the whole table (initial load)."""
+        self.beginResetModel()
+        self._rows = list(objects)
+        self._reindex()
+        self.endResetModel()
+
+    def upsert_rows(self, objects):
+        """Updates rows already shown in place and inserts the rest."""
+        for obj in objects:
+            row = self._row_by_id.get(self.key(obj))
+            if row is None:
+                self._insert(obj)
+                continue
+            if self.sort_key and self.sort_key(self._rows[row]) != self.sort_key(obj):
+                # The sort position changed (e.g. a rename); move the row.
+                self._remove_row(row)
+                self._insert(obj)
+                continue
+            self._rows[row] = obj
+            self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.columns) - 1))
+
+    def remove_ids(self, object_ids):
+        """Removes the rows showing the given IDs."""
+        for object_id in object_ids:
+            row = self._row_by_id.get(object_id)
+            if row is not None:
+                self._remove_row(row)
+
+    def _insert(self, obj):
+        row = self._insert_position(obj)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._rows.insert(row, obj)
+        self._reindex(row)
+        self.endInsertRows()
+
+    def _remove_row(self, row):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._rows[row]
+        self._row_by_id = {k: r for k, r in self._row_by_id.items() if r != row}
+        self._reindex(row)
+        self.endRemoveRows()
+
+    def _insert_position(self, obj):
+        if not self.sort_key:
+            return 0 if self.newest_first else len(self._rows)
+        target = self.sort_key(obj)
+        low, high = 0, len(self._rows)
+        while low < high:  # Binary search so only log(n) sort keys are computed
+            mid = (low + high) // 2
+            if self.sort_key(self._rows[mid]) <= target:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def _reindex(self, start=0):
+        """Rebuilds the ID index from the given row onwards."""
+        if start == 0:
+            self._row_by_id = {}
+        for row in range(start, len(self._rows)):
+            self._row_by_id[self.key(self._rows[row])] = row
+
+
+class IdFilterProxyModel(QSortFilterProxyModel):
+    """
+    Shows only the rows of an EntityTableModel whose IDs are in a given set.
+
+    The set comes from a database query (e.g. DBManager.find_medicine_ids), so
+    filtering never has to inspect the row objects themselves.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._visible_ids = None  # None shows every row
+        self._ranks = None  # ID -> position when showing a ranked result, e.g. DBManager.find_customers
+
+    def set_visible_ids(self, object_ids, ranked=False):
+        """
+        Shows only these IDs; None shows every row.
+        With ranked=True the rows are shown in the order of object_ids (e.g. best match first)
+        instead of the source model's order.
+        """
+        object_ids = list(object_ids) if object_ids is not None else None
+        self._visible_ids = set(object_ids) if object_ids is not None else None
+        if ranked and object_ids is not None:
+            self._ranks = {object_id: rank for rank, object_id in enumerate(object_ids)}
+            self.sort(0)
+            self.invalidate()  # Re-sorts even if column 0 was already the sort column
+        else:
+            self._ranks = None
+            self.sort(-1)  # Back to the source model's order
+            self.invalidateFilter()
+
+    def object_for_index(self, index):
+        """Returns the row object behind a proxy index."""
+        return self.sourceModel().row_object(self.mapToSource(index).row())
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if self._visible_ids is None:
+            return True
+        model = self.sourceModel()
+        return model.key(model.row_object(source_row)) in self._visible_ids
+
+    def lessThan(self, left, right):
+        if self._ranks is None:
+            return super().lessThan(left, right)
+        model = self.sourceModel()
+        last = len(self._ranks)
+        return (self._ranks.get(model.key(model.row_object(left.row())), last)
+                < self._ranks.get(model.key(model.row_object(right.row())), last))
+
+
+class ReportTableModel(QAbstractTableModel):
+    """
+    Read-only table of preformatted report rows (lists of strings), as produced
+    by database/report_engine.py. Showing a report only swaps the row list, so
+    even a large cached report appears at once.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._headers = []
+        self._rows = []
+
+    def set_report(self, headers, rows):
+        self.beginResetModel()
+        self._headers = list(headers)
+        self._rows = rows
+        self.endResetModel()
+
+    def append_rows(self, rows):
+        """Adds rows below the current ones, e.g. the next page of a drill-down."""
+        if not rows:
+            return
+        self.beginInsertRows(QModelIndex(), len(self._rows), len(self._rows) + len(rows) - 1)
+        self._rows = self._rows + rows  # Cached results are shared, so never extend them in place
+        self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._headers)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return QVariant()
+        return self._rows[index.row()][index.column()]
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return QVariant()
+        if orientation == Qt.Orientation.Horizontal:
+            return self._headers[section]
+        return str(section + 1)
+
+
+def medicine_columns():
+    """Columns of the full medicine table (MedicineScreen)."""
+    return [
+        ("ID", lambda m: m.id),
+        ("Name", lambda m: m.name),
+        ("Brand", lambda m: m.brand),
+        ("Category", lambda m: m.category),
+        ("Barcode", lambda m: m.barcode),
+        ("Price", lambda m: f"{m.price:.2f}"),
+        ("Cost", lambda m: f"{m.cost_price:.2f}" if m.cost_price is not None else ""),
+        ("Stock", lambda m: m.stock),
+        ("Low Alert", lambda m: m.low_stock_alert),
+        ("Expiry Date", lambda m: m.expiry_date),
+        ("Description", lambda m: m.description),
+        ("Created At", lambda m: m.created_at),
+    ]
+
+
+def customer_columns():
+    """Columns of the full customer table (CustomerScreen)."""
+    return [
+        ("ID", lambda c: c.id),
+        ("Name", lambda c: c.name),
+        ("Phone", lambda c: c.phone),
+        ("Email", lambda c: c.email),
+        ("Address", lambda c: c.address),
+        ("Created At", lambda c: c.created_at),
+    ]
+
+
+def sale_columns():
+    """Columns of the sales history table (BillingScreen); rows are sale dictionaries."""
+    return [
+        ("Sale ID", lambda s: s["id"]),
+        ("Customer", lambda s: s["customer_name"]),
+        ("Total Amount", lambda s: f"{s['total_amount']:.2f}"),
+        ("Date", lambda s: s["sale_date"]),
+        ("Items Sold", lambda s: ", ".join(f"{item['name']} (x{item['qty']})" for item in s["items"])),
+    ]